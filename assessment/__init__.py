@@ -0,0 +1,16 @@
+"""Streamlit-free assessment engine: question banks and scoring."""
+from .questions import (
+    PLACEHOLDER, INDUSTRY_OPTIONS, TOOLS_EXPANDED,
+    YEARS_OPTIONS, HEADCOUNT_OPTIONS, TURNOVER_OPTIONS, WORK_MODE_OPTIONS,
+    BASE_QUESTIONS, CYBER_QUESTIONS, CYBER_TOTAL,
+)
+from .bank import QuestionBank, compile_bank, INITIAL_BANK, CYBER_BANK
+from .branching import (
+    Branching, Visibility, compile_branching, INITIAL_BRANCHING, visible_questions, choice_options,
+)
+from .registry import Banks, current_banks
+from .session import CompactAnswers, WizardSession
+from .scoring import (
+    digital_dependency_score, dd_text, traffic_light,
+    compute_domain_scores, overall_score, add_action_cards, score_assessment,
+)
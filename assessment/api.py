@@ -0,0 +1,305 @@
+"""A small asyncio HTTP API over the scoring engine, for tools that don't drive the Streamlit UI.
+
+    python -m assessment serve [--port 8765] [--window-ms 0] [--max-batch 256]
+
+    POST /score          {"answers": {...}, "cyber_answers": {...}, "id": "...", "profile": {...}, "save": false}
+    POST /score/batch    {"records": [<as above>, ...]}
+    GET  /assessments/<id>
+    GET  /healthz
+    GET  /metrics        Prometheus text (see metrics.py); /metrics.json for JSON
+
+``/score`` answers with ``score_assessment``'s shape (overall, domains,
+digital_dependency, good, fixes). Requests arriving together are micro-batched.
+Every request the event loop reads in one turn, up to ``max_batch``, is
+scored with one vectorised pass over the live cyber bank (see batch.py). A
+burst of clients therefore costs little more than one, and a lone request
+waits for nobody. When the previous batch was not alone, ``window`` seconds
+(default 0) may be added so batches grow further at some latency cost. Scores
+match ``score_assessment`` exactly.
+
+Storage goes through the process-wide ``AssessmentStore``. ``"save": true``
+queues the assessment for its group-commit writer, and lookups borrow a
+connection from its reader pool on a small thread pool, never on the event
+loop. The HTTP handling is deliberately minimal: HTTP/1.1 keep-alive,
+Content-Length bodies and JSON in and out. Put a real proxy in front for TLS.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple, Optional
+
+from . import metrics
+from .bank import QuestionBank
+from .batch import CompiledWeights, compile_weights, encode_answers, score_codes, result_dicts, action_cards_codes
+from .compliance import coverage_dicts
+from .registry import Banks, current_banks
+from .scoring import digital_dependency_score, dd_text, scoring_model
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+MAX_BODY = 1 << 20
+MAX_RECORDS = 1000       # per /score/batch request
+
+class BadRequest(ValueError):
+    pass
+
+# =========================================================
+# Micro-batched scoring
+# =========================================================
+_compiled: Tuple[Optional[str], Optional[CompiledWeights]] = (None, None)
+
+def _weights(banks: Banks) -> CompiledWeights:
+    """The weight matrices of the live cyber bank, recompiled when it is reloaded."""
+    global _compiled
+    version, cw = _compiled
+    if version != banks.version:
+        cw = compile_weights(list(banks.cyber.questions))
+        _compiled = (banks.version, cw)
+    return cw
+
+def score_many(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """``score_assessment`` for every record, in one vectorised pass."""
+    banks = current_banks()
+    cw = _weights(banks)
+    initials = [r.get("answers") or {} for r in records]
+    codes = encode_answers([r.get("cyber_answers") or {} for r in records], cw)
+    res = score_codes(codes, cw)
+    cards = action_cards_codes(codes, initials, banks.rules)
+    compliance = coverage_dicts([r.get("cyber_answers") or {} for r in records], banks)
+    model = scoring_model(banks).version
+    out = []
+    for i, (initial, (good, fixes)) in enumerate(zip(initials, cards)):
+        dd = digital_dependency_score(initial)
+        scored = result_dicts(res, i, cw)
+        out.append({"overall": scored["overall"], "domains": scored["domains"],
+                    "digital_dependency": {"score": dd, "text": dd_text(dd)}, "good": good, "fixes": fixes,
+                    "compliance": compliance[i], "model": model})
+    return out
+
+class Batcher:
+    """Collects records from concurrent requests and scores them together."""
+
+    def __init__(self, window: float = 0.0, max_batch: int = 256):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.Handle] = None
+        self._last = 0          # size of the previous batch
+        self.batches = 0
+        self.records = 0
+
+    async def score(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((record, fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            # Alone, flush as soon as the loop has read whatever else arrived; under load, wait for company.
+            loop = asyncio.get_running_loop()
+            if self._last > 1 and self.window > 0:
+                self._timer = loop.call_later(self.window, self._flush)
+            else:
+                self._timer = loop.call_soon(self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.records += len(batch)
+        self._last = len(batch)
+        metrics.observe("sme_api_batch_size", len(batch))
+        try:
+            with metrics.timer("sme_scoring_seconds", step="api_batch"):
+                results = score_many([r for r, _ in batch])
+        except Exception:
+            # One bad record must not fail the requests it was batched with: score them one by one.
+            for record, fut in batch:
+                try:
+                    res = score_many([record])[0]
+                except Exception as e:
+                    if not fut.done():
+                        fut.set_exception(e)
+                else:
+                    if not fut.done():
+                        fut.set_result(res)
+            return
+        for (_, fut), res in zip(batch, results):
+            if not fut.done():          # the client may have gone away
+                fut.set_result(res)
+
+# =========================================================
+# Requests
+# =========================================================
+def _check_answers(key: str, answers: Dict[str, Any], bank: QuestionBank) -> None:
+    """BadRequest unless every answer to a question of ``bank`` has that question's type."""
+    for qid, v in answers.items():
+        i = bank.index.get(qid)
+        if i is None:
+            continue                                # not asked, so never scored
+        q = bank.questions[i]
+        if q["type"] == "multi":
+            if not (isinstance(v, list) and all(isinstance(x, str) for x in v)):
+                raise BadRequest(f"'{key}.{qid}' must be a list of strings")
+        elif not (isinstance(v, str) or (q.get("allow_other") and isinstance(v, dict)
+                                          and isinstance(v.get("value"), str)
+                                          and isinstance(v.get("comment", ""), str))):
+            raise BadRequest(f"'{key}.{qid}' must be a string")
+
+def _record(body: Any) -> Dict[str, Any]:
+    if not isinstance(body, dict):
+        raise BadRequest("expected a JSON object")
+    for key in ("answers", "cyber_answers", "profile"):
+        if body.get(key) is not None and not isinstance(body[key], dict):
+            raise BadRequest(f"'{key}' must be an object")
+    banks = current_banks()
+    _check_answers("answers", body.get("answers") or {}, banks.initial.bank)
+    _check_answers("cyber_answers", body.get("cyber_answers") or {}, banks.cyber)
+    return body
+
+class ScoringAPI:
+    def __init__(self, window: float = 0.0, max_batch: int = 256, store_threads: int = 4,
+                 db: Optional[str] = None):
+        self.batcher = Batcher(window, max_batch)
+        self.db = db
+        self._io = ThreadPoolExecutor(store_threads, thread_name_prefix="api-store")
+        self.requests = 0
+        self.started = time.time()
+
+    def _store(self):
+        from .store import get_store
+        return get_store(self.db)
+
+    async def _in_pool(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    async def _save(self, record: Dict[str, Any], result: Dict[str, Any]) -> None:
+        rid = record.get("id") or uuid.uuid4().hex
+        result["id"] = rid
+        await self._in_pool(self._store().save, rid, record.get("profile") or {}, record.get("answers") or {},
+                            record.get("cyber_answers"))
+
+    async def route(self, method: str, path: str, body: Any) -> Tuple[int, Any]:
+        self.requests += 1
+        if method == "POST" and path == "/score":
+            record = _record(body)
+            result = await self.batcher.score(record)
+            if record.get("save"):
+                await self._save(record, result)
+            elif record.get("id") is not None:
+                result["id"] = record["id"]
+            return 200, result
+        if method == "POST" and path == "/score/batch":
+            records = body.get("records") if isinstance(body, dict) else None
+            if not isinstance(records, list):
+                raise BadRequest("expected {\"records\": [...]}")
+            if len(records) > MAX_RECORDS:
+                raise BadRequest(f"at most {MAX_RECORDS} records per request")
+            records = [_record(r) for r in records]
+            results = list(await asyncio.gather(*(self.batcher.score(r) for r in records)))
+            for r, res in zip(records, results):
+                if r.get("save"):
+                    await self._save(r, res)
+                elif r.get("id") is not None:
+                    res["id"] = r["id"]
+            return 200, {"results": results}
+        if method == "GET" and path.startswith("/assessments/"):
+            row = await self._in_pool(self._store().get, path[len("/assessments/"):])
+            if row is None:
+                return 404, {"error": "no such assessment"}
+            return 200, {k: row[k] for k in ("id", "completed_at", "stage", "business_name", "overall_score",
+                                              "domain_scores", "good", "fixes")}
+        if method == "GET" and path == "/healthz":
+            b = self.batcher
+            return 200, {"ok": True, "banks": current_banks().version, "uptime_s": round(time.time() - self.started),
+                         "requests": self.requests,
+                         "batches": b.batches, "mean_batch": round(b.records / b.batches, 2) if b.batches else 0}
+        if method == "GET" and path == "/metrics":
+            return 200, metrics.REGISTRY.prometheus()
+        if method == "GET" and path == "/metrics.json":
+            return 200, metrics.REGISTRY.as_json()
+        return 404, {"error": f"no route for {method} {path}"}
+
+    # ---------- HTTP/1.1 ----------
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {"error": "headers too large"}, False)
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                keep = (headers.get("connection", "").lower() != "close") if version == "HTTP/1.1" \
+                    else headers.get("connection", "").lower() == "keep-alive"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "bad Content-Length"}, False)
+                    return
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "body too large"}, False)
+                    return
+                raw = await reader.readexactly(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else None
+                    status, payload = await self.route(method, target.split("?", 1)[0], body)
+                except (BadRequest, json.JSONDecodeError, UnicodeDecodeError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception:
+                    log.exception("error handling %s %s", method, target)
+                    status, payload = 500, {"error": "internal error"}
+                await self._respond(writer, status, payload, keep)
+                if not keep:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep: bool) -> None:
+        if isinstance(payload, str):
+            body, ctype = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, ctype = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(), "application/json"
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                  431: "Request Header Fields Too Large", 500: "Internal Server Error"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep else 'close'}\r\n\r\n"
+                     .encode() + body)
+        await writer.drain()
+
+    def close(self) -> None:
+        self._io.shutdown(wait=True)
+
+async def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, **kwargs: Any) -> None:
+    api = ScoringAPI(**kwargs)
+    server = await asyncio.start_server(api.handle, host, port, backlog=1024)
+    log.info("scoring API listening on %s:%d", host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.close()
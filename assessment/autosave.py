@@ -0,0 +1,194 @@
+"""Autosave of in-progress wizard sessions, and resume by token.
+
+``Autosaver.save(wiz)`` is called on every wizard rerun. It compares the
+session with what was last saved (``wiz.saved``) and queues only what moved:
+the cursor (stage, current question, cyber step) and one record per changed
+answer. A writer thread waits ``delay`` seconds after the first queued change,
+so a burst of clicks from one user collapses into a single write per field,
+then hands every session's changes to the backend in one batch. The same
+thread sweeps expired sessions every ``EVICT_INTERVAL`` seconds.
+
+``load(token)`` rebuilds a ``WizardSession`` from the cursor and answer
+records. The app puts the token in the page URL (``?resume=...``), so a
+dropped connection or a reopened bookmark continues where the user left off.
+Where the records are kept is up to the backend (backends.py).
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from .backends import Changes, SessionBackend, open_backend
+from .branching import Visibility
+from .registry import Banks
+from .session import CompactAnswers, WizardSession
+
+log = logging.getLogger(__name__)
+
+EVICT_INTERVAL = 60.0
+
+_DELETED = object()
+
+class _Saved:
+    __slots__ = ("cursor", "profile", "answers", "cyber_answers")
+
+class _Pending:
+    """One session's unwritten changes; later saves overwrite earlier ones."""
+    __slots__ = ("cursor", "profile", "cleared", "answers")
+
+    def __init__(self):
+        self.cursor: Optional[tuple] = None
+        self.profile: Optional[str] = None
+        self.cleared: List[int] = []                      # parts to wipe before writing answers
+        self.answers: Dict[Tuple[int, str], Any] = {}     # (part, qid) -> value or _DELETED
+
+    def merge(self, newer: Optional["_Pending"]) -> "_Pending":
+        if newer is None:
+            return self
+        self.cursor = newer.cursor or self.cursor
+        self.profile = newer.profile or self.profile
+        self.cleared += newer.cleared
+        self.answers = {k: v for k, v in self.answers.items() if k[0] not in newer.cleared}
+        self.answers.update(newer.answers)
+        return self
+
+def _copy_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in profile.items()}
+
+def _cursor(wiz: WizardSession) -> tuple:
+    return wiz.assessment_id, wiz.stage, wiz.visibility.br.bank.ids[wiz.qpos], wiz.cyber_idx
+
+# =========================================================
+# Autosaver
+# =========================================================
+class Autosaver:
+    def __init__(self, backend: Optional[SessionBackend] = None, delay: float = 0.5):
+        self.backend = backend if backend is not None else open_backend()
+        self.delay = delay
+        self.rows_written = 0
+        self.commits = 0
+        self._pending: Dict[str, _Pending] = {}
+        self._lock = threading.Lock()          # guards _pending
+        self._write_lock = threading.Lock()    # one batch at a time, in queue order
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name="session-autosave", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---------- change detection (caller's thread) ----------
+    def save(self, wiz: WizardSession) -> int:
+        """Queue whatever changed in ``wiz`` since its last save; returns the number of changed fields."""
+        saved = wiz.saved
+        if saved is None:
+            saved = wiz.saved = _Saved()
+            saved.cursor = saved.profile = saved.answers = saved.cyber_answers = None
+        cursor = _cursor(wiz)
+        profile = wiz.profile
+        parts = [(part, answers, answers.changed_since(snap))
+                 for part, answers, snap in ((0, wiz.answers, saved.answers), (1, wiz.cyber_answers, saved.cyber_answers))]
+        n = (cursor != saved.cursor) + (profile != saved.profile) + sum(len(c) for *_, c in parts if c)
+        if not n and all(c is not None for *_, c in parts):
+            return 0
+        with self._lock:
+            p = self._pending.get(wiz.token)
+            if p is None:
+                p = self._pending[wiz.token] = _Pending()
+            if cursor != saved.cursor:
+                p.cursor = cursor
+            if profile != saved.profile:
+                p.profile = json.dumps(profile, ensure_ascii=False, separators=(",", ":"))
+            for part, answers, changed in parts:
+                if changed is None:                 # first save, or the bank was reloaded: rewrite the part
+                    p.cleared.append(part)
+                    p.answers = {k: v for k, v in p.answers.items() if k[0] != part}
+                    changed = list(answers)
+                    n += len(changed)
+                for qid in changed:
+                    p.answers[part, qid] = answers.get(qid, _DELETED)
+        saved.cursor, saved.profile = cursor, _copy_profile(profile)
+        saved.answers, saved.cyber_answers = wiz.answers.snapshot(), wiz.cyber_answers.snapshot()
+        if not self._wake.is_set():
+            self._wake.set()
+        return n
+
+    # ---------- writes ----------
+    def _write_loop(self) -> None:
+        swept = time.monotonic()
+        while not self._stop.is_set():
+            if self._wake.wait(EVICT_INTERVAL):
+                self._stop.wait(self.delay)   # let a burst of clicks collapse into one write
+                self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() - swept >= EVICT_INTERVAL:
+                    swept = time.monotonic()
+                    n = self.backend.evict(time.time())
+                    if n:
+                        log.info("evicted %d expired wizard sessions", n)
+            except Exception:
+                log.exception("session autosave failed")
+
+    def flush(self) -> None:
+        """Write everything queued so far, now, as one batch."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            batch = {}
+            for token, p in pending.items():
+                answers = {k: None if v is _DELETED else json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+                           for k, v in p.answers.items()}
+                batch[token] = Changes(p.cursor, p.profile, tuple(p.cleared), answers)
+            try:
+                self.rows_written += self.backend.write(batch, time.time())
+            except BaseException:
+                with self._lock:                # put them back, under anything queued meanwhile
+                    for token, p in pending.items():
+                        self._pending[token] = p.merge(self._pending.get(token))
+                raise
+            self.commits += 1
+
+    def close(self) -> None:
+        if self._closed: return
+        self._closed = True
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        try:
+            self.flush()
+        finally:
+            self.backend.close()
+
+    # ---------- resume ----------
+    def load(self, token: str, banks: Banks) -> Optional[WizardSession]:
+        """The saved session for ``token`` on the given banks, or None if there is none (or it expired)."""
+        stored = self.backend.read(token, time.time())
+        if stored is None:
+            return None
+        (assessment_id, stage, cursor, cyber_idx), profile, answers = stored
+        wiz = WizardSession(assessment_id, banks.initial, banks.cyber, profile=json.loads(profile), token=token)
+        wiz.stage = stage
+        wiz.answers = CompactAnswers(banks.initial.bank, ((q, json.loads(v)) for part, q, v in answers if part == 0))
+        wiz.cyber_answers = CompactAnswers(banks.cyber, ((q, json.loads(v)) for part, q, v in answers if part == 1))
+        wiz.visibility = Visibility(wiz.answers, banks.initial)
+        wiz.place(cursor)
+        wiz.cyber_idx = min(cyber_idx, len(banks.cyber.ids) - 1)
+        saved = wiz.saved = _Saved()
+        saved.cursor, saved.profile = (assessment_id, stage, cursor, cyber_idx), _copy_profile(wiz.profile)
+        saved.answers, saved.cyber_answers = wiz.answers.snapshot(), wiz.cyber_answers.snapshot()
+        return wiz
+
+_autosavers: Dict[str, Autosaver] = {}
+_autosavers_lock = threading.Lock()
+
+def get_autosaver(url: Optional[str] = None) -> Autosaver:
+    """The process-wide autosaver for a backend URL (default ``SME_SESSION_BACKEND``, see backends.py)."""
+    with _autosavers_lock:
+        if url not in _autosavers:
+            _autosavers[url] = Autosaver(open_backend(url))
+        return _autosavers[url]
@@ -0,0 +1,64 @@
+"""Question banks compiled once per process into read-only lookup structures.
+
+``compile_bank`` turns a list of question dicts into a ``QuestionBank``: the
+questions in order as read-only mappings, id -> position, id -> choice ->
+weight, the phase/domain ordering and per-domain maxima. ``INITIAL_BANK`` and
+``CYBER_BANK`` are built at import time and shared by every session, so a
+Streamlit rerun only looks things up instead of rebuilding the banks.
+"""
+from types import MappingProxyType
+from typing import Dict, Any, List, Tuple, NamedTuple, Mapping
+
+from .questions import BASE_QUESTIONS, CYBER_QUESTIONS
+
+class QuestionBank(NamedTuple):
+    questions: Tuple[Mapping[str, Any], ...]
+    ids: Tuple[str, ...]
+    index: Mapping[str, int]                    # id -> position
+    weights: Mapping[str, Mapping[str, int]]    # id -> choice -> weight ({} if unweighted)
+    groups: Tuple[str, ...]                     # phases/domains in question order
+    group_of: Tuple[str, ...]                   # phase/domain of each question
+    group_ids: Mapping[str, Tuple[str, ...]]    # phase/domain -> question ids
+    group_max: Mapping[str, int]                # phase/domain -> best achievable weight
+
+_SCALARS = {str, int, float, bool, type(None)}
+
+def _freeze(v: Any) -> Any:
+    # Scalars are returned inline rather than through a call: large banks are mostly strings.
+    if isinstance(v, dict):
+        return MappingProxyType({k: x if type(x) in _SCALARS else _freeze(x) for k, x in v.items()})
+    if isinstance(v, (list, tuple)):
+        return tuple([x if type(x) in _SCALARS else _freeze(x) for x in v])
+    return v
+
+def compile_bank(questions: List[Dict[str, Any]], group_key: str) -> QuestionBank:
+    """Compile ``questions`` grouped by ``group_key`` ("phase" or "domain")."""
+    frozen = tuple(_freeze(q) for q in questions)
+    ids = tuple(q["id"] for q in frozen)
+    if len(set(ids)) != len(ids):
+        dupes = sorted({i for i in ids if ids.count(i) > 1})
+        raise ValueError(f"duplicate question ids: {dupes}")
+    group_of = tuple(q[group_key] for q in frozen)
+    group_ids: Dict[str, List[str]] = {}
+    group_max: Dict[str, int] = {}
+    weights: Dict[str, Mapping[str, int]] = {}
+    for q, g in zip(frozen, group_of):
+        group_ids.setdefault(g, []).append(q["id"])
+        choices, w = q.get("choices", ()), q.get("weights", ())
+        if w and len(w) != len(choices):
+            raise ValueError(f"{q['id']!r}: {len(w)} weights for {len(choices)} choices")
+        weights[q["id"]] = MappingProxyType(dict(zip(choices, w)))
+        group_max[g] = group_max.get(g, 0) + max(w, default=0)
+    return QuestionBank(
+        questions=frozen,
+        ids=ids,
+        index=MappingProxyType({qid: i for i, qid in enumerate(ids)}),
+        weights=MappingProxyType(weights),
+        groups=tuple(group_ids),
+        group_of=group_of,
+        group_ids=MappingProxyType({g: tuple(v) for g, v in group_ids.items()}),
+        group_max=MappingProxyType(group_max),
+    )
+
+INITIAL_BANK = compile_bank(BASE_QUESTIONS, "phase")
+CYBER_BANK = compile_bank(CYBER_QUESTIONS, "domain")
@@ -0,0 +1,189 @@
+"""Vectorised Cybersecurity Posture scoring for many assessments at once.
+
+``CYBER_QUESTIONS`` is compiled once into a questions×choices weight matrix and
+a questions×domains membership matrix. Answers are encoded as integer choice
+indices (``-1`` = unanswered), after which every domain percentage, traffic
+light and overall score for the whole batch comes out of a handful of array
+operations. Results are identical to ``compute_domain_scores`` /
+``overall_score`` for the same answers. Action-card rules from
+``assessment.rules`` are evaluated the same way, as a rules×choices lookup
+table gathered by each row's codes.
+"""
+from itertools import compress
+from typing import Dict, Any, List, Tuple, Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .questions import CYBER_QUESTIONS
+from .scoring import GREEN_AT, AMBER_AT
+from .rules import COMPILED_RULES, CompiledRules, GOOD_LIMIT, FIX_LIMIT, initial_matches
+
+MISSING = -1
+
+COLOURS = np.array(["red", "amber", "green"])
+LABELS = np.array(["At risk", "Needs work", "Good"])
+
+# =========================================================
+# Compilation
+# =========================================================
+class CompiledWeights(NamedTuple):
+    ids: List[str]
+    domains: List[str]
+    choices: List[List[str]]
+    choice_index: List[Dict[str, int]]
+    weights: np.ndarray      # (Q, C+1); last column is 0 so code -1 scores nothing
+    membership: np.ndarray   # (Q, D) 0/1
+    domain_max: np.ndarray   # (D,)
+
+def compile_weights(questions: List[Dict[str, Any]]) -> CompiledWeights:
+    ids = [q["id"] for q in questions]
+    domains = list(dict.fromkeys(q["domain"] for q in questions))
+    width = max(len(q["weights"]) for q in questions)
+    weights = np.zeros((len(questions), width + 1), dtype=np.int64)
+    membership = np.zeros((len(questions), len(domains)), dtype=np.int64)
+    for i, q in enumerate(questions):
+        weights[i, :len(q["weights"])] = q["weights"]
+        membership[i, domains.index(q["domain"])] = 1
+    domain_max = membership.T @ weights.max(axis=1)
+    return CompiledWeights(
+        ids=ids,
+        domains=domains,
+        choices=[list(q["choices"]) for q in questions],
+        choice_index=[{c: j for j, c in enumerate(q["choices"])} for q in questions],
+        weights=weights,
+        membership=membership,
+        domain_max=domain_max,
+    )
+
+COMPILED = compile_weights(CYBER_QUESTIONS)
+
+# =========================================================
+# Encoding
+# =========================================================
+def encode_answers(records: Iterable[Dict[str, Any]], cw: CompiledWeights = COMPILED) -> np.ndarray:
+    """Encode ``cyber_answers`` dicts as an (N, Q) array of choice indices.
+
+    Unanswered questions become ``MISSING``; labels that are not one of the
+    question's choices count as choice 0, as in ``compute_domain_scores``.
+    """
+    rows = []
+    for ans in records:
+        row = []
+        for qid, lookup in zip(cw.ids, cw.choice_index):
+            if qid in ans:
+                row.append(lookup.get(ans[qid], 0))
+            else:
+                row.append(MISSING)
+        rows.append(row)
+    return np.array(rows, dtype=np.int8).reshape(len(rows), len(cw.ids))
+
+def encode_frame(df: pd.DataFrame, cw: CompiledWeights = COMPILED) -> np.ndarray:
+    """Encode a DataFrame with one label column per question id."""
+    codes = np.full((len(df), len(cw.ids)), MISSING, dtype=np.int8)
+    for j, (qid, choices) in enumerate(zip(cw.ids, cw.choices)):
+        if qid not in df.columns: continue
+        col = df[qid]
+        cat = pd.Categorical(col, categories=choices).codes
+        codes[:, j] = np.where(col.isna().to_numpy(), MISSING, np.maximum(cat, 0))
+    return codes
+
+# =========================================================
+# Scoring
+# =========================================================
+def _light_level(pct: np.ndarray) -> np.ndarray:
+    # Same thresholds as scoring.traffic_light: 0 = red, 1 = amber, 2 = green
+    return (pct >= AMBER_AT).astype(np.int8) + (pct >= GREEN_AT).astype(np.int8)
+
+def score_codes(codes: np.ndarray, cw: CompiledWeights = COMPILED) -> Dict[str, np.ndarray]:
+    """Score an (N, Q) array of choice indices in one pass."""
+    codes = np.asarray(codes)
+    rows = np.arange(len(cw.ids))
+    earned = cw.weights[rows, codes]                      # (N, Q)
+    sums = earned @ cw.membership                         # (N, D)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(cw.domain_max > 0, (sums / cw.domain_max) * 100, 0.0)
+    scores = np.round(pct).astype(np.int64)
+    if len(cw.domains):
+        avg = scores.sum(axis=1) / len(cw.domains)
+    else:
+        avg = np.zeros(len(codes))
+    return {
+        "domain_pct": pct,
+        "domain_score": scores,
+        "domain_level": _light_level(pct),
+        "overall_pct": avg,
+        "overall_score": np.round(avg).astype(np.int64),
+        "overall_level": _light_level(avg),
+    }
+
+def score_frame(df: pd.DataFrame, cw: CompiledWeights = COMPILED) -> pd.DataFrame:
+    """Score a DataFrame of cyber answers; returns one row of results per input row.
+
+    Colour and label columns are categoricals over the three traffic lights.
+    """
+    res = score_codes(encode_frame(df, cw), cw)
+    def light(levels, names):
+        return pd.Categorical.from_codes(levels, categories=list(names))
+    out: Dict[str, Any] = {
+        "overall_score": res["overall_score"],
+        "overall_colour": light(res["overall_level"], COLOURS),
+        "overall_label": light(res["overall_level"], LABELS),
+    }
+    for d, dom in enumerate(cw.domains):
+        out[f"{dom} score"] = res["domain_score"][:, d]
+        out[f"{dom} colour"] = light(res["domain_level"][:, d], COLOURS)
+        out[f"{dom} label"] = light(res["domain_level"][:, d], LABELS)
+    return pd.DataFrame(out, index=df.index)
+
+def result_dicts(res: Dict[str, np.ndarray], i: int, cw: CompiledWeights = COMPILED) -> Dict[str, Any]:
+    """Row ``i`` of a batch result in the ``compute_domain_scores``/``overall_score`` shape."""
+    domains = {}
+    for d, dom in enumerate(cw.domains):
+        lvl = res["domain_level"][i, d]
+        domains[dom] = {"score": int(res["domain_score"][i, d]), "colour": str(COLOURS[lvl]), "label": str(LABELS[lvl])}
+    lvl = res["overall_level"][i]
+    overall = {"score": int(res["overall_score"][i]), "colour": str(COLOURS[lvl]), "label": str(LABELS[lvl])}
+    return {"domains": domains, "overall": overall}
+
+# =========================================================
+# Action cards
+# =========================================================
+def rule_matrix(codes: np.ndarray, initials: List[Dict[str, Any]],
+                cr: CompiledRules = COMPILED_RULES) -> np.ndarray:
+    """(N, R) boolean matrix of which rules fire for each assessment.
+
+    Codes come from ``encode_answers``/``encode_frame``, where out-of-bank
+    labels are folded into choice 0; rules should therefore not list choice 0.
+    """
+    codes = np.asarray(codes)
+    width = max(len(c) for c in cr.choice_index) + 1
+    table = np.zeros((len(cr.rules), width), dtype=bool)
+    for r, rule in enumerate(cr.rules):
+        n = len(cr.choice_index[rule.qpos])
+        for c in range(n):
+            table[r, c] = (c in rule.choices) != rule.negate
+        table[r, n:] = rule.negate           # unanswered (code -1 lands in the last column)
+    qpos = np.array([rule.qpos for rule in cr.rules], dtype=np.intp)
+    picked = codes[:, qpos].astype(np.intp)
+    picked[picked < 0] = width - 1
+    fired = table[np.arange(len(cr.rules)), picked]
+    for r, rule in enumerate(cr.rules):
+        if rule.initial:
+            fired[:, r] &= np.fromiter((initial_matches(a, rule.initial) for a in initials),
+                                       dtype=bool, count=len(initials))
+    return fired
+
+def action_cards_codes(codes: np.ndarray, initials: List[Dict[str, Any]],
+                       cr: CompiledRules = COMPILED_RULES) -> List[Tuple[List[str], List[str]]]:
+    """``add_action_cards`` for a whole batch: one (good, fixes) pair per row."""
+    fired = rule_matrix(codes, initials, cr)
+    n_good = sum(rule.kind == "good" for rule in cr.rules)    # compiled rules list goods first
+    good_texts = [rule.text for rule in cr.rules[:n_good]]
+    fix_texts = [rule.text for rule in cr.rules[n_good:]]
+    out = []
+    for row in fired.tolist():
+        good = list(compress(good_texts, row[:n_good]))[:GOOD_LIMIT]
+        fixes = list(compress(fix_texts, row[n_good:]))[:FIX_LIMIT]
+        out.append((good, fixes))
+    return out
@@ -0,0 +1,194 @@
+"""Show/hide rules for conditional questions.
+
+A question's ``show_if`` is data, not code: one condition, or a list of
+conditions that must all hold, each of the form
+
+    {"question": "third_parties", "op": "eq", "value": "Yes"}
+
+``op`` is one of ``eq``, ``ne``, ``in``, ``not_in`` (value is a list),
+``contains`` (a multi-select answer includes the value) or ``answered`` (no
+value). A condition may only refer to an earlier question, so the dependency
+graph is acyclic and follows question order. As before, an answer keeps
+counting after its own question is hidden.
+
+``Visibility`` holds one session's visible questions as a doubly linked list
+over bank positions, in a bytearray and two int arrays (9 bytes per question).
+When an answer changes, only the questions whose conditions mention it are
+re-checked, and next/previous are array lookups.
+"""
+from array import array
+from types import MappingProxyType
+from typing import Dict, Any, List, Tuple, NamedTuple, Mapping, Optional, Callable, Sequence
+
+from .bank import QuestionBank, INITIAL_BANK
+from .questions import PLACEHOLDER
+
+OTHER = "Other (please specify)"
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda ans, v: ans == v,
+    "ne": lambda ans, v: ans != v,
+    "in": lambda ans, v: ans in v,
+    "not_in": lambda ans, v: ans not in v,
+    "contains": lambda ans, v: isinstance(ans, (list, tuple)) and v in ans,
+    "answered": lambda ans, v: bool(ans),
+}
+
+Check = Tuple[str, Callable[[Any, Any], bool], Any]     # (question id, operator, value)
+
+class Branching(NamedTuple):
+    bank: QuestionBank
+    conditions: Tuple[Optional[Tuple[Check, ...]], ...]   # per position; None = always shown
+    dependents: Mapping[str, Tuple[int, ...]]             # question id -> positions whose show_if reads it
+
+# =========================================================
+# Compilation
+# =========================================================
+def _allowed_values(q: Mapping[str, Any]) -> Optional[set]:
+    if "choices" not in q:
+        return None
+    allowed = set(q["choices"])
+    if q.get("allow_other"):
+        allowed.add(OTHER)
+    return allowed
+
+def compile_branching(bank: QuestionBank) -> Branching:
+    conditions: List[Optional[Tuple[Check, ...]]] = []
+    dependents: Dict[str, List[int]] = {}
+    for i, q in enumerate(bank.questions):
+        raw = q.get("show_if")
+        if raw is None:
+            conditions.append(None)
+            continue
+        if callable(raw):
+            raise ValueError(f"{q['id']!r}: show_if must be a condition dict, not a function")
+        checks = []
+        for c in ([raw] if isinstance(raw, Mapping) else raw):
+            ref, op, value = c.get("question"), c.get("op", "eq"), c.get("value")
+            if bank.index.get(ref, i) >= i:
+                raise ValueError(f"{q['id']!r}: show_if refers to {ref!r}, which is not an earlier question")
+            if op not in OPERATORS:
+                raise ValueError(f"{q['id']!r}: unknown show_if operator {op!r}")
+            if op in ("in", "not_in"):
+                value = tuple(value)
+            allowed = _allowed_values(bank.questions[bank.index[ref]])
+            values = value if op in ("in", "not_in") else (value,)
+            if allowed is not None and op != "answered" and not set(values) <= allowed:
+                raise ValueError(f"{q['id']!r}: show_if value {value!r} is not a choice of {ref!r}")
+            checks.append((ref, OPERATORS[op], value))
+            if i not in dependents.setdefault(ref, []):
+                dependents[ref].append(i)
+        conditions.append(tuple(checks))
+    return Branching(
+        bank=bank,
+        conditions=tuple(conditions),
+        dependents=MappingProxyType({ref: tuple(ps) for ref, ps in dependents.items()}),
+    )
+
+INITIAL_BRANCHING = compile_branching(INITIAL_BANK)
+
+def is_shown(checks: Optional[Tuple[Check, ...]], answers: Dict[str, Any]) -> bool:
+    return checks is None or all(fn(answers.get(ref), v) for ref, fn, v in checks)
+
+def visible_questions(answers: Dict[str, Any], br: Branching = INITIAL_BRANCHING) -> List[Mapping[str, Any]]:
+    """Every question shown for ``answers`` (full evaluation; see ``Visibility`` for the incremental form)."""
+    return [q for q, checks in zip(br.bank.questions, br.conditions) if is_shown(checks, answers)]
+
+def choice_options(options: Sequence[str], allow_other: bool, current: Any) -> Tuple[List[str], int]:
+    """A choice question's radio options (placeholder first, "Other" last if allowed) and the index
+    of ``current`` among them (0, the placeholder, if it is not one of them)."""
+    opts = [PLACEHOLDER, *options]
+    if allow_other and OTHER not in options:
+        opts.append(OTHER)
+    value = current.get("value") if isinstance(current, dict) else current
+    if isinstance(value, str):
+        try:
+            return opts, opts.index(value)
+        except ValueError:
+            pass
+    return opts, 0
+
+# =========================================================
+# Per-session incremental visibility
+# =========================================================
+class Visibility:
+    __slots__ = ("br", "shown", "count", "_next", "_prev")
+
+    def __init__(self, answers: Dict[str, Any], br: Branching = INITIAL_BRANCHING):
+        self.br = br
+        self.shown = bytearray(is_shown(c, answers) for c in br.conditions)
+        self.count = 0
+        n = len(self.shown)
+        # Position n is a sentinel: _next[n] is the first shown question, _prev[n] the last.
+        self._next = array("i", [n]) * (n + 1)
+        self._prev = array("i", [n]) * (n + 1)
+        last = n
+        for i, shown in enumerate(self.shown):
+            if shown:
+                self._next[last], self._prev[i] = i, last
+                last = i
+                self.count += 1
+        self._next[last], self._prev[n] = n, last
+
+    def update(self, qid: str, answers: Dict[str, Any]) -> bool:
+        """Re-check the questions that depend on ``qid``; True if any appeared or disappeared."""
+        changed = False
+        for i in self.br.dependents.get(qid, ()):
+            shown = is_shown(self.br.conditions[i], answers)
+            if shown != bool(self.shown[i]):
+                self.shown[i] = shown
+                if shown:
+                    self._link(i)
+                else:
+                    self._unlink(i)
+                changed = True
+        return changed
+
+    def _link(self, i: int) -> None:
+        p = i - 1
+        while p >= 0 and not self.shown[p]:
+            p -= 1
+        if p < 0:
+            p = len(self.shown)
+        n = self._next[p]
+        self._next[p], self._prev[i], self._next[i], self._prev[n] = i, p, n, i
+        self.count += 1
+
+    def _unlink(self, i: int) -> None:
+        p, n = self._prev[i], self._next[i]
+        self._next[p], self._prev[n] = n, p
+        self.count -= 1
+
+    def first(self) -> Optional[int]:
+        return self._pos(self._next[-1])
+
+    def next_pos(self, i: int) -> Optional[int]:
+        """Next shown position after ``i`` (``i`` itself may be hidden)."""
+        if self.shown[i]:
+            return self._pos(self._next[i])
+        for j in range(i + 1, len(self.shown)):
+            if self.shown[j]:
+                return j
+        return None
+
+    def prev_pos(self, i: int) -> Optional[int]:
+        if self.shown[i]:
+            return self._pos(self._prev[i])
+        for j in range(i - 1, -1, -1):
+            if self.shown[j]:
+                return j
+        return None
+
+    def step(self, i: int) -> int:
+        """1-based number of position ``i`` among the shown questions."""
+        return self.shown.count(1, 0, i) + 1
+
+    def positions(self) -> List[int]:
+        out, i = [], self._next[-1]
+        while i != len(self.shown):
+            out.append(i)
+            i = self._next[i]
+        return out
+
+    def _pos(self, i: int) -> Optional[int]:
+        return None if i == len(self.shown) else i
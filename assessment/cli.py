@@ -0,0 +1,397 @@
+"""Command-line batch scoring.
+
+    python -m assessment score clients.jsonl -o scored.jsonl
+    python -m assessment score clients.csv -o scored.csv
+    python -m assessment reports --out reports/
+    python -m assessment serve --port 8765
+    python -m assessment export assessments.csv --since 2024-01-01 --industry Retail
+    python -m assessment prefill inventory.csv -o scored.csv --map columns.yaml
+    python -m assessment normalize-industries --dry-run
+    python -m assessment rescore --workers 4
+
+JSONL input: one object per line with ``answers`` (Initial Assessment) and
+``cyber_answers`` (Cybersecurity Posture), plus optional ``id`` and ``profile``.
+CSV input: one column per question id (multi-selects separated by ``;``),
+plus optional ``id`` column. Records are streamed, so file size is not limited
+by memory.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Dict, Any, Iterator, List, Optional, TextIO
+
+from .compliance import current_frameworks
+from .industries import MATCH_THRESHOLD
+from .questions import BASE_QUESTIONS, CYBER_QUESTIONS, MULTI_SEP
+from .rescore import CHUNK
+from .scoring import score_assessment
+
+_BASE_TYPES = {q["id"]: q["type"] for q in BASE_QUESTIONS}
+_CYBER_IDS = {q["id"] for q in CYBER_QUESTIONS}
+_DOMAINS: List[str] = list(dict.fromkeys(q["domain"] for q in CYBER_QUESTIONS))
+
+# =========================================================
+# Input
+# =========================================================
+def _detect_format(path: str, explicit: Optional[str]) -> str:
+    if explicit: return explicit
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+def record_from_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """Turn a flat CSV row into the ``answers``/``cyber_answers`` shape."""
+    answers: Dict[str, Any] = {}
+    cyber: Dict[str, Any] = {}
+    for key, val in row.items():
+        if val is None or val == "": continue
+        if key in _CYBER_IDS:
+            cyber[key] = val
+        elif key in _BASE_TYPES:
+            if _BASE_TYPES[key] == "multi":
+                answers[key] = [v.strip() for v in val.split(MULTI_SEP) if v.strip()]
+            else:
+                answers[key] = val
+    return {"id": row.get("id", ""), "answers": answers, "cyber_answers": cyber}
+
+def read_records(fh: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "csv":
+        for row in csv.DictReader(fh):
+            yield record_from_row(row)
+        return
+    for line in fh:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+# =========================================================
+# Output
+# =========================================================
+def flatten_result(rec_id: Any, res: Dict[str, Any]) -> Dict[str, Any]:
+    row: Dict[str, Any] = {
+        "id": rec_id,
+        "overall_score": res["overall"]["score"],
+        "overall_label": res["overall"]["label"],
+    }
+    for dom in _DOMAINS:
+        row[f"{dom} score"] = res["domains"][dom]["score"]
+        row[f"{dom} label"] = res["domains"][dom]["label"]
+    row["digital_dependency"] = res["digital_dependency"]["text"]
+    row["good"] = " | ".join(res["good"])
+    row["fixes"] = " | ".join(res["fixes"])
+    for title, pct in res["compliance"].items():
+        row[f"{title} coverage"] = pct
+    return row
+
+def _csv_header() -> List[str]:
+    cols = ["id", "overall_score", "overall_label"]
+    for dom in _DOMAINS:
+        cols += [f"{dom} score", f"{dom} label"]
+    cols += ["digital_dependency", "good", "fixes"]
+    return cols + [f"{title} coverage" for title in current_frameworks().titles]
+
+# =========================================================
+# Commands
+# =========================================================
+def cmd_score(args: argparse.Namespace) -> int:
+    in_fmt = _detect_format(args.input, args.input_format)
+    out_fmt = _detect_format(args.output, args.output_format)
+    fin = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    fout = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    writer = csv.DictWriter(fout, fieldnames=_csv_header()) if out_fmt == "csv" else None
+    if writer: writer.writeheader()
+
+    n = 0
+    t0 = time.perf_counter()
+    try:
+        for rec in read_records(fin, in_fmt):
+            res = score_assessment(rec.get("answers") or {}, rec.get("cyber_answers") or {})
+            if writer:
+                writer.writerow(flatten_result(rec.get("id", n), res))
+            else:
+                fout.write(json.dumps({"id": rec.get("id", n), **res}, ensure_ascii=False) + "\n")
+            n += 1
+    finally:
+        if fin is not sys.stdin: fin.close()
+        if fout is not sys.stdout: fout.close()
+    elapsed = time.perf_counter() - t0
+    if not args.quiet:
+        rate = n / elapsed if elapsed else 0.0
+        print(f"Scored {n} assessments in {elapsed:.2f}s ({rate:,.0f}/s)", file=sys.stderr)
+    return 0
+
+def cmd_reports(args: argparse.Namespace) -> int:
+    from .report import render_bulk
+    from .store import get_store, profile_from_row
+
+    store = get_store(args.db)
+    records = (     # one report per client: superseded assessments are left out
+        {"id": d["id"], "profile": profile_from_row(d), "answers": d["answers"], "cyber_answers": d["cyber_answers"]}
+        for d in store.iter_clients()
+    )
+    t0 = time.perf_counter()
+    try:
+        n = render_bulk(records, args.out, workers=args.workers)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - t0
+    if not args.quiet:
+        print(f"Rendered {n} reports to {args.out} in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+def cmd_check_banks(args: argparse.Namespace) -> int:
+    from .registry import load_banks
+
+    try:
+        banks = load_banks(args.dir)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    from .compliance import FRAMEWORKS_PATH, load_frameworks
+
+    path = os.path.join(args.dir, "frameworks.yaml") if args.dir else FRAMEWORKS_PATH
+    try:
+        cf = load_frameworks(path, banks)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    from .industries import INDUSTRIES_PATH, load_industries
+
+    path = os.path.join(args.dir, "industries.csv") if args.dir else INDUSTRIES_PATH
+    try:
+        index = load_industries(path)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"OK: {len(banks.initial.bank.ids)} initial and {len(banks.cyber.ids)} cyber questions, "
+          f"{len(banks.rules.rules)} action rules, {len(cf.controls)} controls in {len(cf.keys)} frameworks, "
+          f"{len(index.industries)} industries (version {banks.version})")
+    return 0
+
+def cmd_normalize_industries(args: argparse.Namespace) -> int:
+    from .industries import INDUSTRIES_PATH, classify_many
+    from .store import get_store
+
+    store = get_store(args.db)
+    t0 = time.perf_counter()
+    texts = store.industry_texts(missing_only=not args.all)
+    try:
+        found = classify_many([t for t, _ in texts], args.threshold, workers=args.workers, path=INDUSTRIES_PATH)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    codes = {t: code for (t, _), (code, _) in zip(texts, found) if code is not None}
+    if args.dry_run:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["industry_other", "assessments", "industry_code", "score"])
+        for (text, n), (code, score) in zip(texts, found):
+            writer.writerow([text, n, code or "", f"{score:.2f}"])
+        updated = sum(n for t, n in texts if t in codes)
+    else:
+        updated = store.set_industry_codes(codes)
+    elapsed = time.perf_counter() - t0
+    if not args.quiet:
+        print(f"Matched {len(codes):,} of {len(texts):,} free-text industries; "
+              f"{updated:,} assessments {'would be ' if args.dry_run else ''}updated in {elapsed:.2f}s",
+              file=sys.stderr)
+    return 0
+
+def _job_line(job: Any) -> str:
+    eta = f", {job.eta:,.0f}s left" if job.eta is not None and job.status == "running" else ""
+    return (f"job {job.id} ({job.model_version}) {job.status}: {job.progress:.0%} of rowids, "
+            f"{job.scanned:,} rows scanned, {job.checked:,} recomputed, {job.changed:,} changed, "
+            f"{job.rate:,.0f} rows/s{eta}")
+
+def cmd_rescore(args: argparse.Namespace) -> int:
+    from . import rescore
+    from .store import get_store
+
+    store = get_store(args.db)
+    if args.status:
+        st = store.model_status()
+        print(f"scoring model {st.model.version}: {sum(st.versions.values()) - st.stale:,} rows current, "
+              f"{st.stale:,} stale")
+        for v, n in sorted(st.versions.items(), key=lambda kv: -kv[1]):
+            if v != st.model.version:
+                print(f"  {v or '(before versioning)'}: {n:,}")
+        if st.job is not None:
+            print(_job_line(st.job) + (f" ({st.job.error})" if st.job.error else ""))
+        return 0
+    tty = not args.quiet and sys.stderr.isatty()
+
+    def progress(job: Any) -> None:
+        print("\r" + _job_line(job), end="", file=sys.stderr, flush=True)
+
+    try:
+        job = rescore.run(store, workers=args.workers, chunk=args.chunk, on_progress=progress if tty else None)
+    except RuntimeError as e:
+        print(("\n" if tty else "") + str(e), file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print(("\n" if tty else "") + "paused; run the command again to resume", file=sys.stderr)
+        return 130
+    if not args.quiet:
+        print(("\r" if tty else "") + (_job_line(job) if job else "every stored result is up to date"),
+              file=sys.stderr)
+    return 0
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    import asyncio
+    import logging
+    from .api import serve
+
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(asctime)s %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, window=args.window_ms / 1000, max_batch=args.max_batch, db=args.db))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def cmd_export(args: argparse.Namespace) -> int:
+    from .export import export
+    from .store import get_store
+
+    t0 = time.perf_counter()
+    try:
+        n = export(get_store(args.db), args.output, args.format, since=args.since, until=args.until,
+                   industry=args.industry, stage=args.stage, chunk=args.chunk)
+    except (ImportError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - t0
+    if not args.quiet:
+        rate = n / elapsed if elapsed else 0.0
+        print(f"Exported {n} assessments in {elapsed:.2f}s ({rate:,.0f}/s)", file=sys.stderr)
+    return 0
+
+def cmd_prefill(args: argparse.Namespace) -> int:
+    from .api import score_many
+    from .prefill import NO_MAP, detect_format, load_map, read_prefills
+    from .registry import current_banks
+
+    try:
+        cmap = load_map(args.map) if args.map else NO_MAP
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    banks = current_banks()
+    out_fmt = _detect_format(args.output, args.output_format)
+    fin = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8-sig")
+    fout = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    writer = csv.DictWriter(fout, fieldnames=["id", "business_name", "prefilled", "issues"] + _csv_header()[1:]) \
+        if out_fmt == "csv" else None
+    if writer: writer.writeheader()
+
+    n = issues = 0
+    t0 = time.perf_counter()
+    prefills = read_prefills(fin, banks, detect_format(args.input, args.input_format), cmap)
+    try:
+        while True:
+            chunk = list(itertools.islice(prefills, args.chunk))
+            if not chunk:
+                break
+            results = score_many([{"answers": p.answers, "cyber_answers": p.cyber_answers} for p in chunk])
+            for p, res in zip(chunk, results):
+                rec_id = p.id or p.profile.get("business_name") or str(p.row)
+                issues += len(p.issues)
+                if writer:
+                    writer.writerow({**flatten_result(rec_id, res), "business_name": p.profile.get("business_name", ""),
+                                     "prefilled": len(p.answers) + len(p.cyber_answers), "issues": " | ".join(p.issues)})
+                else:
+                    fout.write(json.dumps({"id": rec_id, "profile": p.profile, "answers": p.answers,
+                                           "cyber_answers": p.cyber_answers, "issues": p.issues, **res},
+                                          ensure_ascii=False) + "\n")
+            n += len(chunk)
+    except ValueError as e:
+        print(f"{args.input}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if fin is not sys.stdin: fin.close()
+        if fout is not sys.stdout: fout.close()
+    elapsed = time.perf_counter() - t0
+    if not args.quiet:
+        rate = n / elapsed if elapsed else 0.0
+        print(f"Pre-filled and scored {n} clients in {elapsed:.2f}s ({rate:,.0f}/s), {issues} values rejected",
+              file=sys.stderr)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m assessment", description="SME assessment engine")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("score", help="Score a JSONL/CSV file of completed assessments")
+    p.add_argument("input", help="Input file ('-' for stdin)")
+    p.add_argument("-o", "--output", default="-", help="Output file ('-' for stdout)")
+    p.add_argument("--input-format", choices=["jsonl", "csv"])
+    p.add_argument("--output-format", choices=["jsonl", "csv"])
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.set_defaults(func=cmd_score)
+
+    p = sub.add_parser("reports", help="Render a PDF report for every stored client")
+    p.add_argument("--out", required=True, help="Directory for <assessment id>.pdf files")
+    p.add_argument("--db", help="Assessment database (default: SME_DB_PATH or data/assessments.db)")
+    p.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.set_defaults(func=cmd_reports)
+
+    p = sub.add_parser("check-banks", help="Validate the question bank files before deploying them")
+    p.add_argument("--dir", help="Directory with initial.yaml and cyber.yaml (default: SME_QUESTION_BANKS or the built-in banks)")
+    p.set_defaults(func=cmd_check_banks)
+
+    p = sub.add_parser("export", help="Export stored assessments to CSV, JSONL or Parquet (streamed)")
+    p.add_argument("output", help="Output file ('-' for stdout); the format follows the extension")
+    p.add_argument("--format", choices=["csv", "jsonl", "parquet"])
+    p.add_argument("--since", help="Completed on or after (ISO date or timestamp)")
+    p.add_argument("--until", help="Completed before (ISO date or timestamp)")
+    p.add_argument("--industry")
+    p.add_argument("--stage", choices=["initial", "cyber"])
+    p.add_argument("--db", help="Assessment database (default: SME_DB_PATH or data/assessments.db)")
+    p.add_argument("--chunk", type=int, default=5000, help="Rows read and written at a time")
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("prefill", help="Pre-fill answers from an inventory/RMM export and score every client")
+    p.add_argument("input", help="CSV, JSON array or JSONL file, one client per row ('-' for stdin)")
+    p.add_argument("-o", "--output", default="-", help="Output file ('-' for stdout)")
+    p.add_argument("--map", help="YAML/JSON mapping of inventory columns and values onto question ids (see prefill.py)")
+    p.add_argument("--input-format", choices=["json", "csv"])
+    p.add_argument("--output-format", choices=["jsonl", "csv"])
+    p.add_argument("--chunk", type=int, default=1000, help="Clients scored together")
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.set_defaults(func=cmd_prefill)
+
+    p = sub.add_parser("normalize-industries",
+                       help="Map stored 'Other (please specify)' industries to taxonomy codes (industries.csv)")
+    p.add_argument("--db", help="Assessment database (default: SME_DB_PATH or data/assessments.db)")
+    p.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    p.add_argument("--threshold", type=float, default=MATCH_THRESHOLD, help="Lowest match score accepted (0-1)")
+    p.add_argument("--all", action="store_true", help="Also re-classify assessments that already have a code")
+    p.add_argument("--dry-run", action="store_true", help="Print the matches as CSV instead of storing them")
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.set_defaults(func=cmd_normalize_industries)
+
+    p = sub.add_parser("rescore", help="Bring stored results up to the current weights and rules (resumable)")
+    p.add_argument("--db", help="Assessment database (default: SME_DB_PATH or data/assessments.db)")
+    p.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    p.add_argument("--chunk", type=int, default=CHUNK, help="Rowids per work unit and checkpoint")
+    p.add_argument("--status", action="store_true", help="Print the stored model versions and the latest job")
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.set_defaults(func=cmd_rescore)
+
+    p = sub.add_parser("serve", help="Serve the scoring engine over HTTP (see assessment/api.py)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--window-ms", type=float, default=0.0,
+                   help="Extra time a request waits for others to batch with, under load (default: none)")
+    p.add_argument("--max-batch", type=int, default=256)
+    p.add_argument("--db", help="Assessment database for \"save\": true and lookups (default: SME_DB_PATH)")
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,388 @@
+"""Compliance coverage: Cyber Essentials, NIST CSF 2.0 and ISO 27001 Annex A.
+
+``banks/frameworks.yaml`` (``SME_FRAMEWORKS``) maps each Cybersecurity
+Posture question to the controls it evidences in each framework. A choice
+earns credit between 0 and 1, by default its weight over the question's top
+weight. A control's coverage is the average credit of its questions. A
+framework's coverage is the average over the controls that have questions.
+
+The file is compiled against the live cyber bank, once per bank version
+and file change, into:
+
+    credit      questions × (choices + 1), the last column (unanswered) 0
+    controls    a questions × controls sparse matrix (CSR), each column
+                scaled by 1 / its number of questions
+    frameworks  its columns summed per framework over assessed controls and
+                divided by their number: questions × frameworks, dense
+
+Scoring N assessments gathers an N × questions credit matrix from their
+choice codes. Framework coverage is then one product with the small dense
+matrix, whatever the number of controls. Per-control coverage (the results
+page detail) adds each question's credit into its controls, one sparse row
+at a time, so its cost is the number of non-zeros. Adding
+frameworks or controls adds a column or a few non-zeros, not a pass over the
+answers.
+
+The portfolio's average coverage is pre-aggregated. ``compliance_clients``
+keeps each scored client's framework coverage, computed from their latest
+assessment (``portfolio_clients``), and ``compliance_rollup`` sums it per
+industry and framework. Both hold hundredths of a percent, so the sums are
+exact whatever order clients are added and removed in. The store updates both in the same transaction as
+the assessments (re-scoring included), so a portfolio page reads a few rows
+per industry. They are stamped with the compiled frameworks' ``version``.
+After a frameworks or bank edit they no longer match and are rebuilt
+once, and saves stop maintaining them until then.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Tuple, NamedTuple, Mapping, Optional, Iterable
+
+import numpy as np
+
+from .loader import BANK_DIR, parse, _stamp
+from .portfolio import client_key
+from .registry import Banks, CHECK_INTERVAL, current_banks
+from .scoring import traffic_light
+
+log = logging.getLogger(__name__)
+
+FRAMEWORKS_PATH = os.environ.get("SME_FRAMEWORKS", os.path.join(BANK_DIR, "frameworks.yaml"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS compliance_clients (
+    client_key     TEXT PRIMARY KEY,           -- portfolio_clients.client_key, scored clients only
+    assessment_id  TEXT NOT NULL,
+    industry       TEXT NOT NULL,
+    coverage       TEXT NOT NULL               -- JSON [coverage per framework in 1/100 %, in file order]
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_compliance_assessment ON compliance_clients(assessment_id);
+CREATE TABLE IF NOT EXISTS compliance_rollup (
+    industry       TEXT NOT NULL,
+    framework      TEXT NOT NULL,              -- framework key
+    clients        INTEGER NOT NULL,
+    coverage_sum   INTEGER NOT NULL,           -- 1/100 %
+    PRIMARY KEY (industry, framework)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS compliance_version (
+    version        TEXT NOT NULL               -- CompiledFrameworks.version the two tables were built with
+);
+"""
+
+_ADD = ("INSERT INTO compliance_rollup (industry, framework, clients, coverage_sum) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(industry, framework) DO UPDATE SET "
+        "clients = clients + excluded.clients, coverage_sum = coverage_sum + excluded.coverage_sum")
+
+class Control(NamedTuple):
+    framework: int
+    id: str
+    title: str
+    assessed: bool                # some question maps to it
+
+class CompiledFrameworks(NamedTuple):
+    keys: List[str]
+    titles: List[str]
+    controls: List[Control]       # grouped by framework, in file order
+    choice_index: List[Dict[str, int]]
+    ids: List[str]                # cyber question ids, in bank order
+    credit: np.ndarray            # (Q, C+1)
+    indptr: np.ndarray            # CSR of the (Q, K) question -> control matrix
+    indices: np.ndarray
+    data: np.ndarray
+    by_framework: np.ndarray      # (Q, F)
+    version: str                  # changes whenever any client's coverage could
+
+class ControlResult(NamedTuple):
+    id: str
+    title: str
+    coverage: Optional[int]       # None if not assessed
+    colour: str
+
+class FrameworkResult(NamedTuple):
+    title: str
+    coverage: int
+    colour: str
+    label: str
+    controls: List[ControlResult]
+
+# =========================================================
+# Compilation
+# =========================================================
+def compile_frameworks(doc: Any, questions: List[Dict[str, Any]], path: str = "<frameworks>") -> CompiledFrameworks:
+    """Validate a frameworks document against the cyber questions and compile it (raises ValueError)."""
+    if not isinstance(doc, dict) or not isinstance(doc.get("frameworks"), dict) or \
+            not isinstance(doc.get("mappings") or {}, dict) or not isinstance(doc.get("credit") or {}, dict):
+        raise ValueError(f"{path}: expected 'frameworks', 'mappings' and optionally 'credit' mappings")
+    pos = {q["id"]: i for i, q in enumerate(questions)}
+    errors: List[str] = []
+    keys, titles, controls, col = [], [], [], {}
+    for key, fw in doc["frameworks"].items():
+        if not isinstance(fw, dict) or not isinstance(fw.get("controls"), dict) or not fw["controls"]:
+            errors.append(f"framework {key!r}: needs a title and a non-empty controls mapping"); continue
+        keys.append(str(key))
+        titles.append(str(fw.get("title") or key))
+        for cid, title in fw["controls"].items():
+            col[(str(key), str(cid))] = len(controls)
+            controls.append(Control(len(keys) - 1, str(cid), str(title), False))
+
+    entries: List[Tuple[int, int]] = []           # (question, control)
+    for qid, by_fw in (doc.get("mappings") or {}).items():
+        if qid not in pos:
+            errors.append(f"mappings: unknown question id {qid!r}"); continue
+        if not isinstance(by_fw, dict):
+            errors.append(f"mappings {qid!r}: expected framework -> list of control ids"); continue
+        for key, cids in by_fw.items():
+            for cid in cids if isinstance(cids, list) else [cids]:
+                k = col.get((str(key), str(cid)))
+                if k is None:
+                    errors.append(f"mappings {qid!r}: unknown control {key}:{cid}")
+                else:
+                    entries.append((pos[qid], k))
+
+    width = max(len(q["choices"]) for q in questions) + 1
+    credit = np.zeros((len(questions), width))
+    for i, q in enumerate(questions):
+        top = max(q["weights"])
+        credit[i, :len(q["weights"])] = [w / top if top > 0 else 0.0 for w in q["weights"]]
+    for qid, values in (doc.get("credit") or {}).items():
+        if qid not in pos:
+            errors.append(f"credit: unknown question id {qid!r}"); continue
+        n = len(questions[pos[qid]]["choices"])
+        if not isinstance(values, list) or len(values) != n or \
+                not all(isinstance(v, (int, float)) and 0 <= v <= 1 for v in values):
+            errors.append(f"credit {qid!r}: expected {n} numbers between 0 and 1"); continue
+        credit[pos[qid], :n] = values
+    if errors:
+        raise ValueError(f"{path}: invalid frameworks file:\n  " + "\n  ".join(errors))
+
+    entries = sorted(set(entries))
+    rows = np.array([q for q, _ in entries], dtype=np.intp)
+    cols = np.array([k for _, k in entries], dtype=np.intp)
+    counts = np.bincount(cols, minlength=len(controls))
+    data = 1.0 / counts[cols] if len(entries) else np.zeros(0)
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(questions))))).astype(np.intp)
+    controls = [c._replace(assessed=bool(counts[k])) for k, c in enumerate(controls)]
+
+    fw_of = np.array([c.framework for c in controls], dtype=np.intp)
+    assessed = np.bincount(fw_of, weights=counts > 0, minlength=len(keys))
+    by_framework = np.zeros((len(questions), len(keys)))
+    np.add.at(by_framework, (rows, fw_of[cols]), data)
+    by_framework /= np.maximum(assessed, 1)
+    ids, choices = [q["id"] for q in questions], [list(q["choices"]) for q in questions]
+    version = hashlib.sha256(json.dumps([keys, ids, choices]).encode() + credit.tobytes()
+                             + by_framework.tobytes()).hexdigest()[:16]
+    return CompiledFrameworks(
+        keys, titles, controls, [{c: j for j, c in enumerate(cs)} for cs in choices],
+        ids, credit, indptr, cols, data, by_framework, version,
+    )
+
+def load_frameworks(path: str, banks: Banks) -> CompiledFrameworks:
+    try:
+        with open(path, "rb") as fh:
+            doc = parse(fh.read(), path)
+    except ValueError:
+        raise
+    except Exception as e:                  # yaml.YAMLError and friends
+        raise ValueError(f"{path}: {e}") from e
+    return compile_frameworks(doc, list(banks.cyber.questions), path)
+
+_compiled: Tuple[Optional[Tuple[str, Tuple[int, int]]], Optional[CompiledFrameworks]] = (None, None)
+_checked = 0.0
+_lock = threading.Lock()
+
+def current_frameworks(banks: Optional[Banks] = None) -> CompiledFrameworks:
+    """The frameworks file compiled against the live cyber bank; a bad edit is logged and the last good one kept."""
+    global _compiled, _checked
+    banks = banks or current_banks()
+    tag, cf = _compiled
+    if cf is not None and tag[0] == banks.version and time.monotonic() - _checked < CHECK_INTERVAL:
+        return cf
+    with _lock:
+        _checked = time.monotonic()
+        tag, cf = _compiled
+        try:
+            stamp = _stamp(FRAMEWORKS_PATH)
+            if cf is None or tag != (banks.version, stamp):
+                cf = load_frameworks(FRAMEWORKS_PATH, banks)
+                _compiled = ((banks.version, stamp), cf)
+        except (OSError, ValueError) as e:
+            if cf is None or tag[0] != banks.version:
+                raise
+            log.error("frameworks not reloaded, keeping the previous version: %s", e)
+    return cf
+
+# =========================================================
+# Coverage
+# =========================================================
+def encode(records: Iterable[Mapping[str, Any]], cf: CompiledFrameworks) -> np.ndarray:
+    """(N, Q) choice codes of cyber answer dicts; unanswered and unknown labels are -1 (no credit)."""
+    rows = [[lookup.get(ans.get(qid), -1) for qid, lookup in zip(cf.ids, cf.choice_index)] for ans in records]
+    return np.array(rows, dtype=np.intp).reshape(len(rows), len(cf.ids))
+
+def credits(codes: np.ndarray, cf: CompiledFrameworks) -> np.ndarray:
+    return cf.credit[np.arange(len(cf.ids)), codes]        # code -1 picks the last, zero column
+
+def framework_coverage(codes: np.ndarray, cf: CompiledFrameworks) -> np.ndarray:
+    """(N, F) coverage percentages (0-100) of each framework."""
+    return credits(codes, cf) @ cf.by_framework * 100
+
+def control_coverage(codes: np.ndarray, cf: CompiledFrameworks) -> np.ndarray:
+    """(N, K) coverage percentages of each control; NaN where no question maps to it."""
+    cred = credits(codes, cf) * 100
+    out = np.zeros((len(cred), len(cf.controls)))
+    for q in range(len(cf.ids)):
+        lo, hi = cf.indptr[q], cf.indptr[q + 1]
+        if lo < hi:
+            out[:, cf.indices[lo:hi]] += cred[:, q:q + 1] * cf.data[lo:hi]
+    out[:, [not c.assessed for c in cf.controls]] = np.nan
+    return out
+
+def coverage_dicts(records: List[Mapping[str, Any]], banks: Optional[Banks] = None) -> List[Dict[str, int]]:
+    """{framework title: coverage %} for each set of cyber answers, in one pass."""
+    cf = current_frameworks(banks)
+    cov = np.round(framework_coverage(encode(records, cf), cf)).astype(int).tolist()
+    return [dict(zip(cf.titles, row)) for row in cov]
+
+def assess(cyber: Mapping[str, Any], banks: Optional[Banks] = None) -> List[FrameworkResult]:
+    """Coverage of every framework and control for one assessment."""
+    cf = current_frameworks(banks)
+    codes = encode([cyber], cf)
+    fw = framework_coverage(codes, cf)[0]
+    ctl = control_coverage(codes, cf)[0]
+    out = []
+    for f, title in enumerate(cf.titles):
+        colour, label = traffic_light(fw[f])
+        controls = [ControlResult(c.id, c.title, None if np.isnan(ctl[k]) else int(round(ctl[k])),
+                                  "" if np.isnan(ctl[k]) else traffic_light(ctl[k])[0])
+                    for k, c in enumerate(cf.controls) if c.framework == f]
+        out.append(FrameworkResult(title, int(round(fw[f])), colour, label, controls))
+    return out
+
+# =========================================================
+# Portfolio roll-up (maintained inside the store's write transaction)
+# =========================================================
+def _dumps(v: Any) -> str:
+    return json.dumps(v, separators=(",", ":"))
+
+def _version(conn: sqlite3.Connection) -> Optional[str]:
+    row = conn.execute("SELECT version FROM compliance_version").fetchone()
+    return row[0] if row else None
+
+def stale(conn: sqlite3.Connection, banks: Optional[Banks] = None) -> bool:
+    """True if the roll-up was built for other frameworks (or never), so ``rebuild`` must run first."""
+    return _version(conn) != current_frameworks(banks).version
+
+def _rollup_rows(delta: Dict[str, Tuple[int, np.ndarray]], cf: CompiledFrameworks) -> List[Tuple[Any, ...]]:
+    return [(industry, key, n, int(total[f])) for industry, (n, total) in delta.items() if n or total.any()
+            for f, key in enumerate(cf.keys)]
+
+def _coverage(conn: sqlite3.Connection, tail: str, params: List[Any], cf: CompiledFrameworks) -> List[Tuple[Any, ...]]:
+    """(client key, assessment id, industry, coverage in 1/100 %) of the scored portfolio clients selected by ``tail``."""
+    rows = conn.execute("SELECT p.client_key, p.assessment_id, p.industry, a.cyber_answers FROM portfolio_clients p "
+                        f"JOIN assessments a ON a.id = p.assessment_id WHERE p.stage = 'cyber' AND {tail}",
+                        params).fetchall()
+    if not rows:
+        return []
+    cov = np.rint(framework_coverage(encode([json.loads(r[3]) if r[3] else {} for r in rows], cf), cf) * 100)
+    cov = cov.astype(np.int64)
+    return [(r[0], r[1], r[2] or "", c) for r, c in zip(rows, cov)]
+
+def apply(conn: sqlite3.Connection, rows: Iterable[Mapping[str, Any]], banks: Optional[Banks] = None) -> int:
+    """Refresh the coverage of the clients that assessment rows (just upserted, with the portfolio) touch.
+
+    Returns the clients changed. Does nothing while the roll-up is stale.
+    """
+    try:
+        cf = current_frameworks(banks)
+    except (OSError, ValueError):
+        conn.execute("DELETE FROM compliance_version")      # whatever loads next must rebuild
+        return 0
+    if _version(conn) != cf.version:
+        return 0
+    rows = list(rows)
+    ids = list({r["id"] for r in rows})
+    keys = {client_key(r["business_name"], r["id"]) for r in rows}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        keys.update(k for (k,) in conn.execute("SELECT client_key FROM compliance_clients "
+                                               f"WHERE assessment_id IN ({', '.join('?' * len(chunk))})", chunk))
+    keys_list = list(keys)
+    old: Dict[str, Tuple[str, str, str]] = {}
+    new: Dict[str, Tuple[str, str, np.ndarray]] = {}
+    for i in range(0, len(keys_list), 500):
+        chunk = keys_list[i:i + 500]
+        marks = ", ".join("?" * len(chunk))
+        old.update((r[0], tuple(r[1:])) for r in conn.execute(
+            f"SELECT client_key, assessment_id, industry, coverage FROM compliance_clients WHERE client_key IN ({marks})",
+            chunk))
+        new.update((k, (a, ind, c)) for k, a, ind, c in _coverage(conn, f"p.client_key IN ({marks})", chunk, cf))
+
+    delta: Dict[str, Tuple[int, np.ndarray]] = {}
+    def count(industry: str, cov: np.ndarray, sign: int) -> None:
+        n, total = delta.get(industry, (0, np.zeros(len(cf.keys), dtype=np.int64)))
+        delta[industry] = (n + sign, total + sign * cov)
+    gone, upserts = [], []
+    for k in keys:
+        was, now = old.get(k), new.get(k)
+        text = _dumps(now[2].tolist()) if now is not None else None
+        if was is not None and now is not None and was == (now[0], now[1], text):
+            continue
+        if was is not None:
+            count(was[1], np.array(json.loads(was[2]), dtype=np.int64), -1)
+        if now is not None:
+            count(now[1], now[2], 1)
+            upserts.append((k, now[0], now[1], text))
+        else:
+            gone.append((k,))
+    conn.executemany("DELETE FROM compliance_clients WHERE client_key = ?", gone)
+    conn.executemany("INSERT OR REPLACE INTO compliance_clients (client_key, assessment_id, industry, coverage) "
+                     "VALUES (?, ?, ?, ?)", upserts)
+    out = _rollup_rows(delta, cf)
+    conn.executemany(_ADD, out)
+    if any(r[2] < 0 for r in out):
+        conn.execute("DELETE FROM compliance_rollup WHERE clients <= 0")
+    return len(gone) + len(upserts)
+
+def rebuild(conn: sqlite3.Connection, chunk: int = 5000, banks: Optional[Banks] = None) -> int:
+    """Recompute every scored client's coverage and the roll-up for the live frameworks; returns the clients."""
+    cf = current_frameworks(banks)
+    conn.execute("DELETE FROM compliance_clients")
+    conn.execute("DELETE FROM compliance_rollup")
+    conn.execute("DELETE FROM compliance_version")
+    delta: Dict[str, Tuple[int, np.ndarray]] = {}
+    last, total = "", 0
+    while True:
+        clients = _coverage(conn, "p.client_key > ? ORDER BY p.client_key LIMIT ?", [last, chunk], cf)
+        if not clients:
+            break
+        conn.executemany("INSERT INTO compliance_clients (client_key, assessment_id, industry, coverage) "
+                         "VALUES (?, ?, ?, ?)", [(k, a, ind, _dumps(c.tolist())) for k, a, ind, c in clients])
+        for _, _, industry, cov in clients:
+            n, acc = delta.get(industry, (0, np.zeros(len(cf.keys), dtype=np.int64)))
+            delta[industry] = (n + 1, acc + cov)
+        last, total = clients[-1][0], total + len(clients)
+    conn.executemany(_ADD, _rollup_rows(delta, cf))
+    conn.execute("INSERT INTO compliance_version (version) VALUES (?)", (cf.version,))
+    return total
+
+# =========================================================
+# Portfolio reads
+# =========================================================
+def portfolio_coverage(conn: sqlite3.Connection, industry: Optional[str] = None,
+                       banks: Optional[Banks] = None) -> Optional[Tuple[Dict[str, float], int]]:
+    """Average coverage of each framework over the portfolio's scored clients (their latest assessment), and how
+    many there are; None while the roll-up is stale (see ``rebuild``)."""
+    cf = current_frameworks(banks)
+    if _version(conn) != cf.version:
+        return None
+    sql = "SELECT framework, SUM(clients), SUM(coverage_sum) FROM compliance_rollup"
+    params: Tuple[str, ...] = ()
+    if industry is not None:
+        sql += " WHERE industry = ?"; params = (industry,)
+    sums = {key: (n, total) for key, n, total in conn.execute(sql + " GROUP BY framework", params)}
+    n = max((c for c, _ in sums.values()), default=0)
+    return {title: sums[key][1] / 100 / n if n and key in sums else 0.0 for key, title in zip(cf.keys, cf.titles)}, n
@@ -0,0 +1,149 @@
+"""Streaming export of stored assessments to CSV, JSONL or Parquet.
+
+    python -m assessment export assessments.parquet --since 2024-01-01 --industry Retail
+
+Rows come out of the store in chunks (``AssessmentStore.iter_chunks``).
+Each chunk is flattened and written before the next is read, so memory
+depends on the chunk size and not on how many assessments there are.
+
+CSV and Parquet are flat, one column per field, in the order of the live
+question banks:
+
+- profile columns, then ``dd_score`` and ``overall_score``
+- one column per Initial Assessment question. Multi-selects are joined with
+  ``;``. Questions that allow "Other" get a ``<id> other`` column holding the
+  comment.
+- one column per cyber question, then ``<domain> score``
+- ``good`` and ``fixes``, joined with `` | ``
+
+JSONL keeps each assessment's nested shape (``profile``, ``answers``,
+``cyber_answers``, ``domain_scores`` and so on), so nothing is lost.
+Parquet needs pyarrow, which is not a requirement of the app. Each chunk
+becomes one row group.
+"""
+import csv
+import json
+import os
+import sys
+from typing import Dict, Any, List, Tuple, Optional, Iterable, Iterator, TextIO
+
+from .questions import MULTI_SEP
+from .registry import Banks, current_banks
+
+FORMATS = ("csv", "jsonl", "parquet")
+CARD_SEP = " | "
+
+PROFILE_COLUMNS = ["contact_name", "business_name", "industry", "industry_other", "industry_code",
+                   "years", "headcount", "turnover", "work_mode"]
+_INT = "int"
+_STR = "str"
+
+def detect_format(path: str, explicit: Optional[str] = None) -> str:
+    if explicit:
+        return explicit
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("parquet", "pq"):
+        return "parquet"
+    return "csv" if ext == "csv" else "jsonl"
+
+def flat_columns(banks: Banks) -> List[Tuple[str, str]]:
+    """(name, type) of every flat column, for the given banks."""
+    cols = [("id", _STR), ("created_at", _STR), ("completed_at", _STR), ("stage", _STR)]
+    cols += [(c, _STR) for c in PROFILE_COLUMNS]
+    cols += [("dd_score", _INT), ("overall_score", _INT)]
+    for q in banks.initial.bank.questions:
+        cols.append((q["id"], _STR))
+        if q.get("allow_other"):
+            cols.append((f"{q['id']} other", _STR))
+    cols += [(qid, _STR) for qid in banks.cyber.ids]
+    cols += [(f"{dom} score", _INT) for dom in banks.cyber.groups]
+    return cols + [("good", _STR), ("fixes", _STR)]
+
+def flatten(d: Dict[str, Any], banks: Banks) -> Dict[str, Any]:
+    """One stored assessment (as from the store) as a flat row."""
+    row = {k: d[k] for k in ("id", "created_at", "completed_at", "stage", *PROFILE_COLUMNS, "dd_score", "overall_score")}
+    answers = d["answers"] or {}
+    for q in banks.initial.bank.questions:
+        v = answers.get(q["id"])
+        if isinstance(v, dict):                     # {"value": "Other (please specify)", "comment": ...}
+            row[q["id"]] = v.get("value")
+            if q.get("allow_other"):
+                row[f"{q['id']} other"] = v.get("comment")
+            continue
+        row[q["id"]] = MULTI_SEP.join(v) if isinstance(v, list) else v
+        if q.get("allow_other"):
+            row[f"{q['id']} other"] = None
+    cyber = d["cyber_answers"] or {}
+    for qid in banks.cyber.ids:
+        row[qid] = cyber.get(qid)
+    domains = d["domain_scores"] or {}
+    for dom in banks.cyber.groups:
+        row[f"{dom} score"] = domains[dom]["score"] if dom in domains else None
+    row["good"] = CARD_SEP.join(d["good"]) if d["good"] else None
+    row["fixes"] = CARD_SEP.join(d["fixes"]) if d["fixes"] else None
+    return row
+
+def nested(d: Dict[str, Any]) -> Dict[str, Any]:
+    """One stored assessment as a JSONL record."""
+    return {
+        "id": d["id"], "created_at": d["created_at"], "completed_at": d["completed_at"], "stage": d["stage"],
+        "profile": {c: d[c] for c in PROFILE_COLUMNS},
+        "answers": d["answers"], "cyber_answers": d["cyber_answers"],
+        "dd_score": d["dd_score"], "overall_score": d["overall_score"], "domain_scores": d["domain_scores"],
+        "good": d["good"], "fixes": d["fixes"],
+    }
+
+# =========================================================
+# Writers (each consumes an iterator of chunks)
+# =========================================================
+def write_csv(chunks: Iterable[List[Dict[str, Any]]], fh: TextIO, banks: Banks) -> int:
+    w = csv.DictWriter(fh, fieldnames=[c for c, _ in flat_columns(banks)])
+    w.writeheader()
+    n = 0
+    for chunk in chunks:
+        w.writerows(flatten(d, banks) for d in chunk)
+        n += len(chunk)
+    return n
+
+def write_jsonl(chunks: Iterable[List[Dict[str, Any]]], fh: TextIO) -> int:
+    n = 0
+    for chunk in chunks:
+        fh.write("".join(json.dumps(nested(d), ensure_ascii=False, separators=(",", ":")) + "\n" for d in chunk))
+        n += len(chunk)
+    return n
+
+def write_parquet(chunks: Iterable[List[Dict[str, Any]]], path: str, banks: Banks) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow); CSV and JSONL work without it") from None
+    cols = flat_columns(banks)
+    schema = pa.schema([(c, pa.int64() if t == _INT else pa.string()) for c, t in cols])
+    n = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            rows = [flatten(d, banks) for d in chunk]
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array([r[c] for r in rows], type=schema.field(c).type) for c, _ in cols], schema=schema))
+            n += len(chunk)
+    return n
+
+def export(store, path: str, fmt: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+           industry: Optional[str] = None, stage: Optional[str] = None, chunk: int = 5000) -> int:
+    """Write every matching assessment to ``path`` ('-' for stdout); returns the rows written."""
+    fmt = detect_format(path, fmt)
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    banks = current_banks()
+    chunks: Iterator[List[Dict[str, Any]]] = store.iter_chunks(since, until, industry, stage, chunk)
+    if fmt == "parquet":
+        if path == "-":
+            raise ValueError("Parquet can't be written to stdout; give a file name")
+        return write_parquet(chunks, path, banks)
+    fh = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    try:
+        return write_csv(chunks, fh, banks) if fmt == "csv" else write_jsonl(chunks, fh)
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
@@ -0,0 +1,257 @@
+"""Reassessment history: an immutable snapshot per scored assessment, delta-encoded, with score series.
+
+Clients are the portfolio's (portfolio.client_key: the normalised business
+name). Each scored assessment of a client becomes snapshot ``seq`` 1, 2, ...
+Snapshot rows are never rewritten once a newer one exists. A client who
+reviews and re-finishes their latest assessment supersedes that last
+snapshot, because it is the same run.
+
+A snapshot's state is its answers plus the strengths and fixes shown at the
+time (kept as ``{item: rank}``, so they diff like answers). ``changes``
+holds everything that differs from the previous snapshot, as
+``{part: {key: [old, new]}}``, where ``None`` means absent. Every
+``KEYFRAME``-th snapshot also stores the full state, so rebuilding any
+snapshot reads at most ``KEYFRAME`` rows. "What changed since last time" is
+one row's ``changes``. A diff over a few runs composes the rows in between.
+Longer spans rebuild both ends from their keyframes instead.
+
+``score_series`` has one row per client, metric (overall or a domain) and
+snapshot, keyed so that a client's whole trend is one index range. The
+store maintains both tables inside its write transaction.
+"""
+import json
+import sqlite3
+from typing import Dict, Any, List, Tuple, NamedTuple, Mapping, Optional, Iterable
+
+from .portfolio import client_key, OVERALL
+
+KEYFRAME = 8
+PARTS = ("answers", "cyber_answers", "good", "fixes")
+ANSWER_PARTS = PARTS[:2]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    client_key     TEXT NOT NULL,
+    seq            INTEGER NOT NULL,           -- 1, 2, ... per client
+    assessment_id  TEXT NOT NULL UNIQUE,
+    completed_at   TEXT NOT NULL,
+    changes        TEXT NOT NULL,              -- JSON {part: {key: [old, new]}} against seq - 1
+    state          TEXT,                       -- JSON {part: {key: value}} on keyframes (seq % KEYFRAME == 1)
+    PRIMARY KEY (client_key, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS score_series (
+    client_key     TEXT NOT NULL,
+    metric         TEXT NOT NULL,              -- 'overall' or a domain name
+    seq            INTEGER NOT NULL,
+    completed_at   TEXT NOT NULL,
+    score          INTEGER NOT NULL,
+    PRIMARY KEY (client_key, metric, seq)
+) WITHOUT ROWID;
+"""
+
+State = Dict[str, Dict[str, Any]]            # part -> {qid: answer} or {item: rank}
+Changes = Dict[str, Dict[str, List[Any]]]    # part -> {key: [old, new]}
+
+class Point(NamedTuple):
+    seq: int
+    completed_at: str
+    score: int
+
+class Diff(NamedTuple):
+    seq: int                                 # the later snapshot
+    since_seq: int
+    since: str                               # completed_at of the earlier snapshot
+    answers: Changes                         # answer parts only
+    scores: Dict[str, Tuple[Optional[int], Optional[int]]]
+    good_added: List[str]
+    good_lost: List[str]
+    fixes_added: List[str]
+    fixes_resolved: List[str]
+
+def _dumps(v: Any) -> str:
+    return json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+
+def _loads(v: Any) -> Any:
+    return json.loads(v) if isinstance(v, str) else v
+
+def _is_keyframe(seq: int) -> bool:
+    return seq % KEYFRAME == 1
+
+def state_of(row: Mapping[str, Any]) -> State:
+    """The snapshot state of an ``assessments`` row."""
+    state = {part: _loads(row[part]) or {} for part in ANSWER_PARTS}
+    for part in ("good", "fixes"):
+        state[part] = {item: i for i, item in enumerate(_loads(row[part]) or [])}
+    return state
+
+def ranked(items: Mapping[str, int]) -> List[str]:
+    """A strengths or fixes part back as the list shown."""
+    return sorted(items, key=items.__getitem__)
+
+def diff_states(old: State, new: State) -> Changes:
+    out: Changes = {}
+    for part in PARTS:
+        a, b = old.get(part) or {}, new.get(part) or {}
+        ch = {q: [a.get(q), b.get(q)] for q in sorted(a.keys() | b.keys()) if a.get(q) != b.get(q)}
+        if ch:
+            out[part] = ch
+    return out
+
+def _apply_changes(state: State, changes: Changes) -> State:
+    for part, ch in changes.items():
+        answers = state.setdefault(part, {})
+        for q, (_, new) in ch.items():
+            if new is None:
+                answers.pop(q, None)
+            else:
+                answers[q] = new
+    return state
+
+def compose(steps: Iterable[Changes]) -> Changes:
+    """One change set equivalent to applying ``steps`` in order."""
+    out: Changes = {}
+    for changes in steps:
+        for part, ch in changes.items():
+            acc = out.setdefault(part, {})
+            for q, (old, new) in ch.items():
+                acc[q] = [acc[q][0] if q in acc else old, new]
+    return {p: {q: on for q, on in ch.items() if on[0] != on[1]} for p, ch in out.items()
+            if any(on[0] != on[1] for on in ch.values())}
+
+# =========================================================
+# Maintenance (called inside the store's write transaction)
+# =========================================================
+def state_at(conn: sqlite3.Connection, key: str, seq: int) -> State:
+    """The answers of snapshot ``seq``, rebuilt from its keyframe and the changes after it."""
+    kf = seq - (seq - 1) % KEYFRAME
+    rows = conn.execute("SELECT seq, changes, state FROM snapshots WHERE client_key = ? AND seq BETWEEN ? AND ? "
+                        "ORDER BY seq", (key, kf, seq)).fetchall()
+    if not rows or rows[0][0] != kf or rows[0][2] is None:
+        raise ValueError(f"snapshot {key!r} #{seq}: keyframe #{kf} missing")
+    state: State = json.loads(rows[0][2])
+    for _, changes, _ in rows[1:]:
+        _apply_changes(state, json.loads(changes))
+    return state
+
+def _latest(conn: sqlite3.Connection, key: str) -> Optional[Tuple[int, str]]:
+    row = conn.execute("SELECT seq, assessment_id FROM snapshots WHERE client_key = ? ORDER BY seq DESC LIMIT 1",
+                       (key,)).fetchone()
+    return (row[0], row[1]) if row else None
+
+def apply(conn: sqlite3.Connection, rows: Iterable[Mapping[str, Any]]) -> int:
+    """Snapshot each scored assessment row (dicts or sqlite3.Rows of ``assessments``); returns snapshots written."""
+    # Per client within this batch: (latest seq, its assessment id, its answers)
+    latest: Dict[str, Tuple[int, str, State]] = {}
+    written = 0
+    for row in rows:
+        if row["stage"] != "cyber":
+            continue
+        key = client_key(row["business_name"], row["id"])
+        if key in latest:
+            seq, last_id, last_state = latest[key]
+        else:
+            found = _latest(conn, key)
+            seq, last_id = found if found else (0, "")
+            last_state = None
+        if row["id"] != last_id and conn.execute("SELECT 1 FROM snapshots WHERE assessment_id = ?",
+                                                 (row["id"],)).fetchone():
+            continue                                    # an older run: its snapshot is immutable
+        state = state_of(row)
+        if row["id"] == last_id:                        # the latest run, finished again: replace it
+            conn.execute("DELETE FROM snapshots WHERE client_key = ? AND seq = ?", (key, seq))
+            conn.execute("DELETE FROM score_series WHERE client_key = ? AND seq = ?", (key, seq))
+            seq -= 1
+            last_state = None
+        if seq and last_state is None:
+            last_state = state_at(conn, key, seq)
+        seq += 1
+        changes = diff_states(last_state or {}, state)
+        conn.execute(
+            "INSERT INTO snapshots (client_key, seq, assessment_id, completed_at, changes, state) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, seq, row["id"], row["completed_at"], _dumps(changes), _dumps(state) if _is_keyframe(seq) else None))
+        series = [(key, OVERALL, seq, row["completed_at"], row["overall_score"])]
+        series += [(key, dom, seq, row["completed_at"], d["score"])
+                   for dom, d in (_loads(row["domain_scores"]) or {}).items()]
+        conn.executemany("INSERT INTO score_series (client_key, metric, seq, completed_at, score) "
+                         "VALUES (?, ?, ?, ?, ?)", series)
+        latest[key] = (seq, row["id"], state)
+        written += 1
+    return written
+
+def rebuild(conn: sqlite3.Connection, chunk: int = 10000) -> int:
+    """Snapshot every stored scored assessment, oldest first; returns the assessments read."""
+    conn.execute("DELETE FROM snapshots")
+    conn.execute("DELETE FROM score_series")
+    conn.row_factory, factory = sqlite3.Row, conn.row_factory
+    try:
+        last, total = ("", 0), 0
+        while True:
+            rows = conn.execute(
+                "SELECT rowid AS _rowid, id, stage, business_name, completed_at, answers, cyber_answers, "
+                "overall_score, domain_scores, good, fixes FROM assessments "
+                "WHERE stage = 'cyber' AND (completed_at, rowid) > (?, ?) ORDER BY completed_at, rowid LIMIT ?",
+                (*last, chunk)).fetchall()
+            if not rows:
+                return total
+            apply(conn, rows)
+            last, total = (rows[-1]["completed_at"], rows[-1]["_rowid"]), total + len(rows)
+    finally:
+        conn.row_factory = factory
+
+# =========================================================
+# Reads
+# =========================================================
+def find(conn: sqlite3.Connection, assessment_id: str) -> Optional[Tuple[str, int]]:
+    """(client key, seq) of an assessment's snapshot; None until it is scored and written."""
+    row = conn.execute("SELECT client_key, seq FROM snapshots WHERE assessment_id = ?", (assessment_id,)).fetchone()
+    return (row[0], row[1]) if row else None
+
+def trend(conn: sqlite3.Connection, key: str, until: Optional[int] = None) -> Dict[str, List[Point]]:
+    """Every metric's score at each snapshot up to ``until`` (default: all), oldest first."""
+    out: Dict[str, List[Point]] = {}
+    for metric, seq, when, score in conn.execute(
+            "SELECT metric, seq, completed_at, score FROM score_series WHERE client_key = ? AND seq <= ? "
+            "ORDER BY metric, seq", (key, until if until is not None else 1 << 62)):
+        out.setdefault(metric, []).append(Point(seq, when, score))
+    return out
+
+def diff(conn: sqlite3.Connection, key: str, seq: Optional[int] = None, since_seq: Optional[int] = None) -> Optional[Diff]:
+    """What changed between snapshots ``since_seq`` and ``seq`` (default: the latest and the one before it)."""
+    if seq is None:
+        found = _latest(conn, key)
+        if found is None:
+            return None
+        seq = found[0]
+    since_seq = seq - 1 if since_seq is None else since_seq
+    if since_seq < 1 or since_seq >= seq:
+        return None
+    if seq - since_seq <= KEYFRAME:
+        rows = conn.execute("SELECT completed_at, changes FROM snapshots WHERE client_key = ? AND seq BETWEEN ? AND ? "
+                            "ORDER BY seq", (key, since_seq, seq)).fetchall()
+        if len(rows) != seq - since_seq + 1:
+            return None
+        since, changes = rows[0][0], compose(json.loads(r[1]) for r in rows[1:])
+    else:
+        row = conn.execute("SELECT completed_at FROM snapshots WHERE client_key = ? AND seq = ?",
+                           (key, since_seq)).fetchone()
+        if row is None:
+            return None
+        since, changes = row[0], diff_states(state_at(conn, key, since_seq), state_at(conn, key, seq))
+    scores: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+    for metric, s, score in conn.execute("SELECT metric, seq, score FROM score_series WHERE client_key = ? "
+                                         "AND seq IN (?, ?)", (key, since_seq, seq)):
+        old, new = scores.get(metric, (None, None))
+        scores[metric] = (score, new) if s == since_seq else (old, score)
+    def moved(part: str, gone: bool) -> List[str]:
+        ch = changes.get(part, {})
+        return ranked({k: on[0] if gone else on[1] for k, on in ch.items() if (on[1] if gone else on[0]) is None})
+    return Diff(
+        seq, since_seq, since, {p: changes[p] for p in ANSWER_PARTS if p in changes}, scores,
+        moved("good", False), moved("good", True), moved("fixes", False), moved("fixes", True),
+    )
+
+def snapshots(conn: sqlite3.Connection, key: str) -> List[Tuple[int, str, str]]:
+    """(seq, assessment id, completed_at) of a client's snapshots, oldest first."""
+    return [tuple(r) for r in conn.execute("SELECT seq, assessment_id, completed_at FROM snapshots "
+                                           "WHERE client_key = ? ORDER BY seq", (key,))]
@@ -0,0 +1,238 @@
+"""Industry taxonomy: typeahead search and free-text classification.
+
+``banks/industries.csv`` (``SME_INDUSTRIES``) lists industry codes with
+their title, the intake group they count under for peer cohorts and the
+portfolio (one of ``INDUSTRY_OPTIONS``), and ``;``-separated synonyms. The
+shipped file has the NACE Rev. 2 divisions and the classes small businesses
+most often pick. A full NACE or SIC export with the same four columns drops
+in as is.
+
+Every title and synonym is a *term*. The index, built once per file change,
+keeps:
+
+    postings  trigram -> ids of the terms that contain it (CSR arrays)
+    words     every word of every term, sorted, with its term id
+
+A query's trigrams select posting lists, and one ``np.bincount`` over them
+counts the trigrams each term shares with the query. That gives every term's
+similarity at once, so a search costs the length of those lists, not the
+size of the taxonomy. A query word that starts some term's word (a
+half-typed "dent" for "dentist") adds a prefix bonus, found by bisecting
+``words``. Each industry scores as its best term.
+
+``classify_many`` maps stored "Other (please specify)" texts to codes with
+one index per worker process.
+"""
+import bisect
+import csv
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, NamedTuple, Optional, Sequence, Iterable
+
+import numpy as np
+
+from .loader import BANK_DIR, _stamp
+from .questions import INDUSTRY_OPTIONS
+from .registry import CHECK_INTERVAL
+
+log = logging.getLogger(__name__)
+
+INDUSTRIES_PATH = os.environ.get("SME_INDUSTRIES", os.path.join(BANK_DIR, "industries.csv"))
+MATCH_THRESHOLD = 0.6         # classify: lowest score accepted as a match
+PREFIX_WEIGHT = 0.2           # share of the score from query words that start a term's word
+
+class Industry(NamedTuple):
+    code: str
+    title: str
+    group: str                    # an INDUSTRY_OPTIONS label
+    synonyms: Tuple[str, ...]
+
+class Match(NamedTuple):
+    industry: Industry
+    score: float                  # 0-1
+    term: str                     # the title or synonym that matched best
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def normalize(text: str) -> str:
+    """Lower-case ASCII words: accents dropped, '&' spelled out, punctuation as spaces."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold().replace("&", " and ")
+    return _NON_WORD.sub(" ", text).strip()
+
+def trigrams(norm: str) -> List[str]:
+    """Distinct trigrams of normalized text, each word padded as "  word " (so starts weigh more)."""
+    out = set()
+    for w in norm.split():
+        p = f"  {w} "
+        out.update(p[i:i + 3] for i in range(len(p) - 2))
+    return sorted(out)
+
+# =========================================================
+# Index
+# =========================================================
+class IndustryIndex:
+    def __init__(self, industries: Sequence[Industry]):
+        self.industries = list(industries)
+        self.by_code = {ind.code: ind for ind in self.industries}
+        terms, owner = [], []
+        for i, ind in enumerate(self.industries):
+            for t in dict.fromkeys((ind.title, *ind.synonyms)):
+                terms.append(t)
+                owner.append(i)
+        self.terms = terms
+        self.owner = np.array(owner, dtype=np.intp)
+        grams = [trigrams(normalize(t)) for t in terms]
+        self.gram_id: Dict[str, int] = {}
+        gids: List[int] = []
+        for gs in grams:
+            gids.extend(self.gram_id.setdefault(g, len(self.gram_id)) for g in gs)
+        gids_a = np.array(gids, dtype=np.intp)
+        tids = np.repeat(np.arange(len(terms)), [len(gs) for gs in grams])
+        self.postings = tids[np.argsort(gids_a, kind="stable")]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(gids_a, minlength=len(self.gram_id))))).astype(np.intp)
+        self.term_grams = np.array([len(gs) for gs in grams], dtype=np.float64)
+        words = sorted({(w, t) for t, term in enumerate(terms) for w in normalize(term).split()})
+        self.words = [w for w, _ in words]
+        self.word_term = np.array([t for _, t in words], dtype=np.intp)
+
+    def scores(self, query: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(term ids, similarity 0-1, shared trigrams) of every term that shares a trigram with ``query``."""
+        norm = normalize(query)
+        grams = trigrams(norm)
+        n = len(self.terms)
+        lists = [self.postings[self.indptr[g]:self.indptr[g + 1]]
+                 for g in (self.gram_id.get(s) for s in grams) if g is not None]
+        if not lists:
+            return np.zeros(0, dtype=np.intp), np.zeros(0), np.zeros(0, dtype=np.intp)
+        shared = np.bincount(np.concatenate(lists), minlength=n)
+        ids = np.flatnonzero(shared)
+        shared = shared[ids]
+        size = self.term_grams[ids]
+        jaccard = shared / (len(grams) + size - shared)
+        cover = shared / size                    # how much of the term the text contains
+        score = np.maximum(jaccard, 0.8 * cover) * (1 - PREFIX_WEIGHT)
+        tokens = [w for w in norm.split() if len(w) > 1]
+        hits = [np.unique(self.word_term[bisect.bisect_left(self.words, w):
+                                         bisect.bisect_left(self.words, w + "\uffff")]) for w in tokens]
+        if tokens:
+            # a word starting with the token shares its leading trigrams, so every hit is in ids
+            score += PREFIX_WEIGHT * np.bincount(np.concatenate(hits), minlength=n)[ids] / len(tokens)
+        return ids, score, shared
+
+    def search(self, query: str, limit: int = 10, threshold: float = 0.0) -> List[Match]:
+        """The ``limit`` best industries for ``query``, best first (ties go to the longer match)."""
+        ids, score, shared = self.scores(query)
+        keep = np.flatnonzero(score > threshold)
+        if len(keep) > limit * 8:
+            keep = keep[np.argpartition(-score[keep], limit * 8)[:limit * 8]]
+        out: List[Match] = []
+        seen = set()
+        for k in keep[np.lexsort((ids[keep], -shared[keep], -score[keep]))].tolist():
+            i = int(self.owner[ids[k]])
+            if i not in seen:
+                seen.add(i)
+                out.append(Match(self.industries[i], float(score[k]), self.terms[ids[k]]))
+                if len(out) == limit:
+                    break
+        return out
+
+    def classify(self, text: str, threshold: float = MATCH_THRESHOLD) -> Optional[Match]:
+        """The best industry for free text, or None if nothing scores ``threshold`` or more."""
+        best = self.search(text, 1, threshold - 1e-9)
+        return best[0] if best else None
+
+# =========================================================
+# Loading
+# =========================================================
+def read_industries(lines: Iterable[str], path: str = "<industries>") -> List[Industry]:
+    """Parse and validate taxonomy CSV rows (raises ValueError)."""
+    reader = csv.DictReader(lines)
+    missing = {"code", "title", "group"} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+    errors: List[str] = []
+    out: List[Industry] = []
+    seen = set()
+    for n, row in enumerate(reader, start=2):
+        code, title, group = ((row.get(k) or "").strip() for k in ("code", "title", "group"))
+        if not code or not title:
+            errors.append(f"line {n}: code and title are required"); continue
+        if code in seen:
+            errors.append(f"line {n}: duplicate code {code!r}"); continue
+        if group not in INDUSTRY_OPTIONS:
+            errors.append(f"line {n}: group {group!r} is not one of the intake industries"); continue
+        seen.add(code)
+        synonyms = tuple(s.strip() for s in (row.get("synonyms") or "").split(";") if s.strip())
+        out.append(Industry(code, title, group, synonyms))
+    if errors:
+        raise ValueError(f"{path}: invalid industries file:\n  " + "\n  ".join(errors[:20]))
+    if not out:
+        raise ValueError(f"{path}: no industries")
+    return out
+
+def load_industries(path: str = INDUSTRIES_PATH) -> IndustryIndex:
+    with open(path, newline="", encoding="utf-8") as fh:
+        return IndustryIndex(read_industries(fh, path))
+
+_loaded: Tuple[Optional[Tuple[int, int]], Optional[IndustryIndex]] = (None, None)
+_checked = 0.0
+_lock = threading.Lock()
+
+def current_industries() -> IndustryIndex:
+    """The taxonomy index, rebuilt when the file changes; a bad edit is logged and the last good one kept."""
+    global _loaded, _checked
+    stamp, index = _loaded
+    if index is not None and time.monotonic() - _checked < CHECK_INTERVAL:
+        return index
+    with _lock:
+        _checked = time.monotonic()
+        stamp, index = _loaded
+        try:
+            new = _stamp(INDUSTRIES_PATH)
+            if index is None or new != stamp:
+                index = load_industries(INDUSTRIES_PATH)
+                _loaded = (new, index)
+        except (OSError, ValueError) as e:
+            if index is None:
+                raise
+            log.error("industries not reloaded, keeping the previous version: %s", e)
+    return index
+
+# =========================================================
+# Batch classification
+# =========================================================
+_worker_index: Optional[IndustryIndex] = None
+
+def _init_worker(path: str) -> None:
+    global _worker_index
+    _worker_index = load_industries(path)
+
+def _classify_chunk(job: Tuple[List[str], float]) -> List[Tuple[Optional[str], float]]:
+    texts, threshold = job
+    out = []
+    for text in texts:
+        m = _worker_index.classify(text, threshold)
+        out.append((m.industry.code, m.score) if m else (None, 0.0))
+    return out
+
+def classify_many(texts: Sequence[str], threshold: float = MATCH_THRESHOLD, workers: Optional[int] = None,
+                  path: str = INDUSTRIES_PATH, chunk: int = 500) -> List[Tuple[Optional[str], float]]:
+    """(code or None, score) for each text, classified across ``workers`` processes (default: CPU count)."""
+    jobs = [(list(texts[i:i + chunk]), threshold) for i in range(0, len(texts), chunk)]
+    workers = workers or os.cpu_count() or 1
+    out: List[Tuple[Optional[str], float]] = []
+    if workers == 1 or len(jobs) <= 1:
+        _init_worker(path)
+        for job in jobs:
+            out.extend(_classify_chunk(job))
+        return out
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+        for part in pool.map(_classify_chunk, jobs):
+            out.extend(part)
+    return out
@@ -0,0 +1,186 @@
+"""Question banks as YAML or JSON files: parsing, validation and a per-process cache.
+
+A bank file is a mapping with ``kind`` ("initial" or "cyber"), the allowed
+``phases`` or ``domains``, and a ``questions`` list; see the files in
+``assessment/banks/``. ``load_bank`` parses and validates a file once, then
+hands back the cached result until the file's mtime or size changes. JSON
+needs nothing beyond the standard library; YAML needs PyYAML (its libyaml
+loader when available).
+
+YAML parsing is slow (~2 MB/s even with libyaml), so each validated document
+is also written to ``SME_BANK_CACHE`` (default data/bank-cache) in marshal
+format under the SHA-256 of the file bytes. Later processes load an unchanged
+file from there without importing PyYAML at all.
+"""
+import hashlib
+import json
+import marshal
+import os
+import threading
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+BANK_DIR = os.environ.get("SME_QUESTION_BANKS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "banks"))
+EXTENSIONS = (".yaml", ".yml", ".json")
+CACHE_DIR = os.environ.get("SME_BANK_CACHE", os.path.join("data", "bank-cache"))
+LOADER_VERSION = 1   # bump when validation changes so cached documents are re-validated
+
+KINDS = {
+    # kind: (group key, declared groups key, weights required)
+    "initial": ("phase", "phases", False),
+    "cyber": ("domain", "domains", True),
+}
+TYPES = {"choice", "multi", "text"}
+QUESTION_KEYS = {"id", "phase", "domain", "text", "type", "choices", "weights", "tip", "allow_other", "show_if"}
+
+class LoadedBank(NamedTuple):
+    path: str
+    kind: str
+    questions: List[Dict[str, Any]]
+    digest: str          # sha256 of the file bytes
+    stamp: Tuple[int, int]
+
+# =========================================================
+# Parsing & validation
+# =========================================================
+def bank_path(kind: str, bank_dir: Optional[str] = None) -> str:
+    """``<bank_dir>/<kind>.yaml`` (or .yml / .json, whichever exists)."""
+    bank_dir = bank_dir or BANK_DIR
+    for ext in EXTENSIONS:
+        path = os.path.join(bank_dir, kind + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"no {kind} question bank ({'/'.join(EXTENSIONS)}) in {bank_dir}")
+
+def parse(data: bytes, path: str) -> Any:
+    if path.endswith(".json"):
+        return json.loads(data)
+    import yaml
+    return yaml.load(data, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+def validate(doc: Any, path: str = "<bank>") -> str:
+    """Raise ValueError listing every problem in a parsed bank; returns its kind."""
+    if not isinstance(doc, dict):
+        raise ValueError(f"{path}: expected a mapping with kind and questions")
+    kind = doc.get("kind")
+    if kind not in KINDS:
+        raise ValueError(f"{path}: kind must be one of {sorted(KINDS)}, got {kind!r}")
+    group_key, groups_key, weighted = KINDS[kind]
+    errors: List[str] = []
+    groups = doc.get(groups_key)
+    if not isinstance(groups, list) or not groups or not all(isinstance(g, str) for g in groups):
+        errors.append(f"{groups_key} must be a non-empty list of names")
+        groups = []
+    questions = doc.get("questions")
+    if not isinstance(questions, list) or not questions:
+        errors.append("questions must be a non-empty list")
+        questions = []
+    seen = set()
+    for n, q in enumerate(questions):
+        where = f"question {n + 1}"
+        if not isinstance(q, dict):
+            errors.append(f"{where}: expected a mapping"); continue
+        qid = q.get("id")
+        if not isinstance(qid, str) or not qid:
+            errors.append(f"{where}: id must be a non-empty string")
+        else:
+            where = f"{qid!r}"
+            if qid in seen:
+                errors.append(f"{where}: duplicate id")
+            seen.add(qid)
+        unknown = set(q) - QUESTION_KEYS
+        if unknown:
+            errors.append(f"{where}: unknown keys {sorted(unknown)}")
+        if q.get(group_key) not in groups:
+            errors.append(f"{where}: {group_key} {q.get(group_key)!r} is not one of the declared {groups_key}")
+        if not isinstance(q.get("text"), str) or not q.get("text"):
+            errors.append(f"{where}: text must be a non-empty string")
+        if "tip" in q and not isinstance(q["tip"], str):
+            errors.append(f"{where}: tip must be a string")
+        if "allow_other" in q and not isinstance(q["allow_other"], bool):
+            errors.append(f"{where}: allow_other must be true or false")
+        qtype = q.get("type")
+        if qtype not in TYPES or (weighted and qtype != "choice"):
+            errors.append(f"{where}: type must be {'choice' if weighted else ' | '.join(sorted(TYPES))}, got {qtype!r}")
+        choices = q.get("choices")
+        if qtype in ("choice", "multi"):
+            if not isinstance(choices, list) or not choices or not all(isinstance(c, str) for c in choices):
+                errors.append(f"{where}: choices must be a non-empty list of strings (quote Yes/No)")
+                choices = None
+            elif len(set(choices)) != len(choices):
+                errors.append(f"{where}: duplicate choices")
+        elif choices is not None:
+            errors.append(f"{where}: {qtype} questions take no choices")
+        weights = q.get("weights")
+        if weighted or weights is not None:
+            if not isinstance(weights, list) or not all(isinstance(w, int) and not isinstance(w, bool) for w in weights):
+                errors.append(f"{where}: weights must be a list of integers")
+            elif choices is not None and len(weights) != len(choices):
+                errors.append(f"{where}: {len(weights)} weights for {len(choices)} choices")
+        if "show_if" in q and not isinstance(q["show_if"], (dict, list)):
+            errors.append(f"{where}: show_if must be a condition mapping or a list of them")
+    if errors:
+        raise ValueError(f"{path}: invalid question bank:\n  " + "\n  ".join(errors))
+    return kind
+
+# =========================================================
+# Caches: validated documents on disk, loaded banks per process
+# =========================================================
+def _doc_cache_path(digest: str) -> str:
+    return os.path.join(CACHE_DIR, f"{digest}.v{LOADER_VERSION}.marshal")
+
+def _read_doc(data: bytes, path: str) -> Tuple[Any, str, str]:
+    """(validated document, kind, sha256) for the file bytes, via the on-disk cache."""
+    digest = hashlib.sha256(data).hexdigest()
+    cached = _doc_cache_path(digest)
+    try:
+        with open(cached, "rb") as fh:
+            doc = marshal.load(fh)
+        return doc, doc["kind"], digest
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass
+    doc = parse(data, path)
+    kind = validate(doc, path)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as fh:
+            marshal.dump(doc, fh)
+        os.replace(tmp, cached)
+    except (OSError, ValueError):   # read-only disk, or a value marshal can't store: just skip it
+        pass
+    return doc, kind, digest
+
+_cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}   # path -> (stamp, LoadedBank or the error)
+_cache_lock = threading.Lock()
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def load_bank(path: str, kind: Optional[str] = None) -> LoadedBank:
+    """Parsed, validated bank at ``path``; re-read only when the file changes.
+
+    A file that fails to parse or validate raises ValueError (the same error
+    object until the file changes again).
+    """
+    path = os.path.abspath(path)
+    stamp = _stamp(path)
+    with _cache_lock:
+        hit = _cache.get(path)
+        if hit is None or hit[0] != stamp:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            try:
+                doc, kind, digest = _read_doc(data, path)
+                result: Any = LoadedBank(path, kind, doc["questions"], digest, stamp)
+            except ValueError as e:            # json.JSONDecodeError is a ValueError
+                result = e
+            except Exception as e:             # yaml.YAMLError and friends
+                result = ValueError(f"{path}: {e}")
+            _cache[path] = hit = (stamp, result)
+    result = hit[1]
+    if isinstance(result, ValueError):
+        raise result
+    if kind is not None and result.kind != kind:
+        raise ValueError(f"{path}: expected a {kind} bank, got {result.kind}")
+    return result
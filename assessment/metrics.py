@@ -0,0 +1,279 @@
+"""In-process metrics: counters, timing histograms and the wizard funnel, exported for Prometheus or as JSON.
+
+    from assessment import metrics
+    metrics.inc("sme_reruns_total", stage="qa")
+    with metrics.timer("sme_scoring_seconds", step="action_cards"):
+        ...
+
+Everything lands in one process-wide ``Registry``. ``start_export()`` turns on
+whichever exports the environment asks for:
+
+    SME_METRICS_FILE      write a snapshot every SME_METRICS_INTERVAL seconds (default 10);
+                          JSON if the name ends in .json, else Prometheus text
+    SME_METRICS_PORT      serve GET /metrics (Prometheus text) and /metrics.json on this port
+
+The ``Funnel`` follows each wizard session's current step. A session idle for
+``SME_ABANDON_AFTER`` seconds (default 30 minutes) counts as abandoned at its
+last step, so ``sme_abandoned_total{step}`` shows where people give up.
+Recording a sample is a dict lookup and an add under a lock, cheap enough to
+leave on in every rerun.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Tuple, Optional, Iterator
+
+log = logging.getLogger(__name__)
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (10, 25, 50, 75, 100, 150, 200, 300, 500)
+ABANDON_AFTER = float(os.environ.get("SME_ABANDON_AFTER", 1800))
+EXPORT_INTERVAL = float(os.environ.get("SME_METRICS_INTERVAL", 10))
+
+Labels = Tuple[Tuple[str, str], ...]
+
+HELP = {
+    "sme_reruns_total": "Full-page script runs, by stage at the start of the run",
+    "sme_card_renders_total": "Wizard card renders (fragment reruns and the card's part of page runs)",
+    "sme_render_seconds": "Time to run the page or a wizard card, by stage",
+    "sme_scoring_seconds": "Time spent scoring, by step",
+    "sme_completions_total": "Assessments completed, by assessment",
+    "sme_abandoned_total": "Sessions that went idle for SME_ABANDON_AFTER seconds, by last step",
+    "sme_sessions_at_step": "Live sessions whose current step this is",
+    "sme_reruns_per_assessment": "Page runs and card renders a session took to finish the cyber assessment",
+    "sme_api_batch_size": "Records scored together by the HTTP API",
+}
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _fmt_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    esc = (lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)      # the last is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, v)] += 1
+        self.count += 1
+        self.sum += v
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the largest finite bound if it overflowed)."""
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+class Registry:
+    def __init__(self, buckets: Optional[Dict[str, Tuple[float, ...]]] = None):
+        self._lock = threading.Lock()
+        self.buckets = buckets or {}          # histogram name -> bounds, if not BUCKETS
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def inc(self, name: str, n: float = 1, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + n
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self.gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            h = series.get(key)
+            if h is None:
+                h = series[key] = Histogram(self.buckets.get(name, BUCKETS))
+            h.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.counters.clear(); self.gauges.clear(); self.histograms.clear()
+
+    # ---------- export ----------
+    def prometheus(self) -> str:
+        out: List[str] = []
+        with self._lock:
+            for kind, families in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted(families):
+                    if name in HELP:
+                        out.append(f"# HELP {name} {HELP[name]}")
+                    out.append(f"# TYPE {name} {kind}")
+                    out += [f"{name}{_fmt_labels(k)} {v:g}" for k, v in sorted(families[name].items())]
+            for name in sorted(self.histograms):
+                if name in HELP:
+                    out.append(f"# HELP {name} {HELP[name]}")
+                out.append(f"# TYPE {name} histogram")
+                for k, h in sorted(self.histograms[name].items()):
+                    seen = 0
+                    for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+                        seen += n
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        out.append(f"{name}_bucket{_fmt_labels(k, (('le', le),))} {seen}")
+                    out.append(f"{name}_sum{_fmt_labels(k)} {h.sum:.6f}")
+                    out.append(f"{name}_count{_fmt_labels(k)} {h.count}")
+        return "\n".join(out) + "\n"
+
+    def as_json(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "time": time.time(),
+                "counters": {n: [{"labels": dict(k), "value": v} for k, v in s.items()] for n, s in self.counters.items()},
+                "gauges": {n: [{"labels": dict(k), "value": v} for k, v in s.items()] for n, s in self.gauges.items()},
+                "histograms": {n: [{"labels": dict(k), "count": h.count, "sum": round(h.sum, 6),
+                                    "mean": round(h.sum / h.count, 6) if h.count else 0.0,
+                                    "p50_le": h.quantile(0.5), "p99_le": h.quantile(0.99),
+                                    "buckets": dict(zip([f"{b:g}" for b in h.buckets] + ["+Inf"], h.counts))}
+                                   for k, h in s.items()] for n, s in self.histograms.items()},
+            }
+
+REGISTRY = Registry({"sme_reruns_per_assessment": COUNT_BUCKETS,
+                     "sme_api_batch_size": (1, 2, 4, 8, 16, 32, 64, 128, 256)})
+inc, observe, timer = REGISTRY.inc, REGISTRY.observe, REGISTRY.timer
+
+# =========================================================
+# Wizard funnel
+# =========================================================
+class Funnel:
+    """Where each live session is, and where idle ones gave up."""
+
+    def __init__(self, registry: Registry = REGISTRY, abandon_after: float = ABANDON_AFTER):
+        self.registry = registry
+        self.abandon_after = abandon_after
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, List[Any]] = {}      # token -> [step, last seen, runs]
+        self._at: Dict[str, int] = {}
+
+    def _move(self, old: Optional[str], new: Optional[str]) -> None:
+        for step, d in ((old, -1), (new, 1)):
+            if step is not None:
+                self._at[step] = self._at.get(step, 0) + d
+                self.registry.set("sme_sessions_at_step", self._at[step], step=step)
+
+    def visit(self, token: str, step: str, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            s = self._sessions.get(token)
+            if s is None:
+                self._sessions[token] = [step, now, 1]
+                self._move(None, step)
+                return
+            if s[0] != step:
+                self._move(s[0], step)
+                s[0] = step
+            s[1] = now
+            s[2] += 1
+
+    def complete(self, token: str) -> None:
+        with self._lock:
+            s = self._sessions.pop(token, None)
+            if s is not None:
+                self._move(s[0], None)
+                self.registry.observe("sme_reruns_per_assessment", s[2])
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Count sessions idle past ``abandon_after`` as abandoned; returns how many."""
+        cutoff = (time.time() if now is None else now) - self.abandon_after
+        with self._lock:
+            idle = [(t, s) for t, s in self._sessions.items() if s[1] < cutoff]
+            for token, s in idle:
+                del self._sessions[token]
+                self._move(s[0], None)
+                self.registry.inc("sme_abandoned_total", step=s[0])
+        return len(idle)
+
+FUNNEL = Funnel()
+
+# =========================================================
+# Export
+# =========================================================
+def write_snapshot(path: str, registry: Registry = REGISTRY) -> None:
+    """Replace ``path`` with the current metrics (JSON for *.json, else Prometheus text)."""
+    body = json.dumps(registry.as_json(), indent=1) if path.endswith(".json") else registry.prometheus()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(body)
+    os.replace(tmp, path)
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, ctype = REGISTRY.prometheus().encode(), "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body, ctype = json.dumps(REGISTRY.as_json()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+_export_lock = threading.Lock()
+_exporting = False
+
+def start_export(path: Optional[str] = None, port: Optional[int] = None, interval: float = EXPORT_INTERVAL) -> None:
+    """Start the file writer and/or HTTP endpoint (from SME_METRICS_FILE / SME_METRICS_PORT); once per process."""
+    global _exporting
+    if _exporting:
+        return
+    with _export_lock:
+        if _exporting:
+            return
+        _exporting = True
+        path = path or os.environ.get("SME_METRICS_FILE")
+        port = port or int(os.environ.get("SME_METRICS_PORT") or 0)
+
+        def loop() -> None:
+            while True:
+                time.sleep(interval)
+                FUNNEL.sweep()
+                if path:
+                    try:
+                        write_snapshot(path)
+                    except OSError:
+                        log.exception("could not write metrics to %s", path)
+        threading.Thread(target=loop, name="metrics-export", daemon=True).start()
+        if port:
+            server = ThreadingHTTPServer(("0.0.0.0", port), _Handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            log.info("metrics on http://0.0.0.0:%d/metrics", port)
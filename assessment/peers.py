@@ -0,0 +1,138 @@
+"""Peer percentiles: where an assessment's scores sit among similar businesses.
+
+Every score is a whole percentage, so one cohort's distribution of one
+metric (the overall score or a domain) is exactly a 101-bucket histogram.
+The store keeps those histograms in ``score_counts`` and updates them in the
+same transaction as the assessments they count. A replaced row's old scores
+are subtracted first, and a batch's changes are summed before they are
+written. Looking up a percentile is two indexed queries, however many
+assessments are stored.
+
+Cohorts nest from the most specific (industry, headcount and turnover) to
+everyone (``LEVELS``). The results page uses the most specific cohort with at
+least ``MIN_PEERS`` scored assessments.
+"""
+import json
+import sqlite3
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Any, Tuple, NamedTuple, Mapping, Optional, Iterable, Iterator
+
+LEVELS: Tuple[Tuple[str, ...], ...] = (
+    ("industry", "headcount", "turnover"),
+    ("industry", "headcount"),
+    ("industry",),
+    ("headcount",),
+    (),
+)
+MIN_PEERS = 20
+OVERALL = "overall"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS score_counts (
+    cohort  TEXT NOT NULL,                 -- e.g. 'industry=Retail|headcount=6–20'; '' is everyone
+    metric  TEXT NOT NULL,                 -- 'overall' or a domain name
+    score   INTEGER NOT NULL,              -- 0..100
+    n       INTEGER NOT NULL,
+    PRIMARY KEY (cohort, metric, score)
+) WITHOUT ROWID;
+"""
+
+_ADD = ("INSERT INTO score_counts (cohort, metric, score, n) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(cohort, metric, score) DO UPDATE SET n = n + excluded.n")
+
+# (industry, headcount, turnover, overall score, domain scores as JSON or a dict)
+ScoreRow = Tuple[Optional[str], Optional[str], Optional[str], Optional[int], Any]
+
+class Peer(NamedTuple):
+    percentile: int     # share of the cohort scoring lower, counting ties as half
+    cohort: str         # e.g. "Retail businesses with 6–20 people"
+    peers: int          # scored assessments in the cohort
+
+@lru_cache(maxsize=4096)
+def cohort_keys(industry: Optional[str], headcount: Optional[str], turnover: Optional[str]) -> Tuple[str, ...]:
+    """The key of each level in ``LEVELS``, most specific first."""
+    values = {"industry": industry or "", "headcount": headcount or "", "turnover": turnover or ""}
+    return tuple("|".join(f"{f}={values[f]}" for f in fields) for fields in LEVELS)
+
+def cohort_label(fields: Tuple[str, ...], industry: str, headcount: str, turnover: str) -> str:
+    label = f"{industry} businesses" if "industry" in fields else "businesses"
+    if "headcount" in fields:
+        label += " run by just one person" if headcount == "Just me" else f" with {headcount} people"
+    if "turnover" in fields:
+        label += f" turning over {turnover}"
+    return label if fields else "all businesses"
+
+def _metrics(row: ScoreRow) -> Iterator[Tuple[Optional[str], Optional[str], Optional[str], str, int]]:
+    industry, headcount, turnover, overall, domains = row
+    if overall is None:
+        return
+    if isinstance(domains, str):
+        domains = json.loads(domains)
+    yield industry, headcount, turnover, OVERALL, overall
+    for dom, d in (domains or {}).items():
+        yield industry, headcount, turnover, dom, d["score"]
+
+# =========================================================
+# Maintenance (called inside the store's write transaction)
+# =========================================================
+def apply(conn: sqlite3.Connection, changes: Iterable[Tuple[Optional[ScoreRow], ScoreRow]]) -> int:
+    """Move each (old, new) pair of score rows between histograms; returns the buckets touched."""
+    # Net each profile's changes first, then fan the few distinct ones out to every cohort level.
+    delta: Counter = Counter()
+    for old, new in changes:
+        if old is not None:
+            delta.subtract(_metrics(old))
+        delta.update(_metrics(new))
+    buckets: Counter = Counter()
+    for (industry, headcount, turnover, metric, score), n in delta.items():
+        if n:
+            for cohort in cohort_keys(industry, headcount, turnover):
+                buckets[cohort, metric, score] += n
+    rows = [(c, m, s, n) for (c, m, s), n in buckets.items() if n]
+    conn.executemany(_ADD, rows)
+    if any(r[3] < 0 for r in rows):
+        conn.execute("DELETE FROM score_counts WHERE n <= 0")
+    return len(rows)
+
+def rebuild(conn: sqlite3.Connection, chunk: int = 10000) -> int:
+    """Recount every histogram from the assessments table; returns the assessments counted."""
+    conn.execute("DELETE FROM score_counts")
+    last, total = 0, 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, industry, headcount, turnover, overall_score, domain_scores FROM assessments "
+            "WHERE rowid > ? AND overall_score IS NOT NULL ORDER BY rowid LIMIT ?", (last, chunk)).fetchall()
+        if not rows:
+            return total
+        apply(conn, ((None, tuple(r[1:])) for r in rows))
+        last, total = rows[-1][0], total + len(rows)
+
+# =========================================================
+# Lookup
+# =========================================================
+def percentile(hist: Mapping[int, int], score: int) -> int:
+    total = sum(hist.values())
+    below = sum(n for s, n in hist.items() if s < score)
+    return round(100 * (below + hist.get(score, 0) / 2) / total) if total else 0
+
+def percentiles(conn: sqlite3.Connection, profile: Mapping[str, Any], scores: Mapping[str, int],
+                min_peers: int = MIN_PEERS) -> Dict[str, Peer]:
+    """Peer percentile of each metric in ``scores``, within the most specific cohort large enough; {} if none is."""
+    industry = (profile.get("industry") or {}).get("value") or ""
+    headcount, turnover = profile.get("headcount") or "", profile.get("turnover") or ""
+    keys = cohort_keys(industry, headcount, turnover)
+    sizes = dict(conn.execute(
+        f"SELECT cohort, SUM(n) FROM score_counts WHERE metric = ? AND cohort IN ({', '.join('?' * len(keys))}) "
+        "GROUP BY cohort", (OVERALL, *keys)))
+    for fields, key in zip(LEVELS, keys):
+        if sizes.get(key, 0) >= min_peers:
+            break
+    else:
+        return {}
+    hists: Dict[str, Dict[int, int]] = {}
+    for metric, score, n in conn.execute("SELECT metric, score, n FROM score_counts WHERE cohort = ?", (key,)):
+        hists.setdefault(metric, {})[score] = n
+    label = cohort_label(fields, industry, headcount, turnover)
+    return {m: Peer(percentile(hists[m], s), label, sum(hists[m].values()))
+            for m, s in scores.items() if m in hists}
@@ -0,0 +1,179 @@
+"""What-if simulator and effort-budgeted remediation planner.
+
+Every recommended fix (a "fix" action-card rule that fires for the
+assessment) is one answer change. The fix moves its question to the
+highest-weighted choice that stops the rule firing. Fixes that change no
+answer (e.g. "add vendor contacts" once the checklist exists) keep their
+place in the list but gain nothing.
+
+The rules are compiled once per bank version into a rules × current-choice
+table of weight gains. For one assessment each open fix is therefore a
+single row of a fixes × domains delta matrix. A set of candidate plans is a
+plans × fixes 0/1 matrix, and every plan's domain sums are one matrix
+product. Its domain and overall scores then follow with the same rounding
+as ``compute_domain_scores`` / ``overall_score``, so they are exact, not an
+estimate from per-fix uplifts that rounding would make wrong. The planner
+compares every subset of the fixes that gain anything (there are rarely more
+than a dozen). Past ``EXACT_LIMIT`` of them it adds the best points-per-effort
+fix, one at a time, until the budget runs out.
+"""
+from typing import Dict, Any, List, Tuple, NamedTuple, Mapping, Optional, Iterable
+
+import numpy as np
+
+from .batch import CompiledWeights, compile_weights, encode_answers
+from .registry import Banks, current_banks
+from .rules import CompiledRules, choice_codes, initial_matches, FIX_LIMIT
+
+EXACT_LIMIT = 16          # 2**16 plans
+
+class Fix(NamedTuple):
+    text: str
+    question: str
+    domain: str
+    target: Optional[str]        # the answer it moves the question to; None if no answer changes
+    effort: int
+    uplift: int                  # overall score points if only this fix is done
+    domain_uplift: int           # points in its own domain if only this fix is done
+
+class Plan(NamedTuple):
+    fixes: List[Fix]
+    effort: int
+    overall: int                 # scores with every fix of the plan done
+    domains: Dict[str, int]
+    exact: bool                  # every combination within the budget was compared
+
+class _Compiled(NamedTuple):
+    cw: CompiledWeights
+    fix_rules: List[int]         # positions in rules.rules of the "fix" rules, in listing order
+    target: np.ndarray           # (R,) choice a fix moves its question to; -1 if none beats the rest
+    gain: np.ndarray             # (R, C+1) weight gained by doing the fix, by current choice (last: unanswered)
+    domain: np.ndarray           # (Q,) domain index of each question
+
+_compiled: Tuple[Optional[str], Optional[_Compiled]] = (None, None)
+
+def _compile(banks: Banks) -> _Compiled:
+    global _compiled
+    version, comp = _compiled
+    if version == banks.version:
+        return comp
+    cw = compile_weights(list(banks.cyber.questions))
+    cr: CompiledRules = banks.rules
+    fix_rules = [r for r, rule in enumerate(cr.rules) if rule.kind == "fix"]
+    target = np.full(len(fix_rules), -1, dtype=np.intp)
+    gain = np.zeros((len(fix_rules), cw.weights.shape[1]), dtype=np.int64)
+    for k, r in enumerate(fix_rules):
+        rule = cr.rules[r]
+        w = cw.weights[rule.qpos]
+        # Real choices (not the placeholder) that stop the rule firing.
+        ok = [c for c in range(1, len(cw.choices[rule.qpos])) if (c in rule.choices) == rule.negate]
+        if ok:
+            best = max(ok, key=lambda c: (w[c], -c))
+            target[k] = best
+            gain[k] = np.maximum(w[best] - w, 0)
+    domain = cw.membership.argmax(axis=1)
+    comp = _Compiled(cw, fix_rules, target, gain, domain)
+    _compiled = (banks.version, comp)
+    return comp
+
+class Simulator:
+    """The open fixes of one assessment, and the exact scores of any combination of them."""
+
+    def __init__(self, cyber: Mapping[str, Any], initial: Optional[Mapping[str, Any]] = None,
+                 banks: Optional[Banks] = None):
+        banks = banks or current_banks()
+        comp = self._comp = _compile(banks)
+        cw, cr = comp.cw, banks.rules
+        codes = encode_answers([cyber], cw)[0]
+        rule_codes = choice_codes(cyber, cr)
+        self.base_sums = (cw.weights[np.arange(len(cw.ids)), codes] @ cw.membership).astype(np.int64)
+        self.domains = cw.domains
+
+        rows, deltas, seen = [], [], set()
+        for k, r in enumerate(comp.fix_rules):
+            rule = cr.rules[r]
+            if (rule_codes[rule.qpos] in rule.choices) == rule.negate:
+                continue
+            if rule.initial and not initial_matches(initial or {}, rule.initial):
+                continue
+            delta = np.zeros(len(cw.domains), dtype=np.int64)
+            if rule.qpos not in seen:             # one answer change per question
+                delta[comp.domain[rule.qpos]] = comp.gain[k, codes[rule.qpos]]
+                seen.add(rule.qpos)
+            rows.append((k, rule))
+            deltas.append(delta)
+        delta = np.array(deltas, dtype=np.int64).reshape(len(rows), len(cw.domains))
+
+        # Rank by what each fix is worth alone; ties go to less effort, then the rules' own order.
+        overall, doms = self.score(np.eye(len(rows), dtype=np.int64), delta)
+        base_overall, base_doms = self.score(np.zeros((1, 0), dtype=np.int64), delta[:0])
+        fixes = []
+        for i, (k, rule) in enumerate(rows):
+            d = comp.domain[rule.qpos]
+            changed = bool(delta[i].any())
+            fixes.append(Fix(
+                rule.text, cw.ids[rule.qpos], cw.domains[d],
+                cw.choices[rule.qpos][comp.target[k]] if changed else None, rule.effort,
+                int(overall[i] - base_overall[0]), int(doms[i, d] - base_doms[0, d]),
+            ))
+        order = sorted(range(len(fixes)), key=lambda i: (-fixes[i].uplift, -fixes[i].domain_uplift, fixes[i].effort, i))
+        self.fixes: List[Fix] = [fixes[i] for i in order]
+        self._delta = delta[order]
+        self._effort = np.array([f.effort for f in self.fixes], dtype=np.int64)
+        self.overall, self.domain_scores = int(base_overall[0]), dict(zip(cw.domains, base_doms[0].tolist()))
+
+    def score(self, masks: np.ndarray, delta: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(overall (P,), domain scores (P, D)) of plans given as a (P, fixes) 0/1 matrix."""
+        delta = self._delta if delta is None else delta
+        sums = self.base_sums + np.asarray(masks, dtype=np.int64) @ delta
+        top = self._comp.cw.domain_max
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(top > 0, sums / top * 100, 0.0)
+        doms = np.round(pct).astype(np.int64)
+        overall = np.round(doms.sum(axis=1) / doms.shape[1]).astype(np.int64) if doms.shape[1] \
+            else np.zeros(len(doms), dtype=np.int64)
+        return overall, doms
+
+    def what_if(self, chosen: Iterable[Fix]) -> Tuple[int, Dict[str, int]]:
+        """Overall and domain scores with the ``chosen`` fixes done."""
+        chosen = set(chosen)
+        mask = np.array([[f in chosen for f in self.fixes]], dtype=np.int64)
+        overall, doms = self.score(mask)
+        return int(overall[0]), dict(zip(self.domains, doms[0].tolist()))
+
+    def plan(self, budget: int) -> Plan:
+        """The fixes that raise the overall score most within ``budget`` effort (then the domains, then least effort)."""
+        useful = [i for i in range(len(self.fixes)) if self._delta[i].any() and self._effort[i] <= budget]
+        if len(useful) <= EXACT_LIMIT:
+            n = len(useful)
+            masks = (np.arange(1 << n)[:, None] >> np.arange(n)) & 1
+            full = np.zeros((len(masks), len(self.fixes)), dtype=np.int64)
+            full[:, useful] = masks
+            effort = full @ self._effort
+            full, effort = full[effort <= budget], effort[effort <= budget]
+            overall, doms = self.score(full)
+            best = np.lexsort((full.sum(axis=1), effort, -doms.sum(axis=1), -overall))[0]
+            picked, exact = full[best], True
+        else:
+            picked, exact = np.zeros(len(self.fixes), dtype=np.int64), False
+            left = budget
+            while True:
+                cand = [i for i in useful if not picked[i] and self._effort[i] <= left]
+                if not cand:
+                    break
+                now_overall, now_doms = self.score(picked[None, :])
+                masks = np.repeat(picked[None, :], len(cand), axis=0)
+                masks[np.arange(len(cand)), cand] = 1
+                overall, doms = self.score(masks)
+                gain = (overall - now_overall) * 1000 + doms.sum(axis=1) - now_doms.sum()
+                value = gain / self._effort[cand]
+                i = cand[int(value.argmax())]
+                picked[i], left = 1, left - self._effort[i]
+        overall, doms = self.score(picked[None, :])
+        fixes = [f for f, p in zip(self.fixes, picked) if p]
+        return Plan(fixes, sum(f.effort for f in fixes), int(overall[0]), dict(zip(self.domains, doms[0].tolist())), exact)
+
+def ranked_fixes(cyber: Mapping[str, Any], initial: Optional[Mapping[str, Any]] = None,
+                 banks: Optional[Banks] = None, limit: int = FIX_LIMIT) -> List[Fix]:
+    """The recommended fixes, most overall uplift first."""
+    return Simulator(cyber, initial, banks).fixes[:limit]
@@ -0,0 +1,261 @@
+"""The MSP portfolio: one row per client, with roll-ups, kept up to date as assessments are stored.
+
+A client is a business, identified by its normalised business name (or by
+the assessment id when the name is blank). ``portfolio_clients`` holds each
+client's latest assessment, denormalised into what the portfolio table shows.
+A scored (cyber) assessment always beats an initial-only one, so a client
+starting a reassessment keeps their scores until it is finished.
+``portfolio_rollup`` counts clients per industry, metric and traffic light,
+with score sums for averages. The store updates both tables in the same
+transaction as the assessments. Pages are filtered, sorted and cut
+with SQL, and roll-ups are sums over a few hundred rows, so neither depends
+on how many clients there are.
+
+An assessment re-saved under another business name moves to that client;
+the old client is dropped rather than falling back to an older assessment.
+"""
+import json
+import sqlite3
+from collections import Counter
+from typing import Dict, Any, List, Tuple, NamedTuple, Mapping, Optional, Iterable, Iterator
+
+from .scoring import traffic_light
+
+OVERALL = "overall"
+UNSCORED = ""       # the colour of a client with no cyber assessment yet
+LIGHTS = ("green", "amber", "red")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolio_clients (
+    client_key     TEXT PRIMARY KEY,           -- casefolded business name, or 'id:<assessment id>'
+    assessment_id  TEXT NOT NULL UNIQUE,       -- the client's latest assessment
+    business_name  TEXT,
+    industry       TEXT,
+    headcount      TEXT,
+    turnover       TEXT,
+    stage          TEXT NOT NULL,
+    completed_at   TEXT NOT NULL,
+    dd_score       INTEGER,
+    overall_score  INTEGER,
+    overall_colour TEXT NOT NULL,              -- '' while unscored
+    domain_scores  TEXT,                       -- JSON {domain: {score, colour, label}}
+    fixes          TEXT,                       -- JSON list
+    fix_count      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_portfolio_name      ON portfolio_clients(business_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS ix_portfolio_overall   ON portfolio_clients(overall_score);
+CREATE INDEX IF NOT EXISTS ix_portfolio_completed ON portfolio_clients(completed_at);
+CREATE INDEX IF NOT EXISTS ix_portfolio_dd        ON portfolio_clients(dd_score);
+CREATE INDEX IF NOT EXISTS ix_portfolio_fixes     ON portfolio_clients(fix_count);
+CREATE INDEX IF NOT EXISTS ix_portfolio_industry  ON portfolio_clients(industry, completed_at);
+CREATE TABLE IF NOT EXISTS portfolio_rollup (
+    industry   TEXT NOT NULL,
+    metric     TEXT NOT NULL,                  -- 'overall' or a domain name
+    colour     TEXT NOT NULL,
+    clients    INTEGER NOT NULL,
+    score_sum  INTEGER NOT NULL,
+    PRIMARY KEY (industry, metric, colour)
+) WITHOUT ROWID;
+"""
+
+CLIENT_COLUMNS = [
+    "client_key", "assessment_id", "business_name", "industry", "headcount", "turnover", "stage",
+    "completed_at", "dd_score", "overall_score", "overall_colour", "domain_scores", "fixes", "fix_count",
+]
+
+_UPSERT = (
+    f"INSERT INTO portfolio_clients ({', '.join(CLIENT_COLUMNS)}) VALUES ({', '.join('?' * len(CLIENT_COLUMNS))}) "
+    "ON CONFLICT(client_key) DO UPDATE SET "
+    + ", ".join(f"{c}=excluded.{c}" for c in CLIENT_COLUMNS if c != "client_key")
+)
+_ADD = ("INSERT INTO portfolio_rollup (industry, metric, colour, clients, score_sum) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(industry, metric, colour) DO UPDATE SET "
+        "clients = clients + excluded.clients, score_sum = score_sum + excluded.score_sum")
+
+# Sort keys offered to the UI -> SQL. rowid breaks ties so pages never overlap.
+SORTS = {
+    "completed": "completed_at",
+    "name": "business_name COLLATE NOCASE",
+    "overall": "overall_score",
+    "dd": "dd_score",
+    "fixes": "fix_count",
+}
+_NULLABLE = {"overall", "dd"}     # unscored clients sort last either way
+
+class Client(NamedTuple):
+    client_key: str
+    assessment_id: str
+    business_name: str
+    industry: str
+    headcount: str
+    turnover: str
+    stage: str
+    completed_at: str
+    dd_score: Optional[int]
+    overall_score: Optional[int]
+    overall_colour: str
+    domain_scores: Optional[str]
+    fixes: Optional[str]
+    fix_count: int
+
+def client_key(business_name: Optional[str], assessment_id: str) -> str:
+    name = " ".join((business_name or "").split()).casefold()
+    return name or f"id:{assessment_id}"
+
+def client_from_row(row: Mapping[str, Any]) -> Client:
+    """The portfolio entry for one stored assessment row (a dict or sqlite3.Row of the assessments table)."""
+    overall, fixes = row["overall_score"], row["fixes"]
+    if fixes is not None and not isinstance(fixes, str):
+        fixes = json.dumps(fixes, ensure_ascii=False, separators=(",", ":"))
+    return Client(
+        client_key(row["business_name"], row["id"]), row["id"], row["business_name"] or "",
+        row["industry"] or "", row["headcount"] or "", row["turnover"] or "", row["stage"], row["completed_at"],
+        row["dd_score"], overall, traffic_light(overall)[0] if overall is not None else UNSCORED,
+        row["domain_scores"], fixes, len(json.loads(fixes)) if fixes else 0,
+    )
+
+def _rank(c: Client) -> Tuple[bool, str]:
+    return c.stage == "cyber", c.completed_at
+
+def _contributions(c: Client) -> Iterator[Tuple[Tuple[str, str, str], int]]:
+    yield (c.industry, OVERALL, c.overall_colour), c.overall_score or 0
+    if c.domain_scores:
+        for dom, d in json.loads(c.domain_scores).items():
+            yield (c.industry, dom, d["colour"]), d["score"]
+
+# =========================================================
+# Maintenance (called inside the store's write transaction)
+# =========================================================
+def _current(conn: sqlite3.Connection, column: str, values: List[str]) -> Iterator[Client]:
+    for i in range(0, len(values), 500):
+        chunk = values[i:i + 500]
+        for r in conn.execute(f"SELECT {', '.join(CLIENT_COLUMNS)} FROM portfolio_clients "
+                              f"WHERE {column} IN ({', '.join('?' * len(chunk))})", chunk):
+            yield Client(*r)
+
+def apply(conn: sqlite3.Connection, clients: Iterable[Client]) -> int:
+    """File each new assessment under its client if it is the latest; returns the clients changed."""
+    clients = list(clients)
+    current: Dict[str, Optional[Client]] = {}
+    for c in _current(conn, "client_key", list({c.client_key for c in clients})):
+        current[c.client_key] = c
+    for c in _current(conn, "assessment_id", list({c.assessment_id for c in clients})):
+        current[c.client_key] = c
+    by_id = {c.assessment_id: k for k, c in current.items()}
+
+    clients_delta: Counter = Counter()
+    score_delta: Counter = Counter()
+    def count(c: Client, sign: int) -> None:
+        for key, score in _contributions(c):
+            clients_delta[key] += sign
+            score_delta[key] += sign * score
+
+    changed = set()
+    for new in clients:
+        moved_from = by_id.get(new.assessment_id)
+        if moved_from is not None and moved_from != new.client_key:     # re-saved under another name
+            count(current[moved_from], -1)
+            current[moved_from] = None
+            del by_id[new.assessment_id]
+            changed.add(moved_from)
+        old = current.get(new.client_key)
+        if old is not None and old.assessment_id != new.assessment_id and _rank(new) < _rank(old):
+            continue
+        if old is not None:
+            count(old, -1)
+            by_id.pop(old.assessment_id, None)
+        count(new, 1)
+        current[new.client_key] = new
+        by_id[new.assessment_id] = new.client_key
+        changed.add(new.client_key)
+
+    gone = [(k,) for k in changed if current[k] is None]
+    conn.executemany("DELETE FROM portfolio_clients WHERE client_key = ?", gone)
+    conn.executemany(_UPSERT, [current[k] for k in changed if current[k] is not None])
+    rows = [(*key, n, score_delta[key]) for key, n in clients_delta.items() if n or score_delta[key]]
+    conn.executemany(_ADD, rows)
+    if any(r[3] < 0 for r in rows):
+        conn.execute("DELETE FROM portfolio_rollup WHERE clients <= 0")
+    return len(changed)
+
+def rebuild(conn: sqlite3.Connection, chunk: int = 10000) -> int:
+    """Refile every stored assessment, oldest first; returns the assessments read."""
+    conn.execute("DELETE FROM portfolio_clients")
+    conn.execute("DELETE FROM portfolio_rollup")
+    conn.row_factory, factory = sqlite3.Row, conn.row_factory
+    try:
+        last, total = 0, 0
+        while True:
+            rows = conn.execute(
+                "SELECT rowid AS _rowid, id, business_name, industry, headcount, turnover, stage, completed_at, "
+                "dd_score, overall_score, domain_scores, fixes FROM assessments WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last, chunk)).fetchall()
+            if not rows:
+                return total
+            apply(conn, [client_from_row(r) for r in rows])
+            last, total = rows[-1]["_rowid"], total + len(rows)
+    finally:
+        conn.row_factory = factory
+
+# =========================================================
+# Reads
+# =========================================================
+def _where(industry: Optional[str], headcount: Optional[str], turnover: Optional[str], search: Optional[str],
+           light: Optional[str], domain: Optional[str]) -> Tuple[str, List[Any]]:
+    where, params = [], []
+    for col, val in (("industry", industry), ("headcount", headcount), ("turnover", turnover)):
+        if val:
+            where.append(f"{col} = ?"); params.append(val)
+    if search:
+        where.append("business_name LIKE ? ESCAPE '\\'")
+        params.append("%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    if light is not None:
+        if domain:
+            where.append("json_extract(domain_scores, ?) = ?"); params += [f'$."{domain}".colour', light]
+        else:
+            where.append("overall_colour = ?"); params.append(light)
+    return (" WHERE " + " AND ".join(where)) if where else "", params
+
+def page(conn: sqlite3.Connection, industry: Optional[str] = None, headcount: Optional[str] = None,
+         turnover: Optional[str] = None, search: Optional[str] = None, light: Optional[str] = None,
+         domain: Optional[str] = None, sort: str = "completed", descending: bool = True,
+         page_no: int = 0, per_page: int = 50) -> Tuple[List[Dict[str, Any]], int]:
+    """One page of clients matching every given filter, and how many match in all.
+
+    ``light`` filters on the overall traffic light, or on ``domain``'s if given.
+    """
+    if sort not in SORTS:
+        raise ValueError(f"unknown sort {sort!r}; expected one of {sorted(SORTS)}")
+    where, params = _where(industry, headcount, turnover, search, light, domain)
+    order = "DESC" if descending else "ASC"
+    rows = conn.execute(
+        f"SELECT {', '.join(CLIENT_COLUMNS)} FROM portfolio_clients{where} "
+        f"ORDER BY {SORTS[sort] + ' IS NULL, ' if sort in _NULLABLE else ''}{SORTS[sort]} {order}, rowid {order} "
+        "LIMIT ? OFFSET ?",
+        (*params, per_page, page_no * per_page)).fetchall()
+    total = conn.execute(f"SELECT COUNT(*) FROM portfolio_clients{where}", params).fetchone()[0]
+    out = []
+    for r in rows:
+        d = dict(zip(CLIENT_COLUMNS, r))
+        d["domain_scores"] = json.loads(d["domain_scores"]) if d["domain_scores"] else {}
+        d["fixes"] = json.loads(d["fixes"]) if d["fixes"] else []
+        out.append(d)
+    return out, total
+
+def rollup(conn: sqlite3.Connection, industry: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Per metric: clients scored, average score and clients per light (for one industry or all)."""
+    sql = "SELECT metric, colour, SUM(clients), SUM(score_sum) FROM portfolio_rollup"
+    params: Tuple[str, ...] = ()
+    if industry:
+        sql += " WHERE industry = ?"; params = (industry,)
+    out: Dict[str, Dict[str, Any]] = {}
+    for metric, colour, n, total in conn.execute(sql + " GROUP BY metric, colour", params):
+        m = out.setdefault(metric, {"clients": 0, "average": 0.0, "score_sum": 0, UNSCORED: 0,
+                                    **dict.fromkeys(LIGHTS, 0)})
+        m[colour] = n
+        if colour != UNSCORED:
+            m["clients"] += n
+            m["score_sum"] += total
+    for m in out.values():
+        m["average"] = m.pop("score_sum") / m["clients"] if m["clients"] else 0.0
+    return out
@@ -0,0 +1,243 @@
+"""Pre-filled answers from what a technician already knows (RMM exports, asset inventories).
+
+    python -m assessment prefill inventory.csv -o scored.csv [--map columns.yaml]
+
+An inventory is a CSV, JSON array or JSONL file with one client per row. Each
+column is one of three things:
+
+- a question id (``mfa_all``, ``tools_regular``)
+- an intake field (``business_name``, ``industry``, ``headcount``)
+- through a mapping file, whatever the RMM tool calls it:
+
+    columns: {"MFA enforced": mfa_all, "BitLocker": disk_encryption}
+    values:
+      mfa_all: {"true": "Yes, for all important accounts", "false": "No / not sure"}
+
+Other columns are ignored. Values are checked against the live banks' choice
+lists, ignoring case and surrounding spaces. A value that is not a choice is
+dropped and reported as an issue. On questions that allow "Other" it is kept
+as an "Other" answer instead, with the value as the comment. Multi-selects are
+split on ``;``. JSON records may also use the nested ``profile`` / ``answers``
+/ ``cyber_answers`` shape of ``score`` and ``export``.
+
+Files are parsed one record at a time (JSON arrays too), so a client list of
+any length is read in constant memory. The wizard marks pre-filled question
+ids in the profile (``profile["prefilled"]``) and steps over them (see
+``WizardSession.prefill``).
+"""
+import csv
+import itertools
+import json
+import os
+from typing import Dict, Any, List, Tuple, NamedTuple, Mapping, Optional, Iterable, Iterator, TextIO
+
+from .branching import OTHER
+from .loader import parse
+from .questions import MULTI_SEP, PLACEHOLDER, INDUSTRY_OPTIONS, YEARS_OPTIONS, HEADCOUNT_OPTIONS, TURNOVER_OPTIONS, WORK_MODE_OPTIONS
+from .registry import Banks
+
+_PROFILE = 0
+_INITIAL = 1
+_CYBER = 2
+
+class ColumnMap(NamedTuple):
+    columns: Mapping[str, str]                    # inventory column -> question id / intake field
+    values: Mapping[str, Mapping[str, str]]       # question id -> casefolded raw value -> choice
+
+NO_MAP = ColumnMap({}, {})
+
+class Prefill(NamedTuple):
+    row: int                                      # 1-based record number in the file
+    id: str
+    profile: Dict[str, Any]
+    answers: Dict[str, Any]
+    cyber_answers: Dict[str, Any]
+    issues: List[str]
+
+    @property
+    def name(self) -> str:
+        return self.profile.get("business_name") or self.id
+
+class _Field(NamedTuple):
+    part: int
+    type: str                                     # choice, multi or text
+    choices: Optional[Mapping[str, str]]          # label and casefolded label -> label
+    rank: Optional[Mapping[str, int]]             # label -> position, to keep multi-selects in bank order
+    other: bool                                   # unknown values become "Other (please specify)"
+
+def _fold(v: str) -> str:
+    return " ".join(v.split()).casefold()
+
+def _choices(labels: Iterable[str]) -> Dict[str, str]:
+    labels = [c for c in labels if c != PLACEHOLDER]
+    return {**{_fold(c): c for c in labels}, **{c: c for c in labels}}
+
+def _lookup(f: "_Field", label: str) -> Optional[str]:
+    # Exact labels are the common case; only fold the rest.
+    c = f.choices.get(label)
+    return c if c is not None else f.choices.get(_fold(label))
+
+_PROFILE_FIELDS = {
+    "contact_name": _Field(_PROFILE, "text", None, None, False),
+    "business_name": _Field(_PROFILE, "text", None, None, False),
+    "industry": _Field(_PROFILE, "choice", _choices(INDUSTRY_OPTIONS), None, True),
+    "industry_other": _Field(_PROFILE, "text", None, None, False),
+    "industry_code": _Field(_PROFILE, "text", None, None, False),
+    "years": _Field(_PROFILE, "choice", _choices(YEARS_OPTIONS), None, False),
+    "headcount": _Field(_PROFILE, "choice", _choices(HEADCOUNT_OPTIONS), None, False),
+    "turnover": _Field(_PROFILE, "choice", _choices(TURNOVER_OPTIONS), None, False),
+    "work_mode": _Field(_PROFILE, "choice", _choices(WORK_MODE_OPTIONS), None, False),
+}
+
+_compiled: Tuple[Optional[str], Dict[str, _Field]] = (None, {})
+
+def _fields(banks: Banks) -> Dict[str, _Field]:
+    """Every field an inventory can fill, for the live banks (rebuilt when they are reloaded)."""
+    global _compiled
+    version, fields = _compiled
+    if version != banks.version:
+        fields = dict(_PROFILE_FIELDS)
+        for part, bank in ((_INITIAL, banks.initial.bank), (_CYBER, banks.cyber)):
+            for q in bank.questions:
+                choices = _choices(q["choices"]) if "choices" in q else None
+                rank = {c: i for i, c in enumerate(q["choices"])} if q["type"] == "multi" else None
+                fields[q["id"]] = _Field(part, q["type"], choices, rank, bool(q.get("allow_other")))
+        _compiled = (banks.version, fields)
+    return fields
+
+def load_map(path: str) -> ColumnMap:
+    """A column mapping file (YAML or JSON; see the module docstring)."""
+    with open(path, "rb") as fh:
+        doc = parse(fh.read(), path) or {}
+    if not isinstance(doc, dict) or not set(doc) <= {"columns", "values"}:
+        raise ValueError(f"{path}: expected a mapping with 'columns' and/or 'values'")
+    columns, values = doc.get("columns") or {}, doc.get("values") or {}
+    if not isinstance(columns, dict) or not isinstance(values, dict) or \
+            not all(isinstance(v, dict) for v in values.values()):
+        raise ValueError(f"{path}: 'columns' must map names to ids and 'values' ids to {{raw: choice}}")
+    return ColumnMap({str(k): str(v) for k, v in columns.items()},
+                     {str(q): {_fold(str(k)): v for k, v in m.items()} for q, m in values.items()})
+
+# =========================================================
+# Validation
+# =========================================================
+def _items(raw: Mapping[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """A record's (column, value) pairs; nested JSON records are flattened first."""
+    for key, val in raw.items():
+        if key in ("answers", "cyber_answers", "profile") and isinstance(val, dict):
+            for k, v in val.items():
+                if k == "industry" and isinstance(v, dict):
+                    yield "industry", v.get("value")
+                    yield "industry_other", v.get("other")
+                    yield "industry_code", v.get("code")
+                else:
+                    yield k, v
+        else:
+            yield key, val
+
+def prefill_record(raw: Mapping[str, Any], banks: Banks, cmap: ColumnMap = NO_MAP, row: int = 0) -> Prefill:
+    """Validate one inventory record against the banks."""
+    fields = _fields(banks)
+    parts: Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]] = ({}, {}, {})
+    issues: List[str] = []
+    rec_id = ""
+    for key, val in _items(raw):
+        if key == "id":
+            rec_id = "" if val is None else str(val)
+            continue
+        name = cmap.columns.get(key, key)
+        f = fields.get(name)
+        if f is None or val is None or val == "" or val == PLACEHOLDER or val == []:
+            continue
+        aliases = cmap.values.get(name)
+        if f.type == "multi":
+            labels = val if isinstance(val, list) else str(val).split(MULTI_SEP)
+            picked = []
+            for label in labels:
+                label = str(label).strip()
+                label = aliases.get(_fold(label), label) if aliases else label
+                c = _lookup(f, label) if label else None
+                if c is not None:
+                    picked.append(c)
+                elif label:
+                    issues.append(f"{key}: {label!r} is not a choice")
+            if picked:
+                parts[f.part][name] = sorted(set(picked), key=f.rank.__getitem__)
+        elif f.type == "choice":
+            if isinstance(val, dict) and val.get("value") == OTHER and f.other:
+                parts[f.part][name] = {"value": OTHER, "comment": str(val.get("comment") or "")}
+                continue
+            text = str(val).strip()
+            text = aliases.get(_fold(text), text) if aliases else text
+            c = _lookup(f, text)
+            if c is not None:
+                parts[f.part][name] = c
+            elif f.other and name == "industry":
+                parts[_PROFILE]["industry"] = OTHER
+                parts[_PROFILE].setdefault("industry_other", text)
+            elif f.other:
+                parts[f.part][name] = {"value": OTHER, "comment": text}
+            else:
+                issues.append(f"{key}: {text!r} is not a choice")
+        else:
+            parts[f.part][name] = str(val).strip()
+    flat = parts[_PROFILE]
+    profile = {k: v for k, v in flat.items() if k not in ("industry", "industry_other", "industry_code")}
+    if "industry" in flat or "industry_other" in flat:
+        profile["industry"] = {"value": flat.get("industry", OTHER), "other": flat.get("industry_other", ""),
+                               "code": flat.get("industry_code", "")}
+    return Prefill(row, rec_id, profile, parts[_INITIAL], parts[_CYBER], issues)
+
+# =========================================================
+# Streaming input
+# =========================================================
+def detect_format(path: str, explicit: Optional[str] = None) -> str:
+    if explicit:
+        return explicit
+    return "csv" if os.path.splitext(path)[1].lower() == ".csv" else "json"
+
+def _json_array(fh: TextIO, block: int = 1 << 16) -> Iterator[Any]:
+    """The elements of a JSON array whose "[" has been read, decoded one at a time."""
+    dec = json.JSONDecoder()
+    buf, pos = "", 0
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buf):
+            buf, pos = fh.read(block), 0
+            if not buf:
+                raise ValueError("unterminated JSON array")
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            obj, pos = dec.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            more = fh.read(block)                 # the element runs past the buffer
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+
+def read_inventory(fh: TextIO, fmt: str = "json") -> Iterator[Dict[str, Any]]:
+    """Raw records of a CSV, JSON array or JSONL stream, one at a time."""
+    if fmt == "csv":
+        yield from csv.DictReader(fh)
+        return
+    ch = fh.read(1)
+    while ch.isspace():
+        ch = fh.read(1)
+    if ch == "[":
+        for obj in _json_array(fh):
+            if not isinstance(obj, dict):
+                raise ValueError("expected a JSON array of objects")
+            yield obj
+        return
+    for line in itertools.chain([ch + fh.readline()], fh):
+        if line.strip():
+            yield json.loads(line)
+
+def read_prefills(fh: TextIO, banks: Banks, fmt: str = "json", cmap: ColumnMap = NO_MAP) -> Iterator[Prefill]:
+    for n, raw in enumerate(read_inventory(fh, fmt), 1):
+        yield prefill_record(raw, banks, cmap, n)
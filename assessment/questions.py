@@ -0,0 +1,57 @@
+"""Question banks for the Initial Assessment and Cybersecurity Posture stages.
+
+The questions themselves live in ``assessment/banks/*.yaml`` (or the directory
+named by ``SME_QUESTION_BANKS``); the lists here are the versions loaded at
+import. A running app picks up later edits through ``registry.current_banks``.
+"""
+from typing import Dict, Any, List
+
+from .loader import bank_path, load_bank
+
+PLACEHOLDER = "— Select one —"
+MULTI_SEP = ";"          # between a multi-select's choices in flat files (CSV, Parquet, inventory exports)
+
+# =========================================================
+# Intake options
+# =========================================================
+
+INDUSTRY_OPTIONS = [
+    "Retail",
+    "Food & Beverage (Café/Restaurant)",
+    "Professional Services (Consulting/Legal/Accounting)",
+    "Creative/Marketing/Design",
+    "Healthcare",
+    "Education",
+    "Manufacturing",
+    "Logistics / Transportation",
+    "Construction / Trades",
+    "Real Estate",
+    "Hospitality / Travel",
+    "Non-profit",
+    "IT / Software",
+    "Finance / Insurance",
+    "Personal Services",
+    "e-Commerce only",
+    "Marketplace seller",
+    "Government / Public sector",
+    "Agriculture",
+    "Automotive",
+    "Fitness / Wellness",
+    "Beauty / Salon",
+    "Event services",
+    "Other (please specify)"
+]
+
+YEARS_OPTIONS = ("<1 year","1–3 years","3–10 years","10+ years")
+HEADCOUNT_OPTIONS = ("Just me","2–5","6–20","21–100","100+")
+TURNOVER_OPTIONS = ("<€100k","€100k–500k","€500k–2M",">€2M")
+WORK_MODE_OPTIONS = ("Local & in-person","Online/remote","A mix of both")
+
+# =========================================================
+# Question banks (loaded from files)
+# =========================================================
+BASE_QUESTIONS: List[Dict[str, Any]] = load_bank(bank_path("initial"), "initial").questions
+CYBER_QUESTIONS: List[Dict[str, Any]] = load_bank(bank_path("cyber"), "cyber").questions
+CYBER_TOTAL = len(CYBER_QUESTIONS)
+
+TOOLS_EXPANDED = next(q["choices"] for q in BASE_QUESTIONS if q["id"] == "tools_regular")
@@ -0,0 +1,79 @@
+"""The live question banks, reloaded when their files change.
+
+``current_banks()`` returns a ``Banks`` snapshot: the compiled Initial
+Assessment branching, the Cybersecurity Posture bank and the action-card
+rules compiled against it. At most once per ``CHECK_INTERVAL`` seconds it
+stats the bank files. If one changed, it loads, validates and compiles a new
+snapshot and swaps it in. A bad edit is logged and the previous snapshot
+stays live, so a running server never serves a half-valid bank and sessions
+carry on.
+"""
+import hashlib
+import logging
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from .bank import QuestionBank, compile_bank, CYBER_BANK
+from .branching import Branching, compile_branching, INITIAL_BRANCHING
+from .loader import LoadedBank, bank_path, load_bank
+from .rules import CompiledRules, ACTION_RULES, compile_rules, COMPILED_RULES
+
+log = logging.getLogger(__name__)
+
+CHECK_INTERVAL = 1.0
+
+class Banks(NamedTuple):
+    version: str               # changes whenever either file's content does
+    initial: Branching
+    cyber: QuestionBank
+    rules: CompiledRules
+
+def _version(initial: LoadedBank, cyber: LoadedBank) -> str:
+    return hashlib.sha256((initial.digest + cyber.digest).encode()).hexdigest()[:16]
+
+def build_banks(initial: LoadedBank, cyber: LoadedBank) -> Banks:
+    """Compile two loaded bank files (raises ValueError if they don't fit together or with the rules)."""
+    cyber_bank = compile_bank(cyber.questions, "domain")
+    return Banks(
+        version=_version(initial, cyber),
+        initial=compile_branching(compile_bank(initial.questions, "phase")),
+        cyber=cyber_bank,
+        rules=compile_rules(ACTION_RULES, list(cyber_bank.questions)),
+    )
+
+def load_banks(bank_dir: Optional[str] = None) -> Banks:
+    return build_banks(load_bank(bank_path("initial", bank_dir), "initial"),
+                       load_bank(bank_path("cyber", bank_dir), "cyber"))
+
+def _startup() -> Banks:
+    # The import-time banks are already compiled; only the version is needed.
+    initial = load_bank(bank_path("initial"), "initial")
+    cyber = load_bank(bank_path("cyber"), "cyber")
+    return Banks(_version(initial, cyber), INITIAL_BRANCHING, CYBER_BANK, COMPILED_RULES)
+
+_current = _startup()
+_checked = time.monotonic()
+_lock = threading.Lock()
+_last_error: Optional[BaseException] = None
+
+def current_banks() -> Banks:
+    global _current, _checked, _last_error
+    if time.monotonic() - _checked < CHECK_INTERVAL:
+        return _current
+    with _lock:
+        if time.monotonic() - _checked < CHECK_INTERVAL:
+            return _current
+        _checked = time.monotonic()
+        try:
+            initial = load_bank(bank_path("initial"), "initial")
+            cyber = load_bank(bank_path("cyber"), "cyber")
+            if _version(initial, cyber) != _current.version:
+                _current = build_banks(initial, cyber)
+                log.info("question banks reloaded (version %s)", _current.version)
+            _last_error = None
+        except (OSError, ValueError) as e:
+            if str(e) != str(_last_error):
+                log.error("question banks not reloaded, keeping version %s: %s", _current.version, e)
+            _last_error = e
+    return _current
@@ -0,0 +1,245 @@
+"""PDF export of the Cybersecurity Posture results page.
+
+Reports are rendered with fpdf (core fonts, so text is folded to Latin-1) and
+cached on disk under a SHA-256 of the profile, answers and scoring-model
+version (see scoring.scoring_model): the same inputs always map to the same file, so repeat downloads skip
+rendering. In the app, ``submit_report`` renders on a thread pool so the
+script thread never waits; ``render_bulk`` renders every stored client across
+worker processes.
+"""
+import hashlib
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, ProcessPoolExecutor, wait
+from datetime import date
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from fpdf import FPDF
+
+from .planner import ranked_fixes
+from .scoring import score_assessment, scoring_model
+
+REPORT_VERSION = 2   # bump when the layout changes so cached PDFs are re-rendered
+DEFAULT_CACHE_DIR = os.environ.get("SME_REPORT_CACHE", os.path.join("data", "reports"))
+
+FILL = {"green": (230, 247, 230), "amber": (255, 243, 205), "red": (255, 231, 231)}
+TEXT = {"green": (13, 107, 13), "amber": (122, 91, 0), "red": (177, 0, 0)}
+
+_LATIN1 = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-", "…": "...",
+    "•": "-", "≈": "~", "€": "EUR ", "×": "x", "→": "->", "←": "<-",
+})
+
+def pdf_text(s: Any) -> str:
+    """Markdown-free, Latin-1-safe text for fpdf's core fonts."""
+    s = str(s).replace("**", "").translate(_LATIN1)
+    return s.encode("latin-1", "replace").decode("latin-1")
+
+# =========================================================
+# Rendering
+# =========================================================
+def report_key(profile: Dict[str, Any], answers: Dict[str, Any], cyber_answers: Dict[str, Any]) -> str:
+    # The scoring model's version is part of the key: edited weights or rules change the report, while
+    # bank edits that leave every score alone (question text, tips) keep the cached PDFs.
+    payload = json.dumps([REPORT_VERSION, scoring_model().version, profile, answers, cyber_answers],
+                         sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=dict)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _industry(profile: Dict[str, Any]) -> str:
+    ind = profile.get("industry") or {}
+    disp = ind.get("value") or "-"
+    if disp.startswith("Other") and ind.get("other"):
+        disp = f"Other - {ind['other']}"
+    return disp
+
+def render_pdf(profile: Dict[str, Any], answers: Dict[str, Any], cyber_answers: Dict[str, Any]) -> bytes:
+    res = score_assessment(answers, cyber_answers)
+    pdf = FPDF(unit="mm", format="A4")
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    width = pdf.w - pdf.l_margin - pdf.r_margin
+
+    pdf.set_font("Arial", "B", 18)
+    pdf.cell(0, 10, pdf_text("SME Cybersecurity Posture Report"), ln=1)
+    pdf.set_font("Arial", "", 9)
+    pdf.set_text_color(102, 102, 102)
+    pdf.cell(0, 5, pdf_text(f"Generated {date.today().isoformat()}"), ln=1)
+    pdf.set_text_color(11, 18, 32)
+    pdf.ln(4)
+
+    # Profile summary
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 7, "Business profile", ln=1)
+    pdf.set_font("Arial", "", 10)
+    for label, val in (
+        ("Business", profile.get("business_name")),
+        ("Contact", profile.get("contact_name")),
+        ("Industry", _industry(profile)),
+        ("People", profile.get("headcount")),
+        ("Years", profile.get("years")),
+        ("Turnover", profile.get("turnover")),
+        ("Work mode", profile.get("work_mode")),
+        ("Digital dependency", res["digital_dependency"]["text"]),
+    ):
+        pdf.cell(40, 6, pdf_text(label + ":"))
+        pdf.cell(0, 6, pdf_text(val or "-"), ln=1)
+    pdf.ln(4)
+
+    # Traffic lights
+    def light_row(name: str, data: Dict[str, Any], bold: bool = False):
+        pdf.set_font("Arial", "B" if bold else "", 11 if bold else 10)
+        pdf.set_text_color(11, 18, 32)
+        pdf.cell(width - 60, 8, pdf_text(name), border="B")
+        pdf.set_fill_color(*FILL[data["colour"]])
+        pdf.set_text_color(*TEXT[data["colour"]])
+        pdf.cell(35, 8, pdf_text(data["label"]), border="B", align="C", fill=1)
+        pdf.set_text_color(11, 18, 32)
+        pdf.cell(25, 8, f"{data['score']}%", border="B", align="R", ln=1)
+
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 7, "Posture by domain", ln=1)
+    light_row("Overall posture", res["overall"], bold=True)
+    for dom, data in res["domains"].items():
+        light_row(dom, data)
+    pdf.ln(5)
+
+    # Action cards
+    def bullets(title: str, items: Iterable[str], empty: str):
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 7, pdf_text(title), ln=1)
+        pdf.set_font("Arial", "", 10)
+        items = list(items)
+        for it in items or [empty]:
+            pdf.cell(5, 6, "-" if items else "")
+            pdf.multi_cell(width - 5, 6, pdf_text(it))
+        pdf.ln(3)
+
+    bullets("What you're doing well", res["good"],
+            "We didn't detect specific strengths yet - once you implement the fixes below, this list will grow.")
+    fixes = [f.text + (f" (+{f.uplift} pts overall)" if f.uplift else "") for f in ranked_fixes(cyber_answers, answers)]
+    bullets("Top recommended fixes", fixes,
+            "Great baseline! Keep policies current and review quarterly.")
+
+    pdf.set_font("Arial", "I", 8)
+    pdf.set_text_color(102, 102, 102)
+    pdf.multi_cell(0, 4, pdf_text("Scores reflect practical control coverage and are intended to guide "
+                                  "priorities, not replace audits."))
+    return pdf.output(dest="S").encode("latin-1")
+
+# =========================================================
+# Content-addressed cache
+# =========================================================
+def cache_path(key: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    return os.path.join(cache_dir, key[:2], f"{key}.pdf")
+
+def cached_pdf(key: str, cache_dir: str = DEFAULT_CACHE_DIR) -> Optional[bytes]:
+    try:
+        with open(cache_path(key, cache_dir), "rb") as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+def get_or_render(profile: Dict[str, Any], answers: Dict[str, Any], cyber_answers: Dict[str, Any],
+                  cache_dir: str = DEFAULT_CACHE_DIR) -> bytes:
+    key = report_key(profile, answers, cyber_answers)
+    data = cached_pdf(key, cache_dir)
+    if data is not None:
+        return data
+    data = render_pdf(profile, answers, cyber_answers)
+    path = cache_path(key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)   # atomic, so concurrent renders of the same key are harmless
+    return data
+
+# =========================================================
+# Background rendering for the app
+# =========================================================
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-report")
+_pending: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+def submit_report(profile: Dict[str, Any], answers: Dict[str, Any], cyber_answers: Dict[str, Any],
+                  cache_dir: str = DEFAULT_CACHE_DIR) -> Tuple[str, Future]:
+    """Start (or join) rendering the report; returns its cache key and a future for the bytes.
+
+    Identical requests from several sessions share one render.
+    """
+    answers, cyber_answers = dict(answers), dict(cyber_answers)   # a snapshot for the worker
+    key = report_key(profile, answers, cyber_answers)
+    with _pending_lock:
+        fut = _pending.get(key)
+        if fut is None:
+            data = cached_pdf(key, cache_dir)
+            fut = Future()
+            if data is not None:
+                fut.set_result(data)
+                return key, fut
+            fut = _pool.submit(get_or_render, profile, answers, cyber_answers, cache_dir)
+            _pending[key] = fut
+            fut.add_done_callback(lambda _f, k=key: _forget(k))
+    return key, fut
+
+def _forget(key: str) -> None:
+    with _pending_lock:
+        _pending.pop(key, None)
+
+# =========================================================
+# Bulk rendering (quarterly mail-outs)
+# =========================================================
+CHUNK = 16               # reports per task sent to a worker process
+
+Job = Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any], str, str]
+
+def report_filename(assessment_id: str) -> str:
+    """``<id>.pdf``; ValueError if the id would name a file outside the output directory."""
+    if not assessment_id or os.path.basename(assessment_id) != assessment_id or assessment_id in (".", ".."):
+        raise ValueError(f"assessment id {assessment_id!r} can't be used as a file name")
+    return f"{assessment_id}.pdf"
+
+def _render_one(job: Job) -> str:
+    assessment_id, profile, answers, cyber, out_dir, cache_dir = job
+    out = os.path.join(out_dir, report_filename(assessment_id))
+    data = get_or_render(profile, answers, cyber, cache_dir)
+    with open(out, "wb") as fh:
+        fh.write(data)
+    return out
+
+def _render_chunk(jobs: List[Job]) -> int:
+    for job in jobs:
+        _render_one(job)
+    return len(jobs)
+
+def render_bulk(records: Iterable[Dict[str, Any]], out_dir: str, workers: Optional[int] = None,
+                cache_dir: str = DEFAULT_CACHE_DIR) -> int:
+    """Render ``{id, profile, answers, cyber_answers}`` records to ``out_dir/<id>.pdf`` in parallel.
+
+    Records are read as the workers free up (a few chunks per worker in flight), so memory stays flat
+    however many are stored. ValueError if an id is not a plain file name.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    jobs = iter((r["id"], r["profile"], r["answers"], r["cyber_answers"] or {}, out_dir, cache_dir) for r in records)
+    n = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(itertools.islice(jobs, CHUNK))
+                if not chunk:
+                    break
+                pending.add(pool.submit(_render_chunk, chunk))
+            if not pending:
+                return n
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    n += fut.result()
+                except BaseException:
+                    for f in pending:
+                        f.cancel()
+                    raise
@@ -0,0 +1,414 @@
+"""Scoring-model versions of stored results, and the resumable job that brings them up to date.
+
+Every stored assessment carries the ``model_version`` it was scored with
+(``scoring.scoring_model``). It is a hash of the weights, domains,
+traffic-light thresholds and action-card rules, so a tip or wording edit
+keeps it. ``scoring_models`` keeps the spec of every version the store has
+written, so a stale version can be compared with the current one:
+
+    weights only, domain maxima unchanged
+        only rows that picked a choice whose weight changed can score
+        differently: a json_extract filter finds them, and every other
+        row just gets the new version
+    anything else (thresholds, rules, domains, a domain's maximum)
+        every scored row is recomputed
+
+Rows are recomputed in worker processes, ``chunk`` rowids at a time, with
+the vectorised scorer (``batch.py``). Only rows whose overall score, domain
+scores, strengths or fixes actually differ are rewritten. They go through
+the same upsert as ``write_rows``, so peers, the portfolio and the latest
+history snapshot follow; older snapshots keep what was shown at the time. The rewrite,
+the version bump of the chunk's other rows and the job's checkpoint
+(``last_rowid``) commit in one transaction. A job stopped at any point,
+by Ctrl-C, a crash or a redeploy, resumes after its last chunk. A runner
+refreshes ``updated_at`` after every chunk. A "running" job whose
+heartbeat is older than ``STALE_AFTER`` seconds, or whose runner's process
+on this host has exited, may be taken over.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Tuple, NamedTuple, Optional, Callable
+
+from .batch import CompiledWeights, compile_weights, encode_answers, score_codes, result_dicts, action_cards_codes
+from .scoring import ScoringModel, scoring_model
+
+log = logging.getLogger(__name__)
+
+CHUNK = 2000                 # rowids per work unit
+STALE_AFTER = 120            # seconds without a heartbeat before a "running" job may be taken over
+
+SCHEMA = """
+CREATE INDEX IF NOT EXISTS ix_assessments_model ON assessments(model_version);
+CREATE TABLE IF NOT EXISTS scoring_models (
+    version     TEXT PRIMARY KEY,
+    spec        TEXT NOT NULL,              -- JSON, see scoring.model_spec
+    first_seen  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rescore_jobs (
+    id            INTEGER PRIMARY KEY,
+    model_version TEXT NOT NULL,            -- the version rows are brought up to
+    status        TEXT NOT NULL,            -- 'running', 'paused', 'failed', 'done' or 'superseded'
+    owner         TEXT,                     -- host:pid of the runner
+    started_at    TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,            -- heartbeat, once per chunk
+    finished_at   TEXT,
+    first_rowid   INTEGER NOT NULL,
+    last_rowid    INTEGER NOT NULL,         -- checkpoint: every row up to here is at model_version
+    max_rowid     INTEGER NOT NULL,         -- rows stored later carry the current version already
+    stale         INTEGER NOT NULL,         -- rows on other versions when the job started
+    scanned       INTEGER NOT NULL DEFAULT 0,
+    checked       INTEGER NOT NULL DEFAULT 0,   -- rows recomputed (could change)
+    changed       INTEGER NOT NULL DEFAULT 0,   -- rows whose results differed and were rewritten
+    seconds       REAL NOT NULL DEFAULT 0,      -- time spent running, over every resume
+    error         TEXT
+);
+"""
+
+class Job(NamedTuple):
+    id: int
+    model_version: str
+    status: str
+    owner: Optional[str]
+    started_at: str
+    updated_at: str
+    finished_at: Optional[str]
+    first_rowid: int
+    last_rowid: int
+    max_rowid: int
+    stale: int
+    scanned: int
+    checked: int
+    changed: int
+    seconds: float
+    error: Optional[str]
+
+    @property
+    def progress(self) -> float:
+        span = self.max_rowid - self.first_rowid
+        return 1.0 if span <= 0 else min(1.0, (self.last_rowid - self.first_rowid) / span)
+
+    @property
+    def rate(self) -> float:
+        """Rows scanned per second of running time."""
+        return self.scanned / self.seconds if self.seconds else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left at the current rate (None before the first chunk)."""
+        done = self.last_rowid - self.first_rowid
+        if not done or not self.seconds:
+            return None
+        return (self.max_rowid - self.last_rowid) * self.seconds / done
+
+class Status(NamedTuple):
+    model: ScoringModel
+    versions: Dict[Optional[str], int]         # stored rows per model version (None: stored before versioning)
+    job: Optional[Job]                         # the latest job
+
+    @property
+    def stale(self) -> int:
+        return sum(n for v, n in self.versions.items() if v != self.model.version)
+
+def _dumps(v: Any) -> str:
+    return json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _gone(owner: Optional[str]) -> bool:
+    """True if ``owner`` ran on this host and its process has exited."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+# =========================================================
+# Which rows can change
+# =========================================================
+def _domain_max(spec: Dict[str, Any]) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for q in spec["questions"].values():
+        out[q["domain"]] = out.get(q["domain"], 0) + max((w for _, w in q["weights"]), default=0)
+    return out
+
+def affected(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Optional[List[str]]]]:
+    """{question id: changed choices (None: any answer)} that can change a result scored under ``old``.
+
+    None if any scored row can change.
+    """
+    if any(old[k] != new[k] for k in ("lights", "domains", "rules", "limits")):
+        return None
+    oq, nq = old["questions"], new["questions"]
+    if oq.keys() != nq.keys() or any(oq[q]["domain"] != nq[q]["domain"] for q in oq):
+        return None
+    if _domain_max(old) != _domain_max(new):
+        return None
+    out: Dict[str, Optional[List[str]]] = {}
+    for qid in oq:
+        ow, nw = oq[qid]["weights"], nq[qid]["weights"]
+        if ow == nw:
+            continue
+        if ow[:1] != nw[:1]:
+            out[qid] = None                    # the first weight also scores labels that aren't choices
+        else:
+            a, b = dict(ow), dict(nw)
+            out[qid] = sorted(c for c in a.keys() | b.keys() if a.get(c) != b.get(c))
+    return out
+
+def candidates(conn: sqlite3.Connection, model: ScoringModel) -> Tuple[str, List[Any]]:
+    """SQL condition (and its parameters) on stale scored rows: True for those whose results can change."""
+    narrowed: List[str] = []
+    clauses: List[str] = []
+    params: List[Any] = []
+    for (v,) in conn.execute("SELECT DISTINCT model_version FROM assessments WHERE model_version IS NOT NULL"):
+        row = conn.execute("SELECT spec FROM scoring_models WHERE version = ?", (v,)).fetchone()
+        found = affected(json.loads(row[0]), model.spec) if row and v != model.version else None
+        if found is None:
+            continue
+        terms, args = [], [v]
+        for qid, choices in found.items():
+            path = f'$."{qid}"'
+            if choices is None:
+                terms.append("json_type(cyber_answers, ?) IS NOT NULL")
+                args.append(path)
+            else:
+                terms.append(f"json_extract(cyber_answers, ?) IN ({', '.join('?' * len(choices))})")
+                args += [path, *choices]
+        narrowed.append(v)
+        clauses.append(f"(model_version = ? AND ({' OR '.join(terms) or '0'}))")
+        params += args
+    if not narrowed:
+        return "1", []
+    return (f"model_version IS NULL OR model_version NOT IN ({', '.join('?' * len(narrowed))}) OR "
+            + " OR ".join(clauses), [*narrowed, *params])
+
+# =========================================================
+# Maintenance (called inside the store's write transaction)
+# =========================================================
+def register(conn: sqlite3.Connection, model: ScoringModel) -> None:
+    conn.execute("INSERT OR IGNORE INTO scoring_models (version, spec, first_seen) VALUES (?, ?, ?)",
+                 (model.version, _dumps(model.spec), _now()))
+
+def _job(conn: sqlite3.Connection, where: str = "1", params: Tuple[Any, ...] = ()) -> Optional[Job]:
+    row = conn.execute(f"SELECT {', '.join(Job._fields)} FROM rescore_jobs WHERE {where} ORDER BY id DESC LIMIT 1",
+                       params).fetchone()
+    return Job(*row) if row else None
+
+def claim(conn: sqlite3.Connection, model: ScoringModel, owner: str) -> Optional[Job]:
+    """Resume the unfinished job for ``model`` or start one; None if no row is on another version.
+
+    Raises RuntimeError while another runner's job is alive.
+    """
+    register(conn, model)
+    last = _job(conn, "status IN ('running', 'paused', 'failed')")
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=STALE_AFTER)).isoformat(timespec="seconds")
+    if (last and last.status == "running" and last.owner != owner and last.updated_at > cutoff
+            and not _gone(last.owner)):
+        raise RuntimeError(f"re-score job {last.id} is already running ({last.owner}, {last.progress:.0%} done)")
+    now = _now()
+    if last and last.model_version == model.version:
+        conn.execute("UPDATE rescore_jobs SET status = 'running', owner = ?, updated_at = ?, error = NULL "
+                     "WHERE id = ?", (owner, now, last.id))
+        return _job(conn, "id = ?", (last.id,))
+    if last:
+        conn.execute("UPDATE rescore_jobs SET status = 'superseded', finished_at = ? WHERE id = ?", (now, last.id))
+    stale = conn.execute("SELECT COUNT(*) FROM assessments WHERE model_version IS NOT ?", (model.version,)).fetchone()[0]
+    if not stale:
+        return None
+    max_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM assessments").fetchone()[0]
+    conn.execute("INSERT INTO rescore_jobs (model_version, status, owner, started_at, updated_at, first_rowid, "
+                 "last_rowid, max_rowid, stale) VALUES (?, 'running', ?, ?, ?, 0, 0, ?, ?)",
+                 (model.version, owner, now, now, max_rowid, stale))
+    return _job(conn, "id = last_insert_rowid()")
+
+def still_stale(conn: sqlite3.Connection, rows: List[tuple], version: str) -> List[tuple]:
+    """``rows`` less those saved again (so already on ``version``) since a worker read them."""
+    ids = [r[0] for r in rows]
+    fresh = set()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        fresh.update(r[0] for r in conn.execute(
+            f"SELECT id FROM assessments WHERE model_version = ? AND id IN ({', '.join('?' * len(chunk))})",
+            (version, *chunk)))
+    return [r for r in rows if r[0] not in fresh]
+
+def checkpoint(conn: sqlite3.Connection, job_id: int, owner: str, lo: int, hi: int, version: str,
+               scanned: int, checked: int, changed: int, seconds: float) -> Job:
+    """Bump rows ``lo``..``hi`` to ``version`` (the rewritten ones carry it already) and advance the job."""
+    n = conn.execute("UPDATE rescore_jobs SET last_rowid = ?, scanned = scanned + ?, checked = checked + ?, "
+                     "changed = changed + ?, seconds = seconds + ?, updated_at = ? "
+                     "WHERE id = ? AND owner = ? AND status = 'running'",
+                     (hi, scanned, checked, changed, seconds, _now(), job_id, owner)).rowcount
+    if not n:
+        raise RuntimeError(f"re-score job {job_id} was taken over by another runner")
+    conn.execute("UPDATE assessments SET model_version = ? WHERE rowid BETWEEN ? AND ? AND model_version IS NOT ?",
+                 (version, lo, hi, version))
+    return _job(conn, "id = ?", (job_id,))
+
+def finish(conn: sqlite3.Connection, job_id: int, owner: str, status: str, error: Optional[str] = None) -> Job:
+    conn.execute("UPDATE rescore_jobs SET status = ?, error = ?, updated_at = ?, "
+                 "finished_at = CASE WHEN ? = 'done' THEN ? END WHERE id = ? AND owner = ?",
+                 (status, error, _now(), status, _now(), job_id, owner))
+    return _job(conn, "id = ?", (job_id,))
+
+# =========================================================
+# Reads
+# =========================================================
+def status(conn: sqlite3.Connection, model: ScoringModel) -> Status:
+    versions = dict(conn.execute("SELECT model_version, COUNT(*) FROM assessments GROUP BY model_version").fetchall())
+    return Status(model, versions, _job(conn))
+
+# =========================================================
+# Workers
+# =========================================================
+_conns: Dict[str, sqlite3.Connection] = {}
+_weights: Tuple[Optional[str], Optional[CompiledWeights]] = (None, None)
+
+def _init_worker() -> None:
+    _conns.clear()                              # never share a forked parent's connection
+
+def _rescore_range(work: Tuple[str, int, int, str, str, List[Any]]) -> Tuple[int, int, List[tuple]]:
+    """(rows in rowids lo..hi, rows recomputed, full rows to rewrite) for one chunk."""
+    global _weights
+    from .registry import current_banks
+    from .store import COLUMNS                  # store imports this module
+    path, lo, hi, version, cond, params = work
+    banks = current_banks()
+    if scoring_model(banks).version != version:
+        raise RuntimeError(f"the scoring model changed during the job (now {scoring_model(banks).version}); run it again")
+    conn = _conns.get(path)
+    if conn is None:
+        conn = _conns[path] = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+    scanned = conn.execute("SELECT COUNT(*) FROM assessments WHERE rowid BETWEEN ? AND ?", (lo, hi)).fetchone()[0]
+    rows = conn.execute(f"SELECT * FROM assessments WHERE rowid BETWEEN ? AND ? AND stage = 'cyber' "
+                        f"AND model_version IS NOT ? AND ({cond})", (lo, hi, version, *params)).fetchall()
+    if not rows:
+        return scanned, 0, []
+    seen, cw = _weights
+    if seen != version:
+        cw = compile_weights(list(banks.cyber.questions))
+        _weights = (version, cw)
+    codes = encode_answers([json.loads(r["cyber_answers"] or "{}") for r in rows], cw)
+    res = score_codes(codes, cw)
+    cards = action_cards_codes(codes, [json.loads(r["answers"] or "{}") for r in rows], banks.rules)
+    out = []
+    for i, (r, (good, fixes)) in enumerate(zip(rows, cards)):
+        scored = result_dicts(res, i, cw)
+        # compared as stored text: the store serialises exactly like _dumps
+        new = {"overall_score": scored["overall"]["score"], "domain_scores": _dumps(scored["domains"]),
+               "good": _dumps(good), "fixes": _dumps(fixes)}
+        if any(r[k] != v for k, v in new.items()):
+            d = dict(r)
+            d.update(new, model_version=version)
+            out.append(tuple(d[c] for c in COLUMNS))
+    return scanned, len(rows), out
+
+def _results(work: List[tuple], workers: int, mp_context: Any) -> Any:
+    """(work unit, its result) in order, with at most two units per worker in flight."""
+    if workers == 1:
+        _init_worker()
+        for w in work:
+            yield w, _rescore_range(w)
+        return
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, mp_context=mp_context)
+    try:
+        pending: deque = deque()
+        todo = iter(work)
+        for w in todo:
+            pending.append((w, pool.submit(_rescore_range, w)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            w, fut = pending.popleft()
+            result = fut.result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append((nxt, pool.submit(_rescore_range, nxt)))
+            yield w, result
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+# =========================================================
+# The job
+# =========================================================
+def run(store: Any, workers: Optional[int] = None, chunk: int = CHUNK,
+        on_progress: Optional[Callable[[Job], None]] = None, stop: Optional[threading.Event] = None,
+        mp_context: Any = None) -> Optional[Job]:
+    """Bring every stored result up to the current scoring model; returns the finished (or paused) job.
+
+    None if nothing was stale. ``stop`` pauses the job after the chunk in progress.
+    """
+    model = scoring_model()
+    me = owner_id()
+    job = store.claim_rescore(model, me)
+    if job is None:
+        return None
+    cond, params = store.rescore_candidates(model)
+    work = [(store.path, lo + 1, min(lo + chunk, job.max_rowid), model.version, cond, params)
+            for lo in range(job.last_rowid, job.max_rowid, chunk)]
+    workers = workers or os.cpu_count() or 1
+    try:
+        t = time.perf_counter()
+        for (_, lo, hi, *_), (scanned, checked, rows) in _results(work, workers, mp_context):
+            now = time.perf_counter()
+            job = store.commit_rescore(job.id, me, lo, hi, model.version, rows, scanned, checked, now - t)
+            t = now
+            if on_progress is not None:
+                on_progress(job)
+            if stop is not None and stop.is_set():
+                return store.end_rescore(job.id, me, "paused")
+    except KeyboardInterrupt:
+        store.end_rescore(job.id, me, "paused")
+        raise
+    except BaseException as e:
+        store.end_rescore(job.id, me, "failed", f"{type(e).__name__}: {e}")
+        raise
+    return store.end_rescore(job.id, me, "done")
+
+_threads: Dict[str, threading.Thread] = {}
+_threads_lock = threading.Lock()
+
+def start_background(store: Any, workers: Optional[int] = None) -> bool:
+    """Run the job on a thread of this process (the app); False if one is already running here."""
+    with _threads_lock:
+        t = _threads.get(store.path)
+        if t is not None and t.is_alive():
+            return False
+        # spawn, not fork: the server process has other threads that may hold locks
+        t = threading.Thread(target=_background, args=(store, workers), name="rescore", daemon=True)
+        _threads[store.path] = t
+        t.start()
+    return True
+
+def running_here(store: Any) -> bool:
+    t = _threads.get(store.path)
+    return t is not None and t.is_alive()
+
+def _background(store: Any, workers: Optional[int]) -> None:
+    try:
+        job = run(store, workers, mp_context=multiprocessing.get_context("spawn"))
+        if job is not None:
+            log.info("re-score job %d %s: %d of %d rows changed", job.id, job.status, job.changed, job.checked)
+    except RuntimeError as e:
+        log.warning("re-score job stopped: %s", e)
+    except Exception:
+        log.exception("re-score job failed")
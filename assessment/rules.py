@@ -0,0 +1,136 @@
+"""Action-card rules ("what you're doing well" / "top recommended fixes").
+
+Each rule is plain data:
+
+    question   cyber question id the rule looks at
+    choices    choice indices that make the rule fire ...
+    negate     ... or, if True, that stop it firing (unanswered then fires)
+    kind       "good" or "fix"
+    text       message shown on the results page
+    priority   lower is listed first within its kind
+    effort     fixes only: rough effort to carry it out, 1 (under an hour)
+               to 5 (a project); the remediation planner budgets with it
+    initial    optional {question id: answer} that must all hold in the
+               Initial Assessment answers
+
+``compile_rules`` resolves question ids to positions once, so evaluating every
+rule for an assessment is a single pass over a list of choice indices.
+"""
+from typing import Dict, Any, List, Tuple, NamedTuple, FrozenSet, Optional
+
+from .questions import CYBER_QUESTIONS
+
+GOOD_LIMIT = 8
+FIX_LIMIT = 10
+
+CHECKLIST_FIX = "Create a **one-page incident checklist** with internal & vendor contacts."
+
+ACTION_RULES: List[Dict[str, Any]] = [
+    # Goods
+    {"kind":"good", "question":"mfa_all", "choices":[1], "priority":10, "text":"MFA enabled on important accounts."},
+    {"kind":"good", "question":"disk_encryption", "choices":[1], "priority":20, "text":"Full-disk encryption on devices."},
+    {"kind":"good", "question":"backup_frequency", "choices":[1], "priority":30, "text":"Frequent (daily/continuous) backups."},
+    {"kind":"good", "question":"backup_restore_test", "choices":[1], "priority":40, "text":"Backups are restore-tested."},
+    {"kind":"good", "question":"patching", "choices":[1], "priority":50, "text":"Automatic updates are in place."},
+    {"kind":"good", "question":"av_edr", "choices":[1], "priority":60, "text":"AV/EDR deployed across devices."},
+    {"kind":"good", "question":"phishing_training", "choices":[1], "priority":70, "text":"Regular phishing/security training."},
+    {"kind":"good", "question":"ir_contacts", "choices":[1], "priority":80, "text":"Incident contacts/checklist documented."},
+
+    # Fixes
+    {"kind":"fix", "question":"mfa_all", "choices":[1], "negate":True, "priority":10, "effort":2,
+     "text":"Turn on **MFA** for email, cloud storage, accounting, and admin portals (today)."},
+    {"kind":"fix", "question":"backup_frequency", "choices":[1], "negate":True, "priority":20, "effort":4,
+     "text":"Implement **3-2-1 backups** with at least one **immutable/offsite** copy."},
+    {"kind":"fix", "question":"disk_encryption", "choices":[1], "negate":True, "priority":30, "effort":3,
+     "text":"Enable **full-disk encryption** (BitLocker/FileVault) on all laptops/desktops."},
+    {"kind":"fix", "question":"patching", "choices":[1], "negate":True, "priority":40, "effort":2,
+     "text":"Enable **automatic updates** for OS and key apps; patch within ~14 days."},
+    {"kind":"fix", "question":"av_edr", "choices":[1], "negate":True, "priority":50, "effort":3,
+     "text":"Deploy **reputable AV/EDR** on all devices and ensure it’s updating."},
+    {"kind":"fix", "question":"ir_contacts", "choices":[1], "negate":True, "priority":60, "effort":1,
+     "text":CHECKLIST_FIX},
+    {"kind":"fix", "question":"phishing_training", "choices":[1], "negate":True, "priority":70, "effort":2,
+     "text":"Schedule **annual phishing/awareness training** (15–30 minutes)."},
+    {"kind":"fix", "question":"email_filters", "choices":[1], "negate":True, "priority":80, "effort":1,
+     "text":"Enable **advanced email filtering** (malware/link protection) in your mail suite."},
+    {"kind":"fix", "question":"shared_accounts", "choices":[1], "negate":True, "priority":90, "effort":3,
+     "text":"Stop using **shared accounts**; give each person their own login."},
+    {"kind":"fix", "question":"admin_rights", "choices":[1], "negate":True, "priority":100, "effort":2,
+     "text":"Restrict **admin rights**; use separate admin accounts and review quarterly."},
+    # Partner breach without a playbook. When the checklist fix above is already
+    # listed it covers vendor contacts, so this only fires when ir_contacts is done.
+    {"kind":"fix", "question":"ir_contacts", "choices":[1], "priority":0, "effort":1,
+     "initial":{"third_parties":"Yes", "breach_contact":"Not really sure"},
+     "text":"Add **vendor breach contacts** to your incident checklist (host, payments, accountant)."},
+]
+
+# =========================================================
+# Compilation
+# =========================================================
+class CompiledRule(NamedTuple):
+    kind: str
+    qpos: int
+    choices: FrozenSet[int]
+    negate: bool
+    text: str
+    initial: Tuple[Tuple[str, Any], ...]
+    effort: int = 1
+
+class CompiledRules(NamedTuple):
+    ids: List[str]
+    choice_index: List[Dict[str, int]]
+    rules: List[CompiledRule]          # sorted by (kind, priority, declaration order)
+
+def compile_rules(rules: List[Dict[str, Any]], questions: List[Dict[str, Any]]) -> CompiledRules:
+    pos = {q["id"]: i for i, q in enumerate(questions)}
+    compiled = []
+    order = sorted(range(len(rules)), key=lambda i: (rules[i]["kind"] != "good", rules[i].get("priority", 0), i))
+    for i in order:
+        r = rules[i]
+        if r["kind"] not in ("good", "fix"):
+            raise ValueError(f"rule {i}: kind must be 'good' or 'fix', got {r['kind']!r}")
+        if r["question"] not in pos:
+            raise ValueError(f"rule {i}: unknown question id {r['question']!r}")
+        n_choices = len(questions[pos[r["question"]]]["choices"])
+        if any(not 0 <= c < n_choices for c in r["choices"]):
+            raise ValueError(f"rule {i}: choice index out of range for {r['question']!r}")
+        if not isinstance(r.get("effort", 1), int) or r.get("effort", 1) < 1:
+            raise ValueError(f"rule {i}: effort must be a positive integer")
+        compiled.append(CompiledRule(
+            kind=r["kind"],
+            qpos=pos[r["question"]],
+            choices=frozenset(r["choices"]),
+            negate=bool(r.get("negate", False)),
+            text=r["text"],
+            initial=tuple((r.get("initial") or {}).items()),
+            effort=r.get("effort", 1),
+        ))
+    return CompiledRules(
+        ids=[q["id"] for q in questions],
+        choice_index=[{c: j for j, c in enumerate(q["choices"])} for q in questions],
+        rules=compiled,
+    )
+
+COMPILED_RULES = compile_rules(ACTION_RULES, CYBER_QUESTIONS)
+
+# =========================================================
+# Evaluation
+# =========================================================
+def choice_codes(cyber: Dict[str, Any], cr: CompiledRules = COMPILED_RULES) -> List[int]:
+    """Selected choice index per question; -1 if unanswered or not a listed choice."""
+    return [lookup.get(cyber.get(qid), -1) for qid, lookup in zip(cr.ids, cr.choice_index)]
+
+def initial_matches(initial: Dict[str, Any], conds: Tuple[Tuple[str, Any], ...]) -> bool:
+    return all(initial.get(k) == v for k, v in conds)
+
+def evaluate_rules(initial: Dict[str, Any], cyber: Dict[str, Any],
+                   codes: Optional[List[int]] = None,
+                   cr: CompiledRules = COMPILED_RULES) -> Tuple[List[str], List[str]]:
+    if codes is None:
+        codes = choice_codes(cyber, cr)
+    good, fixes = [], []
+    for r in cr.rules:
+        if (codes[r.qpos] in r.choices) == r.negate: continue
+        if r.initial and not initial_matches(initial, r.initial): continue
+        (good if r.kind == "good" else fixes).append(r.text)
+    return good[:GOOD_LIMIT], fixes[:FIX_LIMIT]
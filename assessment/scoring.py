@@ -0,0 +1,116 @@
+"""Scoring for the Initial Assessment and Cybersecurity Posture answers.
+
+Nothing in here touches Streamlit, so the same functions back the app,
+the batch CLI and any other tool that needs to score stored answers.
+"""
+import hashlib
+import json
+from typing import Dict, Any, List, Tuple, NamedTuple, Optional
+
+from .bank import QuestionBank
+from .registry import Banks, current_banks
+from .rules import CompiledRules, GOOD_LIMIT, FIX_LIMIT, evaluate_rules
+
+GREEN_AT = 75       # traffic_light: lowest percentage shown green ...
+AMBER_AT = 40       # ... and amber
+
+# =========================================================
+# Digital dependency (Initial Assessment)
+# =========================================================
+def digital_dependency_score(ans: Dict[str, Any]) -> int:
+    s = 0
+    if ans.get("sell_online","").startswith("Yes"): s += 2
+    if ans.get("data_types") == "Yes": s += 1
+    s += min(len(ans.get("tools_regular", [])), 4)
+    return s
+
+def dd_text(v:int) -> str:
+    return "Low" if v <= 2 else ("Medium" if v <= 5 else "High")
+
+# =========================================================
+# Cybersecurity Posture scoring
+# =========================================================
+def traffic_light(pct: float) -> Tuple[str, str]:
+    if pct >= GREEN_AT: return ("green","Good")
+    if pct >= AMBER_AT: return ("amber","Needs work")
+    return ("red","At risk")
+
+def compute_domain_scores(cyber_ans: Dict[str, Any], bank: Optional[QuestionBank] = None) -> Dict[str, Dict[str, Any]]:
+    if bank is None:
+        bank = current_banks().cyber
+    domain_sum = dict.fromkeys(bank.groups, 0)
+    for q, dom in zip(bank.questions, bank.group_of):
+        qid = q["id"]
+        if qid in cyber_ans:
+            domain_sum[dom] += bank.weights[qid].get(cyber_ans[qid], q["weights"][0])
+    results: Dict[str, Dict[str, Any]] = {}
+    for dom, top in bank.group_max.items():
+        pct = (domain_sum[dom] / top) * 100 if top else 0
+        colour, label = traffic_light(pct)
+        results[dom] = {"score": round(pct), "colour": colour, "label": label}
+    return results
+
+def overall_score(domain_scores: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    if not domain_scores: return {"score":0,"colour":"red","label":"At risk"}
+    avg = sum(v["score"] for v in domain_scores.values()) / len(domain_scores)
+    colour, label = traffic_light(avg)
+    return {"score": round(avg), "colour": colour, "label": label}
+
+def add_action_cards(initial: Dict[str, Any], cyber: Dict[str, Any],
+                     cr: Optional[CompiledRules] = None) -> Tuple[List[str], List[str]]:
+    return evaluate_rules(initial, cyber, cr=cr or current_banks().rules)
+
+# =========================================================
+# Scoring model version
+# =========================================================
+class ScoringModel(NamedTuple):
+    version: str                # changes whenever anything in ``spec`` does
+    spec: Dict[str, Any]
+
+def model_spec(banks: Banks) -> Dict[str, Any]:
+    """Everything a stored result depends on: weights, domains, traffic lights and action-card rules.
+
+    Question text, tips and the Initial Assessment are left out, so editing them keeps the version.
+    """
+    cyber, cr = banks.cyber, banks.rules
+    labels = [{i: c for c, i in lookup.items()} for lookup in cr.choice_index]
+    return {
+        "lights": [GREEN_AT, AMBER_AT],
+        "domains": list(cyber.groups),
+        "questions": {qid: {"domain": dom, "weights": [[c, w] for c, w in cyber.weights[qid].items()]}
+                      for qid, dom in zip(cyber.ids, cyber.group_of)},
+        "rules": [[r.kind, cr.ids[r.qpos], sorted(labels[r.qpos][c] for c in r.choices), r.negate, r.text,
+                   [list(kv) for kv in r.initial]] for r in cr.rules],
+        "limits": [GOOD_LIMIT, FIX_LIMIT],
+    }
+
+_model: Tuple[Optional[Banks], Optional[ScoringModel]] = (None, None)
+
+def scoring_model(banks: Optional[Banks] = None) -> ScoringModel:
+    """The scoring model of ``banks`` (default: the live banks), computed once per bank reload."""
+    global _model
+    banks = banks or current_banks()
+    seen, model = _model
+    if seen is not banks:
+        spec = model_spec(banks)
+        digest = hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        model = ScoringModel(digest[:12], spec)
+        _model = (banks, model)
+    return model
+
+def score_assessment(initial: Dict[str, Any], cyber: Dict[str, Any]) -> Dict[str, Any]:
+    """Everything the results page shows for one completed assessment."""
+    from .compliance import coverage_dicts       # it imports traffic_light from here
+    banks = current_banks()
+    domains = compute_domain_scores(cyber, banks.cyber)
+    good, fixes = add_action_cards(initial, cyber, banks.rules)
+    dd = digital_dependency_score(initial)
+    return {
+        "overall": overall_score(domains),
+        "domains": domains,
+        "digital_dependency": {"score": dd, "text": dd_text(dd)},
+        "good": good,
+        "fixes": fixes,
+        "compliance": coverage_dicts([cyber], banks)[0],
+        "model": scoring_model(banks).version,
+    }
@@ -0,0 +1,283 @@
+"""Compact per-session wizard state.
+
+``CompactAnswers`` is a mutable mapping with the same keys and values as the
+plain answers dict the app used to keep (question id -> label, list of labels,
+``{"value", "comment"}`` for "Other", or free text). It stores them as one
+byte per question of the bank:
+
+    0          unanswered
+    1 + i      choice question answered with choice i ("Other" is the last)
+    1          multi-select answered; its choices are a 64-bit mask stored
+               after the per-question bytes
+    255        anything else (free text, "Other" comments, unknown labels),
+               kept as-is in ``extra``
+
+Labels are only rebuilt when a value is read, i.e. at render or scoring
+time. ``WizardSession`` bundles everything one browser session needs into a
+single ``__slots__`` object.
+"""
+import secrets
+from collections.abc import MutableMapping
+from typing import Dict, Any, List, Tuple, NamedTuple, Mapping, Optional, Iterator, Iterable
+
+from .bank import QuestionBank
+from .branching import OTHER, Branching, Visibility
+
+OPAQUE = 255
+_MISSING = object()
+
+CHOICE, MULTI, TEXT = 0, 1, 2
+
+class _Layout(NamedTuple):
+    kinds: Tuple[int, ...]
+    labels: Tuple[Tuple[str, ...], ...]      # choice labels per position ("Other" appended if allowed)
+    lookup: Tuple[Dict[str, int], ...]       # label -> choice index per position
+    slots: Tuple[int, ...]                   # position -> offset of its mask in ``data`` (-1 if not a multi-select)
+    other: Tuple[int, ...]                   # position -> index of "Other" (-1 if not allowed)
+
+_layouts: Dict[int, Tuple[QuestionBank, _Layout]] = {}
+
+def _layout(bank: QuestionBank) -> _Layout:
+    hit = _layouts.get(id(bank))
+    if hit is not None and hit[0] is bank:
+        return hit[1]
+    kinds, labels, lookup, slots, other = [], [], [], [], []
+    n_multi = 0
+    for q in bank.questions:
+        kind = {"choice": CHOICE, "multi": MULTI}.get(q["type"], TEXT)
+        opts = tuple(q.get("choices", ()))
+        if kind == CHOICE and q.get("allow_other") and OTHER not in opts:
+            opts += (OTHER,)
+        if kind == MULTI and len(opts) > 63:
+            kind = TEXT                      # too wide for a 64-bit mask; store the list as-is
+        kinds.append(kind)
+        labels.append(opts)
+        lookup.append({c: i for i, c in enumerate(opts)})
+        slots.append(len(bank.ids) + 8 * n_multi if kind == MULTI else -1)
+        n_multi += kind == MULTI
+        other.append(opts.index(OTHER) if kind == CHOICE and OTHER in opts else -1)
+    layout = _Layout(tuple(kinds), tuple(labels), tuple(lookup), tuple(slots), tuple(other))
+    _layouts[id(bank)] = (bank, layout)
+    return layout
+
+class CompactAnswers(MutableMapping):
+    __slots__ = ("bank", "data", "extra", "_layout")
+
+    def __init__(self, bank: QuestionBank, items: Optional[Iterable[Tuple[str, Any]]] = None):
+        self.bank = bank
+        self._layout = layout = _layout(bank)
+        self.data = bytearray(len(layout.kinds) + 8 * sum(s >= 0 for s in layout.slots))
+        self.extra: Dict[Any, Any] = {}      # position -> raw value; unknown question id -> value
+        if items is not None:
+            for k, v in (items.items() if isinstance(items, Mapping) else items):
+                self[k] = v
+
+    # ---------- encoding ----------
+    def __setitem__(self, qid: str, value: Any) -> None:
+        pos = self.bank.index.get(qid)
+        if pos is None:
+            self.extra[qid] = value
+            return
+        self.extra.pop(pos, None)
+        layout = self._layout
+        kind = layout.kinds[pos]
+        if kind == CHOICE:
+            if isinstance(value, str):
+                i = layout.lookup[pos].get(value)
+                if i is not None:
+                    self.data[pos] = i + 1
+                    return
+            elif (isinstance(value, dict) and layout.other[pos] >= 0 and value.get("value") == OTHER
+                  and set(value) == {"value", "comment"}):
+                self.data[pos] = layout.other[pos] + 1
+                self.extra[pos] = value["comment"]
+                return
+        elif kind == MULTI and isinstance(value, list):
+            lookup, mask = layout.lookup[pos], 0
+            for label in value:
+                i = lookup.get(label) if isinstance(label, str) else None
+                if i is None or mask >> i & 1:
+                    break                    # unknown or repeated label: keep the list as-is
+                mask |= 1 << i
+            else:
+                self.data[pos] = 1
+                off = layout.slots[pos]
+                self.data[off:off + 8] = mask.to_bytes(8, "little")
+                return
+        self.data[pos] = OPAQUE
+        self.extra[pos] = value
+
+    def __delitem__(self, qid: str) -> None:
+        pos = self.bank.index.get(qid)
+        if pos is None:
+            del self.extra[qid]
+            return
+        if not self.data[pos]:
+            raise KeyError(qid)
+        self.data[pos] = 0
+        self.extra.pop(pos, None)
+
+    # ---------- decoding ----------
+    def _decode(self, pos: int) -> Any:
+        code = self.data[pos]
+        layout = self._layout
+        if code == OPAQUE:
+            return self.extra[pos]
+        kind = layout.kinds[pos]
+        if kind == CHOICE:
+            if code - 1 == layout.other[pos]:
+                return {"value": OTHER, "comment": self.extra.get(pos, "")}
+            return layout.labels[pos][code - 1]
+        off = layout.slots[pos]
+        mask = int.from_bytes(self.data[off:off + 8], "little")
+        return [label for i, label in enumerate(layout.labels[pos]) if mask >> i & 1]
+
+    def __getitem__(self, qid: str) -> Any:
+        pos = self.bank.index.get(qid)
+        if pos is None:
+            return self.extra[qid]
+        if not self.data[pos]:
+            raise KeyError(qid)
+        return self._decode(pos)
+
+    def get(self, qid: str, default: Any = None) -> Any:
+        pos = self.bank.index.get(qid)
+        if pos is None:
+            return self.extra.get(qid, default)
+        return self._decode(pos) if self.data[pos] else default
+
+    def __contains__(self, qid: object) -> bool:
+        pos = self.bank.index.get(qid)
+        return qid in self.extra if pos is None else self.data[pos] != 0
+
+    def __iter__(self) -> Iterator[str]:
+        ids = self.bank.ids
+        for pos in range(len(ids)):
+            if self.data[pos]:
+                yield ids[pos]
+        for k in self.extra:
+            if isinstance(k, str):
+                yield k
+
+    def __len__(self) -> int:
+        n = len(self.bank.ids)
+        return n - self.data.count(0, 0, n) + sum(isinstance(k, str) for k in self.extra)
+
+    def __repr__(self) -> str:
+        return f"CompactAnswers({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: self[k] for k in self}
+
+    def choice_index(self, qid: str) -> Optional[int]:
+        """Selected choice index of a choice question, without building its label (None if unanswered/free)."""
+        pos = self.bank.index[qid]
+        code = self.data[pos]
+        return None if code in (0, OPAQUE) or self._layout.kinds[pos] != CHOICE else code - 1
+
+    def rebind(self, bank: QuestionBank) -> "CompactAnswers":
+        """The same answers re-encoded against another (e.g. reloaded) bank."""
+        return CompactAnswers(bank, self.to_dict())
+
+    # ---------- change tracking (autosave) ----------
+    def snapshot(self) -> Tuple[QuestionBank, bytes, Dict[Any, Any]]:
+        return self.bank, bytes(self.data), dict(self.extra)
+
+    def changed_since(self, snap: Optional[Tuple[QuestionBank, bytes, Dict[Any, Any]]]) -> Optional[List[str]]:
+        """Ids whose answer was added, changed or removed since ``snap``; None if it can't tell (other bank)."""
+        if snap is None or snap[0] is not self.bank:
+            return None
+        _, data, extra = snap
+        if data == self.data and extra == self.extra:
+            return []
+        ids, slots, n = self.bank.ids, self._layout.slots, len(self.bank.ids)
+        changed = {i for i, (a, b) in enumerate(zip(data[:n], self.data[:n])) if a != b}
+        if data[n:] != self.data[n:]:
+            changed.update(i for i, off in enumerate(slots) if off >= 0 and data[off:off + 8] != self.data[off:off + 8])
+        out = [ids[i] for i in sorted(changed)]
+        for k in extra.keys() | self.extra.keys():
+            if extra.get(k, _MISSING) != self.extra.get(k, _MISSING):
+                if isinstance(k, str):
+                    out.append(k)
+                elif k not in changed:
+                    out.append(ids[k])
+        return out
+
+# =========================================================
+# Session model
+# =========================================================
+class WizardSession:
+    """Everything the wizard keeps for one browser session."""
+    __slots__ = ("assessment_id", "token", "stage", "profile", "answers", "cyber_answers",
+                 "qpos", "cyber_idx", "visibility", "saved")
+
+    def __init__(self, assessment_id: str, initial: Branching, cyber_bank: QuestionBank,
+                 profile: Optional[Dict[str, Any]] = None, token: Optional[str] = None):
+        self.assessment_id = assessment_id
+        self.token = token or secrets.token_urlsafe(16)    # resume token; a secret, unlike the id
+        # intake -> qa (Initial) -> done_initial -> cyber_qa -> cyber_results
+        self.stage = "intake"
+        self.profile: Dict[str, Any] = profile if profile is not None else empty_profile()
+        self.answers = CompactAnswers(initial.bank)
+        self.cyber_answers = CompactAnswers(cyber_bank)
+        self.visibility = Visibility(self.answers, initial)
+        self.qpos = 0          # position in the visibility's bank, always a shown question
+        self.cyber_idx = 0
+        self.saved: Any = None  # what the autosaver last wrote (see autosave.py)
+
+    def place(self, qid: Optional[str]) -> None:
+        """Put the Initial wizard on ``qid``; if it is now hidden, on the nearest shown question before it
+        (after it if none is), so a resumed session keeps its place. The first question if ``qid`` is gone."""
+        vis = self.visibility
+        pos = vis.br.bank.index.get(qid)
+        if pos is not None and not vis.shown[pos]:
+            before = vis.prev_pos(pos)
+            pos = before if before is not None else vis.next_pos(pos)
+        if pos is None:
+            pos = vis.first()
+        self.qpos = pos if pos is not None else 0
+
+    # ---------- pre-filled answers (see prefill.py) ----------
+    def prefill(self, profile: Mapping[str, Any], answers: Mapping[str, Any], cyber_answers: Mapping[str, Any]) -> None:
+        """Merge answers known in advance and mark their questions as pre-filled, keeping the wizard's place."""
+        qid = self.visibility.br.bank.ids[self.qpos]
+        self.profile.update(profile)
+        for k, v in answers.items():
+            self.answers[k] = v
+        for k, v in cyber_answers.items():
+            self.cyber_answers[k] = v
+        self.visibility = Visibility(self.answers, self.visibility.br)
+        self.place(qid)
+        # A new list, so the autosaver sees the profile change.
+        self.profile["prefilled"] = sorted({*self.profile.get("prefilled", ()), *answers, *cyber_answers})
+
+    def _open(self, answers: "CompactAnswers", qid: str, skip: bool) -> bool:
+        return not skip or qid not in answers or qid not in self.profile.get("prefilled", ())
+
+    def step_initial(self, pos: Optional[int], forward: bool = True, skip_prefilled: bool = True) -> Optional[int]:
+        """Next (or previous) shown Initial question from ``pos`` (None: from the start), past answered pre-filled ones."""
+        vis, ids = self.visibility, self.visibility.br.bank.ids
+        move = vis.next_pos if forward else vis.prev_pos
+        pos = (vis.first() if forward else None) if pos is None else move(pos)
+        while pos is not None and not self._open(self.answers, ids[pos], skip_prefilled):
+            pos = move(pos)
+        return pos
+
+    def step_cyber(self, i: Optional[int], forward: bool = True, skip_prefilled: bool = True) -> Optional[int]:
+        """Next (or previous) cyber step from ``i`` (None: from the start), past answered pre-filled ones."""
+        ids = self.cyber_answers.bank.ids
+        i = (0 if forward else None) if i is None else i + (1 if forward else -1)
+        while i is not None and 0 <= i < len(ids) and not self._open(self.cyber_answers, ids[i], skip_prefilled):
+            i += 1 if forward else -1
+        return i if i is not None and 0 <= i < len(ids) else None
+
+def empty_profile() -> Dict[str, Any]:
+    return {
+        "contact_name": "",
+        "business_name": "",
+        "industry": {"value":"", "other":"", "code":""},  # value + custom + taxonomy code
+        "years": "",
+        "headcount": "",
+        "turnover": "",
+        "work_mode": "",
+    }
@@ -0,0 +1,519 @@
+"""Persistent storage of completed assessments in a local SQLite database.
+
+The database runs in WAL mode so readers never block the writer. Writes from
+all sessions in a process go through one queue and one writer thread, which
+commits whatever has queued up since its last commit in a single transaction
+(group commit). Reads borrow a connection from a small per-store pool, so
+Streamlit reruns never open their own connection. ``get_store()`` hands out
+one store per database file per process.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple, Iterator, Iterable, Mapping
+
+from . import compliance, history, peers, portfolio, rescore
+from .scoring import ScoringModel, score_assessment, scoring_model
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.environ.get("SME_DB_PATH", os.path.join("data", "assessments.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id             TEXT PRIMARY KEY,
+    created_at     TEXT NOT NULL,
+    completed_at   TEXT NOT NULL,
+    stage          TEXT NOT NULL,          -- 'initial' or 'cyber'
+    contact_name   TEXT,
+    business_name  TEXT,
+    industry       TEXT,
+    industry_other TEXT,
+    years          TEXT,
+    headcount      TEXT,
+    turnover       TEXT,
+    work_mode      TEXT,
+    answers        TEXT NOT NULL,          -- JSON, Initial Assessment
+    cyber_answers  TEXT,                   -- JSON, Cybersecurity Posture
+    dd_score       INTEGER,
+    overall_score  INTEGER,
+    domain_scores  TEXT,                   -- JSON {domain: {score, colour, label}}
+    good           TEXT,                   -- JSON list
+    fixes          TEXT,                   -- JSON list
+    industry_code  TEXT,                   -- taxonomy code (industries.csv), '' if unknown
+    model_version  TEXT                    -- scoring model the results came from (rescore.py)
+);
+-- completed_at trails each filter column so "filter, newest first" walks the
+-- index in order instead of sorting the matches.
+CREATE INDEX IF NOT EXISTS ix_assessments_industry  ON assessments(industry, completed_at);
+CREATE INDEX IF NOT EXISTS ix_assessments_headcount ON assessments(headcount, completed_at);
+CREATE INDEX IF NOT EXISTS ix_assessments_turnover  ON assessments(turnover, completed_at);
+CREATE INDEX IF NOT EXISTS ix_assessments_completed ON assessments(completed_at);
+"""
+
+COLUMNS = [
+    "id", "created_at", "completed_at", "stage",
+    "contact_name", "business_name", "industry", "industry_other",
+    "years", "headcount", "turnover", "work_mode",
+    "answers", "cyber_answers", "dd_score", "overall_score", "domain_scores", "good", "fixes",
+    "industry_code", "model_version",
+]
+JSON_COLUMNS = {"answers", "cyber_answers", "domain_scores", "good", "fixes"}
+
+_UPSERT = (
+    f"INSERT INTO assessments ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+    "ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(f"{c}=excluded.{c}" for c in COLUMNS if c not in ("id", "created_at"))
+)
+
+_SCORE_COLUMNS = [COLUMNS.index(c) for c in ("industry", "headcount", "turnover", "overall_score", "domain_scores")]
+
+_MODEL = COLUMNS.index("model_version")
+_ADDED_COLUMNS = ("industry_code", "model_version")     # migrated onto older databases
+
+_STOP = object()
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def _dumps(v: Any) -> Optional[str]:
+    # default=dict: answers may be a CompactAnswers mapping rather than a dict
+    return None if v is None else json.dumps(v, ensure_ascii=False, separators=(",", ":"), default=dict)
+
+def build_row(assessment_id: str, profile: Dict[str, Any], answers: Dict[str, Any],
+              cyber_answers: Optional[Dict[str, Any]] = None,
+              completed_at: Optional[str] = None) -> tuple:
+    """Flatten one assessment (scored if ``cyber_answers`` is given) into a table row."""
+    when = completed_at or utcnow()
+    industry = profile.get("industry") or {}
+    res = score_assessment(answers, cyber_answers or {})
+    has_cyber = cyber_answers is not None
+    return (
+        assessment_id, when, when, "cyber" if has_cyber else "initial",
+        profile.get("contact_name", ""), profile.get("business_name", ""),
+        industry.get("value", ""), industry.get("other", ""),
+        profile.get("years", ""), profile.get("headcount", ""),
+        profile.get("turnover", ""), profile.get("work_mode", ""),
+        _dumps(answers), _dumps(cyber_answers),
+        res["digital_dependency"]["score"],
+        res["overall"]["score"] if has_cyber else None,
+        _dumps(res["domains"]) if has_cyber else None,
+        _dumps(res["good"]) if has_cyber else None,
+        _dumps(res["fixes"]) if has_cyber else None,
+        industry.get("code", ""), res["model"],
+    )
+
+def row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    d = dict(row)
+    for c in JSON_COLUMNS & d.keys():
+        if d[c] is not None:
+            d[c] = json.loads(d[c])
+    return d
+
+def profile_from_row(d: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the session-state ``profile`` dict from a stored row."""
+    return {
+        "contact_name": d.get("contact_name") or "",
+        "business_name": d.get("business_name") or "",
+        "industry": {"value": d.get("industry") or "", "other": d.get("industry_other") or "",
+                     "code": d.get("industry_code") or ""},
+        "years": d.get("years") or "",
+        "headcount": d.get("headcount") or "",
+        "turnover": d.get("turnover") or "",
+        "work_mode": d.get("work_mode") or "",
+    }
+
+# =========================================================
+# Store
+# =========================================================
+class AssessmentStore:
+    def __init__(self, path: str = DEFAULT_DB_PATH, batch_size: int = 1000):
+        self.path = path
+        self.batch_size = batch_size
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._readers: "queue.LifoQueue" = queue.LifoQueue()
+        self._write_lock = threading.Lock()
+        self._models: set = set()              # scoring model versions known to be in scoring_models
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA + peers.SCHEMA + portfolio.SCHEMA + history.SCHEMA + compliance.SCHEMA)
+        have = {r[1] for r in self._writer.execute("PRAGMA table_info(assessments)")}
+        for col in _ADDED_COLUMNS:
+            if col not in have:
+                self._writer.execute(f"ALTER TABLE assessments ADD COLUMN {col} TEXT")
+        self._writer.executescript(rescore.SCHEMA)
+        self._backfill()
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name="assessment-store-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    # ---------- writes ----------
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [b for b in batch if b is not _STOP]
+            try:
+                if rows:
+                    self.write_rows(rows)
+            except Exception:
+                # peers/portfolio/history run Python over each row; a bad row must not cost the rows
+                # batched with it, nor kill the writer. Write them one per transaction instead.
+                log.warning("failed to write %d assessment rows together; retrying one by one", len(rows))
+                for row in rows:
+                    try:
+                        self.write_rows([row])
+                    except Exception:
+                        log.exception("dropped assessment %s", row[0])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(rows) != len(batch):
+                return
+
+    def write_rows(self, rows: Iterable[tuple]) -> None:
+        """Upsert rows synchronously in one transaction (used by the writer thread and bulk loads).
+
+        The peer histograms, the portfolio and the client history are updated in the same transaction.
+        """
+        rows = list(rows)
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._upsert(conn, rows)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _upsert(self, conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        peers.apply(conn, self._score_changes(conn, rows))
+        dicts = [dict(zip(COLUMNS, r)) for r in rows]
+        portfolio.apply(conn, [portfolio.client_from_row(d) for d in dicts])
+        history.apply(conn, dicts)
+        conn.executemany(_UPSERT, rows)
+        compliance.apply(conn, dicts)          # reads the rows just written and their portfolio entries
+        new = {r[_MODEL] for r in rows} - self._models
+        if new:
+            model = scoring_model()
+            if model.version in new:
+                rescore.register(conn, model)
+                self._models.add(model.version)
+
+    def _score_changes(self, conn: sqlite3.Connection, rows: List[tuple]) -> List[tuple]:
+        """(old, new) score rows for ``rows``; old comes from the table, or an earlier row of the batch."""
+        current: Dict[str, Any] = {}
+        ids = list({r[0] for r in rows})
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            current.update((r[0], tuple(r[1:])) for r in conn.execute(
+                "SELECT id, industry, headcount, turnover, overall_score, domain_scores FROM assessments "
+                f"WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+        changes = []
+        for r in rows:
+            new = tuple(r[i] for i in _SCORE_COLUMNS)
+            changes.append((current.get(r[0]), new))
+            current[r[0]] = new
+        return changes
+
+    def _backfill(self) -> None:
+        """Fill derived tables that are new to this database from the assessments already in it."""
+        conn = self._writer
+        if conn.execute("SELECT EXISTS (SELECT 1 FROM assessments)").fetchone()[0]:
+            for table, module in (("score_counts", peers), ("portfolio_clients", portfolio), ("snapshots", history)):
+                if conn.execute(f"SELECT EXISTS (SELECT 1 FROM {table})").fetchone()[0]:
+                    continue
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    n = module.rebuild(conn)
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+                log.info("filled %s from %d stored assessments", table, n)
+        try:
+            self._refresh_compliance()
+        except (OSError, ValueError) as e:         # a bad frameworks file must not keep the store closed
+            log.error("compliance roll-up not rebuilt: %s", e)
+
+    def _refresh_compliance(self) -> None:
+        """Rebuild the compliance roll-up if it was built for other frameworks, or never (see compliance.py)."""
+        with self.reader() as conn:
+            if not compliance.stale(conn):
+                return
+        def rebuild(conn: sqlite3.Connection) -> Optional[int]:
+            return compliance.rebuild(conn) if compliance.stale(conn) else None
+        n = self._transaction(rebuild)
+        if n is not None:
+            log.info("rebuilt the compliance roll-up from %d scored clients", n)
+
+    def set_industry_codes(self, codes: Mapping[str, str]) -> int:
+        """Set ``industry_code`` on every assessment whose ``industry_other`` text is a key of ``codes``."""
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS industry_map (other TEXT PRIMARY KEY, code TEXT NOT NULL)")
+                conn.execute("DELETE FROM temp.industry_map")
+                conn.executemany("INSERT OR REPLACE INTO temp.industry_map VALUES (?, ?)", codes.items())
+                n = conn.execute(
+                    "UPDATE assessments SET industry_code = "
+                    "(SELECT code FROM temp.industry_map WHERE other = assessments.industry_other) "
+                    "WHERE industry_other IN (SELECT other FROM temp.industry_map)").rowcount
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return n
+
+    # ---------- re-scoring (rescore.py) ----------
+    def _transaction(self, fn: Any, *args: Any) -> Any:
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(conn, *args)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return out
+
+    def claim_rescore(self, model: ScoringModel, owner: str) -> Optional["rescore.Job"]:
+        return self._transaction(rescore.claim, model, owner)
+
+    def commit_rescore(self, job_id: int, owner: str, lo: int, hi: int, version: str, rows: List[tuple],
+                       scanned: int, checked: int, seconds: float) -> "rescore.Job":
+        """Rewrite a chunk's changed rows, bump the rest of rowids ``lo``..``hi`` and checkpoint, atomically."""
+        def apply(conn: sqlite3.Connection) -> "rescore.Job":
+            stale = rescore.still_stale(conn, rows, version) if rows else rows
+            if stale:
+                self._upsert(conn, stale)
+            return rescore.checkpoint(conn, job_id, owner, lo, hi, version, scanned, checked, len(stale), seconds)
+        return self._transaction(apply)
+
+    def end_rescore(self, job_id: int, owner: str, status: str, error: Optional[str] = None) -> "rescore.Job":
+        return self._transaction(rescore.finish, job_id, owner, status, error)
+
+    def rescore_candidates(self, model: ScoringModel) -> Tuple[str, List[Any]]:
+        with self.reader() as conn:
+            return rescore.candidates(conn, model)
+
+    def model_status(self) -> "rescore.Status":
+        """Stored rows per scoring model version and the latest re-score job."""
+        with self.reader() as conn:
+            return rescore.status(conn, scoring_model())
+
+    def save(self, assessment_id: str, profile: Dict[str, Any], answers: Dict[str, Any],
+             cyber_answers: Optional[Dict[str, Any]] = None) -> None:
+        """Queue an assessment for writing; returns without waiting for the commit."""
+        self._queue.put(build_row(assessment_id, profile, answers, cyber_answers))
+
+    def flush(self) -> None:
+        """Block until everything queued so far is committed."""
+        self._queue.join()
+
+    def optimize(self) -> None:
+        """Refresh planner statistics (sampled); worth calling after bulk loads."""
+        with self._write_lock:
+            self._writer.execute("PRAGMA analysis_limit=1000")
+            self._writer.execute("ANALYZE")
+
+    def close(self) -> None:
+        if self._closed: return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._writer.execute("PRAGMA optimize")
+        self._writer.close()
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+    # ---------- reads ----------
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def get(self, assessment_id: str) -> Optional[Dict[str, Any]]:
+        with self.reader() as conn:
+            row = conn.execute("SELECT * FROM assessments WHERE id = ?", (assessment_id,)).fetchone()
+        return row_to_dict(row) if row else None
+
+    def count(self) -> int:
+        with self.reader() as conn:
+            return conn.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+
+    def query(self, industry: Optional[str] = None, headcount: Optional[str] = None,
+              turnover: Optional[str] = None, since: Optional[str] = None,
+              until: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently completed assessments matching every given filter."""
+        where, params = [], []
+        for col, val in (("industry", industry), ("headcount", headcount), ("turnover", turnover)):
+            if val is not None:
+                where.append(f"{col} = ?"); params.append(val)
+        if since is not None:
+            where.append("completed_at >= ?"); params.append(since)
+        if until is not None:
+            where.append("completed_at < ?"); params.append(until)
+        sql = "SELECT * FROM assessments"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY completed_at DESC LIMIT ?"
+        params.append(limit)
+        with self.reader() as conn:
+            return [row_to_dict(r) for r in conn.execute(sql, params)]
+
+    def peer_percentiles(self, profile: Dict[str, Any], scores: Dict[str, int]) -> Dict[str, "peers.Peer"]:
+        """Peer percentile of each metric ("overall" or a domain) in ``scores``; see peers.py."""
+        with self.reader() as conn:
+            return peers.percentiles(conn, profile, scores)
+
+    def industry_texts(self, missing_only: bool = True) -> List[Tuple[str, int]]:
+        """Distinct free-text industries ("Other (please specify)") and how many assessments use each."""
+        sql = "SELECT industry_other, COUNT(*) FROM assessments WHERE industry_other != ''"
+        if missing_only:
+            sql += " AND COALESCE(industry_code, '') = ''"
+        with self.reader() as conn:
+            return [tuple(r) for r in conn.execute(sql + " GROUP BY industry_other")]
+
+    def portfolio_page(self, **filters: Any) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of the client portfolio and the total matching; see portfolio.page for the filters."""
+        with self.reader() as conn:
+            return portfolio.page(conn, **filters)
+
+    def portfolio_rollup(self, industry: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        with self.reader() as conn:
+            return portfolio.rollup(conn, industry)
+
+    def portfolio_compliance(self, industry: Optional[str] = None) -> Tuple[Dict[str, float], int]:
+        """Average framework coverage over the portfolio's scored clients, and how many; see compliance.py.
+
+        Reads the pre-aggregated roll-up, rebuilding it first if the frameworks or banks changed.
+        """
+        while True:
+            with self.reader() as conn:
+                out = compliance.portfolio_coverage(conn, industry)
+            if out is not None:
+                return out
+            self._refresh_compliance()
+
+    def history(self, assessment_id: str) -> Optional[Tuple[Dict[str, List["history.Point"]], Optional["history.Diff"]]]:
+        """The client's score trend up to this assessment and what changed since their previous one; see history.py.
+
+        None until the assessment has been scored and written.
+        """
+        with self.reader() as conn:
+            found = history.find(conn, assessment_id)
+            if found is None:
+                return None
+            key, seq = found
+            return history.trend(conn, key, seq), history.diff(conn, key, seq)
+
+    def iter_assessments(self, stage: Optional[str] = None, chunk: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Every stored assessment (optionally only one stage), fetched in rowid-keyed chunks."""
+        sql = "SELECT rowid AS _rowid, * FROM assessments WHERE rowid > ?"
+        if stage is not None:
+            sql += " AND stage = ?"
+        sql += " ORDER BY rowid LIMIT ?"
+        last = 0
+        while True:
+            params = (last, stage, chunk) if stage is not None else (last, chunk)
+            with self.reader() as conn:
+                rows = conn.execute(sql, params).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                d = row_to_dict(r)
+                last = d.pop("_rowid")
+                yield d
+
+    def iter_clients(self, chunk: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Each scored portfolio client's latest assessment (see portfolio.py), fetched in client-keyed chunks."""
+        sql = ("SELECT p.client_key AS _key, a.* FROM portfolio_clients p JOIN assessments a ON a.id = p.assessment_id "
+               "WHERE p.client_key > ? AND p.stage = 'cyber' ORDER BY p.client_key LIMIT ?")
+        last = ""
+        while True:
+            with self.reader() as conn:
+                rows = conn.execute(sql, (last, chunk)).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                d = row_to_dict(r)
+                last = d.pop("_key")
+                yield d
+
+    def iter_chunks(self, since: Optional[str] = None, until: Optional[str] = None,
+                    industry: Optional[str] = None, stage: Optional[str] = None,
+                    chunk: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """Matching assessments oldest first, ``chunk`` rows at a time, for exports.
+
+        Pages are keyed on (completed_at, rowid), which both the completed_at
+        and the industry index return in order, so each chunk is one index
+        range however far into the table it is.
+        """
+        where, params = ["(completed_at, rowid) > (?, ?)"], []
+        for col, val in (("industry", industry), ("stage", stage)):
+            if val is not None:
+                where.append(f"{col} = ?"); params.append(val)
+        if since is not None:
+            where.append("completed_at >= ?"); params.append(since)
+        if until is not None:
+            where.append("completed_at < ?"); params.append(until)
+        sql = (f"SELECT rowid AS _rowid, * FROM assessments WHERE {' AND '.join(where)} "
+               "ORDER BY completed_at, rowid LIMIT ?")
+        last = ("", 0)
+        while True:
+            with self.reader() as conn:
+                rows = conn.execute(sql, (*last, *params, chunk)).fetchall()
+            if not rows:
+                return
+            last = (rows[-1]["completed_at"], rows[-1]["_rowid"])
+            out = []
+            for r in rows:
+                d = row_to_dict(r)
+                del d["_rowid"]
+                out.append(d)
+            yield out
+
+_stores: Dict[str, AssessmentStore] = {}
+_stores_lock = threading.Lock()
+
+def get_store(path: Optional[str] = None) -> AssessmentStore:
+    """The process-wide store for ``path`` (default ``SME_DB_PATH`` or data/assessments.db)."""
+    path = os.path.abspath(path or DEFAULT_DB_PATH)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = AssessmentStore(path)
+        return _stores[path]
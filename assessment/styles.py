@@ -0,0 +1,21 @@
+"""Stylesheet injected at the top of the Streamlit app."""
+
+CSS = """
+<style>
+.card{border:1px solid #eaeaea;border-radius:14px;padding:16px;background:#fff}
+.qtitle{font-size:1.1rem;font-weight:600;margin:0 0 8px 0}
+.qtip{font-size:.95rem;color:#444;margin-top:6px}
+.small{font-size:.9rem;color:#666}
+.footer{display:flex;gap:8px}
+.footer .stButton>button{width:100%;border-radius:10px}
+.header-phase{color:#334; font-weight:600; font-size:1.05rem; margin:2px 0 6px 0}
+.badge{display:inline-block;padding:4px 10px;border-radius:999px;font-weight:600}
+.red{background:#ffe7e7;border:1px solid #ffd0d0;color:#b10000}
+.amber{background:#fff3cd;border:1px solid #ffe59a;color:#7a5b00}
+.green{background:#e6f7e6;border:1px solid #c9efc9;color:#0d6b0d}
+.kpi{border-radius:12px;border:1px solid #eee;padding:14px;background:#fafafa}
+.kpi h4{margin:.1rem 0 .4rem 0}
+ul.tight>li{margin-bottom:.3rem}
+.progress-head{font-size:1rem; font-weight:600; color:#223;}
+</style>
+"""
@@ -0,0 +1,131 @@
+"""Load test for the scoring HTTP API (``python -m assessment serve``).
+
+    python benchmarks/bench_api.py [--concurrency 1 16 64] [--seconds 5] [--url http://host:port]
+
+Starts the server in a subprocess three ways, unless ``--url`` points at one
+already running: unbatched (``--max-batch 1``), batching what arrives in one
+event-loop turn (the default), and with an extra ``--window-ms`` under load.
+For each concurrency level it runs that many keep-alive clients. Each posts
+``/score`` for random answer sets back to back for ``--seconds``. It reports
+requests/s and p50/p99 latency. Before timing, it checks responses against
+``score_assessment`` and round-trips one ``"save": true`` through the store.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from synth import random_record, ROOT
+from assessment import score_assessment
+
+async def request(reader, writer, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, dict]:
+    raw = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(raw)}\r\n\r\n".encode() + raw)
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = next(int(l.split(":", 1)[1]) for l in lines if l.lower().startswith("content-length:"))
+    return int(lines[0].split()[1]), json.loads(await reader.readexactly(length))
+
+async def check(host: str, port: int, bodies: List[dict]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    for body in bodies[:200]:
+        status, got = await request(reader, writer, "POST", "/score", body)
+        assert status == 200 and got == score_assessment(body["answers"], body["cyber_answers"]), got
+    status, got = await request(reader, writer, "POST", "/score", {**bodies[0], "id": "bench-save", "save": True})
+    assert status == 200 and got["id"] == "bench-save"
+    for _ in range(50):                         # the store's writer commits in the background
+        status, row = await request(reader, writer, "GET", "/assessments/bench-save")
+        if status == 200:
+            break
+        await asyncio.sleep(0.05)
+    assert status == 200 and row["overall_score"] == got["overall"]["score"], row
+    status, _ = await request(reader, writer, "POST", "/score", {"answers": []})
+    assert status == 400
+    writer.close()
+
+async def load(host: str, port: int, bodies: List[dict], concurrency: int, seconds: float) -> Tuple[int, List[float]]:
+    lat: List[float] = []
+    stop = time.perf_counter() + seconds
+
+    async def client(k: int) -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        rng = random.Random(k)
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/score", rng.choice(bodies))
+            lat.append((time.perf_counter() - t0) * 1000)
+            assert status == 200
+        writer.close()
+
+    await asyncio.gather(*(client(k) for k in range(concurrency)))
+    return len(lat), lat
+
+def start_server(port: int, flags: List[str], db: str) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, "-m", "assessment", "serve", "--port", str(port), "--quiet",
+                             "--db", db, *flags], cwd=ROOT)
+    import socket
+    for _ in range(200):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+async def health(host: str, port: int) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    _, h = await request(reader, writer, "GET", "/healthz")
+    writer.close()
+    return h
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--window-ms", type=float, default=2.0)
+    ap.add_argument("--port", type=int, default=18765)
+    ap.add_argument("--url", help="an already running server instead of starting one")
+    args = ap.parse_args()
+
+    rng = random.Random(9)
+    bodies = [{"answers": r["answers"], "cyber_answers": r["cyber_answers"]}
+              for r in (random_record(rng, i) for i in range(1000))]
+    tmp = tempfile.TemporaryDirectory()
+    if args.url:
+        u = urlsplit(args.url)
+        modes = [(f"{args.url}", u.hostname, u.port, None)]
+    else:
+        modes = [("unbatched", "127.0.0.1", args.port, ["--max-batch", "1"]),
+                 ("one loop turn", "127.0.0.1", args.port, []),
+                 (f"window {args.window_ms:g} ms", "127.0.0.1", args.port, ["--window-ms", str(args.window_ms)])]
+
+    print(f"{'server':>18}{'clients':>9}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'mean batch':>12}")
+    for k, (label, host, port, flags) in enumerate(modes):
+        proc = start_server(port, flags, os.path.join(tmp.name, f"api-{k}.db")) if flags is not None else None
+        try:
+            asyncio.run(check(host, port, bodies))
+            for c in args.concurrency:
+                before = asyncio.run(health(host, port))
+                n, lat = asyncio.run(load(host, port, bodies, c, args.seconds))
+                after = asyncio.run(health(host, port))
+                lat.sort()
+                batches = after["batches"] - before["batches"]
+                mean = (after["requests"] - before["requests"] - 1) / batches if batches else 0
+                print(f"{label:>18}{c:>9}{n / args.seconds:>10,.0f}{statistics.median(lat):>9.2f}"
+                      f"{lat[int(0.99 * len(lat))]:>9.2f}{mean:>12.1f}")
+        finally:
+            if proc is not None:
+                proc.terminate(); proc.wait()
+
+if __name__ == "__main__":
+    main()
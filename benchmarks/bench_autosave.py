@@ -0,0 +1,129 @@
+"""Write amplification and resume latency of session autosave.
+
+    python benchmarks/bench_autosave.py [--sessions 3000] [--rate 5000] [--db-dir DIR]
+
+Keeps ``--sessions`` wizards in progress at once and replays their reruns in
+random interleaving at ``--rate`` reruns per second. Every rerun calls
+``Autosaver.save``, as the app does: one when an answer changes (each
+checkbox of a multi-select is its own rerun) and one when Next moves the
+cursor. Three ways:
+
+    full snapshot   every rerun rewrites the whole session (no change tracking)
+    incremental     only changed fields, written at once (no debounce)
+    + debounce      only changed fields, coalesced for ``--delay`` seconds
+
+WAL bytes are what SQLite appended to its write-ahead log (auto-checkpoint
+off), i.e. what actually hit the disk. Then ``load`` is timed on random
+tokens of the full table.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from synth import random_bank_answer
+from assessment import current_banks, WizardSession
+from assessment.autosave import Autosaver
+from assessment.backends import SQLiteBackend
+
+def script(wiz: WizardSession, rng: random.Random):
+    """Walk ``wiz`` through both wizards, yielding after each rerun."""
+    wiz.stage = "qa"
+    vis = wiz.visibility
+    pos = vis.first()
+    while pos is not None:
+        wiz.qpos = pos
+        q = vis.br.bank.questions[pos]
+        if q["type"] == "multi":
+            picked = []
+            for c in random_bank_answer(q, rng):
+                picked.append(c)
+                wiz.answers[q["id"]] = [x for x in q["choices"] if x in picked]
+                yield
+        else:
+            wiz.answers[q["id"]] = random_bank_answer(q, rng)
+            yield
+        vis.update(q["id"], wiz.answers)
+        pos = vis.next_pos(pos)
+        yield
+    wiz.stage = "cyber_qa"
+    for i, q in enumerate(wiz.cyber_answers.bank.questions):
+        wiz.cyber_idx = i
+        wiz.cyber_answers[q["id"]] = rng.choice(q["choices"][1:])
+        yield
+        yield
+    wiz.stage = "cyber_results"
+    yield
+
+def run(mode: str, args, db: str):
+    banks = current_banks()
+    saver = Autosaver(SQLiteBackend(db), delay=args.delay if mode == "debounce" else 0.0)
+    saver.backend._writer.execute("PRAGMA wal_autocheckpoint=0")
+    rng = random.Random(3)
+    live = []
+    for _ in range(args.sessions):
+        wiz = WizardSession(uuid.uuid4().hex, banks.initial, banks.cyber)
+        wiz.profile["business_name"] = f"Business {rng.randrange(10**6)}"
+        live.append((wiz, script(wiz, rng)))
+    tokens = [w.token for w, _ in live]
+    reruns, spent = 0, 0.0
+    t0 = time.perf_counter()
+    while live:
+        k = rng.randrange(len(live))
+        wiz, steps = live[k]
+        if next(steps, StopIteration) is StopIteration:
+            live[k] = live[-1]; live.pop()
+            continue
+        if mode == "full":
+            wiz.saved = None
+        s0 = time.perf_counter()
+        saver.save(wiz)
+        spent += time.perf_counter() - s0
+        reruns += 1
+        ahead = t0 + reruns / args.rate - time.perf_counter()
+        if ahead > 0:
+            time.sleep(ahead)
+    saver.flush()
+    wal = os.path.getsize(db + "-wal")
+    out = (reruns, saver.rows_written, saver.commits, wal, spent / reruns * 1e6)
+    saver.close()
+    return out, tokens
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=3000)
+    ap.add_argument("--rate", type=float, default=5000, help="reruns per second across all sessions")
+    ap.add_argument("--delay", type=float, default=0.5)
+    ap.add_argument("--resumes", type=int, default=2000)
+    ap.add_argument("--db-dir")
+    args = ap.parse_args()
+    tmp = None
+    if not args.db_dir:
+        tmp = tempfile.TemporaryDirectory()
+        args.db_dir = tmp.name
+
+    print(f"{'':>16}{'reruns':>9}{'rows':>9}{'rows/rerun':>12}{'commits':>9}{'WAL MiB':>9}{'WAL B/rerun':>13}{'save() us':>11}")
+    for mode, label in (("full", "full snapshot"), ("incremental", "incremental"), ("debounce", f"+ debounce {args.delay}s")):
+        db = os.path.join(args.db_dir, f"sessions-{mode}.db")
+        (reruns, rows, commits, wal, us), tokens = run(mode, args, db)
+        print(f"{label:>16}{reruns:>9}{rows:>9}{rows / reruns:>12.2f}{commits:>9}{wal / 2**20:>9.1f}{wal / reruns:>13,.0f}{us:>11.1f}")
+
+    banks = current_banks()
+    saver = Autosaver(SQLiteBackend(db))
+    rng = random.Random(5)
+    lat = []
+    for token in rng.choices(tokens, k=args.resumes):
+        t0 = time.perf_counter()
+        wiz = saver.load(token, banks)
+        lat.append((time.perf_counter() - t0) * 1000)
+        assert wiz is not None and wiz.stage == "cyber_results"
+    lat.sort()
+    print(f"\nresume ({len(tokens)} stored sessions): p50 {statistics.median(lat):.3f} ms, "
+          f"p99 {lat[int(0.99 * len(lat))]:.3f} ms")
+    saver.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Session state reads and writes per rerun, for each session backend.
+
+    python benchmarks/bench_backends.py [--sessions 2000] [--ops 5000] [--redis redis://host:6379/0]
+
+Stores ``--sessions`` finished sessions, then times what a rerun costs:
+
+    write        one rerun's changes (an answer and the cursor), one call per rerun
+    write x100   the same, 100 sessions per call (what the debounced autosaver sends under load)
+    read         a whole session, as on resume by another replica
+
+Without ``--redis``, the Redis backend talks to resp_standin.py in a
+subprocess; a real Redis is several times faster than the stand-in. Each
+backend is also checked end to end: a second backend object (another
+"replica") must resume what the first one wrote, and sessions past the TTL
+must be gone.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from synth import random_bank_answer
+from assessment import INITIAL_BANK, CYBER_BANK
+from assessment.backends import Changes, open_backend
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def session_changes(rng: random.Random) -> Changes:
+    answers = {(0, q["id"]): json.dumps(random_bank_answer(q, rng)) for q in INITIAL_BANK.questions}
+    answers.update({(1, q["id"]): json.dumps(rng.choice(q["choices"])) for q in CYBER_BANK.questions})
+    profile = json.dumps({"business_name": f"Business {rng.randrange(10**6)}", "industry": {"value": "Retail", "other": ""}})
+    return Changes((uuid.uuid4().hex, "cyber_qa", INITIAL_BANK.ids[-1], 3), profile, (0, 1), answers)
+
+def rerun_change(aid: str, rng: random.Random) -> Changes:
+    q = rng.choice(CYBER_BANK.questions)
+    cursor = (aid, "cyber_qa", INITIAL_BANK.ids[-1], CYBER_BANK.index[q["id"]])
+    return Changes(cursor, None, (), {(1, q["id"]): json.dumps(rng.choice(q["choices"]))})
+
+def per_op(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) / n * 1e6
+
+def bench(name: str, url: str, args) -> None:
+    rng = random.Random(1)
+    backend = open_backend(url, ttl=3600)
+    now = time.time()
+    tokens = [uuid.uuid4().hex for _ in range(args.sessions)]
+    seeded = {t: session_changes(rng) for t in tokens}
+    for i in range(0, len(tokens), 500):
+        backend.write({t: seeded[t] for t in tokens[i:i + 500]}, now)
+
+    changes = [(t, rerun_change(seeded[t].cursor[0], rng)) for t in rng.choices(tokens, k=args.ops)]
+    w1 = per_op(lambda i: backend.write({changes[i][0]: changes[i][1]}, now), args.ops)
+    batches = [dict(changes[i:i + 100]) for i in range(0, args.ops, 100)]
+    w100 = per_op(lambda i: backend.write(batches[i], now), len(batches)) / 100
+    picks = [rng.choice(tokens) for _ in range(args.ops)]
+    r = per_op(lambda i: backend.read(picks[i], now), args.ops)
+
+    # Another replica sees the same sessions (memory: only this process); sessions past the TTL are gone.
+    other = backend if name == "memory" else open_backend(url, ttl=3600)
+    t = rng.choice(tokens)
+    got = other.read(t, now)
+    assert got is not None and {(p, q): v for p, q, v in got.answers} == {**seeded[t].answers, **{
+        k: v for tok, c in changes for k, v in c.answers.items() if tok == t}}, "replica read mismatch"
+    if name == "redis":                     # Redis expires the keys itself
+        with other.connection() as conn:
+            gone = 0 < conn.pipeline([("TTL", f"{other.prefix}{t}:m")])[0] <= 3600
+    else:
+        gone = other.read(t, now + 7200) is None
+    evicted = backend.evict(now + 7200)
+    other.close(); backend.close()
+    print(f"{name:>8}{w1:>12.1f}{1e6 / w1:>10,.0f}{w100:>14.1f}{1e6 / w100:>10,.0f}{r:>10.1f}{1e6 / r:>10,.0f}"
+          f"{'yes' if gone else 'NO':>8}{evicted:>9}")
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=2000)
+    ap.add_argument("--ops", type=int, default=5000)
+    ap.add_argument("--redis", help="a real Redis URL instead of the stand-in")
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    standin = None
+    redis_url = args.redis
+    if not redis_url:
+        port = free_port()
+        standin = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), "resp_standin.py"),
+                                    "--port", str(port)], stdout=subprocess.DEVNULL)
+        redis_url = f"redis://127.0.0.1:{port}/0"
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+    try:
+        print(f"{'backend':>8}{'write us':>12}{'/s':>10}{'write x100 us':>14}{'/s':>10}{'read us':>10}{'/s':>10}"
+              f"{'TTL':>8}{'evicted':>9}")
+        bench("memory", "memory:", args)
+        bench("sqlite", f"sqlite:///{tmp.name}/sessions.db", args)
+        bench("redis", redis_url, args)
+    finally:
+        if standin is not None:
+            standin.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Startup and per-rerun cost of the question banks.
+
+    python benchmarks/bench_bank.py [--repeat 2000] [--file-questions 250,1000,3000]
+
+Reports the cold import time of the package (which loads and compiles the
+banks) and what a rerun pays to use the process-wide compiled banks. For
+large synthetic bank files in YAML and JSON it reports, in a fresh process
+after importing the package, the first load (parse, parser import and
+validation) and a later cold load served from the validated-document cache,
+plus the per-process cached ``load_bank``.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+from synth import ROOT, random_cyber, synthetic_cyber_bank
+from assessment import questions, compile_bank, current_banks, compute_domain_scores, INITIAL_BANK
+from assessment.loader import load_bank
+
+COLD_LOAD = (
+    "import sys, time; sys.path.insert(0, {root!r}); "
+    "from assessment.loader import load_bank; from assessment.bank import compile_bank; "
+    "t = time.perf_counter(); compile_bank(load_bank({path!r}, 'cyber').questions, 'domain'); "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+def _per_call(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+def _alloc_kib(fn):
+    tracemalloc.start()
+    try:
+        m0 = tracemalloc.get_traced_memory()[0]
+        fn()
+        return (tracemalloc.get_traced_memory()[1] - m0) / 1024
+    finally:
+        tracemalloc.stop()
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=2000)
+    ap.add_argument("--file-questions", default="250,1000,3000")
+    args = ap.parse_args()
+
+    cmd = ("import time; t = time.perf_counter(); import assessment; "
+           "print((time.perf_counter() - t) * 1000)")
+    cold = [float(subprocess.check_output([sys.executable, "-c", cmd], text=True)) for _ in range(7)]
+    print(f"cold `import assessment` (banks compiled):  {statistics.median(cold):7.2f} ms median of 7")
+    compile_us = _per_call(lambda: (compile_bank(questions.BASE_QUESTIONS, "phase"),
+                                    compile_bank(questions.CYBER_QUESTIONS, "domain")), 200)
+    print(f"  of which compile_bank (both banks):       {compile_us / 1000:7.2f} ms")
+
+    print("per rerun")
+    shared = lambda: (current_banks().cyber.questions[5], INITIAL_BANK.index["third_parties"])
+    print(f"  current_banks() + compiled lookups:  {_per_call(shared, args.repeat):8.2f} us, "
+          f"{_alloc_kib(shared):6.1f} KiB allocated")
+
+    rng = random.Random(3)
+    answers = itertools.cycle([random_cyber(rng) for _ in range(200)])
+    score = lambda: compute_domain_scores(next(answers))
+    print(f"  compute_domain_scores:               {_per_call(score, args.repeat * 5):8.2f} us")
+
+    print("bank files, load + compile in a fresh process (ms): first parse / from document cache; "
+          "cached load_bank (us)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(x) for x in args.file_questions.split(",")):
+            qs = synthetic_cyber_bank(n, random.Random(n))
+            doc = {"kind": "cyber", "domains": sorted({q["domain"] for q in qs}), "questions": qs}
+            for ext, dump in ((".yaml", lambda d, fh: yaml.safe_dump(d, fh, allow_unicode=True, sort_keys=False)),
+                              (".json", lambda d, fh: json.dump(d, fh, ensure_ascii=False, indent=1))):
+                path = os.path.join(tmp, f"cyber{n}{ext}")
+                with open(path, "w", encoding="utf-8") as fh:
+                    dump(doc, fh)
+                env = {**os.environ, "SME_BANK_CACHE": os.path.join(tmp, f"cache{n}{ext}")}
+                run = lambda: float(subprocess.check_output(
+                    [sys.executable, "-c", COLD_LOAD.format(root=ROOT, path=path)], text=True, env=env))
+                first = run()
+                cached = statistics.median(run() for _ in range(5))
+                load_bank(path)
+                warm = _per_call(lambda: load_bank(path), args.repeat)
+                size = os.path.getsize(path) / 1024
+                print(f"  {n:>5} questions {ext:<5} {size:6.0f} KiB  {first:7.1f} / {cached:6.1f} ms  {warm:6.1f} us")
+
+if __name__ == "__main__":
+    main()
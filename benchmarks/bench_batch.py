@@ -0,0 +1,42 @@
+"""Per-user scoring vs the vectorised batch scorer.
+
+    python benchmarks/bench_batch.py [--records 200000]
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from synth import random_cyber
+from assessment import compute_domain_scores, overall_score
+from assessment.batch import encode_answers, encode_frame, score_codes, score_frame
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=200000)
+    args = ap.parse_args()
+    rng = random.Random(3)
+    recs = [random_cyber(rng) for _ in range(args.records)]
+    df = pd.DataFrame(recs)
+
+    t0 = time.perf_counter()
+    for a in recs:
+        overall_score(compute_domain_scores(a))
+    per_user = time.perf_counter() - t0
+
+    t0 = time.perf_counter(); codes = encode_answers(recs); enc_dicts = time.perf_counter() - t0
+    t0 = time.perf_counter(); encode_frame(df); enc_frame = time.perf_counter() - t0
+    t0 = time.perf_counter(); score_codes(codes); vec = time.perf_counter() - t0
+    t0 = time.perf_counter(); score_frame(df); frame = time.perf_counter() - t0
+
+    n = args.records
+    print(f"{n} assessments")
+    print(f"per-user functions:      {per_user:8.3f}s  ({n/per_user:12,.0f}/s)")
+    print(f"encode_answers (dicts):  {enc_dicts:8.3f}s")
+    print(f"encode_frame (DataFrame):{enc_frame:8.3f}s")
+    print(f"score_codes:             {vec:8.3f}s  ({n/vec:12,.0f}/s)")
+    print(f"score_frame end-to-end:  {frame:8.3f}s  ({n/frame:12,.0f}/s)")
+
+if __name__ == "__main__":
+    main()
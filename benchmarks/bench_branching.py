@@ -0,0 +1,53 @@
+"""Per-click cost of conditional-question visibility, full versus incremental.
+
+    python benchmarks/bench_branching.py [--sizes 15,150,500,1000] [--clicks 5000]
+
+For each bank size, replays the same random answer-and-Next clicks two ways:
+re-evaluating every show_if and searching the visible list for the current
+question (what the wizard did before), and ``Visibility.update`` plus
+``next_pos``/``step`` (what it does now).
+"""
+import argparse
+import random
+import time
+
+from synth import synthetic_bank, random_bank_answer
+from assessment import compile_bank, compile_branching, Visibility, visible_questions
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="15,150,500,1000")
+    ap.add_argument("--clicks", type=int, default=5000)
+    args = ap.parse_args()
+
+    print(f"{'questions':>9}{'conditional':>13}{'full eval us/click':>20}{'incremental us/click':>22}{'speed-up':>10}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        rng = random.Random(n)
+        qs = synthetic_bank(n, rng)
+        br = compile_branching(compile_bank(qs, "phase"))
+        clicks = [(q["id"], random_bank_answer(q, rng)) for q in (rng.choice(qs) for _ in range(args.clicks))]
+
+        answers = {}
+        t0 = time.perf_counter()
+        for qid, value in clicks:
+            answers[qid] = value
+            ids = [q["id"] for q in visible_questions(answers, br)]
+            if qid in ids:
+                ids.index(qid)
+        full = (time.perf_counter() - t0) / args.clicks * 1e6
+
+        answers = {}
+        vis = Visibility(answers, br)
+        t0 = time.perf_counter()
+        for qid, value in clicks:
+            answers[qid] = value
+            vis.update(qid, answers)
+            pos = br.bank.index[qid]
+            vis.next_pos(pos); vis.step(pos)
+        incr = (time.perf_counter() - t0) / args.clicks * 1e6
+
+        n_cond = sum(c is not None for c in br.conditions)
+        print(f"{n:>9}{n_cond:>13}{full:>20.1f}{incr:>22.2f}{full / incr:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Cold-import time of the engine and throughput of ``python -m assessment score``.
+
+    python benchmarks/bench_cli.py [--records 20000]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from synth import random_record
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run(cmd):
+    t0 = time.perf_counter()
+    subprocess.run(cmd, cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    py = sys.executable
+    bare = [_run([py, "-c", "pass"]) for _ in range(args.repeat)]
+    engine = [_run([py, "-c", "import assessment"]) for _ in range(args.repeat)]
+    leaked = subprocess.run(
+        [py, "-c", "import sys, assessment; print('streamlit' in sys.modules)"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    print(f"interpreter start:     {statistics.median(bare)*1000:7.1f} ms")
+    print(f"import assessment:     {statistics.median(engine)*1000:7.1f} ms "
+          f"(+{(statistics.median(engine)-statistics.median(bare))*1000:.1f} ms)")
+    print(f"streamlit imported:    {leaked}")
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "in.jsonl")
+        with open(src, "w", encoding="utf-8") as fh:
+            for i in range(args.records):
+                fh.write(json.dumps(random_record(rng, i), ensure_ascii=False) + "\n")
+        for out in ("out.jsonl", "out.csv"):
+            dt = _run([py, "-m", "assessment", "score", src, "-o", os.path.join(tmp, out)])
+            print(f"score -> {out:<10} {args.records} records in {dt:.2f}s "
+                  f"({args.records/dt:,.0f} records/s end-to-end, {dt/args.records*1e6:.1f} µs/record)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compliance coverage: cost as frameworks and controls grow.
+
+    python benchmarks/bench_compliance.py [--assessments 100000] [--controls 36 1000 10000]
+
+Encodes ``--assessments`` random cyber answer sets once. It then times, for
+the shipped frameworks file and for synthetic ones with more controls (10
+frameworks, 1-3 questions per control), how long it takes to compute:
+
+- framework coverage for all of them (one product with the collapsed
+  questions × frameworks matrix)
+- every control's coverage (a sparse product; its output alone is
+  assessments × controls, so it is timed per 10,000 assessments)
+- the same per-control coverage the obvious way, looping over controls and
+  their questions for each assessment, on a sample scaled to 10,000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from synth import random_record
+from assessment import current_banks
+from assessment.compliance import (compile_frameworks, current_frameworks, encode, credits,
+                                   framework_coverage, control_coverage)
+
+def synthetic(questions: list, n_controls: int, rng: random.Random) -> dict:
+    frameworks = {f"fw{f}": {"title": f"Framework {f}", "controls": {}} for f in range(10)}
+    mappings: dict = {}
+    for k in range(n_controls):
+        fw = f"fw{k % 10}"
+        frameworks[fw]["controls"][f"C{k}"] = f"Control {k}"
+        for q in rng.sample(questions, rng.randint(1, 3)):
+            mappings.setdefault(q["id"], {}).setdefault(fw, []).append(f"C{k}")
+    return {"frameworks": frameworks, "mappings": mappings}
+
+def naive(cyber: dict, cf, members: list) -> list:
+    out = []
+    for qs in members:
+        if qs:
+            out.append(100 * sum(cf.credit[q, cf.choice_index[q].get(cyber.get(cf.ids[q]), -1)] for q in qs) / len(qs))
+        else:
+            out.append(None)
+    return out
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--assessments", type=int, default=100_000)
+    ap.add_argument("--controls", type=int, nargs="+", default=[1000, 10000])
+    ap.add_argument("--sample", type=int, default=500)
+    args = ap.parse_args()
+
+    rng = random.Random(13)
+    questions = list(current_banks().cyber.questions)
+    pool = [random_record(rng, i)["cyber_answers"] for i in range(2000)]
+    records = [pool[i % len(pool)] for i in range(args.assessments)]
+    shipped = current_frameworks()
+    t = timed(lambda: encode(records, shipped))
+    codes = encode(records, shipped)
+    print(f"{args.assessments:,} assessments encoded in {t:.2f}s (shared by every framework set)")
+
+    print(f"{'controls':>9}{'frameworks':>12}{'nnz':>7}{'frameworks s':>14}{'controls s/10k':>16}{'naive s/10k':>13}")
+    sets = [("shipped", shipped)] + [(n, compile_frameworks(synthetic(questions, n, rng), questions))
+                                     for n in args.controls]
+    for _, cf in sets:
+        fw = timed(lambda: framework_coverage(codes, cf))
+        ctl = timed(lambda: control_coverage(codes[:10_000], cf)) * 10_000 / len(codes[:10_000])
+        members: list = [[] for _ in cf.controls]
+        for q in range(len(cf.ids)):
+            for k in cf.indices[cf.indptr[q]:cf.indptr[q + 1]]:
+                members[k].append(q)
+        sample = records[:args.sample]
+        nv = timed(lambda: [naive(r, cf, members) for r in sample]) * 10_000 / len(sample)
+        got = control_coverage(codes[:1], cf)[0]
+        want = np.array([np.nan if v is None else v for v in naive(records[0], cf, members)])
+        assert np.allclose(got, want, equal_nan=True)
+        print(f"{len(cf.controls):>9,}{len(cf.keys):>12}{len(cf.data):>7,}{fw:>14.3f}{ctl:>16.3f}{nv:>13.1f}")
+    print(f"(credit gather alone: {timed(lambda: credits(codes, shipped)):.3f}s)")
+
+if __name__ == "__main__":
+    main()
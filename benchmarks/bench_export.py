@@ -0,0 +1,94 @@
+"""Throughput and peak memory of ``python -m assessment export``.
+
+    python benchmarks/bench_export.py [--rows 100000 1000000] [--formats csv jsonl parquet]
+
+Stores the largest ``--rows`` count of assessments spread over two years, then
+exports the first N of them in each format, with one subprocess per export.
+It reports rows/s and each child's own peak RSS (``ru_maxrss`` from
+``wait4``). Peak memory should barely move between the small and large
+exports. An export filtered by date
+and industry is also timed. Parquet is skipped if pyarrow is missing.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from synth import random_record, ROOT
+from assessment.questions import INDUSTRY_OPTIONS
+from assessment.store import AssessmentStore, build_row
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+def load(path: str, rows: int) -> None:
+    rng = random.Random(5)
+    templates = [build_row("x", r["profile"], r["answers"], r["cyber_answers"] if i % 3 else None)
+                 for i, r in ((i, random_record(rng, i)) for i in range(2000))]
+    store = AssessmentStore(path)
+    t0 = time.perf_counter()
+    for done in range(0, rows, 10_000):
+        batch = []
+        for k in range(done, min(done + 10_000, rows)):
+            row = list(rng.choice(templates))
+            when = (START + timedelta(seconds=k * 730 * 86400 // rows)).isoformat(timespec="seconds")
+            row[0], row[1], row[2] = uuid.uuid4().hex, when, when
+            row[6] = rng.choice(INDUSTRY_OPTIONS[:-1])
+            batch.append(tuple(row))
+        store.write_rows(batch)
+    store.close()
+    print(f"stored {rows:,} assessments in {time.perf_counter() - t0:.0f}s")
+
+def run(args: list) -> tuple:
+    """(seconds, peak RSS in MB) of one export subprocess."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "assessment", "export", "-q", *args], cwd=ROOT)
+    _, status, usage = os.wait4(proc.pid, 0)        # this child's own rusage, not the running maximum
+    dt = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+    return dt, usage.ru_maxrss / 1024
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--formats", nargs="+", default=["csv", "jsonl", "parquet"])
+    ap.add_argument("--chunk", type=int, default=5000)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    total = max(args.rows)
+    db = args.db or os.path.join(tmp.name, "bench.db")
+    if not os.path.exists(db):
+        load(db, total)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        args.formats = [f for f in args.formats if f != "parquet"]
+        print("pyarrow not installed: skipping parquet")
+
+    print(f"{'format':>8}{'rows':>11}{'seconds':>9}{'rows/s':>10}{'peak RSS MB':>13}{'file MB':>9}")
+    for fmt in args.formats:
+        for n in sorted(args.rows):
+            until = (START + timedelta(seconds=n * 730 * 86400 // total)).isoformat(timespec="seconds")
+            out = os.path.join(tmp.name, f"out-{n}.{fmt}")
+            flags = [] if n == total else ["--until", until]
+            dt, rss = run([out, "--db", db, "--chunk", str(args.chunk), *flags])
+            print(f"{fmt:>8}{n:>11,}{dt:>9.1f}{n / dt:>10,.0f}{rss:>13.0f}{os.path.getsize(out) / 2**20:>9.0f}")
+            os.remove(out)
+
+    out = os.path.join(tmp.name, "filtered.jsonl")
+    dt, rss = run([out, "--db", db, "--since", "2024-01-01", "--until", "2024-04-01", "--industry", "Retail"])
+    with open(out, encoding="utf-8") as fh:
+        n = sum(1 for _ in fh)
+    print(f"filtered (one quarter, one industry): {n:,} rows in {dt:.2f}s, peak RSS {rss:.0f} MB")
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
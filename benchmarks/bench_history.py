@@ -0,0 +1,116 @@
+"""Reassessment history: write overhead and the cost of a client's trend and diff.
+
+    python benchmarks/bench_history.py [--clients 2000] [--runs 40] [--long 400]
+
+Stores ``--runs`` quarterly reassessments (10 years at 40) for each of
+``--clients`` clients. One client gets ``--long`` runs. It reports:
+
+- the time to write them with the history tables maintained, against a
+  rebuild of those tables alone
+- the storage the history uses
+- the results-page read (``store.history``: trend plus the diff against the
+  previous run) for a typical client and for the long-history client, next to
+  the naive read. That read fetches every stored run of the client by name,
+  rebuilds the scores from each row and diffs the last two answer sets.
+- diffs over longer spans of the long client's history (composed from the
+  deltas in between up to ``KEYFRAME`` runs, rebuilt from keyframes beyond)
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from synth import random_record
+from assessment import history, portfolio
+from assessment.store import AssessmentStore, build_row
+
+START = datetime(2016, 1, 1, tzinfo=timezone.utc)
+
+def runs_of(rng: random.Random, templates: list, name: str, n: int):
+    """``n`` quarterly runs of one client, each changing a few answers of the one before."""
+    base = rng.choice(templates)
+    answers, cyber = dict(base["answers"]), dict(base["cyber_answers"])
+    for k in range(n):
+        other = rng.choice(templates)
+        for part, src in ((answers, other["answers"]), (cyber, other["cyber_answers"])):
+            for qid in rng.sample(sorted(src), min(3, len(src))):
+                part[qid] = src[qid]
+        row = list(build_row(f"{name}-{k}", dict(base["profile"], business_name=name), answers, cyber))
+        row[1] = row[2] = (START + timedelta(days=91 * k)).isoformat(timespec="seconds")
+        yield tuple(row)
+
+def naive(conn: sqlite3.Connection, name: str) -> tuple:
+    rows = conn.execute("SELECT completed_at, answers, cyber_answers, overall_score, domain_scores FROM assessments "
+                        "WHERE business_name = ? AND stage = 'cyber' ORDER BY completed_at", (name,)).fetchall()
+    series = {"overall": [(r[0], r[3]) for r in rows]}
+    for r in rows:
+        for dom, d in json.loads(r[4]).items():
+            series.setdefault(dom, []).append((r[0], d["score"]))
+    old, new = ({"answers": json.loads(r[1]), "cyber_answers": json.loads(r[2])} for r in rows[-2:])
+    return series, history.diff_states(old, new)
+
+def timed(fn, repeat: int = 20) -> float:
+    """Best of ``repeat`` calls, in ms."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=2000)
+    ap.add_argument("--runs", type=int, default=40)
+    ap.add_argument("--long", type=int, default=400)
+    args = ap.parse_args()
+
+    rng = random.Random(11)
+    templates = [random_record(rng, i) for i in range(500)]
+    tmp = tempfile.TemporaryDirectory()
+    store = AssessmentStore(os.path.join(tmp.name, "bench.db"))
+    total, t0 = 0, time.perf_counter()
+    for c in range(args.clients):
+        rows = list(runs_of(rng, templates, f"Client {c}", args.long if c == 0 else args.runs))
+        store.write_rows(rows)
+        total += len(rows)
+    dt = time.perf_counter() - t0
+    conn = store._writer
+    conn.execute("BEGIN IMMEDIATE")
+    t1 = time.perf_counter()
+    history.rebuild(conn)
+    rebuild = time.perf_counter() - t1
+    conn.execute("COMMIT")
+    print(f"wrote {total:,} assessments of {args.clients:,} clients in {dt:.1f}s "
+          f"({total / dt:,.0f}/s); history tables alone rebuild in {rebuild:.1f}s ({rebuild / dt:.0%} of the load)")
+
+    store.optimize()
+    stat = {r[0]: r[1] for r in conn.execute(
+        "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ('assessments', 'snapshots', 'score_series') GROUP BY name")} \
+        if conn.execute("SELECT 1 FROM pragma_module_list WHERE name = 'dbstat'").fetchone() else {}
+    if stat:
+        print("storage MB: " + ", ".join(f"{k} {v / 2**20:.1f}" for k, v in sorted(stat.items())))
+
+    print(f"{'client':>16}{'runs':>6}{'history() ms':>14}{'naive ms':>10}")
+    for c, n in ((1, args.runs), (0, args.long)):
+        name, last = f"Client {c}", f"Client {c}-{n - 1}"
+        with store.reader() as rd:
+            t_naive = timed(lambda: naive(rd, name))
+            trend, diff = store.history(last)
+            assert diff.answers == naive(rd, name)[1] and len(trend["overall"]) == n
+        print(f"{name:>16}{n:>6}{timed(lambda: store.history(last)):>14.2f}{t_naive:>10.2f}")
+
+    key = portfolio.client_key("Client 0", "")
+    with store.reader() as rd:
+        spans = [(1, 1 + history.KEYFRAME), (1, args.long)]
+        ms = [timed(lambda: history.diff(rd, key, b, a)) for a, b in spans]
+    print(", ".join(f"diff of runs {a}→{b}: {t:.2f} ms" for (a, b), t in zip(spans, ms)))
+    store.close()
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
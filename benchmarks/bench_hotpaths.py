@@ -0,0 +1,214 @@
+"""Micro-benchmarks of the scoring and branching hot paths, with a JSON history.
+
+    python benchmarks/bench_hotpaths.py [--sizes 15,150,500,1000] [--sets 200] [--repeat 7] [--label before-x]
+    python benchmarks/bench_hotpaths.py --compare [OLD [NEW]] [--threshold 0.15]
+
+For each bank size it builds a synthetic Initial Assessment bank with
+``show_if`` branches, a Cybersecurity Posture bank and its action-card rules,
+all with that many questions. It then draws ``--sets`` random answer sets
+and times one call of each function over all of them. A round repeats the
+sets until it lasts at least 20 ms, and the best of ``--repeat`` rounds
+(and the median) is recorded:
+
+    visible_questions          full show_if evaluation of the initial bank
+    compute_domain_scores      per-domain percentages of the cyber answers
+    overall_score              average over the domains
+    add_action_cards           every rule against the answers
+    digital_dependency_score   the intake's digital-dependency points
+    choice_options             one choice question's radio options and pre-selected index
+
+Each run is appended as one JSON line to ``--history``, with:
+- the git commit, plus "dirty" if the tree has uncommitted changes
+- an optional ``--label``
+- the machine
+- per case, a calibration: ms for a fixed pure-Python loop, timed just
+  before and after the case
+
+``--compare`` compares two runs of the history. Each is an index (default
+the last two, ``-2 -1``) or a commit or label prefix, which picks that
+commit's or label's latest run. Each of the old run's times is scaled by
+the ratio of the two calibrations. A case is flagged when both its best and
+its median time are more than ``--threshold`` slower; the command then
+exits 1.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Tuple, Callable
+
+from synth import ROOT, calibrate, random_answers, random_bank_answer, synthetic_bank, synthetic_cyber_bank, synthetic_rules
+from assessment import (compile_bank, compile_branching, visible_questions, choice_options, compute_domain_scores,
+                        overall_score, add_action_cards, digital_dependency_score)
+from assessment.branching import OTHER
+from assessment.rules import compile_rules
+
+HISTORY = os.path.join(ROOT, "benchmarks", "history", "hotpaths.jsonl")
+MIN_ROUND = 0.02              # seconds; rounds of cheap functions pass over the answer sets several times
+CAL_LOOPS = 200_000           # calibration around each case: ~25 ms per round
+
+# =========================================================
+# Cases
+# =========================================================
+def cases(n: int, sets: int) -> Dict[str, Tuple[Callable, List[tuple]]]:
+    """function name -> (function, argument tuples: one per call) for banks of ``n`` questions."""
+    rng = random.Random(n)
+    qs = synthetic_bank(n, rng)
+    for q in qs[::7]:
+        if q["type"] == "choice":
+            q["allow_other"] = True
+    br = compile_branching(compile_bank(qs, "phase"))
+    cqs = synthetic_cyber_bank(n, rng)
+    cbank = compile_bank(cqs, "domain")
+    cr = compile_rules(synthetic_rules(cqs, rng), cqs)
+
+    initial, cyber = [], []
+    for _ in range(sets):
+        a = random_answers(rng)                                 # the real intake keys digital dependency reads
+        for q in qs:
+            if rng.random() < 0.9:
+                a[q["id"]] = ({"value": OTHER, "comment": "Our own system"} if q.get("allow_other") and rng.random() < 0.2
+                              else random_bank_answer(q, rng))
+        initial.append(a)
+        cyber.append({q["id"]: rng.choice(q["choices"]) for q in cqs if rng.random() > 0.05})
+    domains = [compute_domain_scores(c, cbank) for c in cyber]
+    choice_qs = [q for q in qs if q["type"] == "choice"]
+    options = [(q["choices"], q.get("allow_other", False), a.get(q["id"]))
+               for a, q in zip(initial, (rng.choice(choice_qs) for _ in range(sets)))]
+    return {
+        "visible_questions": (visible_questions, [(a, br) for a in initial]),
+        "compute_domain_scores": (compute_domain_scores, [(c, cbank) for c in cyber]),
+        "overall_score": (overall_score, [(d,) for d in domains]),
+        "add_action_cards": (add_action_cards, [(a, c, cr) for a, c in zip(initial, cyber)]),
+        "digital_dependency_score": (digital_dependency_score, [(a,) for a in initial]),
+        "choice_options": (choice_options, options),
+    }
+
+def time_case(fn: Callable, calls: List[tuple], repeat: int) -> Dict[str, float]:
+    """Per-call times, and the calibration loop's time around them (a shared VM's speed drifts within seconds)."""
+    rounds = []
+    t = time.perf_counter()
+    for args in calls:                                          # warm caches and the allocator first
+        fn(*args)
+    passes = max(1, math.ceil(MIN_ROUND / max(time.perf_counter() - t, 1e-9)))
+    cal = calibrate(CAL_LOOPS, 3)
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for _ in range(passes):
+            for args in calls:
+                fn(*args)
+        rounds.append((time.perf_counter() - t) / (passes * len(calls)) * 1e6)
+    return {"best_us": round(min(rounds), 3), "median_us": round(statistics.median(rounds), 3),
+            "calls": passes * len(calls),
+            "calibration_ms": round((cal + calibrate(CAL_LOOPS, 3)) / 2, 2)}
+
+# =========================================================
+# History
+# =========================================================
+def git_commit() -> str:
+    try:
+        head = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return head + ("-dirty" if dirty else "")
+
+def read_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+def pick(history: List[Dict[str, Any]], ref: str) -> Dict[str, Any]:
+    """A run by index (negative from the end) or the latest whose commit or label starts with ``ref``."""
+    try:
+        return history[int(ref)]
+    except ValueError:
+        pass
+    except IndexError:
+        raise SystemExit(f"no run {ref} in a history of {len(history)}")
+    for run in reversed(history):
+        if run["commit"].startswith(ref) or (run.get("label") or "").startswith(ref):
+            return run
+    raise SystemExit(f"no run with commit or label {ref!r}")
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> int:
+    print(f"old: {old['created']} {old['commit']} {old.get('label') or ''}")
+    print(f"new: {new['created']} {new['commit']} {new.get('label') or ''}")
+    print("old times are scaled by each case's calibration ratio (new/old)\n")
+    print(f"{'function':<26}{'questions':>10}{'speed':>7}{'old us':>10}{'new us':>10}{'change':>9}")
+    slower = 0
+    for name, by_size in new["results"].items():
+        for n, cur in by_size.items():
+            prev = old["results"].get(name, {}).get(n)
+            if prev is None:
+                continue
+            speed = cur["calibration_ms"] / prev["calibration_ms"]
+            base = prev["best_us"] * speed
+            change = cur["best_us"] / base - 1
+            flag = ""
+            if change > threshold and cur["median_us"] / (prev["median_us"] * speed) - 1 > threshold:
+                slower += 1
+                flag = "  SLOWER"
+            print(f"{name:<26}{n:>10}{speed:>7.2f}{base:>10.2f}{cur['best_us']:>10.2f}{change:>+9.0%}{flag}")
+    print(f"\n{slower} cases more than {threshold:.0%} slower")
+    return slower
+
+# =========================================================
+# Main
+# =========================================================
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="15,150,500,1000")
+    ap.add_argument("--sets", type=int, default=200, help="Random answer sets (calls per round)")
+    ap.add_argument("--repeat", type=int, default=7, help="Rounds per case; the best is recorded")
+    ap.add_argument("--label", default="", help="Name this run (e.g. a branch) for --compare")
+    ap.add_argument("--history", default=HISTORY)
+    ap.add_argument("--no-save", action="store_true", help="Print only; don't append to the history")
+    ap.add_argument("--compare", nargs="*", metavar="RUN", help="Compare two history runs (default: -2 -1)")
+    ap.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown flagged by --compare")
+    args = ap.parse_args()
+
+    if args.compare is not None:
+        history = read_history(args.history)
+        refs = (args.compare + ["-1"])[:2] if len(args.compare) == 1 else (args.compare or ["-2", "-1"])
+        if len(refs) != 2:
+            ap.error("--compare takes at most two runs")
+        if len(history) < 2 and not args.compare:
+            raise SystemExit(f"{args.history} has {len(history)} run(s); run the benchmarks again first")
+        if compare(pick(history, refs[0]), pick(history, refs[1]), args.threshold):
+            sys.exit(1)
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'function':<26}{'questions':>10}{'best us':>10}{'median us':>11}")
+    for n in sizes:
+        for name, (fn, calls) in cases(n, args.sets).items():
+            r = results.setdefault(name, {})[str(n)] = time_case(fn, calls, args.repeat)
+            print(f"{name:<26}{n:>10}{r['best_us']:>10.2f}{r['median_us']:>11.2f}")
+    run = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "label": args.label,
+        "machine": {"cpus": os.cpu_count(), "python": platform.python_version(), "platform": platform.platform()},
+        "settings": {"sizes": sizes, "sets": args.sets, "repeat": args.repeat},
+        "results": results,
+    }
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(run) + "\n")
+        print(f"appended to {args.history} ({run['commit'] or 'no commit'})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Industry typeahead latency and batch normalization throughput.
+
+    python benchmarks/bench_industries.py [--industries 5000 20000] [--rows 200000] [--workers 1 4]
+
+Typeahead: for the shipped taxonomy and for synthetic ones with
+``--industries`` entries (each with a title and three synonyms, over a
+vocabulary that grows with the taxonomy like a real one does), it times
+``search`` on what users type. The queries are 3-character to full prefixes
+of random terms, some with a typo. It reports p50/p99 latency per lookup,
+next to ``difflib.get_close_matches`` over every term (the obvious way) on
+a sample.
+
+Normalization: it stores ``--rows`` assessments whose "Other" industry is one
+of 5,000 distinct free texts (a term plus filler words or a typo). It then
+times the steps of ``normalize-industries``: reading the distinct texts,
+classifying them with each ``--workers`` count, and the one UPDATE that
+stores the codes.
+"""
+import argparse
+import csv
+import difflib
+import os
+import random
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from synth import random_record
+from assessment.industries import INDUSTRIES_PATH, classify_many, normalize, load_industries, read_industries
+from assessment.questions import INDUSTRY_OPTIONS
+from assessment.store import AssessmentStore, build_row
+
+FILLER = ["small", "family", "local", "independent", "business", "services", "and", "ltd", "uk", "online"]
+
+def synthetic(path: str, n: int, rng: random.Random) -> None:
+    """A taxonomy of ``n`` industries whose words are the shipped ones plus as many made-up ones per 1,000
+    industries as the shipped file has (about what a full NACE or SIC list adds), drawn Zipf-like."""
+    with open(INDUSTRIES_PATH, newline="", encoding="utf-8") as fh:
+        shipped = read_industries(fh)
+    real = sorted({w for ind in shipped for t in (ind.title, *ind.synonyms) for w in normalize(t).split() if len(w) > 2})
+    made = {a[:len(a) // 2] + b[len(b) // 2:] for a, b in zip(rng.choices(real, k=len(real) * n // 1000),
+                                                               rng.choices(real, k=len(real) * n // 1000))}
+    vocab = real + sorted(made - set(real))
+    weights = [1 / (r + 10) for r in range(len(vocab))]
+    rng.shuffle(vocab)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["code", "title", "group", "synonyms"])
+        for k in range(n):
+            terms = [" ".join(rng.choices(vocab, weights, k=rng.randint(1, 4))) for _ in range(4)]
+            w.writerow([f"X{k:06d}", terms[0], rng.choice(INDUSTRY_OPTIONS), ";".join(terms[1:])])
+
+def typo(text: str, rng: random.Random) -> str:
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1:] if len(text) > 4 else text
+
+def queries(index, n: int, rng: random.Random) -> list:
+    out = []
+    for _ in range(n):
+        term = rng.choice(index.terms)
+        q = term[:rng.randint(3, max(3, len(term)))]
+        out.append(typo(q, rng) if rng.random() < 0.2 else q)
+    return out
+
+def bench_search(name: str, path: str, n: int, sample: int, rng: random.Random) -> None:
+    t0 = time.perf_counter()
+    index = load_industries(path)
+    build = time.perf_counter() - t0
+    qs = queries(index, n, rng)
+    times = []
+    for q in qs:
+        t = time.perf_counter()
+        index.search(q, 8)
+        times.append(time.perf_counter() - t)
+    p50, p99 = np.percentile(times, [50, 99]) * 1000
+    norm = [normalize(t) for t in index.terms]
+    t = time.perf_counter()
+    for q in qs[:sample]:
+        difflib.get_close_matches(normalize(q), norm, n=8, cutoff=0.3)
+    naive = (time.perf_counter() - t) / sample * 1000
+    print(f"{name:>10}{len(index.industries):>12,}{len(index.terms):>8,}{build:>9.2f}{p50:>9.3f}{p99:>9.3f}{naive:>12.1f}")
+
+def load_store(db: str, rows: int, rng: random.Random) -> None:
+    index = load_industries(INDUSTRIES_PATH)
+    texts = []
+    for _ in range(5000):
+        term = rng.choice(index.terms)
+        texts.append(" ".join(rng.sample(FILLER, rng.randint(0, 3)) + [typo(term, rng) if rng.random() < 0.3 else term]))
+    templates = [build_row("x", r["profile"], r["answers"], r["cyber_answers"])
+                 for r in (random_record(rng, i) for i in range(500))]
+    store = AssessmentStore(db)
+    for done in range(0, rows, 10_000):
+        batch = []
+        for _ in range(done, min(done + 10_000, rows)):
+            row = list(rng.choice(templates))
+            row[0] = uuid.uuid4().hex
+            row[6], row[7] = INDUSTRY_OPTIONS[-1], rng.choice(texts)
+            batch.append(tuple(row))
+        store.write_rows(batch)
+    store.close()
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--industries", type=int, nargs="+", default=[5000, 20000])
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--sample", type=int, default=50)
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = ap.parse_args()
+
+    rng = random.Random(22)
+    tmp = tempfile.TemporaryDirectory()
+    print(f"{'taxonomy':>10}{'industries':>12}{'terms':>8}{'build s':>9}{'p50 ms':>9}{'p99 ms':>9}{'difflib ms':>12}")
+    bench_search("shipped", INDUSTRIES_PATH, args.queries, args.sample, rng)
+    for n in args.industries:
+        path = os.path.join(tmp.name, f"industries-{n}.csv")
+        synthetic(path, n, rng)
+        bench_search("synthetic", path, args.queries, args.sample, rng)
+
+    db = os.path.join(tmp.name, "bench.db")
+    t0 = time.perf_counter()
+    load_store(db, args.rows, rng)
+    print(f"stored {args.rows:,} assessments with free-text industries in {time.perf_counter() - t0:.0f}s "
+          f"({os.cpu_count()} CPUs)")
+    store = AssessmentStore(db)
+    t0 = time.perf_counter()
+    texts = store.industry_texts()
+    print(f"distinct texts: {len(texts):,} in {time.perf_counter() - t0:.2f}s")
+    for w in dict.fromkeys(args.workers):
+        t0 = time.perf_counter()
+        found = classify_many([t for t, _ in texts], workers=w)
+        dt = time.perf_counter() - t0
+        print(f"classify, workers={w}: {dt:.2f}s ({len(texts) / dt:,.0f} texts/s; "
+              f"one lookup per row instead would take ~{dt * args.rows / len(texts):.0f}s)")
+    codes = {t: code for (t, _), (code, _) in zip(texts, found) if code is not None}
+    t0 = time.perf_counter()
+    n = store.set_industry_codes(codes)
+    print(f"matched {len(codes):,} texts; stored codes on {n:,} assessments in {time.perf_counter() - t0:.2f}s")
+    store.close()
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Load test: concurrent virtual users against one ``streamlit run`` instance.
+
+    python benchmarks/bench_load.py [--users 1 4 8 16] [--duration 60] [--procs 4] [--slo-ms 1000]
+                                    [--save-baseline benchmarks/baselines/load.json]
+                                    [--baseline benchmarks/baselines/load.json] [--tolerance 0.25]
+
+Each virtual user runs complete journeys back to back over the websocket
+protocol (see st_client.py), the same messages a browser sends:
+- an intake with a searched industry and a random size
+- random Initial Assessment answers, so journeys take different
+  ``show_if`` branches
+- every Cybersecurity Posture question
+- the results page
+
+Users are spread over ``--procs`` worker processes, each running its share
+as asyncio tasks, so the clients never compete with each other for a GIL.
+Every ``--users`` level runs for ``--duration`` seconds against the same
+server.
+
+For each level it reports:
+- journeys per minute and failed journeys
+- script runs (reruns) per journey
+- server CPU per journey
+- the server's peak RSS over its idle RSS, per concurrent session
+- p50/p95/p99 wall time of every kind of interaction
+
+A level "sustains" its users if no journey failed and the p95 of every
+interaction is within ``--slo-ms``.
+
+``--save-baseline`` writes the results as JSON. ``--baseline`` compares a
+run with a saved one. It lists every metric that got worse by more than
+``--tolerance`` (p95/p99 also by more than 5 ms) and exits 1 if there are
+any. Each level also times a fixed pure-Python loop before and after it.
+Baseline times are scaled by that before comparing, because a shared VM can
+run 30% slower from one minute to the next. The AppTest harness is not used: it runs the script inside the test
+process, so it cannot show what one server instance sustains.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+import streamlit
+
+from st_client import StreamlitClient, free_port, process_cpu, process_rss, run_journey, start_server
+from synth import calibrate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ABS_SLACK_MS = 5.0          # latency changes smaller than this are never regressions
+MIN_SAMPLES = {"p95": 20, "p99": 100}   # fewer timings than this and the percentile is noise
+
+# =========================================================
+# Virtual users (worker processes)
+# =========================================================
+async def _users(port: int, first: int, users: int, deadline: float, seed: int) -> Dict[str, Any]:
+    timings: Dict[str, List[float]] = {}
+    runs: List[int] = []
+    paths: List[Tuple[str, ...]] = []
+    errors: List[str] = []
+
+    async def user(k: int) -> None:
+        rng = random.Random(seed * 10_007 + k)
+        await asyncio.sleep(rng.random())                  # don't all connect in the same instant
+        while time.time() < deadline:
+            client = StreamlitClient(port)
+            mine: Dict[str, List[float]] = {}
+            try:
+                paths.append(await run_journey(client, mine, rng=rng))
+                runs.append(client.runs)
+                for name, xs in mine.items():
+                    timings.setdefault(name, []).extend(xs)
+            except Exception as e:                          # noqa: BLE001 - counted, not fatal
+                errors.append(f"{type(e).__name__}: {e}")
+            finally:
+                await client.close()
+
+    await asyncio.gather(*(user(first + k) for k in range(users)))
+    return {"timings": timings, "runs": runs, "paths": paths, "errors": errors}
+
+def _warm_up(port: int, seed: int) -> None:
+    async def journey() -> None:
+        client = StreamlitClient(port)
+        try:
+            await run_journey(client, {}, rng=random.Random(seed))
+        finally:
+            await client.close()
+    asyncio.run(journey())
+
+def _worker(job: Tuple[int, int, int, float, int]) -> Dict[str, Any]:
+    return asyncio.run(_users(*job))
+
+# =========================================================
+# One load level
+# =========================================================
+def run_level(port: int, pid: int, users: int, procs: int, duration: float, seed: int) -> Dict[str, Any]:
+    procs = min(procs, users)
+    shares = [users // procs + (i < users % procs) for i in range(procs)]
+    firsts = np.concatenate(([0], np.cumsum(shares)[:-1])).tolist()
+    peak = [process_rss(pid) or 0.0]
+    idle = peak[0]
+    stop = threading.Event()
+
+    def sample() -> None:
+        while not stop.wait(0.25):
+            peak[0] = max(peak[0], process_rss(pid) or 0.0)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    cal = calibrate()
+    with ProcessPoolExecutor(max_workers=procs) as pool:
+        pool.submit(int).result()                           # pay the worker start-up before the clock starts
+        cpu0, t0 = process_cpu(pid), time.perf_counter()
+        sampler.start()
+        deadline = time.time() + duration
+        parts = list(pool.map(_worker, [(port, f, n, deadline, seed) for f, n in zip(firsts, shares)]))
+        wall, cpu = time.perf_counter() - t0, process_cpu(pid)
+    stop.set()
+    sampler.join()
+    cal = round((cal + calibrate()) / 2, 1)
+
+    timings: Dict[str, List[float]] = {}
+    for part in parts:
+        for name, xs in part["timings"].items():
+            timings.setdefault(name, []).extend(xs)
+    runs = [r for part in parts for r in part["runs"]]
+    errors = [e for part in parts for e in part["errors"]]
+    journeys = len(runs)
+    return {
+        "users": users,
+        "wall_s": round(wall, 2),
+        "calibration_ms": cal,
+        "journeys": journeys,
+        "journeys_per_min": round(journeys * 60 / wall, 2),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "paths": len({p for part in parts for p in part["paths"]}),
+        "runs_per_journey": round(float(np.mean(runs)), 1) if runs else None,
+        "cpu_s_per_journey": round((cpu - cpu0) / journeys, 3) if journeys and cpu is not None else None,
+        "cpu_util": round((cpu - cpu0) / wall, 2) if cpu is not None else None,
+        "rss_idle_mb": round(idle, 1),
+        "rss_peak_mb": round(peak[0], 1),
+        "rss_mb_per_session": round((peak[0] - idle) / users, 2),
+        "interactions": {
+            name: {"n": len(xs), **{f"p{q}": round(float(v) * 1000, 1)
+                                    for q, v in zip((50, 95, 99), np.percentile(xs, [50, 95, 99]))}}
+            for name, xs in timings.items()
+        },
+    }
+
+def sustains(level: Dict[str, Any], slo_ms: float) -> bool:
+    return (level["journeys"] > 0 and level["errors"] == 0
+            and all(v["p95"] <= slo_ms for v in level["interactions"].values()))
+
+# =========================================================
+# Reporting and baselines
+# =========================================================
+def report(level: Dict[str, Any], slo_ms: float) -> None:
+    print(f"\n{level['users']} users for {level['wall_s']:.0f}s: {level['journeys']} journeys "
+          f"({level['journeys_per_min']:.1f}/min, {level['paths']} distinct Initial Assessment paths), "
+          f"{level['errors']} failed")
+    for e in level["error_samples"]:
+        print(f"  error: {e}")
+    if level["journeys"]:
+        print(f"  {level['runs_per_journey']:.0f} script runs/journey, server CPU {level['cpu_s_per_journey']:.2f}s/journey "
+              f"({level['cpu_util']:.0%} of a core), RSS {level['rss_idle_mb']:.0f} -> {level['rss_peak_mb']:.0f} MB "
+              f"({level['rss_mb_per_session']:.1f} MB/session)")
+    print(f"  {'interaction':<26}{'n':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, v in level["interactions"].items():
+        flag = "  > SLO" if v["p95"] > slo_ms else ""
+        print(f"  {name:<26}{v['n']:>7}{v['p50']:>9.1f}{v['p95']:>9.1f}{v['p99']:>9.1f}{flag}")
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], tolerance: float) -> List[str]:
+    """Every metric of ``new`` that is more than ``tolerance`` worse than in ``base``.
+
+    Times and throughput in ``base`` are first scaled by how much slower or
+    faster the machine ran (``calibration_ms``), so a busy neighbour on a
+    shared VM is not reported as a regression."""
+    worse = []
+    speed = 1.0
+
+    def check(what: str, old: Any, cur: Any, higher_is_worse: bool = True, slack: float = 0.0,
+              timed: bool = True) -> None:
+        if old is None or cur is None:
+            return
+        if timed:
+            old = round(old * speed if higher_is_worse else old / speed, 3)
+        delta = (cur - old) if higher_is_worse else (old - cur)
+        if delta > abs(old) * tolerance and delta > slack:
+            worse.append(f"{what}: {old} -> {cur}")
+
+    levels = {lv["users"]: lv for lv in base["levels"]}
+    for lv in new["levels"]:
+        old = levels.get(lv["users"])
+        if old is None:
+            continue
+        tag = f"{lv['users']} users"
+        speed = lv["calibration_ms"] / old["calibration_ms"]
+        if lv["errors"] > old["errors"]:
+            worse.append(f"{tag} failed journeys: {old['errors']} -> {lv['errors']}")
+        check(f"{tag} journeys/min", old["journeys_per_min"], lv["journeys_per_min"], higher_is_worse=False)
+        check(f"{tag} runs/journey", old["runs_per_journey"], lv["runs_per_journey"], timed=False)
+        check(f"{tag} CPU s/journey", old["cpu_s_per_journey"], lv["cpu_s_per_journey"])
+        check(f"{tag} MB/session", old["rss_mb_per_session"], lv["rss_mb_per_session"], slack=1.0,
+              timed=False)
+        for name, v in lv["interactions"].items():
+            o = old["interactions"].get(name)
+            for p in ("p95", "p99"):
+                if o and min(o["n"], v["n"]) >= MIN_SAMPLES[p]:
+                    check(f"{tag} {name} {p} ms", o[p], v[p], slack=ABS_SLACK_MS)
+    return worse
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app", default=os.path.join(ROOT, "new_app.py"))
+    ap.add_argument("--users", type=int, nargs="+", default=[1, 4, 8, 16])
+    ap.add_argument("--duration", type=float, default=60, help="Seconds per load level")
+    ap.add_argument("--procs", type=int, default=os.cpu_count(), help="Client processes (default: CPU count)")
+    ap.add_argument("--slo-ms", type=float, default=1000, help="p95 an interaction may take at a sustained level")
+    ap.add_argument("--seed", type=int, default=23)
+    ap.add_argument("--save-baseline", help="Write the results to this JSON file")
+    ap.add_argument("--baseline", help="Compare with this JSON file; exit 1 on regressions")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Relative change counted as a regression")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        env = {"SME_DB_PATH": os.path.join(tmp, "a.db"), "SME_REPORT_CACHE": os.path.join(tmp, "reports"),
+               "SME_SESSION_DB": os.path.join(tmp, "sessions.db")}
+        proc = start_server(args.app, port, env)
+        try:
+            # one untimed journey first, so imports and caches aren't charged to the first level
+            _warm_up(port, args.seed)
+            levels = []
+            for users in args.users:
+                levels.append(run_level(port, proc.pid, users, args.procs, args.duration, args.seed))
+                report(levels[-1], args.slo_ms)
+        finally:
+            proc.terminate(); proc.wait()
+
+    ok = [lv["users"] for lv in levels if sustains(lv, args.slo_ms)]
+    print(f"\nsustained (no failures, every p95 <= {args.slo_ms:.0f} ms): "
+          f"{max(ok) if ok else 'none'} of {args.users} users")
+    result = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"cpus": os.cpu_count(), "python": platform.python_version(),
+                    "streamlit": streamlit.__version__, "platform": platform.platform()},
+        "settings": {"duration": args.duration, "procs": args.procs, "slo_ms": args.slo_ms, "seed": args.seed},
+        "sustained_users": max(ok) if ok else 0,
+        "levels": levels,
+    }
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=1)
+            fh.write("\n")
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            base = json.load(fh)
+        if base["machine"]["cpus"] != result["machine"]["cpus"]:
+            print(f"note: baseline ran on {base['machine']['cpus']} CPUs, this run on {result['machine']['cpus']}")
+        worse = compare(base, result, args.tolerance)
+        for w in worse:
+            print(f"REGRESSION {w}")
+        print(f"{len(worse)} regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        if worse:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
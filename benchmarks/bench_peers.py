@@ -0,0 +1,125 @@
+"""Cost of keeping peer percentile histograms, and percentile lookup latency.
+
+    python benchmarks/bench_peers.py [--rows 1000000] [--db path/to/bench.db]
+
+Bulk-loads ``--rows`` scored assessments twice, with and without the
+``score_counts`` upkeep in ``write_rows``, then times a results page's
+percentile lookup (overall plus every domain) against the naive way: reading
+the cohort's scores out of ``assessments`` on every render. Finally checks the
+incrementally maintained histograms against a full rebuild.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from synth import random_record, HEADCOUNTS, TURNOVERS
+from assessment import peers
+from assessment.questions import INDUSTRY_OPTIONS
+from assessment.store import AssessmentStore, build_row
+
+def _pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+def load(path: str, rows: int, rng: random.Random, templates) -> float:
+    store = AssessmentStore(path)
+    t0 = time.perf_counter()
+    for done in range(0, rows, 10_000):
+        batch = []
+        for _ in range(min(10_000, rows - done)):
+            row = list(rng.choice(templates))
+            row[0] = uuid.uuid4().hex
+            row[6] = rng.choice(INDUSTRY_OPTIONS[:-1])
+            row[9] = rng.choice(HEADCOUNTS)
+            row[10] = rng.choice(TURNOVERS)
+            batch.append(tuple(row))
+        store.write_rows(batch)
+    dt = time.perf_counter() - t0
+    store.close()
+    return rows / dt
+
+def naive(store: AssessmentStore, profile, scores):
+    """Percentiles from a scan of the cohort's rows (most specific cohort only)."""
+    with store.reader() as conn:
+        rows = conn.execute("SELECT overall_score, domain_scores FROM assessments WHERE industry = ? AND "
+                            "headcount = ? AND turnover = ? AND overall_score IS NOT NULL",
+                            (profile["industry"]["value"], profile["headcount"], profile["turnover"])).fetchall()
+    hists = {}
+    for overall, domains in rows:
+        hists.setdefault(peers.OVERALL, {}).setdefault(overall, 0)
+        hists[peers.OVERALL][overall] += 1
+        for dom, d in json.loads(domains).items():
+            h = hists.setdefault(dom, {})
+            h[d["score"]] = h.get(d["score"], 0) + 1
+    return {m: peers.percentile(hists[m], s) for m, s in scores.items() if m in hists}
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--lookups", type=int, default=200)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    path = args.db or os.path.join(tmp.name, "bench.db")
+    rng = random.Random(11)
+    records = [random_record(rng, i) for i in range(2000)]
+    templates = [list(build_row("x", r["profile"], r["answers"], r["cyber_answers"])) for r in records]
+    templates = [t for t in templates if t[15] is not None]  # scored rows only
+
+    apply = peers.apply
+    peers.apply = lambda conn, changes: 0
+    bare = load(os.path.join(tmp.name, "bare.db"), args.rows, random.Random(1), templates)
+    peers.apply = apply
+    kept = load(path, args.rows, random.Random(1), templates)
+    print(f"bulk write_rows, {args.rows:,} rows")
+    print(f"  without histograms:  {bare:10,.0f} rows/s")
+    print(f"  with histograms:     {kept:10,.0f} rows/s ({(bare / kept - 1) * 100:+.0f}% time)")
+
+    store = AssessmentStore(path)
+    with store.reader() as conn:
+        buckets = conn.execute("SELECT COUNT(*) FROM score_counts").fetchone()[0]
+    print(f"  score_counts:        {buckets:10,} buckets")
+
+    from assessment.scoring import compute_domain_scores, overall_score
+    picks = []
+    for _ in range(args.lookups):
+        profile = dict(rng.choice(records)["profile"])
+        profile.update(industry={"value": rng.choice(INDUSTRY_OPTIONS[:-1]), "other": ""},
+                       headcount=rng.choice(HEADCOUNTS), turnover=rng.choice(TURNOVERS))
+        doms = compute_domain_scores(rng.choice(records)["cyber_answers"])
+        picks.append((profile, {"overall": overall_score(doms)["score"], **{d: v["score"] for d, v in doms.items()}}))
+
+    print(f"results page lookup, overall + {len(picks[0][1]) - 1} domains (ms, p50 / p99)")
+    for name, fn in (("score_counts histograms", store.peer_percentiles), ("scan the cohort's rows", lambda p, s: naive(store, p, s))):
+        lat = []
+        for profile, scores in picks:
+            t0 = time.perf_counter(); fn(profile, scores); lat.append((time.perf_counter() - t0) * 1000)
+        print(f"  {name:<26} {statistics.median(lat):8.2f} / {_pct(lat, 0.99):8.2f}")
+
+    agree = 0
+    for profile, scores in picks[:20]:
+        fast = store.peer_percentiles(profile, scores)
+        if fast and fast["overall"].cohort.endswith(f"turning over {profile['turnover']}"):
+            agree += {m: p.percentile for m, p in fast.items()} == naive(store, profile, scores)
+    with store._write_lock:
+        conn = store._writer
+        before = conn.execute("SELECT cohort, metric, score, n FROM score_counts ORDER BY 1, 2, 3").fetchall()
+        conn.execute("BEGIN IMMEDIATE")
+        t0 = time.perf_counter()
+        peers.rebuild(conn)
+        dt = time.perf_counter() - t0
+        same = before == conn.execute("SELECT cohort, metric, score, n FROM score_counts ORDER BY 1, 2, 3").fetchall()
+        conn.execute("ROLLBACK")
+    print(f"full rebuild: {dt:.1f}s; matches incremental: {'yes' if same else 'NO'}; "
+          f"agrees with scan on {agree} specific-cohort lookups")
+    store.close()
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Portfolio page latency at MSP scale.
+
+    python benchmarks/bench_portfolio.py [--clients 50000] [--db path/to/bench.db]
+
+Stores ``--clients`` businesses, a third of them assessed twice (the newer
+assessment must win), then times what one render of pages/portfolio.py
+asks the store for (a roll-up, the average compliance coverage, then one
+page of clients and the match count) under several filters, sorts and page depths, and the whole page run through
+Streamlit's AppTest. Also times filing one new assessment, and checks the
+incrementally maintained tables against a rebuild.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from synth import random_record, HEADCOUNTS, TURNOVERS, ROOT
+from assessment import compliance, portfolio
+from assessment.questions import INDUSTRY_OPTIONS
+
+def _pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+def _timed(fn, n=50):
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter(); fn(); out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=50_000)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    path = args.db or os.path.join(tmp.name, "bench.db")
+    # The page's get_store() reads SME_DB_PATH when assessment.store is first imported.
+    os.environ["SME_DB_PATH"] = path
+    os.environ["SME_ADMIN_TOKEN"] = "bench"
+    from assessment.store import AssessmentStore, build_row
+    store = AssessmentStore(path)
+    rng = random.Random(7)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    templates = [build_row("x", r["profile"], r["answers"], r["cyber_answers"] if i % 6 else None)
+                 for i, r in ((i, random_record(rng, i)) for i in range(2000))]
+
+    def row(n: int, k: int) -> tuple:
+        r = list(rng.choice(templates))
+        when = (start + timedelta(days=400 * k, seconds=rng.randrange(365 * 86400))).isoformat(timespec="seconds")
+        r[0], r[1], r[2] = f"a{n}-{k}", when, when
+        r[5] = f"Client {n:06d}"
+        r[6] = INDUSTRY_OPTIONS[n % (len(INDUSTRY_OPTIONS) - 1)]
+        r[9], r[10] = HEADCOUNTS[n % len(HEADCOUNTS)], TURNOVERS[n // 7 % len(TURNOVERS)]
+        return tuple(r)
+
+    rows = [row(n, 0) for n in range(args.clients)] + [row(n, 1) for n in range(0, args.clients, 3)]
+    rng.shuffle(rows)                   # newer and older assessments arrive in any order
+    t0 = time.perf_counter()
+    for i in range(0, len(rows), 10_000):
+        store.write_rows(rows[i:i + 10_000])
+    dt = time.perf_counter() - t0
+    print(f"stored {len(rows):,} assessments of {args.clients:,} clients in {dt:.1f}s ({len(rows) / dt:,.0f} rows/s)")
+    store.optimize()
+
+    total = store.portfolio_page(per_page=0)[1]
+    assert total == args.clients, total
+    latest = {r["assessment_id"] for r in store.portfolio_page(search="Client 00000", per_page=10)[0]}
+    assert all(a.endswith("-1") if int(a[1:-2]) % 3 == 0 else a.endswith("-0") for a in latest), latest
+
+    deep = args.clients // 50 - 1
+    views = {
+        "default (newest first)": dict(),
+        f"page {deep + 1} of {deep + 1}": dict(page_no=deep),
+        "by name, A-Z": dict(sort="name", descending=False),
+        "industry, by overall score": dict(industry="Retail", sort="overall", descending=False),
+        "overall at risk, most fixes": dict(light="red", sort="fixes"),
+        "one domain at risk": dict(light="red", domain="Devices"),
+        "name search": dict(search="Client 0123"),
+        "industry+people+turnover": dict(industry="Retail", headcount="6–20", turnover="€500k–2M"),
+    }
+    print(f"store calls per render at {total:,} clients (ms, p50 / p99)")
+    s = _timed(lambda: store.portfolio_rollup())
+    print(f"  {'roll-up, all industries':<34} {statistics.median(s):7.2f} / {_pct(s, 0.99):7.2f}")
+    s = _timed(lambda: store.portfolio_rollup("Retail"))
+    print(f"  {'roll-up, one industry':<34} {statistics.median(s):7.2f} / {_pct(s, 0.99):7.2f}")
+    store.portfolio_compliance()                # builds the compliance roll-up on first use
+    s = _timed(lambda: store.portfolio_compliance())
+    print(f"  {'compliance, all industries':<34} {statistics.median(s):7.2f} / {_pct(s, 0.99):7.2f}")
+    s = _timed(lambda: store.portfolio_compliance("Retail"))
+    print(f"  {'compliance, one industry':<34} {statistics.median(s):7.2f} / {_pct(s, 0.99):7.2f}")
+    for name, kw in views.items():
+        s = _timed(lambda: store.portfolio_page(**kw))
+        print(f"  {'page: ' + name:<34} {statistics.median(s):7.2f} / {_pct(s, 0.99):7.2f}")
+
+    one = [row(args.clients + i, 0) for i in range(200)]
+    s = _timed(lambda: store.write_rows([one.pop()]), n=200)
+    print(f"  {'file one new assessment':<34} {statistics.median(s):7.2f} / {_pct(s, 0.99):7.2f}")
+
+    with store._write_lock:
+        conn = store._writer
+        tables = ("SELECT * FROM portfolio_clients ORDER BY client_key", "SELECT * FROM portfolio_rollup ORDER BY 1, 2, 3",
+                  "SELECT * FROM compliance_clients ORDER BY client_key",
+                  "SELECT * FROM compliance_rollup ORDER BY 1, 2")
+        before = [[tuple(r) for r in conn.execute(q)] for q in tables]
+        conn.execute("BEGIN IMMEDIATE")
+        t0 = time.perf_counter()
+        portfolio.rebuild(conn)
+        dt = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        compliance.rebuild(conn)
+        dt_compliance = time.perf_counter() - t0
+        same = before == [[tuple(r) for r in conn.execute(q)] for q in tables]
+        conn.execute("ROLLBACK")
+    print(f"full rebuild: portfolio {dt:.1f}s, compliance {dt_compliance:.1f}s; "
+          f"matches incremental: {'yes' if same else 'NO'}")
+    total = store.portfolio_page(per_page=0)[1]
+    store.close()
+
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, "pages", "portfolio.py"), default_timeout=60)
+    at.query_params["admin"] = "bench"
+    at.run()
+    assert any(f"**{total:,}** matching clients" in m.value for m in at.markdown), "the page opened another database"
+    runs = []
+    for choice in ["Retail", "Any"] * 5:
+        at.sidebar.selectbox[0].set_value(choice)
+        t0 = time.perf_counter(); at.run(); runs.append((time.perf_counter() - t0) * 1000)
+        assert not at.exception, at.exception
+    print(f"whole page run (AppTest): p50 {statistics.median(runs):.0f} ms, max {max(runs):.0f} ms")
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
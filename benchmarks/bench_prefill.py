@@ -0,0 +1,95 @@
+"""Bulk pre-fill (``python -m assessment prefill``): throughput and memory on large client lists.
+
+    python benchmarks/bench_prefill.py [--clients 20000 200000]
+
+Writes a synthetic inventory of ``--clients`` rows as CSV, as a JSON array
+and as JSONL. Column names are RMM-style, mapped through a ``--map`` file,
+and a few values are invalid. Each file is pre-filled and scored in its own
+subprocess. Reports clients/s and that process's peak RSS (from ``wait4``),
+which should stay flat as the list grows. For contrast it also times
+``json.load`` of the whole JSON array.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from synth import random_record, ROOT
+from assessment.questions import MULTI_SEP
+
+RENAMED = {"mfa_all": "MFA Enforced", "disk_encryption": "BitLocker Status", "av_edr": "EDR Agent"}
+MAP = {
+    "columns": {v: k for k, v in RENAMED.items()},
+    "values": {"mfa_all": {"true": "Yes, for all important accounts", "false": "No / not sure"}},
+}
+
+def inventory(n: int, rng: random.Random):
+    for i in range(n):
+        r = random_record(rng, i)
+        row = {"id": f"c{i}", "business_name": r["profile"]["business_name"], "headcount": r["profile"]["headcount"]}
+        for qid, v in r["answers"].items():
+            row[qid] = MULTI_SEP.join(v) if isinstance(v, list) else v
+        for qid, v in r["cyber_answers"].items():
+            row[RENAMED.get(qid, qid)] = v
+        row["MFA Enforced"] = rng.choice(["TRUE", "false", "n/a"])
+        row["hostname"] = f"pc-{i}"
+        yield row
+
+def run(args: list) -> tuple:
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "assessment", "prefill", "-q", *args], cwd=ROOT)
+    _, status, usage = os.wait4(proc.pid, 0)
+    if os.waitstatus_to_exitcode(status):
+        raise RuntimeError(f"prefill failed: {args}")
+    return time.perf_counter() - t0, usage.ru_maxrss / 1024
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, nargs="+", default=[20_000, 200_000])
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    mapping = os.path.join(tmp.name, "map.json")
+    with open(mapping, "w", encoding="utf-8") as fh:
+        json.dump(MAP, fh)
+    template = list(inventory(2000, random.Random(3)))
+    columns = list(dict.fromkeys(k for row in template for k in row))
+
+    print(f"{'input':>8}{'clients':>10}{'seconds':>9}{'clients/s':>11}{'peak RSS MB':>13}")
+    for n in sorted(args.clients):
+        rows = (dict(template[i % len(template)], id=f"c{i}") for i in range(n))
+        paths = {f: os.path.join(tmp.name, f"inv-{n}.{f}") for f in ("csv", "json", "jsonl")}
+        with open(paths["csv"], "w", newline="", encoding="utf-8") as fc, \
+                open(paths["json"], "w", encoding="utf-8") as fj, open(paths["jsonl"], "w", encoding="utf-8") as fl:
+            w = csv.DictWriter(fc, fieldnames=columns)
+            w.writeheader()
+            fj.write("[")
+            for i, row in enumerate(rows):
+                w.writerow(row)
+                line = json.dumps(row, ensure_ascii=False)
+                fj.write(("," if i else "") + line + "\n")
+                fl.write(line + "\n")
+            fj.write("]")
+        for fmt, path in paths.items():
+            dt, rss = run([path, "-o", os.path.join(tmp.name, "scored.csv"), "--map", mapping])
+            print(f"{fmt:>8}{n:>10,}{dt:>9.1f}{n / dt:>11,.0f}{rss:>13.0f}")
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-c", f"import json; json.load(open({paths['json']!r}))"])
+        _, _, usage = os.wait4(proc.pid, 0)
+        print(f"{'(json.load of the array alone)':>38}{time.perf_counter() - t0:>9.1f}s, peak RSS "
+              f"{usage.ru_maxrss / 1024:.0f} MB")
+        for path in paths.values():
+            os.remove(path)
+
+    with open(os.path.join(tmp.name, "scored.csv"), encoding="utf-8") as fh:
+        rejected = sum(1 for r in csv.DictReader(fh) if "'n/a' is not a choice" in r["issues"])
+    print(f"last run: {rejected:,} 'MFA Enforced' values rejected (~1 in 3 expected)")
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
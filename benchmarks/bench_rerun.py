@@ -0,0 +1,75 @@
+"""Server time per wizard interaction, measured against a real ``streamlit run``.
+
+    python benchmarks/bench_rerun.py [--app new_app.py] [--journeys 5]
+
+Drives complete journeys over the websocket protocol (see st_client.py) and
+reports, per interaction, the wall time until its script run finished and the
+server process CPU it consumed (Linux), plus the time spent executing the
+script itself for full-page versus fragment runs. ``--tracemalloc`` adds the
+peak memory each script run allocates (CPU figures are then inflated). Point
+``--app`` at an older checkout of new_app.py to compare before/after.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+
+from st_client import StreamlitClient, free_port, run_journey, start_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def _journeys(port: int, pid: int, n: int):
+    timings, cpu, runs = {}, {}, 0
+    for _ in range(n):
+        client = StreamlitClient(port, server_pid=pid)
+        try:
+            await run_journey(client, timings, cpu)
+            runs += client.runs
+        finally:
+            await client.close()
+    return timings, cpu, runs / n
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app", default=os.path.join(ROOT, "new_app.py"))
+    ap.add_argument("--journeys", type=int, default=5)
+    ap.add_argument("--tracemalloc", action="store_true")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        log = os.path.join(tmp, "runs.jsonl")
+        env = {"SME_DB_PATH": os.path.join(tmp, "a.db"), "SME_REPORT_CACHE": os.path.join(tmp, "reports")}
+        if args.tracemalloc:
+            env["ST_TRACEMALLOC"] = "1"
+        proc = start_server(args.app, port, env, timings_path=log)
+        try:
+            timings, cpu, runs = asyncio.run(_journeys(port, proc.pid, args.journeys))
+        finally:
+            proc.terminate(); proc.wait()
+        with open(log) as fh:
+            script_runs = [json.loads(line) for line in fh if line.strip()]
+
+    n_inter = sum(len(v) for v in timings.values())
+    print(f"{args.app}")
+    print(f"{args.journeys} journeys, {n_inter / args.journeys:.0f} interactions and {runs:.0f} script runs per journey")
+    print(f"{'interaction':<26}{'n':>5}{'wall median ms':>16}{'server CPU mean ms':>20}")
+    for name, xs in timings.items():
+        cpu_ms = f"{statistics.mean(cpu[name]) * 1000:>20.1f}" if cpu.get(name) else f"{'n/a':>20}"
+        print(f"{name:<26}{len(xs):>5}{statistics.median(xs) * 1000:>16.1f}{cpu_ms}")
+
+    print("script execution (excludes Streamlit's per-message overhead)")
+    for label, sel in (("full-page runs", False), ("fragment runs", True)):
+        xs = [r["cpu_ms"] for r in script_runs if r["fragment"] == sel]
+        if xs:
+            print(f"  {label:<16}{len(xs):>6} runs, CPU mean {statistics.mean(xs):6.2f} ms, median {statistics.median(xs):6.2f} ms")
+        kb = [r["alloc_kb"] for r in script_runs if r["fragment"] == sel and "alloc_kb" in r]
+        if kb:
+            print(f"  {'':<16}{'':>6}       peak alloc mean {statistics.mean(kb):6.1f} KiB, median {statistics.median(kb):6.1f} KiB")
+    total = sum(r["cpu_ms"] for r in script_runs)
+    print(f"  script CPU per interaction: {total / n_inter:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Re-scoring stored results after a weight or rule change.
+
+    python benchmarks/bench_rescore.py [--rows 200000] [--workers 1 4] [--naive-sample N]
+
+It stores ``--rows`` synthetic assessments (five in six scored), then edits
+a copy of the question banks and runs ``python -m assessment rescore`` on a
+fresh copy of the database for each scenario and ``--workers`` count:
+
+    weight     one choice of one question scores 1 -> 0 (domain maxima
+               unchanged): only rows that picked it are recomputed
+    domain max one question's top weight 2 -> 3: every scored row is recomputed
+    legacy     the shipped banks, on rows stored before versioning (no
+               model_version): everything is recomputed, nothing changes
+
+The baseline is the obvious job for the domain-max change: read every
+stored assessment, score it again with ``build_row`` and write it back
+through ``write_rows``. It runs in a child process with the edited banks,
+over every row, or over the first ``--naive-sample`` and extrapolated.
+Finally the domain-max job is interrupted (SIGINT) part way and resumed,
+and the resumed job's counts are checked against the uninterrupted run.
+"""
+import argparse
+import os
+import random
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from synth import ROOT, random_record
+from assessment.loader import BANK_DIR
+from assessment.store import AssessmentStore, build_row, profile_from_row
+
+SCENARIOS = ("weight", "domain max", "legacy")
+
+def load_store(db: str, rows: int, rng: random.Random) -> None:
+    templates = [build_row("x", r["profile"], r["answers"], r["cyber_answers"] if i % 6 else None)
+                 for i, r in enumerate(random_record(rng, i) for i in range(2000))]
+    store = AssessmentStore(db)
+    for done in range(0, rows, 10_000):
+        batch = []
+        for _ in range(done, min(done + 10_000, rows)):
+            row = list(rng.choice(templates))
+            row[0] = uuid.uuid4().hex
+            batch.append(tuple(row))
+        store.write_rows(batch)
+    store.close()
+
+def edited_banks(path: str, old: str, new: str) -> str:
+    """A copy of the shipped banks with the first ``old`` weights line of cyber.yaml replaced by ``new``."""
+    shutil.copytree(BANK_DIR, path)
+    with open(os.path.join(path, "cyber.yaml"), encoding="utf-8") as fh:
+        text = fh.read()
+    assert old in text
+    with open(os.path.join(path, "cyber.yaml"), "w", encoding="utf-8") as fh:
+        fh.write(text.replace(old, new, 1))
+    return path
+
+def rescore(db: str, banks: str, workers: int, interrupt_after: float = 0.0) -> float:
+    env = dict(os.environ, SME_QUESTION_BANKS=banks, PYTHONPATH=ROOT)
+    cmd = [sys.executable, "-m", "assessment", "rescore", "--db", db, "--workers", str(workers), "-q"]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env)
+    if interrupt_after:
+        time.sleep(interrupt_after)
+        proc.send_signal(signal.SIGINT)
+    proc.wait()
+    if proc.returncode not in (0, 130):
+        raise SystemExit(f"rescore exited {proc.returncode}")
+    return time.perf_counter() - t0
+
+def last_job(db: str) -> sqlite3.Row:
+    conn = sqlite3.connect(db)
+    conn.row_factory = sqlite3.Row
+    try:
+        return conn.execute("SELECT * FROM rescore_jobs ORDER BY id DESC LIMIT 1").fetchone()
+    finally:
+        conn.close()
+
+def naive(db: str, sample: int) -> float:
+    """Seconds to rescore and rewrite the first ``sample`` rows the obvious way (banks from the environment)."""
+    store = AssessmentStore(db)
+    t0 = time.perf_counter()
+    batch, n = [], 0
+    for d in store.iter_assessments():
+        batch.append(build_row(d["id"], profile_from_row(d), d["answers"], d["cyber_answers"], d["completed_at"]))
+        n += 1
+        if len(batch) == 2000 or n == sample:
+            store.write_rows(batch)
+            batch = []
+        if n == sample:
+            break
+    dt = time.perf_counter() - t0
+    store.close()
+    return dt
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    ap.add_argument("--naive-sample", type=int, default=0, help="Rows the baseline is timed on (default: all)")
+    ap.add_argument("--naive", metavar="DB", help=argparse.SUPPRESS)    # the child process of the baseline
+    args = ap.parse_args()
+    if args.naive:
+        print(naive(args.naive, args.naive_sample))
+        return
+
+    tmp = tempfile.TemporaryDirectory()
+    base = os.path.join(tmp.name, "base.db")
+    t0 = time.perf_counter()
+    load_store(base, args.rows, random.Random(25))
+    print(f"stored {args.rows:,} assessments in {time.perf_counter() - t0:.0f}s ({os.cpu_count()} CPUs)")
+    banks = {
+        "weight": edited_banks(os.path.join(tmp.name, "weight"), "weights: [0, 2, 1, 0]", "weights: [0, 2, 0, 0]"),
+        "domain max": edited_banks(os.path.join(tmp.name, "max"), "weights: [0, 2, 1, 0]", "weights: [0, 3, 1, 0]"),
+        "legacy": BANK_DIR,
+    }
+
+    copy = os.path.join(tmp.name, "run.db")
+    shutil.copy(base, copy)
+    sample = min(args.naive_sample or args.rows, args.rows)
+    out = subprocess.run([sys.executable, __file__, "--naive", copy, "--naive-sample", str(sample)], check=True,
+                         env=dict(os.environ, SME_QUESTION_BANKS=banks["domain max"]), capture_output=True, text=True)
+    est = float(out.stdout) * args.rows / sample
+    print(f"naive rescore of every row (build_row + write_rows): {'~' if sample < args.rows else ''}{est:.0f}s "
+          f"({args.rows / est:,.0f} rows/s)\n")
+
+    print(f"{'scenario':<12}{'workers':>8}{'seconds':>9}{'rows/s':>10}{'recomputed':>12}{'changed':>10}{'vs naive':>10}")
+    full = {}
+    for name in SCENARIOS:
+        for w in dict.fromkeys(args.workers):
+            shutil.copy(base, copy)
+            if name == "legacy":
+                conn = sqlite3.connect(copy)
+                conn.execute("UPDATE assessments SET model_version = NULL")
+                conn.commit()
+                conn.close()
+            dt = rescore(copy, banks[name], w)
+            job = last_job(copy)
+            full[name] = job
+            print(f"{name:<12}{w:>8}{dt:>9.1f}{args.rows / dt:>10,.0f}{job['checked']:>12,}{job['changed']:>10,}"
+                  f"{est / dt:>9.1f}x")
+
+    w = max(args.workers)
+    shutil.copy(base, copy)
+    whole = rescore(copy, banks["domain max"], w)
+    shutil.copy(base, copy)
+    first = rescore(copy, banks["domain max"], w, interrupt_after=whole * 0.5)
+    paused = last_job(copy)
+    second = rescore(copy, banks["domain max"], w)
+    job = last_job(copy)
+    same = (job["checked"], job["changed"]) == (full["domain max"]["checked"], full["domain max"]["changed"])
+    print(f"\ninterrupted at rowid {paused['last_rowid']:,} "
+          f"of {paused['max_rowid']:,} rowids ({paused['status']}) after {first:.1f}s; resumed in {second:.1f}s: "
+          f"job {job['id']} {job['status']}, {job['checked']:,} recomputed, {job['changed']:,} changed "
+          f"({'same as' if same else 'DIFFERENT FROM'} the uninterrupted run)")
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Memory per wizard session: plain answer dicts versus ``WizardSession``.
+
+    python benchmarks/bench_session_memory.py [--sessions 2000] [--sizes 150,1000]
+
+Builds ``--sessions`` finished sessions (random answers to every shown
+question) both ways and reports the traced bytes per session. "Old" is what
+the app kept in ``st.session_state`` before: separate keys with answers as
+``{question id: label}`` dicts and list-based visibility. Labels are the bank's own string objects, as
+they are when they come back from a widget, so only the containers count.
+The shipped banks come first, then synthetic Initial banks of ``--sizes``
+questions.
+"""
+import argparse
+import random
+import sys
+import tracemalloc
+import uuid
+from typing import Any, Callable, List
+
+from synth import synthetic_bank, random_bank_answer
+from assessment import compile_bank, compile_branching, Visibility, INITIAL_BRANCHING, CYBER_BANK
+from assessment.session import CompactAnswers, WizardSession, empty_profile
+
+def answer_all(br, rng: random.Random) -> List[tuple]:
+    """(question id, value) for every question shown along one random path through ``br``."""
+    answers = {}
+    vis = Visibility(answers, br)
+    pos = vis.first()
+    while pos is not None:
+        q = br.bank.questions[pos]
+        value = random_bank_answer(q, rng)
+        if q["type"] == "multi":
+            value = [c for c in q["choices"] if c in value]      # checkbox order
+        answers[q["id"]] = value
+        vis.update(q["id"], answers)
+        pos = vis.next_pos(pos)
+    return list(answers.items())
+
+def old_session(br, initial: list, cyber: list) -> dict:
+    state = {
+        "stage": "cyber_results", "profile": empty_profile(), "answers": dict(initial),
+        "qpos": 0, "cyber_answers": dict(cyber), "cyber_idx": 0, "assessment_id": uuid.uuid4().hex,
+    }
+    vis = state["visibility"] = Visibility(state["answers"], br)
+    # Visibility used to keep Python lists (of one int object per position)
+    ints = list(range(len(vis._next)))
+    vis.shown = [bool(x) for x in vis.shown]
+    vis._next, vis._prev = [ints[i] for i in vis._next], [ints[i] for i in vis._prev]
+    return state
+
+def new_session(br, initial: list, cyber: list) -> WizardSession:
+    wiz = WizardSession(uuid.uuid4().hex, br, CYBER_BANK)
+    wiz.stage = "cyber_results"
+    wiz.answers.update(initial)
+    wiz.visibility = Visibility(wiz.answers, br)
+    wiz.cyber_answers.update(cyber)
+    return wiz
+
+def traced(build: Callable[[], Any], n: int) -> float:
+    """Bytes per object still allocated after building ``n`` of them."""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = [build() for _ in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - base - sys.getsizeof(keep)
+    tracemalloc.stop()
+    return used / n
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=2000)
+    ap.add_argument("--sizes", default="150,1000")
+    args = ap.parse_args()
+
+    rng = random.Random(7)
+    cyber_br = compile_branching(CYBER_BANK)
+    banks = [("shipped", INITIAL_BRANCHING)]
+    for n in (int(s) for s in args.sizes.split(",") if s):
+        banks.append((f"synthetic {n}", compile_branching(compile_bank(synthetic_bank(n, rng), "phase"))))
+
+    print(f"{'initial bank':>14}{'answered':>10}{'answers B: old':>16}{'new':>8}{'session B: old':>16}{'new':>8}{'saving':>8}")
+    for name, br in banks:
+        paths = [(answer_all(br, rng), answer_all(cyber_br, rng)) for _ in range(args.sessions)]
+        answered = sum(len(a) + len(c) for a, c in paths) / len(paths)
+        it = iter(paths); a_old = traced(lambda: tuple(dict(x) for x in next(it)), args.sessions)
+        it = iter(paths); a_new = traced(lambda: (lambda a, c: (CompactAnswers(br.bank, a), CompactAnswers(CYBER_BANK, c)))(*next(it)), args.sessions)
+        it = iter(paths); s_old = traced(lambda: old_session(br, *next(it)), args.sessions)
+        it = iter(paths); s_new = traced(lambda: new_session(br, *next(it)), args.sessions)
+        print(f"{name:>14}{answered:>10.0f}{a_old:>16,.0f}{a_new:>8,.0f}{s_old:>16,.0f}{s_new:>8,.0f}{1 - s_new / s_old:>8.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Insert throughput and query latency of the SQLite assessment store.
+
+    python benchmarks/bench_store.py [--rows 1000000] [--db path/to/bench.db]
+
+Bulk-loads ``--rows`` assessments, then measures sustained inserts through the
+queued group-commit writer from several concurrent "sessions", then query
+latency on the full table.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from synth import random_record, HEADCOUNTS, TURNOVERS
+from assessment.questions import INDUSTRY_OPTIONS
+from assessment.store import AssessmentStore, build_row
+
+def _pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+def _timed(fn, n=200):
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter(); fn(); out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--sessions", type=int, default=8)
+    ap.add_argument("--per-session", type=int, default=2500)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+
+    tmp = None
+    if not args.db:
+        tmp = tempfile.TemporaryDirectory()
+        args.db = os.path.join(tmp.name, "bench.db")
+    store = AssessmentStore(args.db)
+    rng = random.Random(11)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+    # A few thousand distinct scored templates, re-keyed per row, keep generation cheap.
+    templates = [list(build_row("x", r["profile"], r["answers"], r["cyber_answers"]))
+                 for r in (random_record(rng, i) for i in range(2000))]
+
+    def fresh_row():
+        row = list(rng.choice(templates))
+        when = (start + timedelta(seconds=rng.randrange(3 * 365 * 86400))).isoformat(timespec="seconds")
+        row[0] = uuid.uuid4().hex
+        row[1] = row[2] = when
+        row[6] = rng.choice(INDUSTRY_OPTIONS[:-1])
+        row[9] = rng.choice(HEADCOUNTS)
+        row[10] = rng.choice(TURNOVERS)
+        return tuple(row)
+
+    print(f"bulk load {args.rows:,} rows into {args.db}")
+    t0 = time.perf_counter()
+    chunk = 10_000
+    for done in range(0, args.rows, chunk):
+        store.write_rows([fresh_row() for _ in range(min(chunk, args.rows - done))])
+    dt = time.perf_counter() - t0
+    print(f"  bulk write_rows:        {args.rows/dt:10,.0f} rows/s ({dt:.1f}s)")
+    store.optimize()
+
+    # Sustained inserts from concurrent sessions through the group-commit queue.
+    def session(n):
+        r = random.Random()
+        for _ in range(n):
+            rec = random_record(r, 0)
+            store.save(uuid.uuid4().hex, rec["profile"], rec["answers"], rec["cyber_answers"])
+    threads = [threading.Thread(target=session, args=(args.per_session,)) for _ in range(args.sessions)]
+    t0 = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    store.flush()
+    dt = time.perf_counter() - t0
+    total = args.sessions * args.per_session
+    print(f"  queued save() x{args.sessions} sessions: {total/dt:8,.0f} inserts/s "
+          f"(incl. scoring each assessment, {total} rows)")
+
+    n = store.count()
+    print(f"query latency at {n:,} rows (ms, p50 / p99)")
+    some_id = store.query(limit=1)[0]["id"]
+    cases = {
+        "get by id": lambda: store.get(some_id),
+        "industry, latest 50": lambda: store.query(industry="Retail", limit=50),
+        "industry+headcount+turnover, latest 50":
+            lambda: store.query(industry="Retail", headcount="6–20", turnover="€500k–2M", limit=50),
+        "one week window, latest 50":
+            lambda: store.query(since="2024-03-01", until="2024-03-08", limit=50),
+    }
+    for name, fn in cases.items():
+        s = _timed(fn)
+        print(f"  {name:<42} {statistics.median(s):7.2f} / {_pct(s, 0.99):7.2f}")
+
+    def count_by_industry():
+        with store.reader() as conn:
+            conn.execute("SELECT industry, COUNT(*) FROM assessments GROUP BY industry").fetchall()
+    s = _timed(count_by_industry, n=10)
+    print(f"  {'count grouped by industry (index scan)':<42} {statistics.median(s):7.2f} / {_pct(s, 0.99):7.2f}")
+
+    store.close()
+    if tmp: tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
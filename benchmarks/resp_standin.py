@@ -0,0 +1,162 @@
+"""A small in-memory server speaking the Redis protocol, for trying the Redis session backend without Redis.
+
+    python benchmarks/resp_standin.py [--port 6379] [--password secret]
+    SME_SESSION_BACKEND=redis://localhost:6379/0 streamlit run new_app.py
+
+Implements only what ``RedisBackend`` uses (hashes, DEL, EXPIRE, TTL, plus
+PING, SELECT, DBSIZE, FLUSHDB, and AUTH for the default user when started
+with a password), with Redis's reply shapes and lazy expiry.
+One thread per client and one lock around the data. It is much slower than
+Redis, so benchmark numbers against it are an upper bound on backend cost.
+"""
+import argparse
+import socketserver
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+class Store:
+    def __init__(self):
+        self.data: Dict[bytes, Dict[bytes, bytes]] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.lock = threading.Lock()
+
+    def _live(self, key: bytes) -> Optional[Dict[bytes, bytes]]:
+        exp = self.expires.get(key)
+        if exp is not None and exp <= time.monotonic():
+            self.data.pop(key, None); self.expires.pop(key, None)
+        return self.data.get(key)
+
+    def run(self, cmd: List[bytes]) -> Any:
+        name, args = cmd[0].upper(), cmd[1:]
+        with self.lock:
+            if name == b"PING":
+                return b"+PONG"
+            if name == b"SELECT" or name == b"FLUSHDB":
+                if name == b"FLUSHDB":
+                    self.data.clear(); self.expires.clear()
+                return b"+OK"
+            if name == b"HSET" and len(args) >= 3 and len(args) % 2 == 1:
+                h = self._live(args[0])
+                if h is None:
+                    h = self.data[args[0]] = {}
+                added = sum(f not in h for f in args[1::2])
+                h.update(zip(args[1::2], args[2::2]))
+                return added
+            if name == b"HGETALL" and len(args) == 1:
+                h = self._live(args[0]) or {}
+                return [x for kv in h.items() for x in kv]
+            if name == b"HDEL" and len(args) >= 2:
+                h = self._live(args[0])
+                if h is None:
+                    return 0
+                n = sum(h.pop(f, None) is not None for f in args[1:])
+                if not h:
+                    del self.data[args[0]]; self.expires.pop(args[0], None)
+                return n
+            if name == b"DEL":
+                n = 0
+                for k in args:
+                    n += self._live(k) is not None
+                    self.data.pop(k, None); self.expires.pop(k, None)
+                return n
+            if name == b"EXPIRE" and len(args) == 2:
+                if self._live(args[0]) is None:
+                    return 0
+                self.expires[args[0]] = time.monotonic() + int(args[1])
+                return 1
+            if name == b"TTL" and len(args) == 1:
+                if self._live(args[0]) is None:
+                    return -2
+                exp = self.expires.get(args[0])
+                return -1 if exp is None else int(exp - time.monotonic() + 0.5)
+            if name == b"DBSIZE":
+                return sum(self._live(k) is not None for k in list(self.data))
+        return Exception(f"ERR unknown command or wrong arguments '{name.decode()}'")
+
+def encode(reply: Any) -> bytes:
+    if isinstance(reply, Exception):
+        return b"-%s\r\n" % str(reply).encode()
+    if isinstance(reply, bytes) and reply.startswith(b"+"):
+        return reply + b"\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(b"$%d\r\n%s\r\n" % (len(x), x) for x in reply)
+    return b"$-1\r\n"
+
+def parse(buf: bytearray) -> Tuple[List[List[bytes]], int]:
+    """Every complete command at the start of ``buf``, and how many bytes they took."""
+    cmds, pos = [], 0
+    while True:
+        end = buf.find(b"\r\n", pos)
+        if end < 0:
+            return cmds, pos
+        if buf[pos:pos + 1] != b"*":                  # inline command (e.g. from telnet)
+            cmds.append(bytes(buf[pos:end]).split()); pos = end + 2
+            continue
+        p, args = end + 2, []
+        for _ in range(int(buf[pos + 1:end])):
+            e = buf.find(b"\r\n", p)
+            if e < 0:
+                return cmds, pos
+            n = int(buf[p + 1:e])
+            if len(buf) < e + 2 + n + 2:
+                return cmds, pos
+            args.append(bytes(buf[e + 2:e + 2 + n])); p = e + 2 + n + 2
+        cmds.append(args); pos = p
+
+class Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        store: Store = self.server.store
+        password: Optional[str] = self.server.password
+        authed = password is None
+        buf = bytearray()
+
+        def run(cmd: List[bytes]) -> Any:
+            nonlocal authed
+            if cmd[0].upper() == b"AUTH" and len(cmd) in (2, 3):
+                if password is None:
+                    return Exception("ERR AUTH <password> called without any password configured for the default user")
+                authed = cmd[-1].decode() == password and (len(cmd) == 2 or cmd[1] == b"default")
+                return b"+OK" if authed else Exception("WRONGPASS invalid username-password pair or user is disabled.")
+            if not authed:
+                return Exception("NOAUTH Authentication required.")
+            return store.run(cmd)
+
+        while True:
+            chunk = self.request.recv(65536)
+            if not chunk:
+                return
+            buf += chunk
+            cmds, used = parse(buf)
+            del buf[:used]
+            if cmds:    # a pipeline that arrived together is answered in one send
+                self.request.sendall(b"".join(encode(run(c)) for c in cmds if c))
+
+class StandinServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, addr: Tuple[str, int] = ("127.0.0.1", 0), password: Optional[str] = None):
+        super().__init__(addr, Handler)
+        self.store = Store()
+        self.password = password
+
+def start(port: int = 0, password: Optional[str] = None) -> StandinServer:
+    """Serve on a background thread; ``server.server_address[1]`` is the port."""
+    server = StandinServer(("127.0.0.1", port), password)
+    threading.Thread(target=server.serve_forever, name="resp-standin", daemon=True).start()
+    return server
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=6379)
+    ap.add_argument("--password", help="require AUTH with this password")
+    args = ap.parse_args()
+    server = StandinServer(("127.0.0.1", args.port), args.password)
+    print(f"RESP stand-in listening on 127.0.0.1:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Minimal headless Streamlit browser client for benchmarks.
+
+Speaks the same websocket protocol as the web frontend: sends ``BackMsg``
+reruns with widget states (and a ``fragment_id`` for widgets inside a
+fragment) and reads ``ForwardMsg`` deltas until the run finishes. Good enough
+to click buttons, radios, checkboxes and fill text inputs on ``new_app.py``
+against a real ``streamlit run`` server and time each interaction.
+"""
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, Any, List, Optional, Tuple
+
+from tornado.websocket import websocket_connect
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+WIDGET_TYPES = {"button", "radio", "checkbox", "text_input", "selectbox", "download_button"}
+DONE = {
+    ForwardMsg.ScriptFinishedStatus.FINISHED_SUCCESSFULLY,
+    ForwardMsg.ScriptFinishedStatus.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+    ForwardMsg.ScriptFinishedStatus.FINISHED_WITH_COMPILE_ERROR,
+}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(app: str, port: int, env: Optional[Dict[str, str]] = None,
+                 timings_path: Optional[str] = None) -> subprocess.Popen:
+    """Start ``streamlit run app``; with ``timings_path``, log each script run's time there."""
+    opts = ["--server.headless", "true", "--server.port", str(port),
+            "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"]
+    if timings_path:
+        wrapper = os.path.join(os.path.dirname(os.path.abspath(__file__)), "st_timed_server.py")
+        cmd = [sys.executable, wrapper, timings_path, app, *opts]
+    else:
+        cmd = [sys.executable, "-m", "streamlit", "run", app, *opts]
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(app)),
+                            env={**os.environ, **(env or {})},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("streamlit server did not start")
+
+def process_cpu(pid: int) -> Optional[float]:
+    """User+system CPU seconds of ``pid`` (Linux /proc; None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            fields = fh.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def process_rss(pid: int) -> Optional[float]:
+    """Resident set size of ``pid`` in MB (Linux /proc; None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+class Widget:
+    __slots__ = ("kind", "id", "label", "options", "fragment_id")
+
+    def __init__(self, kind: str, proto: Any, fragment_id: str):
+        self.kind = kind
+        self.id = proto.id
+        self.label = getattr(proto, "label", "")
+        self.options = list(getattr(proto, "options", []))
+        self.fragment_id = fragment_id
+
+class StreamlitClient:
+    def __init__(self, port: int, query_string: str = "", server_pid: Optional[int] = None):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.query_string = query_string
+        self.server_pid = server_pid
+        self.last_cpu: Optional[float] = None
+        self.conn = None
+        self.widgets: Dict[str, Widget] = {}
+        self.texts: List[str] = []
+        self._cache: Dict[str, ForwardMsg] = {}
+        self.runs = 0
+
+    async def connect(self) -> float:
+        self.conn = await websocket_connect(self.url, subprotocols=["streamlit"])
+        return await self._rerun([], None)
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+
+    def find(self, label: str, kind: Optional[str] = None) -> Optional[Widget]:
+        for w in self.widgets.values():
+            if (w.label == label or w.label.startswith(label)) and (kind is None or w.kind == kind):
+                return w
+        return None
+
+    def has_text(self, needle: str) -> bool:
+        return any(needle in t for t in self.texts)
+
+    # ---------- interactions ----------
+    async def click(self, w: Widget) -> float:
+        ws = WidgetState(id=w.id, trigger_value=True)
+        return await self._rerun([ws], w.fragment_id)
+
+    async def choose(self, w: Widget, index: int) -> float:
+        return await self._rerun([WidgetState(id=w.id, int_value=index)], w.fragment_id)
+
+    async def check(self, w: Widget, value: bool = True) -> float:
+        return await self._rerun([WidgetState(id=w.id, bool_value=value)], w.fragment_id)
+
+    async def type_text(self, w: Widget, value: str) -> float:
+        return await self._rerun([WidgetState(id=w.id, string_value=value)], w.fragment_id)
+
+    # ---------- protocol ----------
+    async def _rerun(self, states: List[WidgetState], fragment_id: Optional[str]) -> float:
+        msg = BackMsg()
+        msg.rerun_script.query_string = self.query_string
+        msg.rerun_script.widget_states.widgets.extend(states)
+        if fragment_id:
+            msg.rerun_script.fragment_id = fragment_id
+        cpu0 = process_cpu(self.server_pid) if self.server_pid else None
+        t0 = time.perf_counter()
+        await self.conn.write_message(msg.SerializeToString(), binary=True)
+        await self._read_until_done()
+        elapsed = time.perf_counter() - t0
+        if cpu0 is not None:
+            self.last_cpu = process_cpu(self.server_pid) - cpu0
+        return elapsed
+
+    async def _read_until_done(self) -> None:
+        while True:
+            raw = await self.conn.read_message()
+            if raw is None:
+                raise ConnectionError("websocket closed")
+            fm = ForwardMsg()
+            fm.ParseFromString(raw)
+            if fm.ref_hash:
+                fm = self._cache[fm.ref_hash]
+            elif fm.metadata.cacheable:
+                self._cache[fm.hash] = fm
+            kind = fm.WhichOneof("type")
+            if kind == "new_session":
+                self.runs += 1
+                frags = set(fm.new_session.fragment_ids_this_run)
+                if frags:
+                    self.widgets = {k: w for k, w in self.widgets.items() if w.fragment_id not in frags}
+                else:
+                    self.widgets = {}
+                    self.texts = []
+            elif kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                el = fm.delta.new_element
+                t = el.WhichOneof("type")
+                if t in WIDGET_TYPES:
+                    w = Widget(t, getattr(el, t), fm.delta.fragment_id)
+                    self.widgets[w.id] = w
+                elif t == "markdown":
+                    self.texts.append(el.markdown.body)
+            elif kind == "script_finished" and fm.script_finished in DONE:
+                return
+
+INDUSTRY_QUERIES = ["dentist", "plumber", "café", "accountant", "hair salon", "IT support", "online shop", "builder"]
+_QTITLE = re.compile(r'<div class="qtitle">(.*?)</div>')
+
+async def run_journey(client: StreamlitClient, timings: Dict[str, List[float]],
+                      cpu: Optional[Dict[str, List[float]]] = None,
+                      rng: Optional[random.Random] = None) -> Tuple[str, ...]:
+    """Intake -> Initial Assessment -> Cybersecurity Posture -> results, timing each interaction.
+
+    Wall seconds per interaction go to ``timings``; server CPU seconds to ``cpu``
+    when the client knows the server pid. Without ``rng`` every journey gives
+    the same answers. With it, the intake is filled in and answers are
+    random, so journeys take different ``show_if`` paths. Returns the
+    Initial Assessment questions shown, in order.
+    """
+    def rec(name, dt):
+        timings.setdefault(name, []).append(dt)
+        if cpu is not None and client.last_cpu is not None:
+            cpu.setdefault(name, []).append(client.last_cpu)
+
+    def pick(w: Widget, default: int) -> int:
+        return rng.randrange(1, len(w.options)) if rng and len(w.options) > 1 else default
+
+    rec("page load", await client.connect())
+    if rng:
+        rec("intake field", await client.type_text(client.find("Industry / core service", "text_input"),
+                                                   rng.choice(INDUSTRY_QUERIES)))
+        for label in ("How many people", "Approx. annual turnover"):
+            box = client.find(label, "selectbox")
+            rec("intake field", await client.choose(box, rng.randrange(len(box.options))))
+    rec("start (stage change)", await client.click(client.find("Start Initial Assessment")))
+    path: List[str] = []
+    steps = 0
+    while client.find("Next →") and not client.find("→ Continue to Cybersecurity Posture") and steps < 60:
+        path += [m.group(1) for t in client.texts for m in [_QTITLE.search(t)] if m][-1:]
+        radio = client.find("Select one:", "radio")
+        if radio:
+            rec("qa answer", await client.choose(radio, pick(radio, 1)))
+            other = client.find("Please specify", "text_input")
+            if other:
+                rec("qa answer", await client.type_text(other, "Something else"))
+        else:
+            boxes = [w for w in client.widgets.values() if w.kind == "checkbox"]
+            for box in (rng.sample(boxes, rng.randint(1, min(3, len(boxes)))) if rng and boxes else boxes[:1]):
+                rec("qa answer", await client.check(box))
+            txt = client.find("Your answer", "text_input")
+            if txt:
+                rec("qa answer", await client.type_text(txt, "Amazon"))
+        rec("qa next", await client.click(client.find("Next →")))
+        steps += 1
+    rec("continue (stage change)", await client.click(client.find("→ Continue to Cybersecurity Posture")))
+    while client.find("Next →", "button") and steps < 120:
+        radio = client.find("Select one:", "radio")
+        rec("cyber answer", await client.choose(radio, pick(radio, 1 + steps % 3)))
+        rec("cyber next", await client.click(client.find("Next →")))
+        steps += 1
+    if not client.has_text("Overall posture"):
+        raise RuntimeError("journey did not reach the results page")
+    return tuple(path)
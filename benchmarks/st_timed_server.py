@@ -0,0 +1,49 @@
+"""``streamlit run`` with per-script-run timing, for the benchmark client.
+
+    python benchmarks/st_timed_server.py TIMINGS.jsonl APP.py [streamlit options...]
+
+Appends one JSON line per script run: whether it was a fragment run, and the
+wall and thread-CPU milliseconds spent executing the script itself. With
+``ST_TRACEMALLOC=1`` in the environment it also records the peak memory the
+run allocated above its starting point (slows every run down).
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from streamlit.runtime.scriptrunner import script_runner
+
+def main() -> None:
+    out_path, app, rest = sys.argv[1], sys.argv[2], sys.argv[3:]
+    orig = script_runner.exec_func_with_error_handling
+    trace = os.environ.get("ST_TRACEMALLOC") == "1"
+    if trace:
+        tracemalloc.start()
+
+    def timed(func, ctx):
+        if trace:
+            tracemalloc.reset_peak()
+            m0 = tracemalloc.get_traced_memory()[0]
+        t0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            return orig(func, ctx)
+        finally:
+            rec = {
+                "fragment": bool(ctx.fragment_ids_this_run),
+                "wall_ms": (time.perf_counter() - t0) * 1000,
+                "cpu_ms": (time.thread_time() - c0) * 1000,
+            }
+            if trace:
+                rec["alloc_kb"] = (tracemalloc.get_traced_memory()[1] - m0) / 1024
+            with open(out_path, "a") as fh:
+                fh.write(json.dumps(rec) + "\n")
+
+    script_runner.exec_func_with_error_handling = timed
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", app, *rest]
+    cli.main()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Synthetic assessments shared by the benchmark scripts."""
+import os
+import random
+import sys
+import time
+from typing import Dict, Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from assessment.questions import (  # noqa: E402
+    PLACEHOLDER, BASE_QUESTIONS, CYBER_QUESTIONS, INDUSTRY_OPTIONS,
+    YEARS_OPTIONS, HEADCOUNT_OPTIONS, TURNOVER_OPTIONS, WORK_MODE_OPTIONS,
+)
+
+HEADCOUNTS = list(HEADCOUNT_OPTIONS)
+TURNOVERS = list(TURNOVER_OPTIONS)
+
+def random_profile(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "contact_name": "Bench",
+        "business_name": f"Client {rng.randrange(10**6)}",
+        "industry": {"value": rng.choice(INDUSTRY_OPTIONS[:-1]), "other": ""},
+        "years": rng.choice(YEARS_OPTIONS),
+        "headcount": rng.choice(HEADCOUNTS),
+        "turnover": rng.choice(TURNOVERS),
+        "work_mode": rng.choice(WORK_MODE_OPTIONS),
+    }
+
+def random_answers(rng: random.Random) -> Dict[str, Any]:
+    a: Dict[str, Any] = {}
+    for q in BASE_QUESTIONS:
+        if q["type"] == "choice":
+            a[q["id"]] = rng.choice(q["choices"])
+        elif q["type"] == "multi":
+            a[q["id"]] = rng.sample(q["choices"], rng.randint(0, len(q["choices"])))
+        else:
+            a[q["id"]] = "Amazon, Etsy"
+    return a
+
+def random_cyber(rng: random.Random) -> Dict[str, Any]:
+    return {q["id"]: rng.choice(q["choices"]) for q in CYBER_QUESTIONS if rng.random() > 0.05}
+
+def random_record(rng: random.Random, i: int) -> Dict[str, Any]:
+    return {
+        "id": i,
+        "profile": random_profile(rng),
+        "answers": random_answers(rng),
+        "cyber_answers": random_cyber(rng),
+    }
+
+def synthetic_bank(n: int, rng: random.Random, conditional: float = 0.7,
+                   phases: int = 6, choices: int = 4) -> List[Dict[str, Any]]:
+    """``n`` choice/multi questions; roughly ``conditional`` of them have a show_if on an earlier one."""
+    qs: List[Dict[str, Any]] = []
+    for i in range(n):
+        opts = [f"Option {j}" for j in range(choices)]
+        q = {
+            "id": f"q{i}",
+            "phase": f"Phase {i * phases // n}",
+            "text": f"Synthetic question {i}?",
+            "type": "multi" if i % 5 == 4 else "choice",
+            "choices": opts,
+        }
+        if qs and rng.random() < conditional:
+            ref = rng.choice(qs[-20:])
+            if ref["type"] == "multi":
+                q["show_if"] = {"question": ref["id"], "op": "contains", "value": rng.choice(ref["choices"])}
+            else:
+                q["show_if"] = {"question": ref["id"], "op": "in", "value": rng.sample(ref["choices"], 2)}
+        qs.append(q)
+    return qs
+
+def random_bank_answer(q: Dict[str, Any], rng: random.Random) -> Any:
+    if q["type"] == "text":
+        return rng.choice(("", "Xero and Shopify", "A couple of laptops and a shared drive"))
+    if q["type"] == "multi":
+        return rng.sample(list(q["choices"]), rng.randint(0, len(q["choices"])))
+    return rng.choice(q["choices"])
+
+def synthetic_cyber_bank(n: int, rng: random.Random, domains: int = 24) -> List[Dict[str, Any]]:
+    """``n`` weighted choice questions with tips, spread over ``domains`` domains."""
+    return [{
+        "id": f"c{i}",
+        "domain": f"Domain {i % domains}",
+        "text": f"Is control {i} in place across the business, and **reviewed** at least yearly?",
+        "type": "choice",
+        "choices": [PLACEHOLDER, "Yes, fully", "Partly", "No / not sure"],
+        "weights": [0, rng.choice([2, 3]), 1, 0],
+        "tip": "Why this matters: " + " ".join(rng.choice(("backups", "MFA", "patching", "access", "logging"))
+                                             for _ in range(30)),
+    } for i in range(n)]
+
+def synthetic_rules(questions: List[Dict[str, Any]], rng: random.Random) -> List[Dict[str, Any]]:
+    """A "good" card for each question's best choice and a fix when it isn't chosen; some fixes need an intake answer."""
+    rules: List[Dict[str, Any]] = []
+    for i, q in enumerate(questions):
+        rules.append({"kind": "good", "question": q["id"], "choices": [1], "priority": i, "text": f"Control {i} in place."})
+        fix = {"kind": "fix", "question": q["id"], "choices": [1], "negate": True, "priority": rng.randrange(100),
+               "effort": rng.randint(1, 5), "text": f"Put control {i} in place."}
+        if rng.random() < 0.1:
+            fix["initial"] = {"third_parties": "Yes"}
+        rules.append(fix)
+    return rules
+
+def calibrate(loops: int = 1_000_000, rounds: int = 5) -> float:
+    """ms for a fixed pure-Python loop (best of ``rounds``): how fast this machine is right now."""
+    best = float("inf")
+    for _ in range(rounds):
+        t, acc = time.perf_counter(), 0
+        for i in range(loops):
+            acc += i * i % 7
+        best = min(best, time.perf_counter() - t)
+    return round(best * 1000, 1)
@@ -1,482 +1,154 @@
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import time
+import uuid
 import streamlit as st
-from typing import Dict, Any, List, Tuple
+from streamlit.errors import StreamlitAPIException
+from typing import Dict, Any, List, Tuple, Sequence
+
+from assessment import (
+    PLACEHOLDER, INDUSTRY_OPTIONS, YEARS_OPTIONS, HEADCOUNT_OPTIONS, TURNOVER_OPTIONS, WORK_MODE_OPTIONS,
+    Visibility, WizardSession, current_banks, choice_options,
+    digital_dependency_score, dd_text, compute_domain_scores, overall_score, add_action_cards,
+)
+from assessment import metrics
+from assessment.styles import CSS
+from assessment.autosave import get_autosaver
+from assessment.store import get_store
+from assessment.report import submit_report
+from assessment.prefill import detect_format, read_prefills
+from assessment.planner import Simulator
+from assessment.compliance import assess as assess_compliance
+from assessment.industries import MATCH_THRESHOLD, current_industries
+from assessment.rules import FIX_LIMIT
 
 # =========================================================
 # Page & styles
 # =========================================================
 st.set_page_config(page_title="SME Self-Assessment Wizard", page_icon="🧭", layout="wide")
 
-CSS = """
-<style>
-.card{border:1px solid #eaeaea;border-radius:14px;padding:16px;background:#fff}
-.qtitle{font-size:1.1rem;font-weight:600;margin:0 0 8px 0}
-.qtip{font-size:.95rem;color:#444;margin-top:6px}
-.small{font-size:.9rem;color:#666}
-.footer{display:flex;gap:8px}
-.footer .stButton>button{width:100%;border-radius:10px}
-.header-phase{color:#334; font-weight:600; font-size:1.05rem; margin:2px 0 6px 0}
-.badge{display:inline-block;padding:4px 10px;border-radius:999px;font-weight:600}
-.red{background:#ffe7e7;border:1px solid #ffd0d0;color:#b10000}
-.amber{background:#fff3cd;border:1px solid #ffe59a;color:#7a5b00}
-.green{background:#e6f7e6;border:1px solid #c9efc9;color:#0d6b0d}
-.kpi{border-radius:12px;border:1px solid #eee;padding:14px;background:#fafafa}
-.kpi h4{margin:.1rem 0 .4rem 0}
-ul.tight>li{margin-bottom:.3rem}
-.progress-head{font-size:1rem; font-weight:600; color:#223;}
-</style>
-"""
 st.markdown(CSS, unsafe_allow_html=True)
 
 # =========================================================
 # Session init
 # =========================================================
 def ss_init():
-    if "stage" not in st.session_state:
-        # intake -> qa (Initial) -> done_initial -> cyber_qa -> cyber_results
-        st.session_state.stage = "intake"
-    if "profile" not in st.session_state:
-        st.session_state.profile = {
-            "contact_name": "",
-            "business_name": "",
-            "industry": {"value":"", "other":""},  # value + custom
-            "years": "",
-            "headcount": "",
-            "turnover": "",
-            "work_mode": "",
-        }
-    if "answers" not in st.session_state:
-        st.session_state.answers: Dict[str, Any] = {}
-    if "idx" not in st.session_state:
-        st.session_state.idx = 0
-    if "cyber_answers" not in st.session_state:
-        st.session_state.cyber_answers: Dict[str, Any] = {}
-    if "cyber_idx" not in st.session_state:
-        st.session_state.cyber_idx = 0
+    if "wizard" not in st.session_state:
+        banks = current_banks()
+        token = st.query_params.get("resume")
+        wiz = get_autosaver().load(token, banks) if token else None
+        if wiz is None:
+            wiz = WizardSession(uuid.uuid4().hex, banks.initial, banks.cyber)
+        st.session_state.wizard = wiz
+        st.query_params["resume"] = wiz.token   # the page URL is the resume link
 
 ss_init()
+wiz = st.session_state.wizard
 
 # =========================================================
-# Helpers (shared)
+# Instrumentation (see assessment/metrics.py)
 # =========================================================
-def digital_dependency_score(ans: Dict[str, Any]) -> int:
-    s = 0
-    if ans.get("sell_online","").startswith("Yes"): s += 2
-    if ans.get("data_types") == "Yes": s += 1
-    s += min(len(ans.get("tools_regular", [])), 4)
-    return s
-
-def dd_text(v:int) -> str:
-    return "Low" if v <= 2 else ("Medium" if v <= 5 else "High")
-
-def reset_all():
-    for k in ["stage","profile","answers","idx","cyber_answers","cyber_idx"]:
-        if k in st.session_state: del st.session_state[k]
-    ss_init()
-
-def traffic_light(pct: float) -> Tuple[str, str]:
-    if pct >= 75: return ("green","Good")
-    if pct >= 40: return ("amber","Needs work")
-    return ("red","At risk")
+metrics.start_export()
+run_stage, run_t0 = wiz.stage, time.perf_counter()
+metrics.inc("sme_reruns_total", stage=run_stage)
+if run_stage in ("intake", "done_initial"):   # the cards record their own steps; results are the end
+    metrics.FUNNEL.visit(wiz.token, run_stage)
+
+# Admins can profile a page run with ?profile=<SME_ADMIN_TOKEN>.
+ADMIN_TOKEN = os.environ.get("SME_ADMIN_TOKEN")
+profiler = None
+if ADMIN_TOKEN and st.query_params.get("profile") == ADMIN_TOKEN:
+    profiler = cProfile.Profile()
+    profiler.enable()
 
 # =========================================================
-# Initial Assessment — Question Bank (+ branching)
+# Helpers (shared)
 # =========================================================
+def reset_all():
+    del st.session_state.wizard
+    st.query_params.clear()
+    ss_init()
 
-INDUSTRY_OPTIONS = [
-    "Retail",
-    "Food & Beverage (Café/Restaurant)",
-    "Professional Services (Consulting/Legal/Accounting)",
-    "Creative/Marketing/Design",
-    "Healthcare",
-    "Education",
-    "Manufacturing",
-    "Logistics / Transportation",
-    "Construction / Trades",
-    "Real Estate",
-    "Hospitality / Travel",
-    "Non-profit",
-    "IT / Software",
-    "Finance / Insurance",
-    "Personal Services",
-    "e-Commerce only",
-    "Marketplace seller",
-    "Government / Public sector",
-    "Agriculture",
-    "Automotive",
-    "Fitness / Wellness",
-    "Beauty / Salon",
-    "Event services",
-    "Other (please specify)"
-]
-
-TOOLS_EXPANDED = [
-    "Email",
-    "Office/Docs (e.g., Microsoft 365, Google Workspace Docs)",
-    "Cloud storage (Google Drive/OneDrive etc.)",
-    "Accounting/Finance software",
-    "CRM or client list",
-    "POS / Till or Booking system",
-    "Website or webshop",
-    "Online payment system",
-    "Messaging (Teams/Slack/WhatsApp Business)",
-    "Project tool (Trello/Asana/Jira)",
-    "HR/Payroll",
-    "Inventory/ERP",
-    "Marketing tool (Mailchimp/HubSpot)",
-]
-
-BASE_QUESTIONS: List[Dict[str, Any]] = [
-    # Digital Footprint
-    {
-        "id": "sell_online",
-        "phase": "Digital Footprint",
-        "text": "Do you sell products or deliver services online?",
-        "type": "choice",
-        "choices": ["Yes – on my own website","Yes – via marketplaces (Amazon/Etsy)","No – mostly offline"],
-        "tip": "This helps us understand your online exposure and dependencies.",
-        "allow_other": False
-    },
-    {
-        "id": "marketplaces_detail",
-        "phase": "Digital Footprint",
-        "text": "Which marketplace(s) do you use? (e.g., Amazon, Etsy, eBay) — type a short list",
-        "type": "text",
-        "show_if": lambda a: a.get("sell_online") == "Yes – via marketplaces (Amazon/Etsy)"
-    },
-    {
-        "id": "data_types",
-        "phase": "Digital Footprint",
-        "text": "Do you store customer or employee information (e.g., emails, invoices, payment info)?",
-        "type": "choice",
-        "choices": ["Yes","No"],
-        "tip": "You **store data** if you keep any of these: customer emails or order history/invoices; newsletter lists; employee records (contracts/payroll); support tickets/chat logs; CCTV with identifiable faces; payment records (even if payments go through Stripe/PayPal, you likely still store related customer info).",
-        "allow_other": False
-    },
-    {
-        "id": "tools_regular",
-        "phase": "Digital Footprint",
-        "text": "Which of these do you rely on daily?",
-        "type": "multi",
-        "choices": TOOLS_EXPANDED,
-        "tip": "This identifies where your critical information and daily operations live."
-    },
-
-    # IT Ownership
-    {
-        "id": "website_owner",
-        "phase": "IT Ownership",
-        "text": "Who looks after your website and online systems?",
-        "type": "choice",
-        "choices": ["I do it myself","Someone on my team","An external company or freelancer"],
-        "allow_other": True
-    },
-    {
-        "id": "it_support",
-        "phase": "IT Ownership",
-        "text": "Who takes care of your computers, email and systems when something needs setup/fixing?",
-        "type": "choice",
-        "choices": ["I do","A friend/freelancer","An IT company","In-house IT team"],
-        "allow_other": True
-    },
-    {
-        "id": "setup_by",
-        "phase": "IT Ownership",
-        "text": "Did you personally set up your main systems (email, website, backups)?",
-        "type": "choice",
-        "choices": ["Yes, mostly me","Shared effort","Someone else handled it"],
-        "allow_other": True
-    },
-    {
-        "id": "asset_list",
-        "phase": "IT Ownership",
-        "text": "Do you have a clear list of systems, accounts and devices you use?",
-        "type": "choice",
-        "choices": ["Yes, documented","Rough idea","Not really"],
-        "allow_other": True
-    },
-
-    # Partners (branch)
-    {
-        "id": "third_parties",
-        "phase": "Partners",
-        "text": "Do you work with external partners who handle your data or systems (host, accountant, logistics, marketing tools)?",
-        "type": "choice",
-        "choices": ["Yes","No"],
-        "allow_other": False
-    },
-    {
-        "id": "partner_count",
-        "phase": "Partners",
-        "text": "How many key partners or providers do you rely on?",
-        "type": "choice",
-        "choices": ["0–2","3–5","6+"],
-        "show_if": lambda a: a.get("third_parties") == "Yes",
-        "allow_other": False
-    },
-    {
-        "id": "main_partners",
-        "phase": "Partners",
-        "text": "Who are your main partners? (select all that apply)",
-        "type": "multi",
-        "choices": [
-            "Hosting provider", "Domain/DNS", "Email provider", "Payment processor",
-            "Accountant/Payroll", "Logistics/Courier", "Marketing tool",
-            "Managed IT", "Website developer/agency", "Cloud storage",
-            "Other (add details in summary)"
-        ],
-        "show_if": lambda a: a.get("third_parties") == "Yes"
-    },
-    {
-        "id": "breach_contact",
-        "phase": "Partners",
-        "text": "If one of these partners had a breach, would you know what to do and who to contact?",
-        "type": "choice",
-        "choices": ["Yes – I know who to reach","Not really sure"],
-        "show_if": lambda a: a.get("third_parties") == "Yes",
-        "allow_other": False
-    },
-
-    # Confidence
-    {
-        "id": "confidence",
-        "phase": "Confidence",
-        "text": "How prepared would you feel if a cyberattack or data loss hit tomorrow?",
-        "type": "choice",
-        "choices": ["Not at all","Somewhat","Fairly confident","Very confident"],
-        "allow_other": False
-    },
-    {
-        "id": "past_incidents",
-        "phase": "Confidence",
-        "text": "Have you experienced a cybersecurity issue before — like a phishing email, data loss, or a locked computer?",
-        "type": "choice",
-        "choices": ["Yes","No","Not sure"],
-        "allow_other": False
-    },
-    {
-        "id": "know_who_to_call",
-        "phase": "Confidence",
-        "text": "Do you know who to call or where to get help if something happened?",
-        "type": "choice",
-        "choices": ["Yes","No"],
-        "allow_other": False
-    },
-]
-
-def visible_questions(answers: Dict[str, Any]) -> List[Dict[str, Any]]:
-    qs = []
-    for q in BASE_QUESTIONS:
-        cond = q.get("show_if")
-        if cond is None or cond(answers):
-            qs.append(q)
-    return qs
+def sync_banks():
+    """The live question banks; moves this session onto them after a reload, keeping answers and place."""
+    banks = current_banks()
+    wiz = st.session_state.wizard
+    if wiz.visibility.br is not banks.initial:
+        qid = wiz.visibility.br.bank.ids[wiz.qpos]
+        wiz.answers = wiz.answers.rebind(banks.initial.bank)
+        wiz.visibility = Visibility(wiz.answers, banks.initial)
+        wiz.place(qid)
+    if wiz.cyber_answers.bank is not banks.cyber:
+        wiz.cyber_answers = wiz.cyber_answers.rebind(banks.cyber)
+    wiz.cyber_idx = min(wiz.cyber_idx, len(banks.cyber.ids) - 1)
+    return banks
+
+def rerun_card():
+    """Rerun just the wizard card; a full rerun if this click arrived in a full-page run."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
-# =========================================================
-# Cybersecurity Posture — Question Bank (plain-language)
-# =========================================================
-CYBER_QUESTIONS: List[Dict[str, Any]] = [
-    # Access & Accounts
-    {
-        "id":"mfa_all",
-        "domain":"Access & Accounts",
-        "text":"Do all important accounts use **Multi-Factor Authentication (MFA)**?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, for all important accounts","Yes, for some","No / not sure"],
-        "weights":[0,2,1,0],
-        "tip":"MFA = password **plus** a second step (e.g., code from an app like Google Authenticator, SMS, or email). It blocks most account-takeover attempts."
-    },
-    {
-        "id":"shared_accounts",
-        "domain":"Access & Accounts",
-        "text":"Does each person have their **own** login for work systems, or are logins shared?",
-        "type":"choice",
-        "choices":["— Select one —","Everyone has their own","Some shared accounts","Mostly shared accounts"],
-        "weights":[0,2,1,0],
-        "tip":"Personal logins let you remove access when someone leaves and see who did what."
-    },
-    {
-        "id":"admin_rights",
-        "domain":"Access & Accounts",
-        "text":"Are **administrator rights** kept to a **few people** and used **only when needed**?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, limited & reviewed","Partly","No / not sure"],
-        "weights":[0,2,1,0],
-        "tip":"Admins can change settings/install software. Limit who has admin, use a separate admin account, and review every 3–6 months."
-    },
-
-    # Devices
-    {
-        "id":"device_lock",
-        "domain":"Devices",
-        "text":"Are all laptops/phones protected with password/biometrics **and** auto-lock?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, all","Most","No / not sure"],
-        "weights":[0,2,1,0]
-    },
-    {
-        "id":"disk_encryption",
-        "domain":"Devices",
-        "text":"If a **laptop is lost or stolen**, would the data on it be **locked/encrypted** so others can’t read it?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, on all","Some / in progress","No / not sure"],
-        "weights":[0,2,1,0],
-        "tip":"Encryption protects files on a lost device. Windows = **BitLocker**, Mac = **FileVault**."
-    },
-
-    # Data & Backups
-    {
-        "id":"backup_frequency",
-        "domain":"Data & Backups",
-        "text":"How often are business-critical files **backed up automatically**?",
-        "type":"choice",
-        "choices":["— Select one —","Daily or continuous","Weekly","Rarely / never / not sure"],
-        "weights":[0,2,1,0],
-        "tip":"Follow **3-2-1**: 3 copies, 2 different places, 1 offsite/immutable."
-    },
-    {
-        "id":"backup_restore_test",
-        "domain":"Data & Backups",
-        "text":"Have you **tested restoring** from backups recently?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, in last 6 months","Longer than 6 months","Never / not sure"],
-        "weights":[0,2,1,0]
-    },
-
-    # Email & Awareness
-    {
-        "id":"phishing_training",
-        "domain":"Email & Awareness",
-        "text":"Do staff get **phishing/security awareness training**?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, at least yearly","Ad-hoc / once","No / not sure"],
-        "weights":[0,2,1,0]
-    },
-    {
-        "id":"email_filters",
-        "domain":"Email & Awareness",
-        "text":"Do you have **spam/malware filtering** and **link protection** on email?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, managed controls","Basic filtering only","No / not sure"],
-        "weights":[0,2,1,0]
-    },
-
-    # Updates & AV
-    {
-        "id":"patching",
-        "domain":"Updates & AV",
-        "text":"Are computers and apps set to **install updates automatically** (within ~14 days)?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, automated","Partly manual","No / not sure"],
-        "weights":[0,2,1,0],
-        "tip":"Updates (‘patches’) fix security holes used by attackers."
-    },
-    {
-        "id":"av_edr",
-        "domain":"Updates & AV",
-        "text":"Is **antivirus** (or **EDR – Endpoint Detection & Response**) installed on work devices and **checked centrally**?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, on all devices","Some devices","No / not sure"],
-        "weights":[0,2,1,0],
-        "tip":"‘Centrally checked’ = someone can see if all devices are protected."
-    },
-
-    # Response & Continuity
-    {
-        "id":"ir_contacts",
-        "domain":"Response & Continuity",
-        "text":"If something goes wrong, do you have a **one-page incident checklist** and **key contacts**?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, documented","Partial / informal","No / not sure"],
-        "weights":[0,2,1,0]
-    },
-    {
-        "id":"vendor_breach_flow",
-        "domain":"Response & Continuity",
-        "text":"If a **vendor/partner** is breached, do you know **their contact** and the **steps to take**?",
-        "type":"choice",
-        "choices":["— Select one —","Yes, clear contacts","Some idea","No / not sure"],
-        "weights":[0,2,1,0]
-    },
-]
-CYBER_TOTAL = len(CYBER_QUESTIONS)
-
-def compute_domain_scores(cyber_ans: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
-    domain_max: Dict[str,int] = {}
-    domain_sum: Dict[str,int] = {}
-    for q in CYBER_QUESTIONS:
-        dom = q["domain"]
-        domain_max[dom] = domain_max.get(dom, 0) + max(q["weights"])
-        if q["id"] in cyber_ans:
-            sel = cyber_ans[q["id"]]
-            idx = q["choices"].index(sel) if sel in q["choices"] else 0
-            w = q["weights"][idx]
-        else:
-            w = 0
-        domain_sum[dom] = domain_sum.get(dom, 0) + w
-    results: Dict[str, Dict[str, Any]] = {}
-    for dom in domain_max:
-        pct = (domain_sum[dom] / domain_max[dom]) * 100 if domain_max[dom] else 0
-        colour, label = traffic_light(pct)
-        results[dom] = {"score": round(pct), "colour": colour, "label": label}
-    return results
-
-def overall_score(domain_scores: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
-    if not domain_scores: return {"score":0,"colour":"red","label":"At risk"}
-    avg = sum(v["score"] for v in domain_scores.values()) / len(domain_scores)
-    colour, label = traffic_light(avg)
-    return {"score": round(avg), "colour": colour, "label": label}
-
-def add_action_cards(initial: Dict[str, Any], cyber: Dict[str, Any]) -> Tuple[List[str], List[str]]:
-    good, fixes = [], []
-    def chose(id_, i):
-        q = next(q for q in CYBER_QUESTIONS if q["id"] == id_)
-        sel = cyber.get(id_, "")
-        return q["choices"].index(sel) == i if sel in q["choices"] else False
-
-    # Goods
-    if chose("mfa_all", 1): good.append("MFA enabled on important accounts.")
-    if chose("disk_encryption", 1): good.append("Full-disk encryption on devices.")
-    if chose("backup_frequency", 1): good.append("Frequent (daily/continuous) backups.")
-    if chose("backup_restore_test", 1): good.append("Backups are restore-tested.")
-    if chose("patching", 1): good.append("Automatic updates are in place.")
-    if chose("av_edr", 1): good.append("AV/EDR deployed across devices.")
-    if chose("phishing_training", 1): good.append("Regular phishing/security training.")
-    if chose("ir_contacts", 1): good.append("Incident contacts/checklist documented.")
-
-    # Fixes
-    if not chose("mfa_all", 1):
-        fixes.append("Turn on **MFA** for email, cloud storage, accounting, and admin portals (today).")
-    if not chose("backup_frequency", 1):
-        fixes.append("Implement **3-2-1 backups** with at least one **immutable/offsite** copy.")
-    if not chose("disk_encryption", 1):
-        fixes.append("Enable **full-disk encryption** (BitLocker/FileVault) on all laptops/desktops.")
-    if not chose("patching", 1):
-        fixes.append("Enable **automatic updates** for OS and key apps; patch within ~14 days.")
-    if not chose("av_edr", 1):
-        fixes.append("Deploy **reputable AV/EDR** on all devices and ensure it’s updating.")
-    if not chose("ir_contacts", 1):
-        fixes.append("Create a **one-page incident checklist** with internal & vendor contacts.")
-    if not chose("phishing_training", 1):
-        fixes.append("Schedule **annual phishing/awareness training** (15–30 minutes).")
-    if not chose("email_filters", 1):
-        fixes.append("Enable **advanced email filtering** (malware/link protection) in your mail suite.")
-    if not chose("shared_accounts", 1):
-        fixes.append("Stop using **shared accounts**; give each person their own login.")
-    if not chose("admin_rights", 1):
-        fixes.append("Restrict **admin rights**; use separate admin accounts and review quarterly.")
-
-    if initial.get("third_parties") == "Yes" and initial.get("breach_contact") == "Not really sure":
-        if "Create a **one-page incident checklist** with internal & vendor contacts." not in fixes:
-            fixes.insert(0, "Add **vendor breach contacts** to your incident checklist (host, payments, accountant).")
-
-    return good[:8], fixes[:10]
+def autosave():
+    """Queue this session's changes since the last rerun (written shortly after, in the background)."""
+    get_autosaver().save(st.session_state.wizard)
+
+def skip_prefilled() -> bool:
+    return st.session_state.get("skip_prefilled", True)
+
+def ordinal(n: int) -> str:
+    return f"{n}{'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')}"
+
+def answer_text(v: Any) -> str:
+    if v is None:
+        return "—"
+    if isinstance(v, list):
+        return ", ".join(v) or "—"
+    if isinstance(v, dict):
+        return f"{v.get('value', '')}: {v.get('comment', '')}"
+    return str(v)
+
+def question_text(qid: str) -> str:
+    for bank in (wiz.answers.bank, wiz.cyber_answers.bank):
+        pos = bank.index.get(qid)
+        if pos is not None:
+            return bank.questions[pos]["text"]
+    return qid
+
+def uplift_text(f) -> str:
+    if f.uplift:
+        return f" <i>(+{f.uplift} pts overall)</i>"
+    if f.domain_uplift:
+        return f" <i>(+{f.domain_uplift} pts {f.domain})</i>"
+    return ""
+
+def industry_profile(pick, typed: str) -> Dict[str, str]:
+    """The profile's industry: a taxonomy pick counts under its intake group; anything else is "Other"."""
+    if pick is not None:
+        other = pick.title if pick.group == INDUSTRY_OPTIONS[-1] else ""
+        return {"value": pick.group, "other": other, "code": pick.code}
+    if not typed or typed in INDUSTRY_OPTIONS:
+        return {"value": typed, "other": "", "code": ""}
+    return {"value": INDUSTRY_OPTIONS[-1], "other": typed, "code": ""}
+
+def save_progress(with_cyber: bool):
+    """Queue the current assessment for the store (written in the background)."""
+    wiz = st.session_state.wizard
+    metrics.inc("sme_completions_total", assessment="cyber" if with_cyber else "initial")
+    if with_cyber:
+        metrics.FUNNEL.complete(wiz.token)
+    get_store().save(wiz.assessment_id, wiz.profile, wiz.answers, wiz.cyber_answers if with_cyber else None)
 
 # =========================================================
 # Sidebar snapshot
 # =========================================================
 with st.sidebar:
     st.markdown("### Snapshot")
-    p = st.session_state.profile
+    p = wiz.profile
     industry_disp = p.get("industry", {}).get("value") or "—"
     if industry_disp.startswith("Other") and p.get("industry", {}).get("other"):
         industry_disp = f"Other — {p['industry']['other']}"
@@ -490,9 +162,12 @@ f"""**Business:** {p.get('business_name') or '—'}
 """
     )
     st.markdown("---")
-    dd = dd_text(digital_dependency_score(st.session_state.answers))
+    dd = dd_text(digital_dependency_score(wiz.answers))
     st.markdown(f"**Digital dependency (derived):** {dd}")
     st.caption("Derived from online sales, data handling, and daily tools.")
+    st.caption("Progress is saved as you go — bookmark this page to pick up where you left off.")
+    if p.get("prefilled"):
+        st.toggle(f"Skip {len(p['prefilled'])} pre-filled answers", value=True, key="skip_prefilled")
     if st.button("🔁 Restart"):
         reset_all(); st.rerun()
 
@@ -504,25 +179,68 @@ st.title("🧭 SME Self-Assessment Wizard")
 # =========================================================
 # Stage 1: Intake
 # =========================================================
-if st.session_state.stage == "intake":
+PREFILL_PREVIEW = 5000     # inventory rows offered in the picker; the CLI handles whole client lists
+
+if wiz.stage == "intake":
+    industries = current_industries()
+    with st.expander("Already have an inventory or RMM export? Pre-fill from CSV / JSON"):
+        upload = st.file_uploader("Inventory file", type=["csv", "json", "jsonl"], label_visibility="collapsed")
+        if upload is not None:
+            cached = st.session_state.get("prefill_upload")
+            if cached is None or cached[0] != upload.file_id:
+                text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+                try:
+                    rows = list(itertools.islice(read_prefills(text, current_banks(), detect_format(upload.name)), PREFILL_PREVIEW))
+                except ValueError as e:
+                    rows = []
+                    st.error(f"Could not read {upload.name}: {e}")
+                cached = st.session_state.prefill_upload = (upload.file_id, rows)
+            rows = cached[1]
+            if rows:
+                pick = st.selectbox("Client", range(len(rows)), format_func=lambda i: f"{rows[i].name or 'Row'} (row {rows[i].row})") \
+                    if len(rows) > 1 else 0
+                chosen = rows[pick]
+                n = len(chosen.answers) + len(chosen.cyber_answers)
+                st.caption(f"{n} answers and {len(chosen.profile)} business details found.")
+                for issue in chosen.issues:
+                    st.warning(issue)
+                if st.button("Pre-fill", disabled=not (n or chosen.profile)):
+                    wiz.prefill(chosen.profile, chosen.answers, chosen.cyber_answers)
+                    st.rerun()
+
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("First, tell us a bit about the business (≈2 minutes)")
     col1, col2 = st.columns(2)
     with col1:
-        contact = st.text_input("Your name", value=st.session_state.profile.get("contact_name",""))
-        bname   = st.text_input("Business name", value=st.session_state.profile.get("business_name",""))
-        # Industry typeahead + other
-        current_val = st.session_state.profile["industry"]["value"]
-        init_index = INDUSTRY_OPTIONS.index(current_val) if current_val in INDUSTRY_OPTIONS else len(INDUSTRY_OPTIONS)-1
-        industry_sel = st.selectbox("Industry / core service", options=INDUSTRY_OPTIONS, index=init_index)
-        industry_other = ""
-        if industry_sel == "Other (please specify)":
-            industry_other = st.text_input("Type your industry / service", value=st.session_state.profile["industry"].get("other",""))
+        contact = st.text_input("Your name", value=wiz.profile.get("contact_name",""))
+        bname   = st.text_input("Business name", value=wiz.profile.get("business_name",""))
+        # Industry typeahead over the taxonomy (assessment/banks/industries.csv)
+        ind = wiz.profile["industry"]
+        known_ind = industries.by_code.get(ind.get("code", ""))
+        query = st.text_input("Industry / core service",
+                              value=known_ind.title if known_ind else (ind.get("other") or ind.get("value") or ""),
+                              placeholder="Start typing, e.g. dentist, plumber, café")
+        matches = industries.search(query, limit=8, threshold=0.3) if query.strip() else []
+        industry_pick = None
+        if matches:
+            labels = [f"{m.industry.title} ({m.industry.code})" for m in matches]
+            codes = [m.industry.code for m in matches]
+            keep = f"None of these — keep “{query.strip()}”"
+            if known_ind and known_ind.code in codes:
+                default = codes.index(known_ind.code)
+            else:
+                default = 0 if matches[0].score >= MATCH_THRESHOLD else len(labels)
+            pick = st.selectbox("Closest matches", labels + [keep], index=default)
+            if pick != keep:
+                industry_pick = matches[labels.index(pick)].industry
+    def known(options, field):
+        return options.index(wiz.profile[field]) if wiz.profile.get(field) in options else 0
     with col2:
-        years    = st.selectbox("How long in business?", ["<1 year","1–3 years","3–10 years","10+ years"])
-        headcount= st.selectbox("How many people (incl. contractors)?", ["Just me","2–5","6–20","21–100","100+"])
-        turnover = st.selectbox("Approx. annual turnover", ["<€100k","€100k–500k","€500k–2M",">€2M"])
-    work_mode = st.radio("Would you describe your business as mostly…", ["Local & in-person","Online/remote","A mix of both"], horizontal=True)
+        years    = st.selectbox("How long in business?", YEARS_OPTIONS, index=known(YEARS_OPTIONS, "years"))
+        headcount= st.selectbox("How many people (incl. contractors)?", HEADCOUNT_OPTIONS, index=known(HEADCOUNT_OPTIONS, "headcount"))
+        turnover = st.selectbox("Approx. annual turnover", TURNOVER_OPTIONS, index=known(TURNOVER_OPTIONS, "turnover"))
+    work_mode = st.radio("Would you describe your business as mostly…", WORK_MODE_OPTIONS, horizontal=True,
+                         index=known(WORK_MODE_OPTIONS, "work_mode"))
 
     c1, c2 = st.columns([1,2])
     with c1:
@@ -533,42 +251,34 @@ if st.session_state.stage == "intake":
     st.markdown('</div>', unsafe_allow_html=True)
 
     if proceed:
-        st.session_state.profile.update({
+        wiz.profile.update({
             "contact_name": contact.strip(),
             "business_name": bname.strip(),
-            "industry": {"value": industry_sel, "other": industry_other.strip()},
+            "industry": industry_profile(industry_pick, query.strip()),
             "years": years,
             "headcount": headcount,
             "turnover": turnover,
             "work_mode": work_mode
         })
-        st.session_state.stage = "qa"
-        st.session_state.idx = 0
+        first = wiz.step_initial(None, skip_prefilled=skip_prefilled())
+        if first is None:           # every question was pre-filled
+            wiz.stage = "done_initial"
+            save_progress(with_cyber=False)
+        else:
+            wiz.stage = "qa"
+            wiz.qpos = first
         st.rerun()
 
 # =========================================================
 # Utilities for rendering QA pages
 # =========================================================
-PLACEHOLDER = "— Select one —"
-
-def render_choice_with_other(qid: str, options: List[str], allow_other: bool, current: Any):
+def render_choice_with_other(qid: str, options: Sequence[str], allow_other: bool, current: Any):
     """
     Safe radio renderer with placeholder and optional 'Other (please specify)'.
     - Keeps indices in range.
     - Prefills comment if returning to a previously saved 'Other'.
     """
-    base = options[:]
-    if allow_other and "Other (please specify)" not in base:
-        base.append("Other (please specify)")
-    opts = [PLACEHOLDER] + base
-
-    # compute safe pre-selected index
-    pre_idx = 0
-    if isinstance(current, dict) and current.get("value") in opts:
-        pre_idx = opts.index(current["value"])
-    elif isinstance(current, str) and current in opts:
-        pre_idx = opts.index(current)
-
+    opts, pre_idx = choice_options(options, allow_other, current)
     selected = st.radio("Select one:", opts, index=pre_idx, key=f"radio_{qid}")
 
     other_text = ""
@@ -581,18 +291,33 @@ def render_choice_with_other(qid: str, options: List[str], allow_other: bool, cu
 # =========================================================
 # Stage 1: One-question-per-page (Initial Assessment)
 # =========================================================
-if st.session_state.stage == "qa":
-    answers = st.session_state.answers
-    Q = visible_questions(answers)
-    idx = st.session_state.idx
-    q = Q[idx]
+# Only the question card and its navigation rerun on each click (a fragment);
+# the full page reruns when the stage changes or the sidebar needs updating.
+@st.fragment
+def initial_qa_card():
+    with metrics.timer("sme_render_seconds", stage="qa", part="card"):
+        _initial_qa_card()
+
+def _initial_qa_card():
+    sync_banks()
+    wiz = st.session_state.wizard
+    answers = wiz.answers
+    vis = wiz.visibility
+    dd_before = dd_text(digital_dependency_score(answers))
+    pos = wiz.qpos
+    q = vis.br.bank.questions[pos]
+    step = vis.step(pos)
+    metrics.inc("sme_card_renders_total", stage="qa")
+    metrics.FUNNEL.visit(wiz.token, f"qa:{q['id']}")
 
     # Progress
-    st.markdown(f'<div class="progress-head">Initial Assessment • {q["phase"]} • Step {idx+1} of {len(Q)}</div>', unsafe_allow_html=True)
-    st.progress((idx)/max(len(Q),1))
+    st.markdown(f'<div class="progress-head">Initial Assessment • {q["phase"]} • Step {step} of {vis.count}</div>', unsafe_allow_html=True)
+    st.progress((step-1)/max(vis.count,1))
 
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.markdown(f'<div class="qtitle">{q["text"]}</div>', unsafe_allow_html=True)
+    if q["id"] in wiz.profile.get("prefilled", ()):
+        st.caption("📋 Pre-filled from your inventory — change it if it's out of date.")
     if q.get("tip"):
         with st.expander("Why this matters"):
             st.markdown(q["tip"])
@@ -622,35 +347,44 @@ if st.session_state.stage == "qa":
         t = st.text_input("Your answer", value=curr_val or "")
         answers[q["id"]] = t
 
+    vis.update(q["id"], answers)   # shows/hides only the questions that depend on this one
+    autosave()
     st.markdown('</div>', unsafe_allow_html=True)
 
+    # The sidebar shows digital dependency; refresh the whole page only if it moved.
+    if dd_text(digital_dependency_score(answers)) != dd_before:
+        st.rerun()
+
     # Navigation
+    skip = skip_prefilled()
+    prev_pos, next_pos = wiz.step_initial(pos, False, skip), wiz.step_initial(pos, True, skip)
     col_prev, col_skip, col_next = st.columns([1,1,1])
     with col_prev:
-        st.button("← Back", use_container_width=True, disabled=(idx==0),
-                  on_click=lambda: st.session_state.update(idx=max(idx-1,0)))
+        st.button("← Back", use_container_width=True, disabled=(prev_pos is None),
+                  on_click=lambda: setattr(wiz, "qpos", prev_pos))
     with col_skip:
         if st.button("Skip", use_container_width=True):
-            st.session_state.idx = min(idx + 1, len(Q) - 1)
-            st.rerun()
+            if next_pos is not None:
+                wiz.qpos = next_pos
+            rerun_card()
     with col_next:
         if st.button("Next →", type="primary", use_container_width=True):
-            new_Q = visible_questions(st.session_state.answers)
-            current_id = q["id"]
-            ids = [qq["id"] for qq in new_Q]
-            pos = ids.index(current_id) + 1 if current_id in ids else min(idx + 1, len(new_Q))
-            if pos >= len(new_Q):
-                st.session_state.stage = "done_initial"
-            else:
-                st.session_state.idx = pos
-            st.rerun()
+            if next_pos is None:
+                wiz.stage = "done_initial"
+                save_progress(with_cyber=False)
+                st.rerun()
+            wiz.qpos = next_pos
+            rerun_card()
+
+if wiz.stage == "qa":
+    initial_qa_card()
 
 # =========================================================
 # Stage 1: Summary + Continue
 # =========================================================
-if st.session_state.stage == "done_initial":
+if wiz.stage == "done_initial":
     st.success("Initial Assessment complete.")
-    p, a = st.session_state.profile, st.session_state.answers
+    p, a = wiz.profile, wiz.answers
     dd = dd_text(digital_dependency_score(a))
 
     st.markdown("### Quick Summary")
@@ -696,58 +430,91 @@ f"""**Business:** {p.get('business_name') or '—'}
 
     st.info("Next: Cybersecurity Posture (controls like MFA, backups, patching, awareness, incident response).")
     if st.button("→ Continue to Cybersecurity Posture", type="primary"):
-        st.session_state.stage = "cyber_qa"; st.session_state.cyber_idx = 0; st.rerun()
+        first = wiz.step_cyber(None, skip_prefilled=skip_prefilled())
+        if first is None:           # every control was pre-filled
+            wiz.stage = "cyber_results"
+            save_progress(with_cyber=True)
+        else:
+            wiz.stage = "cyber_qa"; wiz.cyber_idx = first
+        st.rerun()
 
 # =========================================================
 # Stage 2: Cybersecurity Posture – Wizard
 # =========================================================
-if st.session_state.stage == "cyber_qa":
-    i = st.session_state.cyber_idx
-    q = CYBER_QUESTIONS[i]
-    st.markdown(f'<div class="progress-head">Cybersecurity Posture • {q["domain"]} • Step {i+1} of {CYBER_TOTAL}</div>', unsafe_allow_html=True)
-    st.progress(i/CYBER_TOTAL)
+@st.fragment
+def cyber_qa_card():
+    with metrics.timer("sme_render_seconds", stage="cyber_qa", part="card"):
+        _cyber_qa_card()
+
+def _cyber_qa_card():
+    bank = sync_banks().cyber
+    wiz = st.session_state.wizard
+    total = len(bank.ids)
+    i = wiz.cyber_idx
+    q = bank.questions[i]
+    metrics.inc("sme_card_renders_total", stage="cyber_qa")
+    metrics.FUNNEL.visit(wiz.token, f"cyber_qa:{q['id']}")
+    st.markdown(f'<div class="progress-head">Cybersecurity Posture • {q["domain"]} • Step {i+1} of {total}</div>', unsafe_allow_html=True)
+    st.progress(i/total)
 
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.markdown(f'<div class="qtitle">{q["text"]}</div>', unsafe_allow_html=True)
+    if q["id"] in wiz.profile.get("prefilled", ()):
+        st.caption("📋 Pre-filled from your inventory — change it if it's out of date.")
     if q.get("tip"):
         with st.expander("Why this matters"):
             st.markdown(q["tip"])
 
-    curr = st.session_state.cyber_answers.get(q["id"], "— Select one —")
+    curr = wiz.cyber_answers.get(q["id"], "— Select one —")
     answer = st.radio("Select one:", q["choices"], index=q["choices"].index(curr) if curr in q["choices"] else 0, key=f"cy_radio_{q['id']}")
-    st.session_state.cyber_answers[q["id"]] = answer
+    wiz.cyber_answers[q["id"]] = answer
+    autosave()
     st.markdown('</div>', unsafe_allow_html=True)
 
+    skip = skip_prefilled()
+    prev_i, next_i = wiz.step_cyber(i, False, skip), wiz.step_cyber(i, True, skip)
     col_prev, col_skip, col_next = st.columns([1,1,1])
     with col_prev:
-        st.button("← Back", use_container_width=True, disabled=(i==0),
-                  on_click=lambda: st.session_state.update(cyber_idx=max(i-1,0)))
+        st.button("← Back", use_container_width=True, disabled=(prev_i is None),
+                  on_click=lambda: setattr(wiz, "cyber_idx", prev_i))
     with col_skip:
         if st.button("Skip", use_container_width=True):
-            st.session_state.cyber_idx = min(i+1, CYBER_TOTAL-1)
-            if st.session_state.cyber_idx == CYBER_TOTAL-1 and i == CYBER_TOTAL-1:
-                st.session_state.stage = "cyber_results"
-            st.rerun()
+            if next_i is None:
+                wiz.stage = "cyber_results"
+                save_progress(with_cyber=True)
+                st.rerun()
+            wiz.cyber_idx = next_i
+            rerun_card()
     with col_next:
         if st.button("Next →", type="primary", use_container_width=True):
-            st.session_state.cyber_idx = i + 1
-            if st.session_state.cyber_idx >= CYBER_TOTAL:
-                st.session_state.stage = "cyber_results"
-            st.rerun()
+            if next_i is None:
+                wiz.stage = "cyber_results"
+                save_progress(with_cyber=True)
+                st.rerun()
+            wiz.cyber_idx = next_i
+            rerun_card()
+
+if wiz.stage == "cyber_qa":
+    cyber_qa_card()
 
 # =========================================================
 # Stage 2: Results – Traffic Lights + Action Cards
 # =========================================================
-if st.session_state.stage == "cyber_results":
+if wiz.stage == "cyber_results":
     st.success("Cybersecurity Posture assessment complete.")
-    scores = compute_domain_scores(st.session_state.cyber_answers)
-    overall = overall_score(scores)
+    with metrics.timer("sme_scoring_seconds", step="domain_scores"):
+        scores = compute_domain_scores(wiz.cyber_answers)
+        overall = overall_score(scores)
+    peer = get_store().peer_percentiles(wiz.profile, {"overall": overall["score"], **{d: v["score"] for d, v in scores.items()}})
 
     def badge(colour, text):
         return f'<span class="badge {colour}">{text}</span>'
 
     st.markdown('<div class="kpi">', unsafe_allow_html=True)
     st.markdown(f"#### Overall posture: {badge(overall['colour'], overall['label'])}  •  **{overall['score']}%**", unsafe_allow_html=True)
+    if "overall" in peer:
+        p = peer["overall"]
+        st.markdown(f"You are in the **{ordinal(p.percentile)} percentile** of {p.cohort} ({p.peers:,} assessments).")
     st.caption("Scores reflect practical control coverage and are intended to guide priorities, not replace audits.")
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -758,10 +525,31 @@ if st.session_state.stage == "cyber_results":
             st.markdown('<div class="kpi">', unsafe_allow_html=True)
             st.markdown(f"**{dom}**")
             st.markdown(f"{badge(data['colour'], data['label'])} • **{data['score']}%**", unsafe_allow_html=True)
+            if dom in peer:
+                st.caption(f"{ordinal(peer[dom].percentile)} percentile among peers")
             st.markdown('</div>', unsafe_allow_html=True)
 
+    st.markdown("### 📋 Compliance coverage")
+    st.caption("How far your answers go towards each framework's controls. Indicative only, not a certification.")
+    with metrics.timer("sme_scoring_seconds", step="compliance"):
+        frameworks = assess_compliance(wiz.cyber_answers)
+    fcols = st.columns(len(frameworks) or 1)
+    for col, fw in zip(fcols, frameworks):
+        with col:
+            st.markdown(f"**{fw.title}**")
+            st.markdown(f"{badge(fw.colour, fw.label)} • **{fw.coverage}%**", unsafe_allow_html=True)
+            with st.expander(f"{sum(c.coverage is not None for c in fw.controls)} of {len(fw.controls)} controls assessed"):
+                st.dataframe(
+                    [{"Control": c.id, "Title": c.title,
+                      "Coverage": "not assessed" if c.coverage is None else f"{c.coverage}%"} for c in fw.controls],
+                    hide_index=True, use_container_width=True,
+                )
+
     st.markdown("---")
-    good, fixes = add_action_cards(st.session_state.answers, st.session_state.cyber_answers)
+    with metrics.timer("sme_scoring_seconds", step="action_cards"):
+        good, _ = add_action_cards(wiz.answers, wiz.cyber_answers)
+        sim = Simulator(wiz.cyber_answers, wiz.answers)
+        fixes = sim.fixes[:FIX_LIMIT]
     colA, colB = st.columns(2)
     with colA:
         st.markdown("### ✅ What you’re doing well")
@@ -772,17 +560,102 @@ if st.session_state.stage == "cyber_results":
     with colB:
         st.markdown("### 🛠 Top recommended fixes")
         if fixes:
-            st.markdown("<ul class='tight'>" + "".join([f"<li>{f}</li>" for f in fixes]) + "</ul>", unsafe_allow_html=True)
+            st.markdown("<ul class='tight'>" + "".join([f"<li>{f.text}{uplift_text(f)}</li>" for f in fixes]) + "</ul>",
+                        unsafe_allow_html=True)
         else:
             st.write("Great baseline! Keep policies current and review quarterly.")
 
+    if any(f.target for f in sim.fixes):
+        with st.expander("🧮 Plan your next steps"):
+            st.caption("Effort per fix runs from 1 (under an hour) to 5 (a small project).")
+            total = sum(f.effort for f in sim.fixes if f.target)
+            budget = st.slider("Effort you can spend", 1, max(total, 2), min(6, total), key="plan_budget")
+            plan = sim.plan(budget)
+            st.markdown(f"**Best plan for effort {budget}:** overall {sim.overall}% → **{plan.overall}%** "
+                        f"(effort {plan.effort})")
+            st.markdown("<ol class='tight'>" + "".join(f"<li>{f.text}</li>" for f in plan.fixes) + "</ol>",
+                        unsafe_allow_html=True)
+            texts = {f.text: f for f in sim.fixes if f.target}
+            chosen = st.multiselect("What if we did…", list(texts), key="what_if",
+                                    format_func=lambda t: t.replace("**", ""))
+            if chosen:
+                overall_if, doms_if = sim.what_if(texts[t] for t in chosen)
+                moved = ", ".join(f"{d} {sim.domain_scores[d]}% → {v}%" for d, v in doms_if.items()
+                                  if v != sim.domain_scores[d])
+                st.markdown(f"Overall {sim.overall}% → **{overall_if}%** "
+                            f"(effort {sum(texts[t].effort for t in chosen)}). {moved}")
+
+    # Reassessment history: the save queued on finishing may not be committed yet.
+    hist = get_store().history(wiz.assessment_id)
+    if hist is None:
+        get_store().flush()
+        hist = get_store().history(wiz.assessment_id)
+    trend, diff = hist or ({}, None)
+    if len(trend.get("overall", ())) > 1:
+        st.markdown("---")
+        st.markdown("### 📈 Your scores over time")
+        dates = {p.seq: p.completed_at[:10] for p in trend["overall"]}
+        chart = {"Assessed": list(dates.values())}
+        for metric, points in sorted(trend.items(), key=lambda kv: kv[0] != "overall"):
+            by_seq = {p.seq: p.score for p in points}
+            chart["Overall" if metric == "overall" else metric] = [by_seq.get(s) for s in dates]
+        st.line_chart(chart, x="Assessed", y_label="Score (%)")
+    if diff is not None:
+        with st.expander(f"🔁 What changed since {diff.since[:10]}", expanded=True):
+            for metric, (old, new) in sorted(diff.scores.items(), key=lambda kv: kv[0] != "overall"):
+                if old is not None and new is not None and old != new:
+                    name = "Overall" if metric == "overall" else metric
+                    st.markdown(f"- **{name}**: {old}% → {new}% ({'+' if new > old else ''}{new - old})")
+            for title, items in (("Newly doing well", diff.good_added), ("No longer a strength", diff.good_lost),
+                                 ("Fixed since last time", diff.fixes_resolved), ("New fixes", diff.fixes_added)):
+                if items:
+                    st.markdown(f"**{title}**")
+                    st.markdown("<ul class='tight'>" + "".join(f"<li>{x}</li>" for x in items) + "</ul>",
+                                unsafe_allow_html=True)
+            changed = [(q, old, new) for part in diff.answers.values() for q, (old, new) in part.items()]
+            if changed:
+                st.markdown(f"**{len(changed)} answer{'s' if len(changed) != 1 else ''} changed**")
+                st.table([{"Question": question_text(q), "Then": answer_text(old), "Now": answer_text(new)} for q, old, new in changed])
+            elif not any(diff[5:]):
+                st.write("Same answers as last time.")
+
     st.markdown("---")
-    st.info("Tip: capture this page as PDF for your records (export coming soon).")
+    # Rendered on a worker thread; poll in a fragment until ready, then show a plain button.
+    _, report = submit_report(wiz.profile, wiz.answers, wiz.cyber_answers)
+    polling = not report.done()
+
+    @st.fragment(run_every=1 if polling else None)
+    def pdf_download():
+        if not report.done():
+            st.caption("⏳ Preparing your PDF report…")
+        elif polling:
+            st.rerun()
+        elif report.exception() is not None:
+            st.warning("PDF export failed — please try again later.")
+        else:
+            st.download_button("⬇ Download PDF report", data=report.result(),
+                               file_name="sme-cyber-posture-report.pdf", mime="application/pdf")
+    pdf_download()
 
     c1, c2 = st.columns([1,1])
     with c1:
         if st.button("← Review answers"):
-            st.session_state.stage = "cyber_qa"; st.session_state.cyber_idx = 0; st.rerun()
+            wiz.stage = "cyber_qa"; wiz.cyber_idx = 0; st.rerun()
     with c2:
         if st.button("Restart whole assessment"):
             reset_all(); st.rerun()
+
+# Stage changes and intake are saved here; the wizard cards save their own reruns.
+autosave()
+
+metrics.observe("sme_render_seconds", time.perf_counter() - run_t0, stage=run_stage, part="page")
+if profiler is not None:
+    profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+    profile_dir = os.environ.get("SME_PROFILE_DIR", os.path.join("data", "profiles"))
+    os.makedirs(profile_dir, exist_ok=True)
+    dump = os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{run_stage}.prof")
+    profiler.dump_stats(dump)
+    with st.expander(f"⏱ Profile of this run ({run_stage}) — saved to {dump}"):
+        st.code(out.getvalue())
@@ -0,0 +1,190 @@
+import hmac
+import math
+import os
+from datetime import datetime, timedelta, timezone
+
+import streamlit as st
+
+from assessment import INDUSTRY_OPTIONS, HEADCOUNT_OPTIONS, TURNOVER_OPTIONS, current_banks, dd_text
+from assessment import rescore
+from assessment.portfolio import OVERALL, LIGHTS, UNSCORED
+from assessment.store import get_store
+from assessment.styles import CSS
+
+# =========================================================
+# Page & styles
+# =========================================================
+st.set_page_config(page_title="Client portfolio", page_icon="📊", layout="wide")
+
+st.markdown(CSS, unsafe_allow_html=True)
+
+# =========================================================
+# Access (admins only: the page lists every client and can start a re-score)
+# =========================================================
+ADMIN_TOKEN = os.environ.get("SME_ADMIN_TOKEN")
+if not ADMIN_TOKEN:
+    st.info("The client portfolio is switched off. Set SME_ADMIN_TOKEN to turn it on.")
+    st.stop()
+if not st.session_state.get("portfolio_admin"):
+    given = st.query_params.get("admin") or st.text_input("Admin token", type="password")
+    if not hmac.compare_digest(given.encode(), ADMIN_TOKEN.encode()):
+        if given:
+            st.error("That is not the admin token.")
+        st.stop()
+    st.session_state.portfolio_admin = True
+
+ANY = "Any"
+DOT = {"green": "🟢", "amber": "🟠", "red": "🔴", UNSCORED: "⚪"}
+SORT_LABELS = {"completed": "Last assessed", "name": "Business", "overall": "Overall score",
+               "dd": "Digital dependency", "fixes": "Outstanding fixes"}
+LIGHT_LABELS = {ANY: ANY, "red": "🔴 At risk", "amber": "🟠 Needs work", "green": "🟢 Good", UNSCORED: "⚪ Not scored"}
+
+store = get_store()
+domains = list(current_banks().cyber.groups)
+
+# =========================================================
+# Filters (sidebar)
+# =========================================================
+with st.sidebar:
+    st.markdown("### Filters")
+    industry = st.selectbox("Industry", [ANY] + INDUSTRY_OPTIONS)
+    headcount = st.selectbox("People", (ANY,) + HEADCOUNT_OPTIONS)
+    turnover = st.selectbox("Turnover", (ANY,) + TURNOVER_OPTIONS)
+    search = st.text_input("Business name contains").strip()
+    light_of = st.selectbox("Traffic light of", ["Overall"] + domains)
+    light = st.selectbox("Traffic light", list(LIGHT_LABELS), format_func=LIGHT_LABELS.get)
+    st.markdown("---")
+    sort = st.selectbox("Sort by", list(SORT_LABELS), format_func=SORT_LABELS.get)
+    descending = st.toggle("Descending", value=True)
+    per_page = st.selectbox("Clients per page", (25, 50, 100), index=1)
+
+filters = dict(
+    industry=None if industry == ANY else industry,
+    headcount=None if headcount == ANY else headcount,
+    turnover=None if turnover == ANY else turnover,
+    search=search or None,
+    light=None if light == ANY else light,
+    domain=None if light_of == "Overall" else light_of,
+)
+# Back to the first page whenever the filters or the order change.
+view = (tuple(filters.items()), sort, descending, per_page)
+if st.session_state.get("portfolio_view") != view:
+    st.session_state.portfolio_view = view
+    st.session_state.portfolio_page_no = 1
+
+# =========================================================
+# Roll-up
+# =========================================================
+st.title("📊 Client portfolio")
+
+roll = store.portfolio_rollup(filters["industry"])
+overall = roll.get(OVERALL)
+if not overall:
+    st.info("No stored assessments yet. Finished assessments appear here automatically.")
+    st.stop()
+
+scope = filters["industry"] or "all industries"
+k1, k2, k3, k4 = st.columns(4)
+k1.metric("Clients", f"{overall['clients'] + overall[UNSCORED]:,}")
+k2.metric("Scored", f"{overall['clients']:,}")
+k3.metric("Average overall score", f"{overall['average']:.0f}%")
+k4.metric("Overall at risk", f"{overall['red']:,}")
+st.dataframe(
+    [{"Domain": m, "Average": f"{r['average']:.0f}%", **{DOT[c]: r[c] for c in LIGHTS}}
+     for m, r in ([("Overall", overall)] + [(d, roll[d]) for d in domains if d in roll])],
+    hide_index=True, use_container_width=True,
+)
+coverage, scored = store.portfolio_compliance(filters["industry"])
+if scored:
+    st.dataframe(
+        [{"Framework": title, "Average coverage": f"{pct:.0f}%"} for title, pct in coverage.items()],
+        hide_index=True, use_container_width=True,
+    )
+st.caption(f"Roll-up across {scope}; it follows the industry filter only.")
+
+# =========================================================
+# Clients (one page, filtered and sorted by the store)
+# =========================================================
+page_no = st.session_state.portfolio_page_no
+rows, total = store.portfolio_page(**filters, sort=sort, descending=descending, page_no=page_no - 1, per_page=per_page)
+pages = max(1, math.ceil(total / per_page))
+c1, c2 = st.columns([1, 3])
+with c1:
+    st.number_input("Page", min_value=1, max_value=pages, step=1, key="portfolio_page_no")
+with c2:
+    st.markdown(f"**{total:,}** matching clients • page {page_no} of {pages}")
+
+table = []
+for r in rows:
+    ds = r["domain_scores"]
+    table.append({
+        "Business": r["business_name"] or "—",
+        "Industry": r["industry"],
+        "People": r["headcount"],
+        "Overall": f"{DOT[r['overall_colour']]} {r['overall_score']}%" if r["overall_score"] is not None else DOT[UNSCORED],
+        **{d: DOT[ds[d]["colour"]] if d in ds else DOT[UNSCORED] for d in domains},
+        "Digital dependency": dd_text(r["dd_score"] or 0),
+        "Fixes": r["fix_count"],
+        "Last assessed": r["completed_at"][:10],
+    })
+st.dataframe(table, hide_index=True, use_container_width=True)
+
+if rows:
+    pick = st.selectbox("Outstanding fixes for", range(len(rows)),
+                        format_func=lambda i: rows[i]["business_name"] or rows[i]["assessment_id"])
+    fixes = rows[pick]["fixes"]
+    if fixes:
+        st.markdown("<ul class='tight'>" + "".join(f"<li>{f}</li>" for f in fixes) + "</ul>", unsafe_allow_html=True)
+    else:
+        st.write("No outstanding fixes." if rows[pick]["overall_score"] is not None else "Not scored yet.")
+
+# =========================================================
+# Scoring model (stored results vs the current weights and rules; see rescore.py)
+# =========================================================
+def _job_caption(job: "rescore.Job") -> str:
+    eta = f" • about {job.eta:,.0f}s left" if job.eta is not None and job.status == "running" else ""
+    return (f"{job.scanned:,} rows scanned • {job.checked:,} recomputed • {job.changed:,} changed • "
+            f"{job.rate:,.0f} rows/s{eta}")
+
+def _live(status: "rescore.Status") -> bool:
+    job = status.job
+    if rescore.running_here(store):
+        return True
+    if job is None or job.status != "running":
+        return False
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=rescore.STALE_AFTER)
+    return datetime.fromisoformat(job.updated_at) > cutoff       # a runner elsewhere (the CLI) is alive
+
+@st.fragment(run_every=2)
+def rescore_progress() -> None:
+    status = store.model_status()
+    job = status.job
+    if job is not None and job.status == "running":
+        st.progress(job.progress, text=f"Re-scoring to model {job.model_version}: {job.progress:.0%}")
+        st.caption(_job_caption(job))
+    else:
+        st.progress(0.0, text="Starting the re-score…")
+    if not _live(status):
+        st.rerun()                                                  # finished: refresh the whole page
+
+st.markdown("---")
+st.markdown("### Scoring model")
+status = store.model_status()
+if _live(status):
+    rescore_progress()
+else:
+    job = status.job
+    if status.stale:
+        st.warning(f"**{status.stale:,}** stored assessments were scored with older weights or rules than the "
+                   f"current model ({status.model.version}). Their scores, peers and the roll-up above use the old "
+                   "results until they are re-scored.")
+        resume = job is not None and job.status in ("paused", "failed") and job.model_version == status.model.version
+        if st.button("Resume re-score" if resume else "Re-score now", type="primary"):
+            rescore.start_background(store)
+            st.rerun()
+    else:
+        st.success(f"Every stored result is up to date with scoring model {status.model.version}.")
+    if job is not None:
+        when = (job.finished_at or job.updated_at)[:16].replace("T", " ")
+        st.caption(f"Last job: {job.status} ({when} UTC, {job.progress:.0%}) • {_job_caption(job)}"
+                   + (f" • {job.error}" if job.error else ""))
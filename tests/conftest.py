@@ -0,0 +1,49 @@
+import os
+import random
+import sys
+from typing import Any, Dict, Optional
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assessment.branching import OTHER
+from assessment.questions import BASE_QUESTIONS, CYBER_QUESTIONS
+from assessment.store import AssessmentStore
+
+def initial_answers(rng: random.Random) -> Dict[str, Any]:
+    """Random Initial Assessment answers: some skipped, some "Other" with a comment, some free text.
+
+    Multi-choice lists are in choice order.
+    """
+    out: Dict[str, Any] = {}
+    for q in BASE_QUESTIONS:
+        if rng.random() < 0.1:
+            continue
+        if q["type"] == "text":
+            out[q["id"]] = f"note {rng.randrange(100)}"
+        elif q["type"] == "multi":
+            out[q["id"]] = [c for c in q["choices"] if rng.random() < 0.4]
+        elif q.get("allow_other") and rng.random() < 0.2:
+            out[q["id"]] = {"value": OTHER, "comment": f"other {rng.randrange(100)}"}
+        else:
+            out[q["id"]] = rng.choice(q["choices"])
+    return out
+
+def cyber_answers(rng: random.Random, skip: float = 0.1) -> Dict[str, Any]:
+    """Random Cybersecurity Posture answers (never the placeholder), ``skip`` of them unanswered."""
+    return {q["id"]: rng.choice(q["choices"][1:]) for q in CYBER_QUESTIONS if rng.random() >= skip}
+
+def profile(business: str, industry: Optional[str] = "Retail") -> Dict[str, Any]:
+    return {"contact_name": "Sam", "business_name": business, "industry": {"value": industry, "other": "", "code": ""},
+            "years": "3–5 years", "headcount": "2–9", "turnover": "<£100k", "work_mode": "Office"}
+
+@pytest.fixture
+def rng() -> random.Random:
+    return random.Random(19)
+
+@pytest.fixture
+def store(tmp_path):
+    s = AssessmentStore(str(tmp_path / "assessments.db"))
+    yield s
+    s.close()
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from assessment import api
+from assessment.branching import OTHER
+from assessment.scoring import score_assessment
+
+from conftest import cyber_answers, initial_answers
+
+KEYS = ("overall", "domains", "digital_dependency", "good", "fixes")
+
+def _route(method, path, body=None):
+    async def go():
+        svc = api.ScoringAPI()
+        try:
+            return await svc.route(method, path, body)
+        finally:
+            svc.close()
+    return asyncio.run(go())
+
+def test_batch_results_match_score_assessment(rng):
+    records = [{"answers": initial_answers(rng), "cyber_answers": cyber_answers(rng), "id": i} for i in range(20)]
+    status, out = _route("POST", "/score/batch", {"records": records})
+    assert status == 200
+    for r, res in zip(records, out["results"]):
+        assert res.pop("id") == r["id"]
+        expected = score_assessment(r["answers"], r["cyber_answers"])
+        assert {k: res[k] for k in KEYS} == {k: expected[k] for k in KEYS}
+
+def test_one_failing_record_does_not_fail_its_batch(monkeypatch, rng):
+    score_many = api.score_many
+    def flaky(records):
+        if any(r.get("poison") for r in records):
+            raise RuntimeError("bad record")
+        return score_many(records)
+    monkeypatch.setattr(api, "score_many", flaky)
+
+    async def go():
+        batcher = api.Batcher(max_batch=3)
+        good = [{"cyber_answers": cyber_answers(rng)} for _ in range(2)]
+        return good, await asyncio.gather(batcher.score(good[0]), batcher.score({"poison": True}),
+                                          batcher.score(good[1]), return_exceptions=True), batcher.batches
+    good, results, batches = asyncio.run(go())
+    assert batches == 1
+    assert isinstance(results[1], RuntimeError)
+    for rec, res in zip(good, (results[0], results[2])):
+        assert res["overall"] == score_assessment({}, rec["cyber_answers"])["overall"]
+
+@pytest.mark.parametrize("body, error", [
+    ([], "expected a JSON object"),
+    ({"answers": []}, "'answers' must be an object"),
+    ({"cyber_answers": {"mfa_all": 1}}, "'cyber_answers.mfa_all' must be a string"),
+    ({"cyber_answers": {"mfa_all": {"value": OTHER, "comment": "x"}}}, "'cyber_answers.mfa_all' must be a string"),
+    ({"answers": {"tools_regular": "Email"}}, "'answers.tools_regular' must be a list of strings"),
+    ({"answers": {"website_owner": {"value": OTHER, "comment": 3}}}, "'answers.website_owner' must be a string"),
+])
+def test_bad_answers_are_rejected(body, error):
+    with pytest.raises(api.BadRequest, match=error):
+        _route("POST", "/score", body)
+
+def test_batch_with_a_bad_record_is_rejected_whole():
+    with pytest.raises(api.BadRequest):
+        _route("POST", "/score/batch", {"records": [{"cyber_answers": {}}, {"cyber_answers": {"mfa_all": [1]}}]})
+
+def test_other_answers_and_unknown_questions_are_accepted():
+    status, res = _route("POST", "/score", {"answers": {"website_owner": {"value": OTHER, "comment": "agency"},
+                                                        "not_asked": 5}})
+    assert status == 200 and "overall" in res
+
+def _http(raw: bytes) -> bytes:
+    async def go():
+        svc = api.ScoringAPI()
+        server = await asyncio.start_server(svc.handle, "127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(raw)
+            await writer.drain()
+            out = await reader.read()
+            writer.close()
+            return out
+        finally:
+            server.close()
+            await server.wait_closed()
+            svc.close()
+    return asyncio.run(go())
+
+def test_http_status_codes():
+    body = json.dumps({"cyber_answers": {"mfa_all": 1}}).encode()
+    out = _http(b"POST /score HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n%s" % (len(body), body))
+    assert out.startswith(b"HTTP/1.1 400 ") and b"must be a string" in out
+    out = _http(b"POST /score HTTP/1.1\r\nContent-Length: abc\r\n\r\n{}")
+    assert out.startswith(b"HTTP/1.1 400 ") and b"bad Content-Length" in out
+    out = _http(b"POST /score HTTP/1.1\r\nContent-Length: 2\r\nConnection: close\r\n\r\n{}")
+    assert out.startswith(b"HTTP/1.1 200 ")
+
+def test_http_keep_alive_and_errors():
+    out = _http(b"POST /score HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}"
+                b"GET /nowhere HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert out.startswith(b"HTTP/1.1 200 ") and b"HTTP/1.1 404 " in out
+    out = _http(b"POST /score HTTP/1.1\r\nContent-Length: 7\r\nConnection: close\r\n\r\nnotjson")
+    assert out.startswith(b"HTTP/1.1 400 ")
@@ -0,0 +1,43 @@
+import pytest
+
+from assessment.backends import Changes, RespError, SessionBackend, open_backend
+
+from benchmarks.resp_standin import start
+
+CHANGES = {"t1": Changes(("a1", "cyber", "q1", 2), "{}", (), {(1, "q1"): '"Yes"'})}
+
+@pytest.fixture
+def server():
+    server = start(password="s3cret:/@")
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+def test_backends_must_read_and_write():
+    class WriteOnly(SessionBackend):
+        def write(self, changes, now):
+            return 0
+
+    for cls in (SessionBackend, WriteOnly):
+        with pytest.raises(TypeError):
+            cls()
+
+@pytest.mark.parametrize("creds", [":s3cret%3A%2F%40", "default:s3cret%3A%2F%40"])
+def test_redis_url_credentials_are_sent(server, creds):
+    backend = open_backend(f"redis://{creds}@127.0.0.1:{server}/1")
+    try:
+        assert backend.write(CHANGES, 0) == 3
+        assert backend.read("t1", 0).answers == [(1, "q1", '"Yes"')]
+    finally:
+        backend.close()
+
+@pytest.mark.parametrize("creds", ["", ":wrong@", "someone:s3cret%3A%2F%40@"])
+def test_redis_without_the_right_credentials_is_refused(server, creds):
+    backend = open_backend(f"redis://{creds}127.0.0.1:{server}/0")
+    with pytest.raises(RespError):
+        backend.write(CHANGES, 0)
+    backend.close()
+
+def test_redis_user_without_password_is_rejected():
+    with pytest.raises(ValueError):
+        open_backend("redis://someone@127.0.0.1:6379/0")
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from assessment.batch import COMPILED, score_frame
+from assessment.questions import CYBER_QUESTIONS
+from assessment.scoring import score_assessment
+
+from conftest import cyber_answers
+
+def test_score_frame_matches_score_assessment(rng):
+    records = [cyber_answers(rng, skip=rng.choice((0.0, 0.3, 0.9))) for _ in range(300)]
+    records += [{}, {q["id"]: q["choices"][0] for q in CYBER_QUESTIONS}]       # unanswered; all placeholders
+    records.append({CYBER_QUESTIONS[0]["id"]: "not one of the choices"})
+    df = pd.DataFrame(records, index=[f"r{i}" for i in range(len(records))])
+    out = score_frame(df)
+    assert list(out.index) == list(df.index)
+    for rid, rec in zip(df.index, records):
+        res = score_assessment({}, rec)
+        row = out.loc[rid]
+        assert (row["overall_score"], row["overall_colour"], row["overall_label"]) == tuple(res["overall"].values())
+        for dom in COMPILED.domains:
+            d = res["domains"][dom]
+            assert (row[f"{dom} score"], row[f"{dom} colour"], row[f"{dom} label"]) == \
+                (d["score"], d["colour"], d["label"])
@@ -0,0 +1,25 @@
+from assessment.branching import INITIAL_BRANCHING, Visibility, visible_questions
+
+from conftest import initial_answers
+
+BANK = INITIAL_BRANCHING.bank
+
+def test_visibility_matches_visible_questions(rng):
+    for _ in range(200):
+        answers = initial_answers(rng)
+        vis = Visibility(answers)
+        expected = [q["id"] for q in visible_questions(answers)]
+        assert [BANK.ids[i] for i in vis.positions()] == expected
+        assert vis.count == len(expected)
+        # Incremental updates agree with a fresh evaluation.
+        for qid in ("third_parties", "sell_online"):
+            q = BANK.questions[BANK.index[qid]]
+            answers[qid] = rng.choice(q["choices"])
+            vis.update(qid, answers)
+            assert [BANK.ids[i] for i in vis.positions()] == [v["id"] for v in visible_questions(answers)]
+        shown = vis.positions()
+        for a, b in zip(shown, shown[1:]):
+            assert vis.next_pos(a) == b and vis.prev_pos(b) == a
+            assert vis.step(b) == vis.step(a) + 1
+        if shown:
+            assert vis.first() == shown[0] and vis.prev_pos(shown[0]) is None and vis.next_pos(shown[-1]) is None
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from assessment import compliance
+from assessment.store import build_row
+
+from conftest import cyber_answers, initial_answers, profile
+
+INDUSTRIES = ("Retail", "Health", "")
+
+def _scan(store, industry=None):
+    """Average coverage the slow way: every scored portfolio client's latest answers, encoded again."""
+    cf = compliance.current_frameworks()
+    sql = ("SELECT a.cyber_answers FROM portfolio_clients p JOIN assessments a ON a.id = p.assessment_id "
+           "WHERE p.stage = 'cyber'" + (" AND p.industry = ?" if industry is not None else ""))
+    with store.reader() as conn:
+        answers = [json.loads(r[0]) for r in conn.execute(sql, (industry,) if industry is not None else ())]
+    if not answers:
+        return dict.fromkeys(cf.titles, 0.0), 0
+    cov = compliance.framework_coverage(compliance.encode(answers, cf), cf).mean(axis=0)
+    return dict(zip(cf.titles, cov.tolist())), len(answers)
+
+def _check(store):
+    for industry in (None, *INDUSTRIES):
+        got, n = store.portfolio_compliance(industry)
+        want, m = _scan(store, industry)
+        assert n == m
+        assert got == pytest.approx(want, abs=0.005)            # stored in hundredths of a percent
+
+def _save(store, rng, rid, business, industry, scored=True):
+    store.write_rows([build_row(rid, profile(business, industry), initial_answers(rng),
+                                cyber_answers(rng) if scored else None)])
+
+def test_rollup_follows_every_kind_of_save(store, rng):
+    for i in range(60):
+        _save(store, rng, f"a{i}", f"Client {i % 40}", INDUSTRIES[i % 3], scored=i % 7 != 0)
+    _check(store)
+    _save(store, rng, "a5", "Client 5", "Health")                        # re-finished, new industry
+    _save(store, rng, "a6", "Renamed Ltd", "Retail")                     # moved to another client
+    _save(store, rng, "b1", "Client 1", "Retail", scored=False)          # reassessment started: keeps scores
+    _save(store, rng, "b2", "Client 2", "Retail")                        # reassessment finished
+    _check(store)
+    with store.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM compliance_clients").fetchone()[0] == _scan(store)[1]
+
+def test_stale_rollup_is_rebuilt_once(store, rng):
+    for i in range(20):
+        _save(store, rng, f"a{i}", f"Client {i}", INDUSTRIES[i % 3])
+    with store._write_lock:
+        store._writer.execute("UPDATE compliance_version SET version = 'older frameworks'")
+    _save(store, rng, "a1", "Client 1", "Retail")                        # not maintained while stale
+    with store.reader() as conn:
+        assert compliance.portfolio_coverage(conn) is None
+    _check(store)
+    with store.reader() as conn:
+        assert not compliance.stale(conn)
+
+def test_rescore_keeps_the_rollup(store, rng):
+    from assessment import rescore
+    for i in range(30):
+        _save(store, rng, f"a{i}", f"Client {i}", INDUSTRIES[i % 3])
+    store.portfolio_compliance()
+    with store._write_lock:
+        store._writer.execute("UPDATE assessments SET model_version = NULL, overall_score = overall_score + 1")
+    assert rescore.run(store, workers=1, chunk=8).changed == 30
+    _check(store)
@@ -0,0 +1,77 @@
+from assessment import history
+from assessment.store import COLUMNS, build_row
+
+from conftest import cyber_answers, initial_answers, profile
+
+RUNS = 2 * history.KEYFRAME + 3
+
+def _runs(store, rng, business="Acme  Bakery", prefix="a"):
+    """RUNS scored assessments of one client a day apart, plus an unscored one; their rows as dicts."""
+    rows = [build_row(f"{prefix}{i:02d}", profile(business), initial_answers(rng), cyber_answers(rng),
+                      f"2024-01-{i + 1:02d}T09:00:00+00:00") for i in range(RUNS)]
+    store.write_rows(rows[:5])
+    store.write_rows([build_row(f"{prefix}-draft", profile(business), initial_answers(rng), None,
+                                "2024-01-06T00:00:00+00:00")])
+    for r in rows[5:]:
+        store.write_rows([r])
+    return [dict(zip(COLUMNS, r)) for r in rows]
+
+def _snapshots(store, key):
+    with store.reader() as conn:
+        return [tuple(r) for r in conn.execute("SELECT seq, assessment_id, state IS NOT NULL FROM snapshots "
+                                               "WHERE client_key = ? ORDER BY seq", (key,))]
+
+def test_states_rebuilt_from_keyframes_and_deltas(store, rng):
+    rows = _runs(store, rng)
+    key = history.client_key(rows[0]["business_name"], rows[0]["id"])
+    assert _snapshots(store, key) == [(i + 1, r["id"], i % history.KEYFRAME == 0) for i, r in enumerate(rows)]
+    with store.reader() as conn:
+        for seq, row in enumerate(rows, 1):
+            assert history.state_at(conn, key, seq) == history.state_of(row)
+
+def test_diff_short_and_long_spans(store, rng):
+    rows = _runs(store, rng)
+    key = history.client_key(rows[0]["business_name"], rows[0]["id"])
+    states = [history.state_of(r) for r in rows]
+    with store.reader() as conn:
+        for since, seq in ((RUNS - 1, RUNS), (2, 2 + history.KEYFRAME), (1, RUNS)):
+            d = history.diff(conn, key, seq, since)
+            expected = history.diff_states(states[since - 1], states[seq - 1])
+            assert d.answers == {p: expected[p] for p in history.ANSWER_PARTS if p in expected}
+            assert d.scores["overall"] == (rows[since - 1]["overall_score"], rows[seq - 1]["overall_score"])
+            assert d.since == rows[since - 1]["completed_at"]
+
+def test_trend_and_store_history(store, rng):
+    rows = _runs(store, rng)
+    trend, diff = store.history(rows[3]["id"])
+    assert [p.score for p in trend["overall"]] == [r["overall_score"] for r in rows[:4]]
+    assert (diff.seq, diff.since_seq) == (4, 3)
+    assert store.history("a-draft") is None
+
+def test_refinished_latest_run_replaces_its_snapshot(store, rng):
+    rows = _runs(store, rng)
+    key = history.client_key(rows[0]["business_name"], rows[0]["id"])
+    again = build_row(rows[-1]["id"], profile(rows[-1]["business_name"]), initial_answers(rng), cyber_answers(rng),
+                      "2024-02-01T09:00:00+00:00")
+    older = build_row(rows[2]["id"], profile(rows[2]["business_name"]), initial_answers(rng), cyber_answers(rng))
+    store.write_rows([again, older])
+    with store.reader() as conn:
+        assert len(history.snapshots(conn, key)) == RUNS
+        assert history.state_at(conn, key, RUNS) == history.state_of(dict(zip(COLUMNS, again)))
+        assert history.state_at(conn, key, 3) == history.state_of(rows[2])
+
+def test_rebuild_matches_incremental(store, rng):
+    rows = _runs(store, rng)
+    _runs(store, rng, "Other Co", "b")
+    key = history.client_key(rows[0]["business_name"], rows[0]["id"])
+    with store.reader() as conn:
+        before = [tuple(r) for r in conn.execute("SELECT * FROM snapshots ORDER BY client_key, seq")]
+        series = [tuple(r) for r in conn.execute("SELECT * FROM score_series ORDER BY client_key, metric, seq")]
+    with store._write_lock:
+        store._writer.execute("BEGIN IMMEDIATE")
+        assert history.rebuild(store._writer, 7) == 2 * RUNS
+        store._writer.execute("COMMIT")
+    with store.reader() as conn:
+        assert [tuple(r) for r in conn.execute("SELECT * FROM snapshots ORDER BY client_key, seq")] == before
+        assert [tuple(r) for r in conn.execute("SELECT * FROM score_series ORDER BY client_key, metric, seq")] == series
+        assert history.state_at(conn, key, RUNS) == history.state_of(rows[-1])
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from assessment.report import render_bulk
+from assessment.store import build_row, profile_from_row
+
+from conftest import cyber_answers, initial_answers, profile
+
+def test_reports_cover_each_client_once(store, rng, tmp_path):
+    rows = [build_row(f"a{i}", profile(f"Client {i % 5}"), initial_answers(rng), cyber_answers(rng),
+                      f"2024-01-{i + 1:02d}T09:00:00+00:00") for i in range(12)]
+    rows.append(build_row("draft", profile("Client 0"), initial_answers(rng), None, "2024-02-01T09:00:00+00:00"))
+    store.write_rows(rows)
+    # Clients 0-4 were last scored in a10, a11, a7, a8, a9; the unscored draft keeps Client 0's scored report.
+    records = [{"id": d["id"], "profile": profile_from_row(d), "answers": d["answers"],
+                "cyber_answers": d["cyber_answers"]} for d in store.iter_clients(chunk=2)]
+    assert sorted(r["id"] for r in records) == ["a10", "a11", "a7", "a8", "a9"]
+    out = tmp_path / "out"
+    assert render_bulk(records, str(out), workers=2, cache_dir=str(tmp_path / "cache")) == 5
+    assert sorted(os.listdir(out)) == ["a10.pdf", "a11.pdf", "a7.pdf", "a8.pdf", "a9.pdf"]
+
+@pytest.mark.parametrize("bad", ["../escape", "/tmp/escape", "sub/x", "..", ""])
+def test_ids_that_are_not_file_names_are_rejected(tmp_path, bad):
+    record = {"id": bad, "profile": profile("Client"), "answers": {}, "cyber_answers": {}}
+    with pytest.raises(ValueError):
+        render_bulk([record], str(tmp_path / "out"), workers=1, cache_dir=str(tmp_path / "cache"))
+    assert not os.path.exists(tmp_path / "escape.pdf")
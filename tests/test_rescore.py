@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from assessment import rescore
+from assessment.scoring import scoring_model
+from assessment.store import COLUMNS, build_row
+
+from conftest import cyber_answers, initial_answers, profile
+
+ROWS, CHUNK = 50, 8
+
+def _stale_store(store, rng):
+    """ROWS stored assessments (one in five unscored) from before versioning, every third one's score off by one."""
+    store.write_rows([build_row(f"a{i:02d}", profile(f"Client {i}"), initial_answers(rng),
+                                cyber_answers(rng) if i % 5 else None) for i in range(ROWS)])
+    with store._write_lock:
+        store._writer.execute("UPDATE assessments SET model_version = NULL")
+        store._writer.execute("UPDATE assessments SET overall_score = overall_score + 1 "
+                              "WHERE stage = 'cyber' AND rowid % 3 = 0")
+    return [(r["id"], r["overall_score"]) for r in store.iter_assessments()]
+
+def test_resumes_after_the_last_chunk(store, rng):
+    before = _stale_store(store, rng)
+    stop, seen = threading.Event(), []
+    def pause_after_two(job):
+        seen.append(job.last_rowid)
+        if len(seen) == 2:
+            stop.set()
+    paused = rescore.run(store, workers=1, chunk=CHUNK, on_progress=pause_after_two, stop=stop)
+    assert paused.status == "paused" and paused.last_rowid == 2 * CHUNK and seen == [CHUNK, 2 * CHUNK]
+    versions = store.model_status().versions
+    assert versions == {scoring_model().version: 2 * CHUNK, None: ROWS - 2 * CHUNK}
+
+    seen.clear()
+    done = rescore.run(store, workers=1, chunk=CHUNK, on_progress=lambda job: seen.append(job.last_rowid))
+    assert done.id == paused.id and done.status == "done"
+    assert seen == [*range(3 * CHUNK, ROWS, CHUNK), ROWS]
+    scored = sum(1 for i in range(ROWS) if i % 5)
+    off = sum(1 for i in range(ROWS) if i % 5 and (i + 1) % 3 == 0)      # rowid i + 1
+    assert (done.scanned, done.checked, done.changed) == (ROWS, scored, off)
+    assert store.model_status().versions == {scoring_model().version: ROWS}
+    after = dict((r["id"], r) for r in store.iter_assessments())
+    for rid, old in before:
+        row = after[rid]
+        if row["stage"] == "cyber":
+            fresh = build_row(rid, {}, row["answers"], row["cyber_answers"])
+            assert row["overall_score"] == fresh[COLUMNS.index("overall_score")]
+        else:
+            assert row["overall_score"] is None and old is None
+    assert rescore.run(store, workers=1, chunk=CHUNK) is None
+
+def test_interrupted_job_is_paused_and_resumed(store, rng):
+    _stale_store(store, rng)
+    def interrupt(job):
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        rescore.run(store, workers=1, chunk=CHUNK, on_progress=interrupt)
+    job = store.model_status().job
+    assert job.status == "paused" and job.last_rowid == CHUNK
+    done = rescore.run(store, workers=1, chunk=CHUNK)
+    assert done.id == job.id and done.status == "done" and done.scanned == ROWS
@@ -0,0 +1,71 @@
+from assessment.bank import CYBER_BANK
+from assessment.branching import INITIAL_BRANCHING, OTHER, Visibility, visible_questions
+from assessment.registry import load_banks
+from assessment.session import CompactAnswers, WizardSession
+
+from conftest import cyber_answers, initial_answers
+
+BANK = INITIAL_BRANCHING.bank
+
+def test_compact_answers_round_trip(rng):
+    for _ in range(200):
+        answers = initial_answers(rng)
+        answers["not_a_question"] = {"kept": [1, 2]}
+        compact = CompactAnswers(BANK, answers)
+        assert compact.to_dict() == answers
+        assert len(compact) == len(answers)
+        cyber = cyber_answers(rng)
+        assert CompactAnswers(CYBER_BANK, cyber).to_dict() == cyber
+
+def test_compact_answers_other_comment_and_odd_values():
+    compact = CompactAnswers(BANK)
+    compact["website_owner"] = {"value": OTHER, "comment": "my nephew"}
+    compact["it_support"] = {"value": OTHER, "comment": ""}
+    compact["third_parties"] = "Maybe"                                  # not one of its choices
+    compact["main_partners"] = ["Domain/DNS", "Domain/DNS"]            # repeated label
+    compact["setup_by"] = {"value": OTHER, "comment": "x", "extra": 1}
+    compact["tools_regular"] = ["HR/Payroll", "Email"]
+    assert compact["website_owner"] == {"value": OTHER, "comment": "my nephew"}
+    assert compact["it_support"] == {"value": OTHER, "comment": ""}
+    assert compact["third_parties"] == "Maybe"
+    assert compact["main_partners"] == ["Domain/DNS", "Domain/DNS"]
+    assert compact["setup_by"] == {"value": OTHER, "comment": "x", "extra": 1}
+    assert compact["tools_regular"] == ["Email", "HR/Payroll"]                 # back in choice order
+    compact["website_owner"] = "I do it myself"
+    assert compact["website_owner"] == "I do it myself" and compact.choice_index("website_owner") == 0
+    del compact["third_parties"]
+    assert "third_parties" not in compact and compact.get("third_parties") is None
+
+def test_compact_answers_rebind(rng):
+    answers = initial_answers(rng)
+    answers["website_owner"] = {"value": OTHER, "comment": "agency"}
+    reloaded = load_banks().initial.bank
+    assert reloaded is not BANK
+    assert CompactAnswers(BANK, answers).rebind(reloaded).to_dict() == answers
+
+def test_compact_answers_changed_since(rng):
+    compact = CompactAnswers(BANK, initial_answers(rng))
+    compact["website_owner"] = {"value": OTHER, "comment": "agency"}
+    snap = compact.snapshot()
+    assert compact.changed_since(snap) == []
+    compact["website_owner"] = {"value": OTHER, "comment": "someone else"}
+    compact["tools_regular"] = ["Email"]
+    compact["unknown"] = 1
+    assert sorted(compact.changed_since(snap)) == ["tools_regular", "unknown", "website_owner"]
+    assert compact.rebind(load_banks().initial.bank).changed_since(snap) is None
+    assert compact.changed_since(None) is None
+
+def test_visibility_over_compact_answers(rng):
+    for _ in range(50):
+        answers = CompactAnswers(BANK, initial_answers(rng))
+        assert [BANK.ids[i] for i in Visibility(answers).positions()] == \
+            [q["id"] for q in visible_questions(answers.to_dict())]
+
+def test_place_resumes_before_a_hidden_question():
+    wiz = WizardSession("a1", INITIAL_BRANCHING, CYBER_BANK)
+    wiz.answers["third_parties"] = "No"
+    wiz.visibility = Visibility(wiz.answers)
+    wiz.place("main_partners")
+    assert BANK.ids[wiz.qpos] == "third_parties"
+    wiz.place("no_such_question")
+    assert wiz.qpos == wiz.visibility.first()
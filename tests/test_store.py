@@ -0,0 +1,24 @@
+import time
+
+from assessment.store import COLUMNS, build_row
+
+from conftest import cyber_answers, initial_answers, profile
+
+def test_bad_row_is_dropped_alone(store, rng):
+    rows = [build_row(f"a{i}", profile(f"Client {i}"), initial_answers(rng), cyber_answers(rng)) for i in range(4)]
+    bad = list(rows[2])
+    bad[COLUMNS.index("domain_scores")] = "not json"                    # the peer histograms cannot read it
+    with store._write_lock:                                             # hold the writer on a0 ...
+        store._queue.put(rows[0])
+        while store._queue.qsize():
+            time.sleep(0.001)
+        for r in (rows[1], tuple(bad), rows[3]):                        # ... so the rest arrive as one batch
+            store._queue.put(r)
+    store.flush()
+    with store.reader() as conn:
+        assert [r[0] for r in conn.execute("SELECT id FROM assessments ORDER BY id")] == ["a0", "a1", "a3"]
+        assert conn.execute("SELECT COUNT(*) FROM portfolio_clients").fetchone()[0] == 3
+    store.save("a4", profile("Client 4"), initial_answers(rng), cyber_answers(rng))  # the writer is still alive
+    store.flush()
+    with store.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM assessments").fetchone()[0] == 4